@@ -10,6 +10,18 @@ from utils.encryption_utils import decrypt_token
 from services.canvas_submissions_service import sync_course_submissions_direct
 from services.course_service import update_student_quiz_data, update_quiz_questions_per_course
 from services.video_service import update_course_videos
+from services.badge_service import ensure_user_badge_indexes
+from services.mastery_service import ensure_mastery_indexes
+from services.analytics_service import ensure_analytics_indexes
+from services.rollup_service import ensure_rollup_indexes, compact_progress_analytics_events
+from services.mastery_history_service import ensure_mastery_history_indexes
+from services.ai_gateway_service import close_ai_client
+from services.ai_cache_service import ensure_ai_cache_indexes
+from services.canonical_question_service import ensure_canonical_question_indexes
+from services.achieveup_service import ensure_question_skill_indexes
+from services.video_search_cache_service import ensure_video_search_cache_indexes
+from utils.youtube_utils import close_youtube_search_executor
+from services.video_metadata_service import close_video_metadata_session, ensure_video_link_refresh_indexes
 
 from routes.base_routes import init_base_routes
 from routes.user_routes import init_user_routes
@@ -117,8 +129,9 @@ quizzes_collection = db[Config.QUIZZES_COLLECTION]
 
 # Create indexes
 async def create_indexes():
+    logger.info("Attempting to create MongoDB indexes...")
+    failed = 0
     try:
-        logger.info("Attempting to create MongoDB indexes...")
         await quizzes_collection.create_index("course_id")
         course_descriptions_collection = db[Config.ACHIEVEUP_COURSE_DESCRIPTIONS_COLLECTION]
         await course_descriptions_collection.create_index(
@@ -126,11 +139,33 @@ async def create_indexes():
             unique=True,
             name="course_instructor_unique_idx"
         )
-        logger.info("Successfully created MongoDB indexes")
     except Exception as e:
+        failed += 1
         logger.error(f"Failed to create MongoDB indexes: {str(e)}")
-        # Don't raise the exception - allow the app to continue running
-        # The indexes will be created when MongoDB is available
+
+    # Each service's indexes are created independently so one failure
+    # (e.g. a unique index over bad existing data) does not skip the rest
+    for ensure_indexes in (
+        ensure_user_badge_indexes,
+        ensure_mastery_indexes,
+        ensure_analytics_indexes,
+        ensure_rollup_indexes,
+        ensure_mastery_history_indexes,
+        ensure_ai_cache_indexes,
+        ensure_canonical_question_indexes,
+        ensure_question_skill_indexes,
+        ensure_video_search_cache_indexes,
+        ensure_video_link_refresh_indexes,
+    ):
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to create MongoDB indexes in {ensure_indexes.__name__}: {str(e)}")
+    # Don't raise - allow the app to continue running
+    # The indexes will be created when MongoDB is available
+    if not failed:
+        logger.info("Successfully created MongoDB indexes")
 
 async def scheduled_update():
     logger.info("Scheduled update started")
@@ -139,6 +174,9 @@ async def scheduled_update():
         await db.command('ping')
         logger.info("MongoDB connection successful")
         
+        # Fold any raw progress analytics events into the rollup buckets
+        await compact_progress_analytics_events()
+        
         # 1. Process Legacy Tokens
         async for token in token_collection.find():
             course_ids = token.get('course_ids')
@@ -234,5 +272,12 @@ async def startup():
     asyncio.create_task(schedule_updates())
     logger.info("Application startup complete")
 
+@app.after_serving
+async def shutdown():
+    # Release the pooled OpenAI and YouTube API connections and the YouTube search threads
+    await close_ai_client()
+    await close_video_metadata_session()
+    close_youtube_search_executor()
+
 if __name__ == "__main__":
     app.run(debug=True, use_reloader=False, port=5001)
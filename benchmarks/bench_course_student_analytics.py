@@ -0,0 +1,95 @@
+# benchmarks/bench_course_student_analytics.py
+
+"""
+Course Student Analytics Benchmark
+==================================
+
+Seeds a synthetic 500-student course into the configured database and
+compares p50/p95 latency of the old per-student mastery loop against the
+single-aggregation read used by get_course_students_analytics.
+
+Run against a development database only:
+    ENVIRONMENT=development python -m benchmarks.bench_course_student_analytics
+"""
+
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+from services.mastery_service import mastery_collection, get_course_mastery_by_student
+
+COURSE_ID = 'bench_course_500'
+STUDENTS = 500
+SKILLS = 12
+RUNS = 30
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def seed_course() -> list:
+    """Insert synthetic mastery documents and return the roster."""
+    await mastery_collection.delete_many({'course_id': COURSE_ID})
+    rng = random.Random(42)
+    docs = []
+    for s in range(STUDENTS):
+        for k in range(SKILLS):
+            attempted = rng.randint(1, 20)
+            correct = rng.randint(0, attempted)
+            docs.append({
+                'student_id': f'bench_student_{s}',
+                'course_id': COURSE_ID,
+                'skill_id': f'Skill {k}',
+                'matrix_id': 'primary',
+                'total_attempted': attempted,
+                'total_correct': correct,
+                'mastery_percentage': correct / attempted * 100,
+                'last_updated': datetime.utcnow()
+            })
+    await mastery_collection.insert_many(docs)
+    return [{'id': f'bench_student_{s}'} for s in range(STUDENTS)]
+
+
+async def per_student_loop(roster: list) -> None:
+    """Old access pattern: one find per student."""
+    for student in roster:
+        await mastery_collection.find({
+            'student_id': student['id'],
+            'course_id': COURSE_ID
+        }).to_list(length=None)
+
+
+async def single_aggregation(roster: list) -> None:
+    """New access pattern: one $match/$group, joined in memory."""
+    mastery_by_student = await get_course_mastery_by_student(COURSE_ID)
+    for student in roster:
+        mastery_by_student.get(student['id'], {})
+
+
+async def measure(label: str, fn, roster: list) -> None:
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        await fn(roster)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<20} p50={percentile(samples, 50):8.1f}ms  "
+          f"p95={percentile(samples, 95):8.1f}ms  mean={statistics.mean(samples):8.1f}ms")
+
+
+async def main():
+    roster = await seed_course()
+    try:
+        await measure('per-student loop', per_student_loop, roster)
+        await measure('single aggregation', single_aggregation, roster)
+    finally:
+        await mastery_collection.delete_many({'course_id': COURSE_ID})
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
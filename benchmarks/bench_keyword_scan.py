@@ -0,0 +1,75 @@
+# benchmarks/bench_keyword_scan.py
+
+"""
+Keyword Scan Benchmark
+======================
+
+Runs the keyword lookups behind the rule-based question heuristics
+(complexity, fallback content groups, technical terminology) over 5,000
+synthetic questions. It compares the per-keyword `keyword in text` scans
+these heuristics used to do against one pass of QUESTION_KEYWORD_AUTOMATON,
+and checks that both find the same keywords.
+
+No database is needed:
+    python -m benchmarks.bench_keyword_scan
+"""
+
+import random
+import time
+
+from services.achieveup_ai_service import QUESTION_KEYWORD_AUTOMATON
+
+QUESTIONS = 5000
+
+VOCABULARY = (
+    'the a of to which what is for in and students write function that returns an array sorted by value '
+    'explain why tcp handshake needed consider following sql query select rows from table where design '
+    'responsive layout with css grid evaluate performance algorithm compare two approaches define variable '
+    'loop over list object class method network packet router describe in detail multiple choice'
+).split()
+
+
+def build_questions() -> list:
+    """Synthetic question texts of 10-80 words."""
+    rng = random.Random(42)
+    return [
+        ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(10, 80))).capitalize() + '?'
+        for _ in range(QUESTIONS)
+    ]
+
+
+def scan_each_keyword(text: str, keyword_groups: dict) -> dict:
+    """The original approach: one substring scan per keyword per group."""
+    text_lower = text.lower()
+    hits = {}
+    for label, keywords in keyword_groups.items():
+        found = {keyword for keyword in keywords if keyword in text_lower}
+        if found:
+            hits[label] = found
+    return hits
+
+
+def main():
+    questions = build_questions()
+    keyword_groups = QUESTION_KEYWORD_AUTOMATON.keyword_groups
+    keywords = sum(len(group) for group in keyword_groups.values())
+
+    started = time.perf_counter()
+    expected = [scan_each_keyword(text, keyword_groups) for text in questions]
+    scan_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    actual = [QUESTION_KEYWORD_AUTOMATON.scan(text) for text in questions]
+    automaton_ms = (time.perf_counter() - started) * 1000
+
+    assert actual == expected, 'automaton and per-keyword scans disagree'
+
+    print(f"{QUESTIONS:,} questions, {keywords} keywords in {len(keyword_groups)} groups")
+    print(f"{'method':<18}{'total':>10}{'per question':>16}")
+    print(f"{'per-keyword in':<18}{scan_ms:>8.0f}ms{scan_ms * 1000 / QUESTIONS:>14.1f}us")
+    print(f"{'automaton':<18}{automaton_ms:>8.0f}ms{automaton_ms * 1000 / QUESTIONS:>14.1f}us")
+    print(f"speedup: {scan_ms / automaton_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_parquet_export.py
+
+"""
+Parquet vs JSON Export Benchmark
+================================
+
+Encodes a synthetic whole-term mastery export (2,000 students x 40 skills)
+with the streaming JSON (NDJSON) and Parquet encoders used by
+/analytics/export/<course_id>, and compares output size, encode time and the
+time a researcher needs to load the file back.
+
+No database is needed:
+    python -m benchmarks.bench_parquet_export
+"""
+
+import asyncio
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+
+from services.analytics_service import COURSE_DATASET_EXPORT_COLUMNS
+from services.export_service import iter_list_rows, stream_ndjson, stream_parquet
+
+STUDENTS = 2000
+SKILLS = 40
+
+
+def build_rows() -> list:
+    """Synthetic mastery documents shaped like AchieveUp_Student_Skill_Mastery."""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 8)
+    rows = []
+    for s in range(STUDENTS):
+        for k in range(SKILLS):
+            attempted = rng.randint(1, 30)
+            correct = rng.randint(0, attempted)
+            rows.append({
+                'student_id': str(100000 + s),
+                'student_name': f'Student {s}',
+                'course_id': '123456',
+                'skill_id': f'Skill {k}: Topic {k % 7}',
+                'matrix_id': 'matrix_123456',
+                'total_attempted': attempted,
+                'total_correct': correct,
+                'mastery_percentage': correct / attempted * 100,
+                'last_updated': start + timedelta(minutes=rng.randint(0, 60 * 24 * 100))
+            })
+    return rows
+
+
+async def encode(stream) -> tuple:
+    started = time.perf_counter()
+    body = b''.join([chunk async for chunk in stream])
+    return body, (time.perf_counter() - started) * 1000
+
+
+async def main():
+    rows = build_rows()
+    columns = COURSE_DATASET_EXPORT_COLUMNS['mastery']
+
+    ndjson, ndjson_ms = await encode(stream_ndjson(iter_list_rows(rows)))
+    parquet, parquet_ms = await encode(stream_parquet(iter_list_rows(rows), columns))
+
+    started = time.perf_counter()
+    [json.loads(line) for line in ndjson.splitlines()]
+    ndjson_load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    pq.read_table(io.BytesIO(parquet)).to_pandas()
+    parquet_load_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{len(rows):,} mastery rows")
+    print(f"{'format':<10}{'size':>12}{'encode':>12}{'load':>12}")
+    print(f"{'ndjson':<10}{len(ndjson) / 1e6:>10.1f}MB{ndjson_ms:>10.0f}ms{ndjson_load_ms:>10.0f}ms")
+    print(f"{'parquet':<10}{len(parquet) / 1e6:>10.1f}MB{parquet_ms:>10.0f}ms{parquet_load_ms:>10.0f}ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
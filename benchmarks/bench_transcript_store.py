@@ -0,0 +1,85 @@
+# benchmarks/bench_transcript_store.py
+
+"""
+Transcript Store Benchmark
+==========================
+
+Encodes a synthetic one-hour lecture transcript (1,200 segments) the way
+transcript_store_service stores it and compares its size with the segment
+list as JSON. Then times finding a core topic's timestamp with the
+prebuilt token index against rescanning every segment's text per query.
+
+No network or database is needed:
+    python -m benchmarks.bench_transcript_store
+"""
+
+import json
+import random
+import time
+
+import bson
+
+from services.transcript_store_service import StoredTranscript, index_tokens
+
+SEGMENTS = 1200
+QUERIES = 200
+
+WORDS = (
+    'so the router looks at the destination address and forwards the packet to the next hop '
+    'a tcp connection begins with a three way handshake and both hosts agree on sequence numbers '
+    'when the buffer fills up packets are dropped and the sender slows down its congestion window '
+    'dns translates a domain name into an address before any connection can be opened'
+).split()
+
+
+def build_segments() -> list:
+    rng = random.Random(7)
+    segments = []
+    start = 0.0
+    for _ in range(SEGMENTS):
+        duration = round(rng.uniform(2.0, 4.0), 2)
+        segments.append({
+            'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))),
+            'start': round(start, 2),
+            'duration': duration
+        })
+        start += duration
+    return segments
+
+
+def rescan_search(segments: list, topic: str) -> int:
+    """Best segment by topic tokens, tokenizing every segment on every query."""
+    tokens = set(index_tokens(topic))
+    scores = [len(tokens & set(index_tokens(segment['text']))) for segment in segments]
+    return max(range(len(scores)), key=scores.__getitem__)
+
+
+def main():
+    segments = build_segments()
+    topics = [' '.join(random.Random(i).sample(WORDS, 3)) for i in range(QUERIES)]
+
+    transcript = StoredTranscript.from_segments('vid', 'en', segments)
+    document = transcript.to_document()
+    json_size = len(json.dumps(segments).encode('utf-8'))
+    stored_size = len(bson.encode(document))
+
+    started = time.perf_counter()
+    for topic in topics:
+        transcript.search(topic)
+    index_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+    started = time.perf_counter()
+    for topic in topics:
+        rescan_search(segments, topic)
+    rescan_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+    print(f"{SEGMENTS:,} segments, {QUERIES} topic searches")
+    print(f"segments as JSON       {json_size / 1024:>8.1f} KB")
+    print(f"stored document        {stored_size / 1024:>8.1f} KB  (text {document['compressed_text_size'] / 1024:.1f} KB "
+          f"of {document['text_size'] / 1024:.1f} KB, index {len(document['token_index']) / 1024:.1f} KB)")
+    print(f"search, token index    {index_ms:>8.2f} ms/query")
+    print(f"search, rescan text    {rescan_ms:>8.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# benchmarks/bench_video_search_loop_lag.py
+
+"""
+YouTube Search Event-Loop Lag Benchmark
+=======================================
+
+Runs update_course_videos for a synthetic course (300 questions over 60
+distinct core topics) and samples event-loop lag while it runs: a
+monitoring task asks to wake every 10ms and records how late it wakes.
+Any other request on the worker would be delayed just as much.
+
+- before: the previous fetch_video_for_topic, which called the blocking
+  VideosSearch(...).result() directly inside the coroutine, once per question
+- after: the current fetch_video_for_topic (thread pool, shared in-flight
+  searches, topic cache)
+
+YouTube, the LLM and Mongo are replaced by in-memory fakes; each search
+blocks its thread for SEARCH_SECONDS like a real scrape. No network or
+database is needed:
+    python -m benchmarks.bench_video_search_loop_lag
+"""
+
+import asyncio
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import numpy as np
+
+from services import video_service
+from utils import youtube_utils
+
+QUESTIONS = 300
+TOPICS = 60
+SEARCH_SECONDS = 0.05
+SAMPLE_INTERVAL = 0.01
+
+
+class FakeVideosSearch:
+    """Stands in for youtubesearchpython.VideosSearch: a blocking scrape."""
+    searches = 0
+
+    def __init__(self, query, limit=1):
+        self.query = query
+        self.limit = limit
+
+    def result(self):
+        FakeVideosSearch.searches += 1
+        time.sleep(SEARCH_SECONDS)
+        return {'result': [
+            {'title': f'{self.query} #{i}', 'link': f'https://youtu.be/{i}', 'channel': {'name': 'Channel'},
+             'thumbnails': [{'url': 'https://i.ytimg.com/x.jpg'}]}
+            for i in range(self.limit)
+        ]}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        return None
+
+
+async def legacy_fetch_video_for_topic(topic):
+    """The previous implementation: a blocking search inside the coroutine."""
+    results = youtube_utils.VideosSearch(topic, limit=1).result().get('result', [])
+    return youtube_utils.parse_video_result(results[0]) if results else {}
+
+
+async def topics_batch(texts, course_name, course_context=''):
+    return {i: f'Topic {text.split()[-1]}' for i, text in enumerate(texts)}
+
+
+async def no_canonical_entries(canonical_ids):
+    return {}
+
+
+async def ignore(*args, **kwargs):
+    return None
+
+
+async def sample_loop_lag(samples: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        samples.append(time.perf_counter() - started - SAMPLE_INTERVAL)
+
+
+async def measure(fetch_video) -> dict:
+    """Run update_course_videos with the given video fetcher and return lag statistics."""
+    topic_cache = {}
+
+    async def cached_candidates(topic):
+        return topic_cache.get(youtube_utils.normalize_topic(topic))
+
+    async def store_candidates(topic, videos):
+        topic_cache[youtube_utils.normalize_topic(topic)] = videos
+
+    questions = [
+        {'_id': i, 'questionid': str(i), 'courseid': 'c1', 'course_name': 'Networks',
+         'question_text': f'Question {i} about topic {i % TOPICS}'}
+        for i in range(QUESTIONS)
+    ]
+    FakeVideosSearch.searches = 0
+
+    with ExitStack() as stack:
+        for target, name, value in (
+            (video_service, 'quizzes_collection', FakeCollection(questions)),
+            (video_service, 'contexts_collection', FakeCollection()),
+            (video_service, 'generate_core_topics_batch', topics_batch),
+            (video_service, 'get_canonical_questions', no_canonical_entries),
+            (video_service, 'save_canonical_topics', ignore),
+            (video_service, 'fetch_video_for_topic', fetch_video),
+            (youtube_utils, 'VideosSearch', FakeVideosSearch),
+            (youtube_utils, 'get_cached_video_candidates', cached_candidates),
+            (youtube_utils, 'store_video_candidates', store_candidates),
+        ):
+            stack.enter_context(patch.object(target, name, value))
+
+        samples = []
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(sample_loop_lag(samples, stop))
+        started = time.perf_counter()
+        await video_service.update_course_videos('c1')
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await monitor
+
+    lag_ms = np.array(samples or [0.0]) * 1000
+    return {
+        'elapsed_ms': elapsed * 1000,
+        'max_lag_ms': lag_ms.max(),
+        'p95_lag_ms': np.percentile(lag_ms, 95),
+        'searches': FakeVideosSearch.searches
+    }
+
+
+async def main():
+    before = await measure(legacy_fetch_video_for_topic)
+    after = await measure(youtube_utils.fetch_video_for_topic)
+
+    print(f"{QUESTIONS} questions, {TOPICS} topics, {SEARCH_SECONDS * 1000:.0f}ms per search")
+    print(f"{'':<8}{'total':>10}{'max lag':>12}{'p95 lag':>12}{'searches':>10}")
+    for name, stats in (('before', before), ('after', after)):
+        print(f"{name:<8}{stats['elapsed_ms']:>8.0f}ms{stats['max_lag_ms']:>10.1f}ms"
+              f"{stats['p95_lag_ms']:>10.1f}ms{stats['searches']:>10}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
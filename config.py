@@ -18,6 +18,20 @@ class Config:
     YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
     # URLs
     YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3/search"
+    YOUTUBE_SEARCH_MAX_CONCURRENCY = int(os.getenv("YOUTUBE_SEARCH_MAX_CONCURRENCY", "4"))  # searches running at once
+    YOUTUBE_SEARCH_TIMEOUT = float(os.getenv("YOUTUBE_SEARCH_TIMEOUT", "20"))  # seconds per search
+    YOUTUBE_SEARCH_CANDIDATES = int(os.getenv("YOUTUBE_SEARCH_CANDIDATES", "3"))  # videos kept per topic
+    YOUTUBE_TOPIC_CACHE_TTL = int(os.getenv("YOUTUBE_TOPIC_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days in seconds
+    YOUTUBE_NEGATIVE_CACHE_TTL = int(os.getenv("YOUTUBE_NEGATIVE_CACHE_TTL", str(24 * 3600)))  # topics with no results
+    YOUTUBE_VIDEOS_API_URL = "https://www.googleapis.com/youtube/v3/videos"
+    YOUTUBE_METADATA_BATCH_WINDOW = float(os.getenv("YOUTUBE_METADATA_BATCH_WINDOW", "0.02"))  # seconds lookups wait to share a call
+    YOUTUBE_METADATA_CACHE_TTL = int(os.getenv("YOUTUBE_METADATA_CACHE_TTL", str(24 * 3600)))  # 1 day in seconds
+    YOUTUBE_METADATA_CACHE_MAX_ENTRIES = int(os.getenv("YOUTUBE_METADATA_CACHE_MAX_ENTRIES", "4096"))
+    YOUTUBE_METADATA_MAX_CONNECTIONS = int(os.getenv("YOUTUBE_METADATA_MAX_CONNECTIONS", "10"))  # shared HTTP pool size
+    YOUTUBE_METADATA_TIMEOUT = float(os.getenv("YOUTUBE_METADATA_TIMEOUT", "10"))  # seconds per API call
+    TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "128"))  # decoded transcripts kept in process
+    TRANSCRIPT_SEARCH_WINDOW = float(os.getenv("TRANSCRIPT_SEARCH_WINDOW", "30"))  # seconds of transcript scored per candidate
+    TRANSCRIPT_DEEP_LINK_LEAD = float(os.getenv("TRANSCRIPT_DEEP_LINK_LEAD", "2"))  # seconds to start before the match
 
     # Environment-based database selection
     ENV = os.getenv("ENVIRONMENT", "production")
@@ -29,6 +43,10 @@ class Config:
     STUDENTS_COLLECTION = "Students"
     COURSES_COLLECTION = "Courses"
     CONTEXTS_COLLECTION = "Course Contexts"
+    CANONICAL_QUESTIONS_COLLECTION = "Canonical Questions"
+    YOUTUBE_TOPIC_CACHE_COLLECTION = "YouTube Topic Cache"
+    VIDEO_LINK_REFRESH_JOBS_COLLECTION = "Video Link Refresh Jobs"
+    VIDEO_TRANSCRIPTS_COLLECTION = "Video Transcripts"
     
     # AchieveUp collection names
     ACHIEVEUP_DATA_COLLECTION = "AchieveUp_Data"
@@ -45,17 +63,22 @@ class Config:
     ACHIEVEUP_BADGE_PROGRESS_COLLECTION = "AchieveUp_Badge_Progress"
     ACHIEVEUP_USER_PROGRESS_COLLECTION = "AchieveUp_User_Progress"
     ACHIEVEUP_PROGRESS_ANALYTICS_COLLECTION = "AchieveUp_Progress_Analytics"
+    ACHIEVEUP_ANALYTICS_ROLLUPS_COLLECTION = "AchieveUp_Analytics_Rollups"
     ACHIEVEUP_PROGRESS_COLLECTION = "AchieveUp_Progress"
+    ACHIEVEUP_MASTERY_HISTORY_COLLECTION = "AchieveUp_Mastery_History"
     ACHIEVEUP_ANALYTICS_COLLECTION = "AchieveUp_Analytics"
     ACHIEVEUP_COURSE_ANALYTICS_COLLECTION = "AchieveUp_Course_Analytics"
+    ACHIEVEUP_COURSE_ANALYTICS_SNAPSHOTS_COLLECTION = "AchieveUp_Course_Analytics_Snapshots"
     ACHIEVEUP_STUDENT_ANALYTICS_COLLECTION = "AchieveUp_Student_Analytics"
     ACHIEVEUP_SKILL_ANALYTICS_COLLECTION = "AchieveUp_Skill_Analytics"
     ACHIEVEUP_CANVAS_COURSES_COLLECTION = "AchieveUp_Canvas_Courses"
     ACHIEVEUP_CANVAS_QUIZZES_COLLECTION = "AchieveUp_Canvas_Quizzes"
     ACHIEVEUP_CANVAS_QUESTIONS_COLLECTION = "AchieveUp_Canvas_Questions"
+    ACHIEVEUP_CANVAS_STUDENTS_COLLECTION = "AchieveUp_Canvas_Students"
     ACHIEVEUP_QUIZ_SUBMISSIONS_COLLECTION = "AchieveUp_Quiz_Submissions"
     ACHIEVEUP_COURSE_DESCRIPTIONS_COLLECTION = "AchieveUp_Course_Descriptions"
     ACHIEVEUP_IMPORT_STATUS_COLLECTION = "AchieveUp_Import_Status"
+    ACHIEVEUP_AI_RESPONSE_CACHE_COLLECTION = "AchieveUp_AI_Response_Cache"
     
     # AchieveUp configuration
     ACHIEVEUP_JWT_SECRET = os.getenv("ACHIEVEUP_JWT_SECRET", "achieveup-secret-key-change-in-production")
@@ -63,13 +86,40 @@ class Config:
     
     # Canvas API Configuration
     CANVAS_API_RATE_LIMIT = int(os.getenv("CANVAS_API_RATE_LIMIT", "100"))  # requests per minute
+    CANVAS_MAX_CONCURRENCY = int(os.getenv("CANVAS_MAX_CONCURRENCY", "8"))  # simultaneous fan-out requests
+    CANVAS_ROSTER_CACHE_TTL = int(os.getenv("CANVAS_ROSTER_CACHE_TTL", "3600"))  # 1 hour in seconds
+    COURSE_ACCESS_CACHE_TTL = int(os.getenv("COURSE_ACCESS_CACHE_TTL", "300"))  # instructor course lists, 5 minutes in seconds
+    DASHBOARD_COURSE_TIMEOUT = float(os.getenv("DASHBOARD_COURSE_TIMEOUT", "8"))  # seconds per course
     SUBMISSION_CACHE_TTL = int(os.getenv("SUBMISSION_CACHE_TTL", "3600"))  # 1 hour in seconds
+    ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "300"))  # 5 minutes in seconds
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "512"))
+    COHORT_MAX_CONCURRENCY = int(os.getenv("COHORT_MAX_CONCURRENCY", "4"))  # courses summarized at once
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))  # rows per streamed export chunk
+    ASSIGNMENT_WRITE_BATCH_SIZE = int(os.getenv("ASSIGNMENT_WRITE_BATCH_SIZE", "500"))  # skill assignment upserts per bulk_write
+    IMPORT_MATCH_THRESHOLD = float(os.getenv("IMPORT_MATCH_THRESHOLD", "0.7"))  # min question-text similarity for skill import
+    IMPORT_MATCH_NUM_PERM = int(os.getenv("IMPORT_MATCH_NUM_PERM", "128"))  # MinHash signature length
+    BACKGROUND_JOB_STALE_AFTER = int(os.getenv("BACKGROUND_JOB_STALE_AFTER", "900"))  # seconds without progress before a running job counts as failed
 
     #AI configuration
     OPENAI_API_KEY= os.getenv("OPENAI_KEY")
+    AI_MODEL = os.getenv("AI_MODEL", "gpt-4o-mini")
+    AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))  # shared HTTP pool size
+    AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))  # seconds
+    AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))  # retries on 429/5xx/timeouts
+    AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))  # seconds, doubled per retry
+    AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "20"))  # seconds
+    AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days in seconds, 0 = never expire
+    AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2048"))  # in-process LRU in front of Mongo
+    AI_BATCH_MAX_CONCURRENCY = int(os.getenv("AI_BATCH_MAX_CONCURRENCY", "4"))  # classification batches in flight
+    AI_BATCH_PROMPT_TOKENS = int(os.getenv("AI_BATCH_PROMPT_TOKENS", "3000"))  # question-text tokens per batch
+    AI_BATCH_MAX_QUESTIONS = int(os.getenv("AI_BATCH_MAX_QUESTIONS", "40"))
+    AI_BATCH_RETRIES = int(os.getenv("AI_BATCH_RETRIES", "1"))  # re-sends of questions a batch left unanswered
+    AI_TOPIC_BATCH_SIZE = int(os.getenv("AI_TOPIC_BATCH_SIZE", "25"))  # questions per core-topic request
     # Feature Flags
     ENABLE_DEMO_MODE = os.getenv("ENABLE_DEMO_MODE", "true").lower() == "true"  # Default to true for backward compatibility
     ENABLE_SUBMISSION_CACHE = os.getenv("ENABLE_SUBMISSION_CACHE", "false").lower() == "true"  # Default to false to minimize storage
+    ENABLE_AI_CACHE = os.getenv("ENABLE_AI_CACHE", "true").lower() == "true"
 
     @classmethod
     def check_config(cls):
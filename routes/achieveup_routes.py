@@ -1,4 +1,5 @@
 from quart import Blueprint, request, jsonify
+from services.export_service import streamed_export_response
 import asyncio
 from services.achieveup_service import (
     create_skill_matrix,
@@ -740,7 +741,7 @@ async def get_individual_analytics_route(student_id):
 
 @achieveup_bp.route('/achieveup/export/<course_id>', methods=['GET'])
 async def export_course_data_route(course_id):
-    """Export course data (CSV). (AchieveUp only)"""
+    """Export course data as a streamed JSON, NDJSON or CSV download. (AchieveUp only)"""
     try:
         # Get token from Authorization header
         auth_header = request.headers.get('Authorization')
@@ -753,8 +754,12 @@ async def export_course_data_route(course_id):
         
         token = auth_header.split(' ')[1]
         
+        # Get query parameters
+        format_type = request.args.get('format', 'json')  # json, ndjson, csv
+        dataset = request.args.get('dataset')  # csv only: skill_matrices, badges, skill_progress
+        
         # Call service
-        result = await export_course_data(token, course_id)
+        result = await export_course_data(token, course_id, format_type, dataset)
         
         if 'error' in result:
             return jsonify({
@@ -763,7 +768,7 @@ async def export_course_data_route(course_id):
                 'statusCode': result['statusCode']
             }), result['statusCode']
         
-        return jsonify(result), 200
+        return streamed_export_response(result['stream'], result['filename'], format_type)
         
     except Exception as e:
         return jsonify({
@@ -1298,7 +1303,8 @@ async def achieveup_ai_suggest_skills_route():
             'courseId': course_id,
             'courseName': course_name,
             'courseCode': course_code,
-            'courseDescription': course_description
+            'courseDescription': course_description,
+            'bypassCache': bool(data.get('bypassCache'))
         })
         
         if 'error' in result:
@@ -1399,7 +1405,7 @@ async def achieveup_ai_analyze_questions_route():
         
         # Call the AI service with matrix_id
         from services.achieveup_service import analyze_questions_with_ai
-        result = await analyze_questions_with_ai(token, questions, course_id, matrix_id)
+        result = await analyze_questions_with_ai(token, questions, course_id, matrix_id, bool(data.get('bypassCache')))
         
         if 'error' in result:
             logger.error(f"AI service error: {result}")
@@ -1460,7 +1466,7 @@ async def achieveup_ai_bulk_assign_route():
         
         # Call the AI service for bulk assignment
         from services.achieveup_service import bulk_assign_skills_with_ai
-        result = await bulk_assign_skills_with_ai(token, course_id, quiz_id)
+        result = await bulk_assign_skills_with_ai(token, course_id, quiz_id, bool(data.get('bypassCache')))
         
         if 'error' in result:
             return jsonify({
@@ -1482,6 +1488,31 @@ async def achieveup_ai_bulk_assign_route():
             'statusCode': 500
         }), 500
 
+@achieveup_bp.route('/achieveup/ai/metrics', methods=['GET'])
+async def achieveup_ai_metrics_route():
+    """Get latency, token and cost metrics per AI operation plus AI, video search and video metadata cache hit rates. (AchieveUp only)"""
+    try:
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Missing token', 'message': 'Authorization header with Bearer token is required', 'statusCode': 401}), 401
+        token = auth_header.split(' ')[1]
+        from services.achieveup_auth_service import achieveup_verify_token
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return jsonify({'error': user_result['error'], 'message': user_result['error'], 'statusCode': user_result['statusCode']}), user_result['statusCode']
+        from services.ai_gateway_service import get_ai_metrics
+        from services.ai_cache_service import get_ai_cache_stats
+        from services.video_search_cache_service import get_video_search_stats
+        from services.video_metadata_service import get_video_metadata_stats
+        return jsonify({
+            **get_ai_metrics(),
+            'cache': get_ai_cache_stats(),
+            'video_search_cache': get_video_search_stats(),
+            'video_metadata_cache': get_video_metadata_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred', 'statusCode': 500}), 500
+
 @achieveup_bp.route('/instructor/analyze-questions-with-ai', methods=['POST'])
 async def instructor_analyze_questions_with_ai_route():
     """Analyze questions with AI for instructors. (AchieveUp only)"""
@@ -1512,7 +1543,7 @@ async def instructor_analyze_questions_with_ai_route():
         if not questions:
             return jsonify({'error': 'Missing required fields', 'message': 'Questions array is required', 'statusCode': 400}), 400
         from services.achieveup_service import analyze_questions_with_ai_instructor
-        result = await analyze_questions_with_ai_instructor(token, questions)
+        result = await analyze_questions_with_ai_instructor(token, questions, bool(data.get('bypassCache')))
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred', 'statusCode': 500}), 500
@@ -1548,7 +1579,7 @@ async def instructor_bulk_assign_skills_with_ai_route():
         if not course_id or not questions:
             return jsonify({'error': 'Missing required fields', 'message': 'Course ID and questions array are required', 'statusCode': 400}), 400
         from services.achieveup_service import bulk_assign_skills_with_ai_instructor
-        result = await bulk_assign_skills_with_ai_instructor(token, course_id, questions)
+        result = await bulk_assign_skills_with_ai_instructor(token, course_id, questions, bool(data.get('bypassCache')))
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred', 'statusCode': 500}), 500
@@ -1836,21 +1867,34 @@ async def import_skills_assignment_route():
                 'statusCode': 400
             }), 400
 
-        from services.achieveup_service import import_skill_setting_from_course
-
-        
-
-        result = await import_skill_setting_from_course(
+        match_threshold = data.get('match_threshold')
+        if match_threshold is not None:
+            try:
+                match_threshold = float(match_threshold)
+            except (TypeError, ValueError):
+                match_threshold = -1
+            if not 0 < match_threshold <= 1:
+                return jsonify({
+                    'error': 'Bad request',
+                    'message': 'match_threshold must be a number between 0 and 1',
+                    'statusCode': 400
+                }), 400
+
+        from services.achieveup_service import start_skill_import_job
+
+        # The import runs in the background; progress is polled from /achieveup/skills/import/<job_id>
+        result = await start_skill_import_job(
             source_course_id=source_course_id,
             target_course_id=target_course_id,
             user_id=user_result['user']['id'],
-            token=token
+            token=token,
+            match_threshold=match_threshold
         )
 
         if 'error' in result:
             return jsonify(result), result.get('statusCode', 500)
 
-        return jsonify(result), 200
+        return jsonify(result), 202
 
     except Exception as e:
         return jsonify({
@@ -1859,6 +1903,35 @@ async def import_skills_assignment_route():
             'statusCode': 500
         }), 500
     
+@achieveup_bp.route('/achieveup/skills/import/<job_id>', methods=['GET'])
+async def get_skill_import_job_route(job_id):
+    """Get the progress and per-quiz details of a skill import job."""
+    try:
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({
+                'error': 'Missing token',
+                'message': 'Authorization header with Bearer token is required',
+                'statusCode': 401
+            }), 401
+
+        token = auth_header.split(' ')[1]
+
+        from services.achieveup_service import get_skill_import_job
+        result = await get_skill_import_job(token, job_id)
+
+        if 'error' in result:
+            return jsonify(result), result.get('statusCode', 500)
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e),
+            'statusCode': 500
+        }), 500
+
 @achieveup_bp.route('/achieveup/import-status/<course_id>', methods=['GET'])
 async def get_import_status_route(course_id):
     try:
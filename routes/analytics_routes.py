@@ -1,10 +1,14 @@
 from quart import Blueprint, request, jsonify
+from services.export_service import STREAMED_EXPORT_FORMATS, streamed_export_response
 from services.analytics_service import (
     get_course_analytics,
     get_student_comparison,
     get_skill_performance_analytics,
     export_analytics_data,
-    get_trend_analytics
+    get_trend_analytics,
+    get_cohort_analytics,
+    open_analytics_export_stream,
+    open_course_analytics_export_stream
 )
 
 analytics_bp = Blueprint('analytics', __name__)
@@ -196,7 +200,7 @@ async def export_analytics_data_route():
         # Get query parameters
         course_id = request.args.get('course_id')
         skill_id = request.args.get('skill_id')
-        format_type = request.args.get('format', 'json')  # json, csv, pdf
+        format_type = request.args.get('format', 'json')  # json, csv, ndjson, pdf
         analytics_type = request.args.get('type', 'course')  # course, skill, comparison, trends
         
         if not course_id and analytics_type != 'trends':
@@ -206,6 +210,17 @@ async def export_analytics_data_route():
                 'statusCode': 400
             }), 400
         
+        # csv, ndjson and parquet are streamed straight from the data source
+        if format_type in STREAMED_EXPORT_FORMATS:
+            result = await open_analytics_export_stream(token, course_id, skill_id, format_type, analytics_type)
+            if 'error' in result:
+                return jsonify({
+                    'error': result['error'],
+                    'message': result['error'],
+                    'statusCode': result['statusCode']
+                }), result['statusCode']
+            return streamed_export_response(result['stream'], result['filename'], format_type)
+        
         # Call analytics service
         result = await export_analytics_data(token, course_id, skill_id, format_type, analytics_type)
         
@@ -319,10 +334,21 @@ async def export_course_analytics_route(course_id):
         token = auth_header.split(' ')[1]
         
         # Get query parameters
-        format_type = request.args.get('format', 'json')  # json, csv, pdf
-        analytics_type = request.args.get('type', 'course')  # course, students, skills
+        format_type = request.args.get('format', 'json')  # json, csv, ndjson, parquet, pdf
+        analytics_type = request.args.get('type', 'course')  # course, students, risk, mastery, progress, submissions, badges
         time_range = request.args.get('time_range', '30d')
         
+        # csv, ndjson and parquet are streamed straight from the data source
+        if format_type in STREAMED_EXPORT_FORMATS:
+            result = await open_course_analytics_export_stream(token, course_id, format_type, analytics_type, time_range)
+            if 'error' in result:
+                return jsonify({
+                    'error': result['error'],
+                    'message': result['error'],
+                    'statusCode': result['statusCode']
+                }), result['statusCode']
+            return streamed_export_response(result['stream'], result['filename'], format_type)
+        
         # Call analytics service
         from services.analytics_service import export_course_analytics
         result = await export_course_analytics(token, course_id, format_type, analytics_type, time_range)
@@ -389,4 +415,84 @@ async def get_individual_graphs_route():
             'error': 'Internal server error',
             'message': 'An unexpected error occurred',
             'statusCode': 500
-        }), 500 
\ No newline at end of file
+        }), 500
+
+@analytics_bp.route('/analytics/cache/stats', methods=['GET'])
+async def get_analytics_cache_stats_route():
+    """Get hit-rate metrics for the analytics result cache. (AchieveUp only)"""
+    try:
+        # Get token from Authorization header
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({
+                'error': 'Missing token',
+                'message': 'Authorization header with Bearer token is required',
+                'statusCode': 401
+            }), 401
+        
+        token = auth_header.split(' ')[1]
+        
+        from services.achieveup_auth_service import achieveup_verify_token
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return jsonify({
+                'error': user_result['error'],
+                'message': user_result['error'],
+                'statusCode': user_result['statusCode']
+            }), user_result['statusCode']
+        
+        from services.analytics_cache_service import get_analytics_cache_stats
+        return jsonify(get_analytics_cache_stats()), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred',
+            'statusCode': 500
+        }), 500
+
+@analytics_bp.route('/analytics/cohort', methods=['GET'])
+async def get_cohort_analytics_route():
+    """Get merged analytics for a cohort of courses. (AchieveUp only)"""
+    try:
+        # Get token from Authorization header
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({
+                'error': 'Missing token',
+                'message': 'Authorization header with Bearer token is required',
+                'statusCode': 401
+            }), 401
+        
+        token = auth_header.split(' ')[1]
+        
+        # Get query parameters
+        course_ids = request.args.get('course_ids')  # comma-separated list
+        skill_ids = request.args.get('skill_ids')  # comma-separated list
+        time_range = request.args.get('time_range', '30d')
+        
+        if not course_ids:
+            return jsonify({
+                'error': 'Missing course_ids',
+                'message': 'A comma-separated list of course IDs is required',
+                'statusCode': 400
+            }), 400
+        
+        # Call analytics service
+        result = await get_cohort_analytics(token, course_ids, skill_ids, time_range)
+        
+        if 'error' in result:
+            return jsonify({
+                'error': result['error'],
+                'message': result['error'],
+                'statusCode': result['statusCode']
+            }), result['statusCode']
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred',
+            'statusCode': 500
+        }), 500
@@ -1,6 +1,7 @@
 # routes/instructor_routes.py
 
 from quart import Blueprint, request, jsonify
+from services.export_service import STREAMED_EXPORT_FORMATS, streamed_export_response
 from services.achieveup_auth_service import achieveup_verify_token, require_instructor_role
 from services.achieveup_service import (
     get_instructor_dashboard,
@@ -24,6 +25,7 @@ from services.analytics_service import (
     get_course_students_analytics,
     get_course_risk_assessment,
     export_course_analytics,
+    open_course_analytics_export_stream,
     get_individual_graphs
 )
 
@@ -524,7 +526,7 @@ async def instructor_analyze_questions_with_ai_route():
                 'statusCode': 400
             }), 400
         
-        result = await analyze_questions_with_ai_instructor(token, questions)
+        result = await analyze_questions_with_ai_instructor(token, questions, bool(data.get('bypassCache')))
         
         if 'error' in result:
             return jsonify({
@@ -586,7 +588,7 @@ async def instructor_bulk_assign_skills_with_ai_route():
                 'statusCode': 400
             }), 400
         
-        result = await bulk_assign_skills_with_ai_instructor(token, course_id, questions)
+        result = await bulk_assign_skills_with_ai_instructor(token, course_id, questions, bool(data.get('bypassCache')))
         
         if 'error' in result:
             return jsonify({
@@ -838,10 +840,21 @@ async def instructor_export_analytics_route(course_id):
             }), 403
         
         # Get query parameters
-        format_type = request.args.get('format', 'json')
+        format_type = request.args.get('format', 'json')  # json, csv, ndjson, parquet, pdf
         analytics_type = request.args.get('type', 'course')
         time_range = request.args.get('time_range', '30d')
         
+        # csv, ndjson and parquet are streamed straight from the data source
+        if format_type in STREAMED_EXPORT_FORMATS:
+            result = await open_course_analytics_export_stream(token, course_id, format_type, analytics_type, time_range)
+            if 'error' in result:
+                return jsonify({
+                    'error': result['error'],
+                    'message': result['error'],
+                    'statusCode': result['statusCode']
+                }), result['statusCode']
+            return streamed_export_response(result['stream'], result['filename'], format_type)
+        
         result = await export_course_analytics(token, course_id, format_type, analytics_type, time_range)
         
         if 'error' in result:
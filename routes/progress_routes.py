@@ -1,9 +1,11 @@
 from quart import Blueprint, request, jsonify
+from services.export_service import STREAMED_EXPORT_FORMATS, streamed_export_response
 from services.progress_service import (
     get_user_progress,
     update_user_progress,
     get_progress_analytics,
-    export_progress_data
+    export_progress_data,
+    open_progress_export_stream
 )
 
 progress_bp = Blueprint('progress', __name__)
@@ -143,7 +145,18 @@ async def export_progress_data_route():
         
         # Get query parameters
         course_id = request.args.get('course_id')
-        format_type = request.args.get('format', 'json')  # json, csv, pdf
+        format_type = request.args.get('format', 'json')  # json, csv, ndjson, parquet, pdf
+        
+        # csv, ndjson and parquet are streamed straight from the data source
+        if format_type in STREAMED_EXPORT_FORMATS:
+            result = await open_progress_export_stream(token, course_id, format_type)
+            if 'error' in result:
+                return jsonify({
+                    'error': result['error'],
+                    'message': result['error'],
+                    'statusCode': result['statusCode']
+                }), result['statusCode']
+            return streamed_export_response(result['stream'], result['filename'], format_type)
         
         # Call progress service
         result = await export_progress_data(token, course_id, format_type)
@@ -4,9 +4,11 @@ from quart import request, jsonify
 from services.video_service import (
     get_assessment_videos, get_course_videos, update_course_videos,
     update_video_link, add_video, remove_video, update_videos_for_filter,
-    vote_video, get_vote_counts, get_student_votes
+    vote_video, get_vote_counts, get_student_votes, find_question_video_timestamp
 )
-from utils.youtube_utils import fetch_video_transcript, extract_video_id
+from utils.youtube_utils import fetch_video_transcript, extract_video_id, find_video_timestamp
+from services.video_metadata_service import start_video_link_refresh_job, get_video_link_refresh_job
+from services.achieveup_auth_service import achieveup_verify_token, verify_instructor_course_access
 
 def init_video_routes(app):
     @app.route('/get-assessment-videos', methods=['POST', 'OPTIONS'])
@@ -138,6 +140,50 @@ def init_video_routes(app):
         else:
             return jsonify({"error": result["message"]}), 404
 
+    @app.route('/refresh-video-links', methods=['POST'])
+    async def refresh_video_links_route():
+        """
+        Start re-validating stored video links (optionally for one course_id); poll the returned job_id.
+        Instructors only: a course refresh requires teaching the course.
+        """
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({
+                'error': 'Missing token',
+                'message': 'Authorization header with Bearer token is required',
+                'statusCode': 401
+            }), 401
+        token = auth_header.split(' ')[1]
+
+        data = await request.get_json(silent=True) or {}
+        course_id = data.get('course_id')
+        if course_id:
+            user_result = await verify_instructor_course_access(token, course_id)
+        else:
+            user_result = await achieveup_verify_token(token)
+            if 'error' not in user_result and (
+                user_result['user']['role'] != 'instructor' or user_result['user'].get('canvasTokenType') != 'instructor'
+            ):
+                user_result = {
+                    'error': 'Insufficient permissions',
+                    'message': 'Instructor access required',
+                    'statusCode': 403
+                }
+        if 'error' in user_result:
+            return jsonify(user_result), user_result['statusCode']
+
+        result = await start_video_link_refresh_job(course_id)
+        if 'error' in result:
+            return jsonify(result), result['statusCode']
+        return jsonify(result), 202
+
+    @app.route('/refresh-video-links/<job_id>', methods=['GET'])
+    async def get_video_link_refresh_job_route(job_id):
+        result = await get_video_link_refresh_job(job_id)
+        if 'error' in result:
+            return jsonify(result), result['statusCode']
+        return jsonify(result), 200
+
     @app.route('/set-video-watched', methods=['POST'])
     async def set_video_watched_route():
         data = await request.get_json()
@@ -213,6 +259,67 @@ def init_video_routes(app):
                 "error": f"Internal server error: {str(e)}"
             }), 500
 
+    @app.route('/find-video-timestamp', methods=['POST', 'OPTIONS'])
+    async def find_video_timestamp_route():
+        """
+        Finds the point in a video where a question's core topic is discussed,
+        from the stored transcript.
+        
+        Request body, either:
+        {
+            "quiz_id": ..., "question_id": ...  # uses the question's video and core topic
+        }
+        or:
+        {
+            "video_url": "https://www.youtube.com/watch?v=...",
+            "video_id": "...",  # Optional, alternative to video_url
+            "core_topic": "..."
+        }
+        plus optionally "languages": ["en"]
+        
+        Response:
+        {
+            "success": true,
+            "start": 84.0,  # seconds
+            "deep_link": "https://www.youtube.com/watch?v=...&t=84s",
+            "matched_terms": [...],
+            ...
+        }
+        OR
+        {
+            "success": false,
+            "error": "Error message"
+        }
+        """
+        if request.method == 'OPTIONS':
+            return '', 204
+
+        try:
+            data = await request.get_json()
+
+            if not data:
+                return jsonify({"success": False, "error": "No JSON data received"}), 400
+
+            languages = data.get('languages', ['en'])
+            if data.get('quiz_id') is not None and data.get('question_id') is not None:
+                result = await find_question_video_timestamp(data['quiz_id'], data['question_id'], languages)
+            else:
+                video_identifier = data.get('video_id') or data.get('video_url')
+                if not video_identifier or not data.get('core_topic'):
+                    return jsonify({"success": False, "error": "Missing quiz_id and question_id, or video and core_topic"}), 400
+                result = await find_video_timestamp(video_identifier, data['core_topic'], languages)
+
+            if result.get('success'):
+                return jsonify(result), 200
+            else:
+                return jsonify(result), 404
+
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+
     @app.route('/vote-video', methods=['POST', 'OPTIONS'])
     async def vote_video_route():
         if request.method == 'OPTIONS':
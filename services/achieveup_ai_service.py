@@ -1,12 +1,22 @@
 # services/achieveup_ai_service.py
 
+import asyncio
 import logging
 import json
 import re
 import os
+import numpy as np
 from typing import List, Dict, Any
-from openai import AsyncOpenAI
-import openai
+from services.ai_gateway_service import create_chat_completion, create_chat_completion_with_usage
+from services.ai_cache_service import (
+    build_ai_cache_key,
+    cached_ai_completion,
+    get_cached_ai_responses,
+    store_ai_responses
+)
+from services.canonical_question_service import get_canonical_skill_suggestions, save_canonical_skill_suggestions
+from services.skill_index_service import get_skill_list_index
+from services.keyword_automaton_service import KeywordAutomaton
 from datetime import datetime
 from config import Config
 
@@ -16,6 +26,9 @@ logger = logging.getLogger(__name__)
 # OpenAI configuration
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY') or Config.OPENAI_KEY
 
+# Question text is truncated to this many characters in batch prompts
+QUESTION_PROMPT_CHARS = 500
+
 # Course code to skill category mapping for fallback
 COURSE_CODE_MAPPINGS = {
     'COP': ['Programming Fundamentals', 'Algorithm Design', 'Data Structures', 'Object-Oriented Programming', 'Software Development'],
@@ -91,18 +104,10 @@ async def generate_ai_skill_suggestions(course_data: Dict[str, Any]) -> List[Dic
         """
         
 
-        client=AsyncOpenAI(api_key=OPENAI_API_KEY)
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert curriculum designer who creates specific, measurable learning outcomes."},
-                {"role": "user", "content": prompt}
-            ],
-            #temperature = 0.3,
-            max_completion_tokens=1000
-        )
-        
-        content = response.choices[0].message.content.strip()
+        content = await create_chat_completion('skill_suggestions', [
+            {"role": "system", "content": "You are an expert curriculum designer who creates specific, measurable learning outcomes."},
+            {"role": "user", "content": prompt}
+        ])
         
         # Extract JSON from response
         json_match = re.search(r'\[.*\]', content, re.DOTALL)
@@ -182,9 +187,10 @@ def generate_fallback_skills(course_data: Dict[str, Any]) -> List[Dict[str, Any]
     
     return skills[:12]  # Limit to 12 skills
 
-async def analyze_questions(questions_data: List[Dict[str, Any]], course_skills: List[str] = None) -> List[Dict[str, Any]]:
+async def analyze_questions(questions_data: List[Dict[str, Any]], course_skills: List[str] = None, bypass_cache: bool = False) -> List[Dict[str, Any]]:
     """
     Analyze questions for complexity and skill mapping using batching for efficiency.
+    Set bypass_cache to ask the model again instead of reusing cached classifications.
     """
     if not course_skills:
         course_skills = GENERIC_SKILLS
@@ -193,8 +199,10 @@ async def analyze_questions(questions_data: List[Dict[str, Any]], course_skills:
     
     # 1. Initial pass: Calculate complexity and identify questions needing AI
     needs_ai = []
+    keyword_hits = []
     for i, question in enumerate(questions_data):
-        complexity = analyze_question_complexity(question)
+        keyword_hits.append(scan_question_keywords(question))
+        complexity = analyze_question_complexity(question, keyword_hits[i])
         question_text = question.get('question_text', '') or question.get('text', '')
         
         # Start with keyword matching
@@ -214,63 +222,104 @@ async def analyze_questions(questions_data: List[Dict[str, Any]], course_skills:
 
     # 2. Batch AI processing (if enabled and needed)
     if OPENAI_API_KEY and needs_ai:
-        batch_size = 20
-        for i in range(0, len(needs_ai), batch_size):
-            chunk_indices = needs_ai[i : i + batch_size]
-            chunk_texts = [
-                (questions_data[idx].get('question_text', '') or questions_data[idx].get('text', ''))
-                for idx in chunk_indices
-            ]
-            
-            logger.info(f"Processing AI batch for {len(chunk_texts)} questions...")
-            batch_results = await classify_questions_batch_ai(chunk_texts, course_skills)
-            
-            if batch_results:
-                for j, idx in enumerate(chunk_indices):
-                    # batch_results is expected to be a dict or list mapping index to skills
-                    ai_skills = batch_results.get(str(j)) or batch_results.get(j)
-                    if ai_skills:
-                        results[idx]['suggestedSkills'] = ai_skills
-                        results[idx]['confidence'] = 0.85 # Higher confidence for AI
+        ai_texts = [
+            (questions_data[idx].get('question_text', '') or questions_data[idx].get('text', ''))
+            for idx in needs_ai
+        ]
+        ai_results = await get_stored_skill_suggestions(ai_texts, course_skills, bypass_cache)
+        remaining = [position for position in range(len(ai_texts)) if position not in ai_results]
+        
+        if remaining:
+            fresh = await classify_questions_concurrently([ai_texts[p] for p in remaining], course_skills, bypass_cache)
+            for j, skills in fresh.items():
+                ai_results[remaining[j]] = skills
+            await store_skill_suggestions({ai_texts[remaining[j]]: skills for j, skills in fresh.items()}, course_skills)
+        
+        for position, idx in enumerate(needs_ai):
+            ai_skills = ai_results.get(position)
+            if ai_skills:
+                results[idx]['suggestedSkills'] = ai_skills
+                results[idx]['confidence'] = 0.85 # Higher confidence for AI
 
     # 3. Final safety net for any still missing skills
     for i, res in enumerate(results):
         if not res['suggestedSkills'] and course_skills:
-            res['suggestedSkills'] = get_fallback_skill_suggestion(questions_data[i], course_skills)
-            res['confidence'] = calculate_confidence_score(questions_data[i], res['suggestedSkills'])
+            res['suggestedSkills'] = get_fallback_skill_suggestion(questions_data[i], course_skills, keyword_hits[i])
+            res['confidence'] = calculate_confidence_score(questions_data[i], res['suggestedSkills'], keyword_hits[i])
 
     return results
 
-def analyze_question_complexity(question: Dict[str, Any]) -> str:
-    """Analyze question complexity based on text content and structure."""
-    question_text = question.get('question_text', '') or question.get('text', '')
-    points = question.get('points', 1)
-    
-    # Text-based indicators
-    text_length = len(question_text)
-    word_count = len(question_text.split())
-    
-    # Complexity indicators
-    high_complexity_words = [
+# Bloom-style verbs by complexity level, and phrases that reveal the question format
+COMPLEXITY_KEYWORDS = {
+    'high': [
         'analyze', 'evaluate', 'compare', 'contrast', 'synthesize', 'justify', 'critique',
         'design', 'implement', 'optimize', 'debug', 'troubleshoot', 'architect'
-    ]
-    
-    medium_complexity_words = [
+    ],
+    'medium': [
         'explain', 'describe', 'apply', 'demonstrate', 'solve', 'calculate',
         'identify', 'classify', 'interpret', 'predict'
-    ]
-    
-    low_complexity_words = [
-        'define', 'list', 'name', 'recall', 'state', 'recognize', 'select', 'choose'
-    ]
+    ],
+    'low': ['define', 'list', 'name', 'recall', 'state', 'recognize', 'select', 'choose'],
+    'objective_format': ['multiple choice', 'select all', 'true/false'],
+    'written_format': ['essay', 'explain', 'describe in detail']
+}
+
+# Broad content indicators for the fallback suggestion, checked in order
+CONTENT_SKILL_MAPPING = {
+    'web': {
+        'keywords': ['web', 'html', 'css', 'javascript', 'js', 'dom', 'element', 'tag', 'style', 'layout', 'responsive', 'grid', 'flexbox', 'browser', 'client'],
+        'skills': ['HTML/CSS Fundamentals', 'JavaScript Programming', 'Web APIs', 'DOM Manipulation', 'Responsive Design']
+    },
+    'database': {
+        'keywords': ['database', 'sql', 'table', 'query', 'select', 'insert', 'update', 'delete', 'join', 'index', 'schema', 'normal'],
+        'skills': ['SQL Fundamentals', 'Database Design', 'Data Normalization', 'Query Optimization']
+    },
+    'network': {
+        'keywords': ['network', 'tcp', 'ip', 'protocol', 'router', 'switch', 'packet', 'lan', 'wan', 'wifi', 'ethernet', 'security', 'firewall'],
+        'skills': ['Network Protocols (TCP/IP)', 'Network Security', 'Routing & Switching', 'Wireless Networks', 'Network Troubleshooting']
+    },
+    'programming': {
+        'keywords': ['program', 'code', 'function', 'variable', 'loop', 'array', 'object', 'class', 'method', 'algorithm', 'data structure'],
+        'skills': ['JavaScript Programming', 'Programming Fundamentals', 'Object-Oriented Programming']
+    },
+    'general': {
+        'keywords': ['technical', 'system', 'software', 'application', 'development', 'engineering', 'computer'],
+        'skills': ['Technical Skills', 'System Analysis', 'Software Development']
+    }
+}
+
+# Technical terminology that raises confidence in a suggestion
+TECHNICAL_WORDS = ['algorithm', 'function', 'database', 'network', 'protocol', 'class', 'object', 'array']
+
+# One automaton over every keyword the question heuristics look for
+QUESTION_KEYWORD_AUTOMATON = KeywordAutomaton({
+    **{('complexity', level): words for level, words in COMPLEXITY_KEYWORDS.items()},
+    **{('content', group): mapping['keywords'] for group, mapping in CONTENT_SKILL_MAPPING.items()},
+    ('technical', 'words'): TECHNICAL_WORDS
+})
+
+def scan_question_keywords(question: Dict[str, Any]) -> Dict[tuple, set]:
+    """Find every heuristic keyword in a question's text in one pass (see QUESTION_KEYWORD_AUTOMATON)."""
+    question_text = question.get('question_text', '') or question.get('text', '')
+    return QUESTION_KEYWORD_AUTOMATON.scan(question_text)
+
+def analyze_question_complexity(question: Dict[str, Any], keyword_hits: Dict[tuple, set] = None) -> str:
+    """
+    Analyze question complexity based on text content and structure.
+    Pass keyword_hits from scan_question_keywords to reuse an earlier scan.
+    """
+    question_text = question.get('question_text', '') or question.get('text', '')
+    points = question.get('points', 1)
+    if keyword_hits is None:
+        keyword_hits = scan_question_keywords(question)
     
-    question_lower = question_text.lower()
+    # Text-based indicators
+    word_count = len(question_text.split())
     
     # Count complexity indicators
-    high_count = sum(1 for word in high_complexity_words if word in question_lower)
-    medium_count = sum(1 for word in medium_complexity_words if word in question_lower)
-    low_count = sum(1 for word in low_complexity_words if word in question_lower)
+    high_count = len(keyword_hits.get(('complexity', 'high'), ()))
+    medium_count = len(keyword_hits.get(('complexity', 'medium'), ()))
+    low_count = len(keyword_hits.get(('complexity', 'low'), ()))
     
     # Scoring system
     complexity_score = 0
@@ -293,9 +342,9 @@ def analyze_question_complexity(question: Dict[str, Any]) -> str:
     complexity_score -= low_count * 1
     
     # Question type analysis
-    if any(phrase in question_lower for phrase in ['multiple choice', 'select all', 'true/false']):
+    if ('complexity', 'objective_format') in keyword_hits:
         complexity_score -= 1
-    elif any(phrase in question_lower for phrase in ['essay', 'explain', 'describe in detail']):
+    elif ('complexity', 'written_format') in keyword_hits:
         complexity_score += 2
     
     # Final classification
@@ -343,7 +392,18 @@ async def map_question_to_skills(question: Dict[str, Any], available_skills: Lis
     
     return suggested_skills
 
-async def classify_question_skills_ai(question_text: str, available_skills: List[str]) -> List[str]:
+def parse_skill_list(content: str, available_skills: List[str]) -> List[str]:
+    """Extract up to 3 known skill names from a JSON array in a model reply (None if there are none)."""
+    json_match = re.search(r'\[.*\]', content, re.DOTALL)
+    if not json_match:
+        return None
+    skills = json.loads(json_match.group())
+
+    # Validate skills are in available list
+    valid_skills = [skill for skill in skills if skill in available_skills]
+    return valid_skills[:3] or None  # Maximum 3 skills
+
+async def classify_question_skills_ai(question_text: str, available_skills: List[str], bypass_cache: bool = False) -> List[str]:
     """Use OpenAI to classify question skills."""
     if not OPENAI_API_KEY or len(available_skills) == 0:
         logger.warning(f"AI classification skipped: API_KEY={'present' if OPENAI_API_KEY else 'missing'}, skills_count={len(available_skills)}")
@@ -364,46 +424,56 @@ async def classify_question_skills_ai(question_text: str, available_skills: List
         Only include skills that are directly relevant to the question content.
         """
 
-        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        return await cached_ai_completion(
+            'question_classification', 'question_skills',
+            {'question': question_text},
+            [
                 {"role": "system", "content": "You are an expert at mapping educational content to learning skills."},
                 {"role": "user", "content": prompt}
             ],
-            #temperature=0.1,
-            max_completion_tokens=1000
+            lambda content: parse_skill_list(content, available_skills),
+            skills=available_skills,
+            bypass_cache=bypass_cache
         )
-
-        content = response.choices[0].message.content.strip()
-        
-        # Extract JSON array
-        json_match = re.search(r'\[.*\]', content, re.DOTALL)
-        if json_match:
-            skills = json.loads(json_match.group())
-            
-            # Validate skills are in available list
-            valid_skills = [skill for skill in skills if skill in available_skills]
-            return valid_skills[:3]  # Maximum 3 skills
-        
-        return None
         
     except Exception as e:
         logger.error(f"AI skill classification error: {str(e)}")
         return None
 
-async def classify_questions_batch_ai(question_texts: List[str], available_skills: List[str]) -> Dict[str, List[str]]:
-    """Use OpenAI to classify multiple questions at once for efficiency."""
+async def classify_questions_batch_ai(question_texts: List[str], available_skills: List[str], bypass_cache: bool = False) -> Dict[str, List[str]]:
+    """
+    Use OpenAI to classify multiple questions at once for efficiency.
+
+    Questions already answered (by this or the single-question classifier)
+    come from the AI response cache; only the rest are sent to the model.
+
+    Returns:
+        Dict mapping each question's position (as a string) to its skills
+    """
     if not OPENAI_API_KEY or not question_texts:
         return {}
     
     try:
+        cleaned_results = {}
+        keys = [
+            build_ai_cache_key('question_skills', {'question': text}, available_skills) if Config.ENABLE_AI_CACHE else None
+            for text in question_texts
+        ]
+        if Config.ENABLE_AI_CACHE and not bypass_cache:
+            cached = await get_cached_ai_responses(keys)
+            for i, key in enumerate(keys):
+                if key in cached:
+                    cleaned_results[str(i)] = cached[key]
+
+        pending = [i for i in range(len(question_texts)) if str(i) not in cleaned_results]
+        if not pending:
+            return cleaned_results
+
         # Prepare numbered list of questions
-        questions_formatted = "\n".join([f"{i}. {text[:500]}" for i, text in enumerate(question_texts)])
+        questions_formatted = "\n".join([f"{j}. {question_texts[i][:QUESTION_PROMPT_CHARS]}" for j, i in enumerate(pending)])
         
         prompt = f"""
-        Map each of the following {len(question_texts)} questions to 1-3 most relevant skills from the provided list.
+        Map each of the following {len(pending)} questions to 1-3 most relevant skills from the provided list.
         
         Available Skills: {', '.join(available_skills)}
         
@@ -418,25 +488,26 @@ async def classify_questions_batch_ai(question_texts: List[str], available_skill
         }}
         """
 
-        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert at mapping educational content to learning skills. Output only valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        content = response.choices[0].message.content.strip()
+        content, usage = await create_chat_completion_with_usage('batch_classification', [
+            {"role": "system", "content": "You are an expert at mapping educational content to learning skills. Output only valid JSON."},
+            {"role": "user", "content": prompt}
+        ], response_format={"type": "json_object"})
         batch_results = json.loads(content)
         
         # Clean and validate
-        cleaned_results = {}
-        for key, skills in batch_results.items():
+        fresh = {}
+        for j, i in enumerate(pending):
+            skills = batch_results.get(str(j))
             if isinstance(skills, list):
                 valid_skills = [s for s in skills if s in available_skills]
-                cleaned_results[key] = valid_skills[:3]
+                cleaned_results[str(i)] = valid_skills[:3]
+                if valid_skills and Config.ENABLE_AI_CACHE:
+                    fresh[keys[i]] = valid_skills[:3]
+
+        # Spread the batch's token cost across its questions
+        await store_ai_responses('question_skills', fresh, {
+            name: round(tokens / len(pending)) for name, tokens in usage.items()
+        })
         
         return cleaned_results
 
@@ -444,10 +515,100 @@ async def classify_questions_batch_ai(question_texts: List[str], available_skill
         logger.error(f"Batch AI skill classification error: {str(e)}")
         return {}
 
-def get_fallback_skill_suggestion(question: Dict[str, Any], available_skills: List[str]) -> List[str]:
+async def get_stored_skill_suggestions(question_texts: List[str], course_skills: List[str], bypass_cache: bool = False) -> Dict[int, List[str]]:
+    """Suggestions already made for the same question (in any section) against the same skill list."""
+    if bypass_cache:
+        return {}
+    try:
+        return await get_canonical_skill_suggestions(question_texts, course_skills)
+    except Exception as e:
+        logger.error(f"Canonical skill suggestion lookup error: {str(e)}")
+        return {}
+
+async def store_skill_suggestions(suggestions: Dict[str, List[str]], course_skills: List[str]) -> None:
+    """Keep AI suggestions on the canonical questions so other sections can reuse them."""
+    try:
+        await save_canonical_skill_suggestions(suggestions, course_skills)
+    except Exception as e:
+        logger.error(f"Canonical skill suggestion store error: {str(e)}")
+
+def estimate_prompt_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) used to size batches."""
+    return len(text) // 4 + 1
+
+def plan_classification_batches(question_texts: List[str]) -> List[List[int]]:
+    """
+    Group question positions into batches for classify_questions_batch_ai.
+
+    Batches are filled in order until the (truncated) question text would
+    exceed Config.AI_BATCH_PROMPT_TOKENS or Config.AI_BATCH_MAX_QUESTIONS, so
+    banks of short questions go out in fewer, larger requests.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    
+    for i, text in enumerate(question_texts):
+        tokens = estimate_prompt_tokens(text[:QUESTION_PROMPT_CHARS]) + 3  # numbering and newline
+        if current and (current_tokens + tokens > Config.AI_BATCH_PROMPT_TOKENS or len(current) >= Config.AI_BATCH_MAX_QUESTIONS):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    
+    if current:
+        batches.append(current)
+    return batches
+
+async def classify_questions_concurrently(question_texts: List[str], available_skills: List[str], bypass_cache: bool = False) -> Dict[int, List[str]]:
+    """
+    Classify any number of questions with concurrent batch requests.
+    
+    At most Config.AI_BATCH_MAX_CONCURRENCY batches are in flight. Questions a
+    batch leaves unanswered are re-sent up to Config.AI_BATCH_RETRIES times:
+    only the missing questions when part of the reply came back, or the batch
+    split in halves when the whole request failed (a timeout or a reply
+    truncated at the token cap would fail the same way again).
+    
+    Returns:
+        Dict mapping each question's position in question_texts to its skills
+        (positions that never got an answer are absent)
+    """
+    batches = plan_classification_batches(question_texts)
+    semaphore = asyncio.Semaphore(Config.AI_BATCH_MAX_CONCURRENCY)
+    logger.info(f"Classifying {len(question_texts)} questions with AI in {len(batches)} batches")
+    
+    async def run_batch(indices, retries_left):
+        async with semaphore:
+            batch_results = await classify_questions_batch_ai(
+                [question_texts[i] for i in indices], available_skills, bypass_cache
+            )
+        answered = {i: batch_results[str(j)] for j, i in enumerate(indices) if str(j) in batch_results}
+        pending = [i for i in indices if i not in answered]
+        if not pending or retries_left <= 0:
+            return answered
+        
+        logger.warning(f"AI batch left {len(pending)} of {len(indices)} questions unanswered ({retries_left} retries left)")
+        if answered or len(pending) == 1:
+            retry_batches = [pending]
+        else:
+            middle = len(pending) // 2
+            retry_batches = [pending[:middle], pending[middle:]]
+        for retried in await asyncio.gather(*(run_batch(batch, retries_left - 1) for batch in retry_batches)):
+            answered.update(retried)
+        return answered
+    
+    merged = {}
+    for answered in await asyncio.gather(*(run_batch(batch, Config.AI_BATCH_RETRIES) for batch in batches)):
+        merged.update(answered)
+    return merged
+
+def get_fallback_skill_suggestion(question: Dict[str, Any], available_skills: List[str], keyword_hits: Dict[tuple, set] = None) -> List[str]:
     """Provide intelligent fallback skill suggestion when other methods fail."""
-    question_text = (question.get('question_text', '') or question.get('text', '')).lower()
     question_type = question.get('type', '').lower()
+    if keyword_hits is None:
+        keyword_hits = scan_question_keywords(question)
     
     # Question type-based suggestions
     if 'multiple_choice' in question_type:
@@ -469,31 +630,9 @@ def get_fallback_skill_suggestion(question: Dict[str, Any], available_skills: Li
                 return [skill]
     
     # Content-based broad matching (more aggressive than keyword matching)
-    content_skill_mapping = {
-        # Web Development indicators
-        ['web', 'html', 'css', 'javascript', 'js', 'dom', 'element', 'tag', 'style', 'layout', 'responsive', 'grid', 'flexbox', 'browser', 'client']: 
-            ['HTML/CSS Fundamentals', 'JavaScript Programming', 'Web APIs', 'DOM Manipulation', 'Responsive Design'],
-        
-        # Database indicators  
-        ['database', 'sql', 'table', 'query', 'select', 'insert', 'update', 'delete', 'join', 'index', 'schema', 'normal']:
-            ['SQL Fundamentals', 'Database Design', 'Data Normalization', 'Query Optimization'],
-        
-        # Network indicators
-        ['network', 'tcp', 'ip', 'protocol', 'router', 'switch', 'packet', 'lan', 'wan', 'wifi', 'ethernet', 'security', 'firewall']:
-            ['Network Protocols (TCP/IP)', 'Network Security', 'Routing & Switching', 'Wireless Networks', 'Network Troubleshooting'],
-        
-        # Programming indicators
-        ['program', 'code', 'function', 'variable', 'loop', 'array', 'object', 'class', 'method', 'algorithm', 'data structure']:
-            ['JavaScript Programming', 'Programming Fundamentals', 'Object-Oriented Programming'],
-        
-        # General technical indicators
-        ['technical', 'system', 'software', 'application', 'development', 'engineering', 'computer']:
-            ['Technical Skills', 'System Analysis', 'Software Development']
-    }
-    
-    # Check content against broader patterns
-    for keywords, potential_skills in content_skill_mapping.items():
-        if any(keyword in question_text for keyword in keywords):
+    for group, mapping in CONTENT_SKILL_MAPPING.items():
+        if ('content', group) in keyword_hits:
+            potential_skills = mapping['skills']
             # Return the first matching skill that's actually available
             for skill in potential_skills:
                 if skill in available_skills:
@@ -543,35 +682,20 @@ def get_fallback_skill_suggestion(question: Dict[str, Any], available_skills: Li
 
 def classify_question_skills_keywords(question_text: str, available_skills: List[str]) -> List[str]:
     """Classify question skills using keyword matching."""
-    question_lower = question_text.lower()
-    skill_scores = {}
+    index = get_skill_list_index(available_skills, get_skill_keyword_groups, min_token_length=4)
+    scores = index.score(question_text)
+    name_tokens = index.presence.sum(axis=1)
     
-    for skill in available_skills:
-        score = 0
-        skill_lower = skill.lower()
-        skill_words = skill_lower.split()
-        
-        # Direct skill name match
-        if skill_lower in question_lower:
-            score += 10
-        
-        # Individual word matches
-        for word in skill_words:
-            if len(word) > 3 and word in question_lower:
-                score += 3
-        
-        # Related keyword matching
-        skill_keywords = get_skill_keywords(skill)
-        for keyword in skill_keywords:
-            if keyword in question_lower:
-                score += 2
-        
-        if score > 0:
-            skill_scores[skill] = score
+    # Whole skill name present, each name word present, each related keyword present
+    skill_scores = (
+        10 * ((scores['matched'] == name_tokens) & (name_tokens > 0))
+        + 3 * scores['matched']
+        + 2 * scores['groups']
+    )
     
     # Return top 3 skills by score
-    sorted_skills = sorted(skill_scores.items(), key=lambda x: x[1], reverse=True)
-    top_skills = [skill for skill, score in sorted_skills[:3]]
+    ranked = [int(i) for i in np.argsort(-skill_scores, kind='stable') if skill_scores[i] > 0]
+    top_skills = [available_skills[i] for i in ranked[:3]]
     
     # Ensure at least one skill is returned
     if not top_skills and available_skills:
@@ -580,24 +704,28 @@ def classify_question_skills_keywords(question_text: str, available_skills: List
     
     return top_skills
 
+SKILL_KEYWORD_MAP = {
+    'Programming Fundamentals': ['code', 'program', 'algorithm', 'function', 'variable', 'loop'],
+    'HTML/CSS Fundamentals': ['html', 'css', 'web', 'tag', 'style', 'markup'],
+    'JavaScript Programming': ['javascript', 'js', 'script', 'dom', 'event', 'function'],
+    'Database Management': ['database', 'sql', 'query', 'table', 'data', 'select'],
+    'Network Protocols': ['network', 'protocol', 'tcp', 'ip', 'http', 'packet'],
+    'Software Testing': ['test', 'testing', 'debug', 'error', 'bug', 'validation'],
+    'Algorithm Design': ['algorithm', 'efficiency', 'complexity', 'optimization', 'sort', 'search'],
+    'Data Structures': ['array', 'list', 'tree', 'graph', 'stack', 'queue', 'hash'],
+    'Object-Oriented Programming': ['class', 'object', 'inheritance', 'polymorphism', 'encapsulation'],
+    'Problem Solving': ['solve', 'solution', 'approach', 'strategy', 'analyze', 'reasoning']
+}
+
 def get_skill_keywords(skill: str) -> List[str]:
     """Get related keywords for a skill."""
-    skill_keyword_map = {
-        'Programming Fundamentals': ['code', 'program', 'algorithm', 'function', 'variable', 'loop'],
-        'HTML/CSS Fundamentals': ['html', 'css', 'web', 'tag', 'style', 'markup'],
-        'JavaScript Programming': ['javascript', 'js', 'script', 'dom', 'event', 'function'],
-        'Database Management': ['database', 'sql', 'query', 'table', 'data', 'select'],
-        'Network Protocols': ['network', 'protocol', 'tcp', 'ip', 'http', 'packet'],
-        'Software Testing': ['test', 'testing', 'debug', 'error', 'bug', 'validation'],
-        'Algorithm Design': ['algorithm', 'efficiency', 'complexity', 'optimization', 'sort', 'search'],
-        'Data Structures': ['array', 'list', 'tree', 'graph', 'stack', 'queue', 'hash'],
-        'Object-Oriented Programming': ['class', 'object', 'inheritance', 'polymorphism', 'encapsulation'],
-        'Problem Solving': ['solve', 'solution', 'approach', 'strategy', 'analyze', 'reasoning']
-    }
-    
-    return skill_keyword_map.get(skill, [])
+    return SKILL_KEYWORD_MAP.get(skill, [])
+
+def get_skill_keyword_groups(skill: str) -> List[List[str]]:
+    """Each related keyword scores on its own in the skill index."""
+    return [[keyword] for keyword in get_skill_keywords(skill)]
 
-def calculate_confidence_score(question: Dict[str, Any], suggested_skills: List[str]) -> float:
+def calculate_confidence_score(question: Dict[str, Any], suggested_skills: List[str], keyword_hits: Dict[tuple, set] = None) -> float:
     """Calculate confidence score for skill suggestions."""
     question_text = question.get('question_text', '') or question.get('text', '')
     
@@ -619,20 +747,21 @@ def calculate_confidence_score(question: Dict[str, Any], suggested_skills: List[
         base_confidence += 0.05
     
     # Technical terminology density
-    technical_words = ['algorithm', 'function', 'database', 'network', 'protocol', 'class', 'object', 'array']
-    technical_count = sum(1 for word in technical_words if word in question_text.lower())
+    if keyword_hits is None:
+        keyword_hits = scan_question_keywords(question)
+    technical_count = len(keyword_hits.get(('technical', 'words'), ()))
     if technical_count > 0:
         base_confidence += min(technical_count * 0.02, 0.1)
     
     return min(base_confidence, 1.0)
 
-async def bulk_assign_skills(course_id: str, quiz_id: str, questions: List[Dict[str, Any]], course_skills: List[str]) -> Dict[str, List[str]]:
+async def bulk_assign_skills(course_id: str, quiz_id: str, questions: List[Dict[str, Any]], course_skills: List[str], bypass_cache: bool = False) -> Dict[str, List[str]]:
     """Perform bulk skill assignment for all questions in a quiz."""
     try:
         assignments = {}
         
         # Analyze all questions
-        question_analyses = await analyze_questions(questions, course_skills)
+        question_analyses = await analyze_questions(questions, course_skills, bypass_cache)
         
         # Extract skill assignments
         for analysis in question_analyses:
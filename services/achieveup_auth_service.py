@@ -3,6 +3,7 @@
 import jwt
 import bcrypt
 import logging
+import time
 import uuid
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -19,6 +20,9 @@ client = AsyncIOMotorClient(
 db = client[Config.DATABASE]
 achieveup_users_collection = db[Config.ACHIEVEUP_USERS_COLLECTION]
 
+# user_id -> (expires_at monotonic timestamp, IDs of the courses the user teaches)
+_instructor_courses_cache = {}
+
 # JWT configuration
 JWT_SECRET = getattr(Config, 'ACHIEVEUP_JWT_SECRET', 'achieveup-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
@@ -420,6 +424,80 @@ async def get_user_canvas_token(user_id: str) -> str:
         logger.error(f"Error getting Canvas token: {str(e)}")
         return None
 
+async def get_instructor_course_ids(user_id: str, canvas_token: str):
+    """
+    IDs of the courses a user teaches in Canvas, cached for
+    Config.COURSE_ACCESS_CACHE_TTL.
+
+    Returns:
+        set of course ID strings, or None if Canvas could not be reached
+    """
+    cached = _instructor_courses_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    from services.achieveup_canvas_service import get_instructor_courses
+    courses = await get_instructor_courses(canvas_token)
+    if not isinstance(courses, list):
+        return None
+
+    course_ids = {str(course.get('id')) for course in courses}
+    _instructor_courses_cache[user_id] = (time.monotonic() + Config.COURSE_ACCESS_CACHE_TTL, course_ids)
+    return course_ids
+
+async def verify_instructor_course_access(token: str, course_id: str) -> dict:
+    """
+    Verify that a token belongs to an instructor who teaches the course.
+
+    Args:
+        token: AchieveUp JWT
+        course_id: Canvas course ID
+
+    Returns:
+        dict: the achieveup_verify_token result, or an error with statusCode
+        (401 bad token, 403 not an instructor of the course)
+    """
+    try:
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return user_result
+
+        user = user_result['user']
+        if user['role'] != 'instructor' or user.get('canvasTokenType') != 'instructor':
+            return {
+                'error': 'Insufficient permissions',
+                'message': 'Instructor role required',
+                'statusCode': 403
+            }
+
+        canvas_token = await get_user_canvas_token(user['id'])
+        if not canvas_token:
+            return {
+                'error': 'No Canvas token',
+                'message': 'No Canvas API token found for user',
+                'statusCode': 400
+            }
+
+        course_ids = await get_instructor_course_ids(user['id'], canvas_token)
+        if course_ids is None:
+            return {
+                'error': 'Canvas unavailable',
+                'message': 'Unable to verify course access with Canvas',
+                'statusCode': 502
+            }
+        if str(course_id) not in course_ids:
+            return {
+                'error': 'Insufficient permissions',
+                'message': 'You are not an instructor of this course',
+                'statusCode': 403
+            }
+
+        return user_result
+
+    except Exception as e:
+        logger.error(f"Verify instructor course access error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
 def require_instructor_role(func):
     """Decorator to require instructor role for endpoints."""
     async def wrapper(*args, **kwargs):
@@ -1,9 +1,13 @@
 # services/achieveup_canvas_service.py
 
 import aiohttp
+import asyncio
 import ssl
 import logging
 import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from services.achieveup_auth_service import achieveup_verify_token, get_user_canvas_token
@@ -103,10 +107,34 @@ db = client[Config.DATABASE]
 achieveup_canvas_courses_collection = db[Config.ACHIEVEUP_CANVAS_COURSES_COLLECTION]
 achieveup_canvas_quizzes_collection = db[Config.ACHIEVEUP_CANVAS_QUIZZES_COLLECTION]
 achieveup_canvas_questions_collection = db[Config.ACHIEVEUP_CANVAS_QUESTIONS_COLLECTION]
+achieveup_canvas_students_collection = db[Config.ACHIEVEUP_CANVAS_STUDENTS_COLLECTION]
 
 # Canvas API configuration
 CANVAS_API_URL = getattr(Config, 'CANVAS_API_URL', 'https://webcourses.ucf.edu/api/v1')
 
+# Shared Canvas request budget for fan-out callers (dashboard, imports).
+# Bounds simultaneous requests and request starts per rolling minute.
+_canvas_request_semaphore = asyncio.Semaphore(Config.CANVAS_MAX_CONCURRENCY)
+_canvas_request_times = deque()
+
+@asynccontextmanager
+async def canvas_request_slot():
+    """
+    Hold one slot of the Canvas request budget for the duration of a call.
+    At most CANVAS_MAX_CONCURRENCY calls run at once and at most
+    CANVAS_API_RATE_LIMIT calls start per minute; callers wait otherwise.
+    """
+    async with _canvas_request_semaphore:
+        while True:
+            now = time.monotonic()
+            while _canvas_request_times and now - _canvas_request_times[0] >= 60:
+                _canvas_request_times.popleft()
+            if len(_canvas_request_times) < Config.CANVAS_API_RATE_LIMIT:
+                _canvas_request_times.append(now)
+                break
+            await asyncio.sleep(60 - (now - _canvas_request_times[0]))
+        yield
+
 async def validate_canvas_token(canvas_token: str, canvas_token_type: str = 'student') -> dict:
     """Validate Canvas API token by testing it with Canvas API. Supports student and instructor tokens."""
     try:
@@ -511,6 +539,12 @@ async def cache_canvas_data(course_id: str, data_type: str, data: list) -> None:
                 {'$set': cache_data},
                 upsert=True
             )
+        elif data_type == 'students':
+            await achieveup_canvas_students_collection.update_one(
+                {'course_id': course_id},
+                {'$set': cache_data},
+                upsert=True
+            )
             
     except Exception as e:
         logger.error(f"Cache Canvas data error: {str(e)}")
@@ -524,13 +558,16 @@ async def get_cached_canvas_data(course_id: str, data_type: str) -> dict:
             cached = await achieveup_canvas_quizzes_collection.find_one({'course_id': course_id})
         elif data_type == 'questions':
             cached = await achieveup_canvas_questions_collection.find_one({'quiz_id': course_id})
+        elif data_type == 'students':
+            cached = await achieveup_canvas_students_collection.find_one({'course_id': course_id})
         else:
             return None
             
         if cached:
             # Check if cache is still valid (e.g., less than 1 hour old)
             cache_age = datetime.utcnow() - cached['cached_at']
-            if cache_age.total_seconds() < 3600:  # 1 hour
+            ttl = Config.CANVAS_ROSTER_CACHE_TTL if data_type == 'students' else 3600
+            if cache_age.total_seconds() < ttl:
                 return cached['data']
                 
         return None
@@ -700,6 +737,22 @@ async def get_course_students(canvas_token: str, course_id: str) -> dict:
         logger.error(f"Get course students error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+async def get_course_students_cached(canvas_token: str, course_id: str) -> dict:
+    """
+    Get students enrolled in a course, served from the roster cache when fresh.
+    Cache misses are fetched from Canvas inside the shared request budget.
+    """
+    cached = await get_cached_canvas_data(course_id, 'students')
+    if cached is not None:
+        return cached
+    
+    async with canvas_request_slot():
+        students = await get_course_students(canvas_token, course_id)
+    
+    if isinstance(students, list):
+        await cache_canvas_data(course_id, 'students', students)
+    return students
+
 async def get_course_detailed_info(canvas_token: str, course_id: str) -> dict:
     """Get detailed course information including syllabus and description."""
     try:
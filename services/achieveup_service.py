@@ -1,10 +1,22 @@
 # services/achieveup_service.py
 
+import asyncio
 import logging
+import time
 import uuid
 from datetime import datetime
+import numpy as np
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from services.achieveup_auth_service import achieveup_verify_token
+from services.analytics_cache_service import cache_analytics_result
+from services.skill_index_service import get_matrix_skill_index
+from services.keyword_automaton_service import KeywordAutomaton
+from services.question_matching_service import match_near_duplicates
+from services.export_service import (
+    EXPORT_CONTENT_TYPES, iter_cursor_rows, stream_csv, stream_ndjson, stream_json_sections
+)
 from config import Config
 
 import re
@@ -49,6 +61,9 @@ achieveup_import_status_collection = db[Config.ACHIEVEUP_IMPORT_STATUS_COLLECTIO
 
 MAX_COURSE_DESCRIPTION_LENGTH = 12000
 
+# Dashboard roster fetches still running after their timeout, kept referenced until they finish
+_dashboard_roster_tasks = set()
+
 async def create_skill_matrix(token: str, course_id: str, matrix_name: str, skills: list) -> dict:
     """Create skill matrix for a course."""
     try:
@@ -340,6 +355,102 @@ async def upsert_course_description(token: str, course_id: str, description: str
         logger.error(f"Upsert course description error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+QUESTION_SKILL_UNIQUE_INDEX = 'course_question_unique_idx'
+
+async def remove_duplicate_question_skills() -> int:
+    """
+    Delete repeat skill assignment documents of the same (course_id, question_id),
+    keeping the most recently written one.
+    
+    Returns:
+        int: number of documents deleted
+    """
+    duplicates = achieveup_question_skills_collection.aggregate([
+        {'$addFields': {'last_written_at': {'$max': ['$updated_at', '$assigned_at']}}},
+        {'$sort': {'last_written_at': -1, '_id': -1}},
+        {'$group': {
+            '_id': {'course_id': '$course_id', 'question_id': '$question_id'},
+            'ids': {'$push': '$_id'},
+            'count': {'$sum': 1}
+        }},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    
+    extra_ids = []
+    async for group in duplicates:
+        extra_ids.extend(group['ids'][1:])
+    if not extra_ids:
+        return 0
+    
+    result = await achieveup_question_skills_collection.delete_many({'_id': {'$in': extra_ids}})
+    logger.warning(f"Removed {result.deleted_count} duplicate question skill assignments before building {QUESTION_SKILL_UNIQUE_INDEX}")
+    return result.deleted_count
+
+async def ensure_question_skill_indexes() -> None:
+    """
+    One skill assignment document per (course_id, question_id). Duplicates
+    written by upserts before the index existed are removed first (once,
+    while the index is missing), since they would make the build fail.
+    """
+    existing_indexes = await achieveup_question_skills_collection.index_information()
+    if QUESTION_SKILL_UNIQUE_INDEX not in existing_indexes:
+        await remove_duplicate_question_skills()
+    await achieveup_question_skills_collection.create_index(
+        [('course_id', 1), ('question_id', 1)],
+        unique=True,
+        name=QUESTION_SKILL_UNIQUE_INDEX
+    )
+
+async def write_question_skill_assignments(course_id: str, assignments: dict, replace: bool = False) -> dict:
+    """
+    Upsert skill assignment documents for many questions of a course with
+    chunked, unordered bulk writes. A failed write is reported for its
+    question and does not stop the rest of the batch.
+    
+    Args:
+        course_id: Canvas course ID
+        assignments: question ID -> fields to store (course_id and question_id are added)
+        replace: replace whole documents instead of setting the given fields
+        
+    Returns:
+        dict: matched, modified and upserted counts and errors as
+        [{'question_id', 'error'}]
+    """
+    summary = {'matched': 0, 'modified': 0, 'upserted': 0, 'errors': []}
+    question_ids = list(assignments)
+    batch_size = Config.ASSIGNMENT_WRITE_BATCH_SIZE
+    
+    for start in range(0, len(question_ids), batch_size):
+        chunk = question_ids[start:start + batch_size]
+        operations = []
+        for question_id in chunk:
+            key = {'course_id': course_id, 'question_id': question_id}
+            doc = {**assignments[question_id], **key}
+            operations.append(ReplaceOne(key, doc, upsert=True) if replace else UpdateOne(key, {'$set': doc}, upsert=True))
+        
+        try:
+            result = await achieveup_question_skills_collection.bulk_write(operations, ordered=False)
+            summary['matched'] += result.matched_count
+            summary['modified'] += result.modified_count
+            summary['upserted'] += result.upserted_count
+        except BulkWriteError as e:
+            # Unordered: every operation without a write error was applied
+            details = e.details
+            summary['matched'] += details.get('nMatched', 0)
+            summary['modified'] += details.get('nModified', 0)
+            summary['upserted'] += details.get('nUpserted', 0)
+            summary['errors'].extend(
+                {'question_id': chunk[error['index']], 'error': error.get('errmsg', 'Write failed')}
+                for error in details.get('writeErrors', [])
+            )
+        except Exception as e:
+            logger.error(f"Skill assignment bulk write error: {str(e)}")
+            summary['errors'].extend({'question_id': question_id, 'error': str(e)} for question_id in chunk)
+    
+    if summary['errors']:
+        logger.warning(f"{len(summary['errors'])} skill assignment writes failed for course {course_id}")
+    return summary
+
 async def assign_skills_to_questions(token: str, course_id: str, question_skills: dict) -> dict:
     """Assign skills to quiz questions."""
     try:
@@ -349,22 +460,14 @@ async def assign_skills_to_questions(token: str, course_id: str, question_skills
             return user_result
         
         # Store question-skill assignments
-        for question_id, skills in question_skills.items():
-            assignment_doc = {
-                'question_id': question_id,
-                'course_id': course_id,
-                'skills': skills,
-                'assigned_at': datetime.utcnow()
-            }
-            
-            # Upsert assignment
-            await achieveup_question_skills_collection.update_one(
-                {'question_id': question_id, 'course_id': course_id},
-                {'$set': assignment_doc},
-                upsert=True
-            )
+        now = datetime.utcnow()
+        summary = await write_question_skill_assignments(course_id, {
+            question_id: {'skills': skills, 'assigned_at': now}
+            for question_id, skills in question_skills.items()
+        })
         
-        return {'message': 'Skills assigned successfully'}
+        message = 'Skills assigned successfully' if not summary['errors'] else 'Some skill assignments could not be saved'
+        return {'message': message, **summary}
         
     except Exception as e:
         logger.error(f"Assign skills error: {str(e)}")
@@ -400,8 +503,38 @@ async def get_assigned_skills(token: str, course_id: str, question_ids:list[str]
         logger.error(f"Get assigned skills error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+async def get_question_skill_matrix(course_id: str = None, matrix_id: str = None) -> dict:
+    """Get the skill matrix used for question suggestions: the given matrix, else the course's first."""
+    if matrix_id:
+        return await achieveup_skill_matrices_collection.find_one({'_id': matrix_id})
+    if course_id:
+        return await achieveup_skill_matrices_collection.find_one({'course_id': str(course_id)})
+    return None
+
+def rank_skill_suggestions(index, overlap, matched, groups) -> dict:
+    """Turn one question's skill-index scores into the top-3 suggestion result."""
+    # Any skill-name token present, plus the weighted share of the name, plus related terms
+    scores = np.minimum(0.9 * (matched > 0) + 0.6 * overlap + 0.4 * groups, 1.0)
+    # Stable sort keeps matrix order between equal scores
+    ranked = [int(i) for i in np.argsort(-scores, kind='stable') if scores[i] > 0][:3]
+    top_skills = [{'skill': index.skills[i], 'score': float(scores[i])} for i in ranked]
+    
+    # If no skills matched, return top 3 skills from matrix with low confidence
+    if not top_skills:
+        top_skills = [{'skill': skill, 'score': 0.5} for skill in index.skills[:3]]
+    
+    # Calculate overall confidence
+    overall_confidence = sum(s['score'] for s in top_skills) / len(top_skills) if top_skills else 0.0
+    
+    return {
+        'suggestions': [s['skill'] for s in top_skills],
+        'confidence': round(overall_confidence, 2),
+        'scores': {s['skill']: round(s['score'], 2) for s in top_skills},
+        'available_skills': list(index.skills)
+    }
+
 async def suggest_skills_for_question(token: str, question_text: str, course_id: str = None, matrix_id: str = None, course_context: str = None) -> dict:
-    """Suggest skills for a quiz question using AI and the selected skill matrix."""
+    """Suggest skills for a quiz question using the selected skill matrix's keyword index."""
     try:
         # Verify user token
         user_result = await achieveup_verify_token(token)
@@ -409,105 +542,19 @@ async def suggest_skills_for_question(token: str, question_text: str, course_id:
             return user_result
         
         # Get the skill matrix to use
-        available_skills = []
-        
-        if matrix_id:
-            # Use the specified matrix
-            matrix = await achieveup_skill_matrices_collection.find_one({'_id': matrix_id})
-            if matrix and 'skills' in matrix:
-                available_skills = matrix['skills']
-        elif course_id:
-            # Get the first/default matrix for the course
-            matrix = await achieveup_skill_matrices_collection.find_one({'course_id': str(course_id)})
-            if matrix and 'skills' in matrix:
-                available_skills = matrix['skills']
+        matrix = await get_question_skill_matrix(course_id, matrix_id)
         
         # If no skills found in matrix, return empty suggestions
-        if not available_skills:
+        if not matrix or not matrix.get('skills'):
             return {
                 'suggestions': [],
                 'confidence': 0.0,
                 'message': 'No skill matrix found' if matrix_id or course_id else 'No matrix_id or course_id provided'
             }
         
-        # Prepare question content for analysis
-        question_lower = question_text.lower()
-        context_lower = course_context.lower() if course_context else ""
-        combined_content = f"{question_lower} {context_lower}"
-        
-        # Score each skill based on semantic relevance
-        skill_scores = []
-        
-        for skill in available_skills:
-            skill_name = skill if isinstance(skill, str) else skill.get('name', '')
-            skill_lower = skill_name.lower()
-            
-            # Calculate relevance score
-            score = 0.0
-            
-            # 1. Direct match - highest score
-            if skill_lower in combined_content or any(word in combined_content for word in skill_lower.split()):
-                score += 0.9
-            
-            # 2. Keyword overlap - extract key terms from skill name and check overlap
-            skill_keywords = set(skill_lower.replace('/', ' ').replace('&', ' ').replace('(', ' ').replace(')', ' ').split())
-            skill_keywords = {word for word in skill_keywords if len(word) > 2}  # Filter short words
-            
-            question_words = set(combined_content.replace('/', ' ').replace('&', ' ').replace('(', ' ').replace(')', ' ').split())
-            question_words = {word for word in question_words if len(word) > 2}
-            
-            overlap = skill_keywords & question_words
-            if overlap:
-                score += 0.6 * (len(overlap) / max(len(skill_keywords), 1))
-            
-            # 3. Common technical terms mapping
-            technical_mappings = {
-                'javascript': ['js', 'function', 'variable', 'array', 'object', 'async', 'promise', 'callback'],
-                'html': ['tag', 'element', 'markup', 'div', 'span', 'semantic'],
-                'css': ['style', 'layout', 'flexbox', 'grid', 'responsive', 'selector'],
-                'sql': ['query', 'select', 'insert', 'update', 'delete', 'join', 'table'],
-                'database': ['schema', 'table', 'index', 'normalization', 'entity', 'relationship'],
-                'network': ['tcp', 'ip', 'protocol', 'packet', 'router', 'switch', 'firewall'],
-                'security': ['encryption', 'authentication', 'authorization', 'firewall', 'vpn'],
-                'api': ['rest', 'endpoint', 'request', 'response', 'http', 'fetch'],
-                'dom': ['element', 'event', 'manipulation', 'document', 'node'],
-                'responsive': ['mobile', 'breakpoint', 'media query', 'viewport']
-            }
-            
-            for key, terms in technical_mappings.items():
-                if key in skill_lower:
-                    for term in terms:
-                        if term in combined_content:
-                            score += 0.4
-                            break
-            
-            # Only include skills with some relevance
-            if score > 0:
-                skill_scores.append({
-                    'skill': skill_name,
-                    'score': min(score, 1.0)  # Cap at 1.0
-                })
-        
-        # Sort by score and take top 3
-        skill_scores.sort(key=lambda x: x['score'], reverse=True)
-        top_skills = skill_scores[:3]
-        
-        # If no skills matched, return top 3 skills from matrix with low confidence
-        if not top_skills:
-            top_skills = [
-                {'skill': skill if isinstance(skill, str) else skill.get('name', ''), 'score': 0.5}
-                for skill in available_skills[:3]
-            ]
-        
-        # Calculate overall confidence
-        overall_confidence = sum(s['score'] for s in top_skills) / len(top_skills) if top_skills else 0.0
-        
-        return {
-            'suggestions': [s['skill'] for s in top_skills],
-            'confidence': round(overall_confidence, 2),
-            'scores': {s['skill']: round(s['score'], 2) for s in top_skills},
-            'available_skills': [skill if isinstance(skill, str) else skill.get('name', '') for skill in available_skills]
-        }
+        index = get_matrix_skill_index(matrix)
+        scores = index.score(f"{question_text} {course_context or ''}")
+        return rank_skill_suggestions(index, scores['overlap'], scores['matched'], scores['groups'])
         
     except Exception as e:
         logger.error(f"Suggest skills error: {str(e)}")
@@ -705,35 +752,68 @@ async def get_individual_analytics(token: str, student_id: str) -> dict:
         logger.error(f"Get individual analytics error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
-async def export_course_data(token: str, course_id: str) -> dict:
-    """Export course data (CSV format)."""
+# Sections of a course export, in output order
+COURSE_EXPORT_DATASETS = ('skill_matrices', 'badges', 'skill_progress')
+
+def get_course_export_cursor(course_id: str, dataset: str):
+    """Get the Motor cursor behind one section of a course export."""
+    if dataset == 'skill_matrices':
+        return achieveup_skill_matrices_collection.find({'course_id': course_id}).limit(1)
+    elif dataset == 'badges':
+        return achieveup_badges_collection.find({'course_id': course_id})
+    return achieveup_progress_collection.find({'course_id': course_id})
+
+async def iter_tagged_course_rows(course_id: str):
+    """Yield every exported document tagged with its dataset, for NDJSON."""
+    for dataset in COURSE_EXPORT_DATASETS:
+        async for doc in iter_cursor_rows(get_course_export_cursor(course_id, dataset)):
+            yield {'type': dataset, **doc}
+
+async def export_course_data(token: str, course_id: str, format_type: str = 'json', dataset: str = None) -> dict:
+    """
+    Export course data as a stream read straight from Motor cursors.
+    
+    Args:
+        token: JWT token
+        course_id: Course ID
+        format_type: 'json' ({skill_matrices, badges, skill_progress}),
+            'ndjson' (one document per line, tagged with 'type') or
+            'csv' (one dataset, skill_progress by default)
+        dataset: Dataset for CSV exports
+        
+    Returns:
+        dict: {'stream': async iterator of bytes, 'filename', 'content_type'}, or an error
+    """
     try:
         # Verify user token
         user_result = await achieveup_verify_token(token)
         if 'error' in user_result:
             return user_result
         
-        # Collect all course data
-        course_data = {
-            'skill_matrices': [],
-            'badges': [],
-            'skill_progress': []
-        }
-        
-        # Get skill matrix
-        matrix = await achieveup_skill_matrices_collection.find_one({'course_id': course_id})
-        if matrix:
-            course_data['skill_matrices'].append(matrix)
-        
-        # Get badges
-        cursor = achieveup_badges_collection.find({'course_id': course_id})
-        course_data['badges'] = await cursor.to_list(length=None)
-        
-        # Get progress
-        cursor = achieveup_progress_collection.find({'course_id': course_id})
-        course_data['skill_progress'] = await cursor.to_list(length=None)
+        if format_type not in ('json', 'ndjson', 'csv'):
+            return {'error': f'Unsupported export format: {format_type}', 'statusCode': 400}
+        
+        if format_type == 'csv':
+            dataset = dataset or 'skill_progress'
+            if dataset not in COURSE_EXPORT_DATASETS:
+                return {'error': f'Unknown dataset: {dataset}', 'statusCode': 400}
+            stream = stream_csv(iter_cursor_rows(get_course_export_cursor(course_id, dataset)))
+            filename = f"course_{course_id}_{dataset}.csv"
+        elif format_type == 'ndjson':
+            stream = stream_ndjson(iter_tagged_course_rows(course_id))
+            filename = f"course_{course_id}_export.ndjson"
+        else:
+            stream = stream_json_sections({
+                dataset_name: iter_cursor_rows(get_course_export_cursor(course_id, dataset_name))
+                for dataset_name in COURSE_EXPORT_DATASETS
+            })
+            filename = f"course_{course_id}_export.json"
         
-        return course_data
+        return {
+            'stream': stream,
+            'filename': filename,
+            'content_type': EXPORT_CONTENT_TYPES[format_type]
+        }
         
     except Exception as e:
         logger.error(f"Export course data error: {str(e)}")
@@ -875,34 +955,31 @@ async def analyze_questions(token: str, questions: list, course_id: str = None,
         if 'error' in user_result:
             return user_result
         
+        questions = [q for q in questions if q.get('id') and q.get('text', '')]
+        
+        # Score every question against the matrix in one pass
+        matrix = await get_question_skill_matrix(course_id, matrix_id)
+        suggestions = []
+        if matrix and matrix.get('skills'):
+            index = get_matrix_skill_index(matrix)
+            scores = index.score_batch([q['text'] for q in questions])
+            suggestions = [
+                rank_skill_suggestions(index, scores['overlap'][i], scores['matched'][i], scores['groups'][i])
+                for i in range(len(questions))
+            ]
+        
         analysis_results = []
         
-        for question in questions:
-            question_id = question.get('id')
-            question_text = question.get('text', '')
-            
-            if not question_id or not question_text:
-                continue
-            
+        for i, question in enumerate(questions):
             # Analyze question complexity
-            complexity = analyze_question_complexity(question_text)
-            
-            # Get skill suggestions from the specified matrix
-            suggested_skills_result = await suggest_skills_for_question(token, question_text, course_id, matrix_id)
-            
-            # Extract suggested skills from result
-            if isinstance(suggested_skills_result, dict):
-                suggested_skills = suggested_skills_result.get('suggestions', [])
-                confidence = suggested_skills_result.get('confidence', 0.0)
-            else:
-                suggested_skills = suggested_skills_result if isinstance(suggested_skills_result, list) else []
-                confidence = calculate_confidence_score(question_text, suggested_skills)
+            complexity = analyze_question_complexity(question['text'])
+            suggested_skills_result = suggestions[i] if suggestions else {'suggestions': [], 'confidence': 0.0}
             
             analysis_results.append({
-                'questionId': question_id,
+                'questionId': question['id'],
                 'complexity': complexity,
-                'suggestedSkills': suggested_skills,
-                'confidence': confidence
+                'suggestedSkills': suggested_skills_result['suggestions'],
+                'confidence': suggested_skills_result['confidence']
             })
         
         return analysis_results
@@ -911,6 +988,37 @@ async def analyze_questions(token: str, questions: list, course_id: str = None,
         logger.error(f"Analyze questions error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+# Demo course skill rules: (skill, confidence, keywords) in suggestion order
+DEMO_SKILL_KEYWORDS = {
+    'demo_001': [  # Web Development
+        ('JavaScript Programming', 0.92, ['javascript', 'js', 'variable', 'function', 'array', 'object']),
+        ('HTML/CSS Fundamentals', 0.88, ['css', 'html', 'style', 'layout', 'grid', 'flexbox', 'responsive']),
+        ('Responsive Design', 0.85, ['responsive', 'mobile', 'media', 'breakpoint']),
+        ('DOM Manipulation', 0.90, ['dom', 'element', 'event', 'manipulation']),
+        ('Web APIs', 0.87, ['api', 'fetch', 'ajax', 'request', 'response'])
+    ],
+    'demo_002': [  # Database
+        ('SQL Fundamentals', 0.95, ['select', 'insert', 'update', 'delete', 'sql']),
+        ('Database Design', 0.88, ['table', 'schema', 'design', 'entity', 'relationship']),
+        ('Data Normalization', 0.92, ['normal', '1nf', '2nf', '3nf', 'bcnf']),
+        ('Query Optimization', 0.85, ['index', 'optimize', 'performance', 'query plan']),
+        ('Stored Procedures', 0.90, ['procedure', 'function', 'trigger', 'stored'])
+    ],
+    'demo_003': [  # Networking
+        ('Network Protocols (TCP/IP)', 0.93, ['tcp', 'ip', 'protocol', 'packet', 'routing']),
+        ('Network Security', 0.89, ['security', 'firewall', 'encryption', 'vpn']),
+        ('Routing & Switching', 0.91, ['router', 'switch', 'routing', 'switching']),
+        ('Wireless Networks', 0.86, ['wireless', 'wifi', '802.11', 'bluetooth']),
+        ('Network Troubleshooting', 0.84, ['troubleshoot', 'debug', 'diagnose', 'problem'])
+    ]
+}
+
+# One automaton per demo course, labelled by skill
+DEMO_SKILL_AUTOMATA = {
+    course_id: KeywordAutomaton({skill: keywords for skill, _, keywords in rules})
+    for course_id, rules in DEMO_SKILL_KEYWORDS.items()
+}
+
 async def get_question_suggestions(token: str, question_id: str) -> dict:
     """Get AI-powered skill suggestions for a specific question."""
     try:
@@ -994,56 +1102,13 @@ async def get_question_suggestions(token: str, question_id: str) -> dict:
         suggested_skills = []
         confidence_scores = []
         
-        if course_id == 'demo_001':  # Web Development
-            if any(keyword in content for keyword in ['javascript', 'js', 'variable', 'function', 'array', 'object']):
-                suggested_skills.append('JavaScript Programming')
-                confidence_scores.append(0.92)
-            if any(keyword in content for keyword in ['css', 'html', 'style', 'layout', 'grid', 'flexbox', 'responsive']):
-                suggested_skills.append('HTML/CSS Fundamentals')
-                confidence_scores.append(0.88)
-            if any(keyword in content for keyword in ['responsive', 'mobile', 'media', 'breakpoint']):
-                suggested_skills.append('Responsive Design')
-                confidence_scores.append(0.85)
-            if any(keyword in content for keyword in ['dom', 'element', 'event', 'manipulation']):
-                suggested_skills.append('DOM Manipulation')
-                confidence_scores.append(0.90)
-            if any(keyword in content for keyword in ['api', 'fetch', 'ajax', 'request', 'response']):
-                suggested_skills.append('Web APIs')
-                confidence_scores.append(0.87)
-                
-        elif course_id == 'demo_002':  # Database
-            if any(keyword in content for keyword in ['select', 'insert', 'update', 'delete', 'sql']):
-                suggested_skills.append('SQL Fundamentals')
-                confidence_scores.append(0.95)
-            if any(keyword in content for keyword in ['table', 'schema', 'design', 'entity', 'relationship']):
-                suggested_skills.append('Database Design')
-                confidence_scores.append(0.88)
-            if any(keyword in content for keyword in ['normal', '1nf', '2nf', '3nf', 'bcnf']):
-                suggested_skills.append('Data Normalization')
-                confidence_scores.append(0.92)
-            if any(keyword in content for keyword in ['index', 'optimize', 'performance', 'query plan']):
-                suggested_skills.append('Query Optimization')
-                confidence_scores.append(0.85)
-            if any(keyword in content for keyword in ['procedure', 'function', 'trigger', 'stored']):
-                suggested_skills.append('Stored Procedures')
-                confidence_scores.append(0.90)
-                
-        elif course_id == 'demo_003':  # Networking
-            if any(keyword in content for keyword in ['tcp', 'ip', 'protocol', 'packet', 'routing']):
-                suggested_skills.append('Network Protocols (TCP/IP)')
-                confidence_scores.append(0.93)
-            if any(keyword in content for keyword in ['security', 'firewall', 'encryption', 'vpn']):
-                suggested_skills.append('Network Security')
-                confidence_scores.append(0.89)
-            if any(keyword in content for keyword in ['router', 'switch', 'routing', 'switching']):
-                suggested_skills.append('Routing & Switching')
-                confidence_scores.append(0.91)
-            if any(keyword in content for keyword in ['wireless', 'wifi', '802.11', 'bluetooth']):
-                suggested_skills.append('Wireless Networks')
-                confidence_scores.append(0.86)
-            if any(keyword in content for keyword in ['troubleshoot', 'debug', 'diagnose', 'problem']):
-                suggested_skills.append('Network Troubleshooting')
-                confidence_scores.append(0.84)
+        automaton = DEMO_SKILL_AUTOMATA.get(course_id)
+        if automaton:
+            matched_skills = automaton.scan(content)
+            for skill, confidence, _ in DEMO_SKILL_KEYWORDS[course_id]:
+                if skill in matched_skills:
+                    suggested_skills.append(skill)
+                    confidence_scores.append(confidence)
         
         # If no specific matches, suggest 2-3 most relevant skills for the course
         if not suggested_skills:
@@ -1072,27 +1137,22 @@ async def get_question_suggestions(token: str, question_id: str) -> dict:
         logger.error(f"Get question suggestions error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+# Complexity indicators and the score each one adds
+COMPLEXITY_INDICATORS = {
+    'low': ['what is', 'define', 'list', 'name', 'identify', 'simple', 'basic'],
+    'medium': ['explain', 'describe', 'compare', 'analyze', 'evaluate', 'discuss'],
+    'high': ['synthesize', 'create', 'design', 'develop', 'implement', 'solve complex']
+}
+COMPLEXITY_INDICATOR_SCORES = {'low': 1, 'medium': 2, 'high': 3}
+COMPLEXITY_INDICATOR_AUTOMATON = KeywordAutomaton(COMPLEXITY_INDICATORS)
+
 def analyze_question_complexity(question_text: str) -> str:
     """Analyze the complexity of a question based on its content."""
-    question_lower = question_text.lower()
-    
     # Simple complexity analysis based on keywords and length
-    complexity_indicators = {
-        'low': ['what is', 'define', 'list', 'name', 'identify', 'simple', 'basic'],
-        'medium': ['explain', 'describe', 'compare', 'analyze', 'evaluate', 'discuss'],
-        'high': ['synthesize', 'create', 'design', 'develop', 'implement', 'solve complex']
-    }
-    
-    score = 0
-    for level, indicators in complexity_indicators.items():
-        for indicator in indicators:
-            if indicator in question_lower:
-                if level == 'low':
-                    score += 1
-                elif level == 'medium':
-                    score += 2
-                elif level == 'high':
-                    score += 3
+    score = sum(
+        COMPLEXITY_INDICATOR_SCORES[level] * count
+        for level, count in COMPLEXITY_INDICATOR_AUTOMATON.count(question_text).items()
+    )
     
     # Consider question length
     if len(question_text) > 200:
@@ -1121,8 +1181,54 @@ def calculate_confidence_score(question_text: str, suggested_skills: list) -> fl
     
     return min(base_confidence + length_factor, 1.0)
  
+def finish_dashboard_roster_task(task: asyncio.Task) -> None:
+    """Drop a finished roster fetch and log its error if nobody awaited it."""
+    _dashboard_roster_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Dashboard roster fetch error: {str(task.exception())}")
+
+async def load_dashboard_course_roster(canvas_token: str, course: dict) -> dict:
+    """
+    Load one course's roster for the instructor dashboard with timing.
+    Slow courses are reported as 'timeout' after DASHBOARD_COURSE_TIMEOUT; the
+    Canvas fetch keeps running in the background and fills the roster cache.
+    """
+    from services.achieveup_canvas_service import get_course_students_cached
+    
+    course_id = course['id']
+    started = time.perf_counter()
+    students = []
+    fetch = asyncio.create_task(get_course_students_cached(canvas_token, course_id))
+    _dashboard_roster_tasks.add(fetch)
+    fetch.add_done_callback(finish_dashboard_roster_task)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(fetch), timeout=Config.DASHBOARD_COURSE_TIMEOUT)
+        if isinstance(result, list):
+            students = result
+            status = 'ok'
+        else:
+            status = 'error'
+            logger.warning(f"Dashboard roster for course {course_id} failed: {result.get('error')}")
+    except asyncio.TimeoutError:
+        status = 'timeout'
+        logger.warning(f"Dashboard roster for course {course_id} timed out")
+    
+    return {
+        'courseId': course_id,
+        'status': status,
+        'students': students,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1)
+    }
+
 async def get_instructor_dashboard(token: str) -> dict:
-    """Get instructor dashboard data with course overview and analytics."""
+    """
+    Get instructor dashboard data with course overview and analytics.
+    
+    Course rosters are loaded concurrently under the shared Canvas request
+    budget (cached rosters are used when fresh), and skill matrix counts and
+    recent matrices are scoped to the instructor's own courses. Courses that
+    are slow or fail are reported in courseTimings and the rest is returned.
+    """
     try:
         # Verify user token
         user_result = await achieveup_verify_token(token)
@@ -1134,7 +1240,6 @@ async def get_instructor_dashboard(token: str) -> dict:
         # Get instructor's Canvas courses
         from services.achieveup_canvas_service import get_instructor_courses
         from services.achieveup_auth_service import get_user_canvas_token
-        from services.achieveup_canvas_service import get_course_students
         
         canvas_token = await get_user_canvas_token(user_id)
         if not canvas_token:
@@ -1147,29 +1252,43 @@ async def get_instructor_dashboard(token: str) -> dict:
         courses_result = await get_instructor_courses(canvas_token)
         if 'error' in courses_result:
             return courses_result
-
-        for course in courses_result:
-            course_id = course['id']
-            students_result = await get_course_students(canvas_token, course_id)
-            if 'error' in students_result:
-                return students_result
         
         courses = courses_result if isinstance(courses_result, list) else []
-
-        students = students_result if isinstance(students_result, list) else []
         
-        # Get skill matrices count
-        matrices_count = await achieveup_skill_matrices_collection.count_documents({})
+        # Matrices may store course_id as a string or an int
+        course_ids = [course['id'] for course in courses]
+        course_id_values = course_ids + [int(cid) for cid in course_ids if str(cid).isdigit()]
+        matrix_query = {'course_id': {'$in': course_id_values}}
+        
+        roster_results, matrices_count, recent_matrices = await asyncio.gather(
+            asyncio.gather(*(load_dashboard_course_roster(canvas_token, course) for course in courses)),
+            achieveup_skill_matrices_collection.count_documents(matrix_query),
+            achieveup_skill_matrices_collection.find(matrix_query).sort([('created_at', -1)]).limit(5).to_list(length=5)
+        )
         
-        # Get recent activity
-        recent_matrices = await achieveup_skill_matrices_collection.find({}).sort([('created_at', -1)]).limit(5).to_list(length=5)
+        # Count each student once even if enrolled in several courses
+        student_ids = set()
+        course_timings = []
+        for roster in roster_results:
+            student_ids.update(student.get('id') for student in roster['students'])
+            course_timings.append({
+                'courseId': roster['courseId'],
+                'status': roster['status'],
+                'students': len(roster['students']),
+                'elapsedMs': roster['elapsedMs']
+            })
+        
+        for matrix in recent_matrices:
+            matrix['_id'] = str(matrix['_id'])
         
         dashboard_data = {
             'courses': courses,
-            'students': len(students),
+            'students': len(student_ids),
             'totalCourses': len(courses),
             'totalSkillMatrices': matrices_count,
             'recentMatrices': recent_matrices,
+            'courseTimings': course_timings,
+            'partial': any(timing['status'] != 'ok' for timing in course_timings),
             'lastUpdated': datetime.utcnow().isoformat()
         }
         
@@ -1209,62 +1328,46 @@ async def get_instructor_course_students(token: str, course_id: str) -> dict:
         logger.error(f"Get instructor course students error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('instructor_student_analytics')
 async def get_instructor_student_analytics(token: str, course_id: str) -> dict:
-    """Get student analytics for instructor's course."""
+    """Get student analytics for instructor's course, served from the course analytics snapshot."""
     try:
-        # Verify user token
-        user_result = await achieveup_verify_token(token)
+        # Per-student data: only instructors of the course may read it
+        from services.achieveup_auth_service import verify_instructor_course_access
+        user_result = await verify_instructor_course_access(token, course_id)
         if 'error' in user_result:
             return user_result
         
-        # Get students for the course
-        students_result = await get_instructor_course_students(token, course_id)
-        if 'error' in students_result:
-            return students_result
+        from services.analytics_service import load_course_students_analytics
+        analytics_result = await load_course_students_analytics(token, course_id)
+        if 'error' in analytics_result:
+            return analytics_result
         
-        students = students_result if isinstance(students_result, list) else []
+        analytics = analytics_result['analytics']
+        students = analytics.get('students', [])
         
         # Get skill matrix for course
         skill_matrix = await achieveup_skill_matrices_collection.find_one({'course_id': course_id})
         
-        # Get mastery data for students
-        mastery_collection = db[Config.ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION] if hasattr(Config, 'ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION') else db['AchieveUp_Student_Skill_Mastery']
-        
-        student_analytics = []
-        for student in students:
-            student_id = student.get('id')
-            # Fetch all skills mastery for this student
-            mastery_records = await db[Config.ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION].find({
-                'student_id': student_id, 
-                'course_id': course_id
-            }).to_list(length=None)
-            
-            if mastery_records:
-                avg_mastery = sum([m.get('mastery_percentage', 0) for m in mastery_records]) / len(mastery_records)
-                skills_completed = len([m for m in mastery_records if m.get('mastery_percentage', 0) >= 80])
-                last_activity = max([m.get('last_updated', datetime.min) for m in mastery_records] + [datetime.min])
-            else:
-                avg_mastery = 0
-                skills_completed = 0
-                last_activity = datetime.min
-
-            analytics = {
-                'studentId': student_id,
+        student_analytics = [
+            {
+                'studentId': student.get('id'),
                 'studentName': student.get('name', 'Unknown'),
                 'email': student.get('email', ''),
-                'progressCount': len(mastery_records),
-                'overallMastery': round(avg_mastery, 2),
-                'skillsCompleted': skills_completed,
-                'lastActivity': last_activity.isoformat() if last_activity != datetime.min else None
+                'progressCount': student.get('recordedSkills', 0),
+                'overallMastery': student.get('recordedMastery', 0),
+                'skillsCompleted': student.get('skillsMastered', 0),
+                'lastActivity': student.get('lastActivity')
             }
-            student_analytics.append(analytics)
+            for student in students
+        ]
         
         return {
             'courseId': course_id,
             'totalStudents': len(students),
             'skillMatrix': skill_matrix,
             'studentAnalytics': student_analytics,
-            'generatedAt': datetime.utcnow().isoformat()
+            'generatedAt': analytics.get('debug', {}).get('snapshotGeneratedAt')
         }
         
     except Exception as e:
@@ -1309,11 +1412,9 @@ async def suggest_course_skills_ai(token: str, course_data: dict) -> dict:
 
         user = user_result['user']
         
-        # Use OpenAI directly with proper async syntax
-        from openai import AsyncOpenAI
+        from services.ai_cache_service import cached_ai_completion
         import json
-        
-        client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+        import re
         
         course_name = course_data.get('courseName', '')
         course_code = course_data.get('courseCode', '')
@@ -1355,26 +1456,24 @@ async def suggest_course_skills_ai(token: str, course_data: dict) -> dict:
         Make skills specific to the course subject matter.
         """
         
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        def parse_skills(ai_response):
+            # Parse JSON response
+            json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+            return json.loads(ai_response)
+
+        skills = await cached_ai_completion(
+            'course_skill_suggestions', 'course_skill_suggestions',
+            {'name': course_name, 'code': course_code, 'description': course_description},
+            [
                 {"role": "system", "content": "You are an expert curriculum designer. Return only valid JSON."},
                 {"role": "user", "content": prompt}
             ],
-            #temperature=0.7,
-            max_completion_tokens=10000
+            parse_skills,
+            bypass_cache=bool(course_data.get('bypassCache'))
         )
         
-        ai_response = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import re
-        json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
-        if json_match:
-            skills = json.loads(json_match.group())
-        else:
-            skills = json.loads(ai_response)
-        
         return {
             'courseId': course_data.get('courseId'),
             'courseName': course_name,
@@ -1427,8 +1526,8 @@ async def get_all_skills_for_course(token: str, course_id: str) -> dict:
         return {'error': 'Internal server error', 'statusCode': 500}
 
 
-async def analyze_questions_with_ai(token: str, questions: list, course_id: str, matrix_id: str = None) -> dict:
-    """Analyze questions using AI for complexity and skill mapping."""
+async def analyze_questions_with_ai(token: str, questions: list, course_id: str, matrix_id: str = None, bypass_cache: bool = False) -> dict:
+    """Analyze questions using AI for complexity and skill mapping (bypass_cache asks the model again)."""
     try:
         # Verify user token
         user_result = await achieveup_verify_token(token)
@@ -1496,7 +1595,7 @@ async def analyze_questions_with_ai(token: str, questions: list, course_id: str,
         from services.achieveup_ai_service import analyze_questions
         
         # Analyze questions with course skills context
-        analysis_results = await analyze_questions(questions, course_skills)
+        analysis_results = await analyze_questions(questions, course_skills, bypass_cache)
         
         return {
             'totalQuestions': len(questions),
@@ -1515,7 +1614,7 @@ async def analyze_questions_with_ai(token: str, questions: list, course_id: str,
         traceback.print_exc()
         return {'error': 'Internal server error', 'statusCode': 500}
 
-async def bulk_assign_skills_with_ai(token: str, course_id: str, questions: list) -> dict:
+async def bulk_assign_skills_with_ai(token: str, course_id: str, questions: list, bypass_cache: bool = False) -> dict:
     """Perform bulk skill assignment using AI."""
     try:
         # Verify user token
@@ -1531,33 +1630,27 @@ async def bulk_assign_skills_with_ai(token: str, course_id: str, questions: list
         from services.achieveup_ai_service import bulk_assign_skills
         
         # Perform bulk assignment
-        assignments = await bulk_assign_skills(course_id, None, questions, course_skills)
+        assignments = await bulk_assign_skills(course_id, None, questions, course_skills, bypass_cache)
         
-        # Store assignments in database
-        for question_id, skills in assignments.items():
-            if skills:  # Only store if there are skills assigned
-                assignment_doc = {
-                    'course_id': course_id,
-                    'question_id': question_id,
-                    'skills': skills,
-                    'ai_generated': True,
-                    'human_reviewed': False,
-                    'created_at': datetime.utcnow(),
-                    'updated_at': datetime.utcnow()
-                }
-                
-                # Upsert the assignment
-                await achieveup_question_skills_collection.replace_one(
-                    {'question_id': question_id},
-                    assignment_doc,
-                    upsert=True
-                )
+        # Store assignments in database (only questions with skills assigned)
+        now = datetime.utcnow()
+        summary = await write_question_skill_assignments(course_id, {
+            question_id: {
+                'skills': skills,
+                'ai_generated': True,
+                'human_reviewed': False,
+                'created_at': now,
+                'updated_at': now
+            }
+            for question_id, skills in assignments.items() if skills
+        }, replace=True)
         
         return {
             'courseId': course_id,
-            'assignedQuestions': len([q for q in assignments.values() if q]),
+            'assignedQuestions': len([q for q in assignments.values() if q]) - len(summary['errors']),
             'totalQuestions': len(questions),
             'assignments': assignments,
+            'writeSummary': summary,
             'generatedAt': datetime.utcnow().isoformat()
         }
         
@@ -1565,7 +1658,7 @@ async def bulk_assign_skills_with_ai(token: str, course_id: str, questions: list
         logger.error(f"Bulk AI skill assignment error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
-async def analyze_questions_with_ai_instructor(token: str, questions: list) -> dict:
+async def analyze_questions_with_ai_instructor(token: str, questions: list, bypass_cache: bool = False) -> dict:
     """Instructor-specific question analysis with enhanced features."""
     try:
         # Verify user token and instructor role
@@ -1576,7 +1669,7 @@ async def analyze_questions_with_ai_instructor(token: str, questions: list) -> d
         # Enhanced analysis for instructors
         from services.achieveup_ai_service import analyze_questions
         
-        analysis_results = await analyze_questions(questions)
+        analysis_results = await analyze_questions(questions, bypass_cache=bypass_cache)
         
         # Add instructor-specific insights
         complexity_distribution = {
@@ -1600,7 +1693,7 @@ async def analyze_questions_with_ai_instructor(token: str, questions: list) -> d
         logger.error(f"Instructor AI question analysis error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
-async def bulk_assign_skills_with_ai_instructor(token: str, course_id: str, questions: list) -> dict:
+async def bulk_assign_skills_with_ai_instructor(token: str, course_id: str, questions: list, bypass_cache: bool = False) -> dict:
     """Instructor-specific bulk skill assignment with enhanced features."""
     try:
         # Verify user token and instructor role
@@ -1623,30 +1716,24 @@ async def bulk_assign_skills_with_ai_instructor(token: str, course_id: str, ques
         from services.achieveup_ai_service import bulk_assign_skills
         
         # Perform bulk assignment
-        assignments = await bulk_assign_skills(course_id, None, questions, course_skills)
+        assignments = await bulk_assign_skills(course_id, None, questions, course_skills, bypass_cache)
         
         # Store assignments with instructor tracking
-        successful_assignments = 0
-        for question_id, skills in assignments.items():
-            if skills:
-                assignment_doc = {
-                    'course_id': course_id,
-                    'question_id': question_id,
-                    'skills': skills,
-                    'ai_generated': True,
-                    'human_reviewed': False,
-                    'assigned_by_instructor': True,
-                    'instructor_id': user_result['user']['id'],
-                    'created_at': datetime.utcnow(),
-                    'updated_at': datetime.utcnow()
-                }
-                
-                await achieveup_question_skills_collection.replace_one(
-                    {'question_id': question_id},
-                    assignment_doc,
-                    upsert=True
-                )
-                successful_assignments += 1
+        now = datetime.utcnow()
+        to_store = {
+            question_id: {
+                'skills': skills,
+                'ai_generated': True,
+                'human_reviewed': False,
+                'assigned_by_instructor': True,
+                'instructor_id': user_result['user']['id'],
+                'created_at': now,
+                'updated_at': now
+            }
+            for question_id, skills in assignments.items() if skills
+        }
+        summary = await write_question_skill_assignments(course_id, to_store, replace=True)
+        successful_assignments = len(to_store) - len(summary['errors'])
         
         # Generate skill usage statistics
         skill_usage = {}
@@ -1660,6 +1747,7 @@ async def bulk_assign_skills_with_ai_instructor(token: str, course_id: str, ques
             'totalQuestions': len(questions),
             'assignments': assignments,
             'skillUsageStatistics': skill_usage,
+            'writeSummary': summary,
             'availableSkills': course_skills,
             'assignmentSummary': {
                 'fullyAssigned': len([q for q in assignments.values() if len(q) > 0]),
@@ -1798,34 +1886,65 @@ def normalize_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-async def import_skill_setting_from_course(source_course_id: str, target_course_id: str, user_id: str, token: str):
-    """Import question skill assignments from source course to target course by matching quiz names and question text."""
-    try:
-        user_result = await achieveup_verify_token(token)
-        if 'error' in user_result:
-            return user_result
+async def get_import_canvas_token(token: str, user_id: str) -> dict:
+    """Check instructor access for a course import and load the instructor's Canvas token."""
+    user_result = await achieveup_verify_token(token)
+    if 'error' in user_result:
+        return user_result
 
-        user = user_result['user']
-        if user['role'] != 'instructor' or user.get('canvasTokenType') != 'instructor':
-            return {
-                'error': 'Access denied',
-                'message': 'Instructor access required',
-                'statusCode': 403
-            }
+    user = user_result['user']
+    if user['role'] != 'instructor' or user.get('canvasTokenType') != 'instructor':
+        return {
+            'error': 'Access denied',
+            'message': 'Instructor access required',
+            'statusCode': 403
+        }
 
-        from services.achieveup_auth_service import get_user_canvas_token
-        from services.achieveup_canvas_service import get_instructor_quiz_questions, get_instructor_course_quizzes
+    from services.achieveup_auth_service import get_user_canvas_token
 
-        canvas_token = await get_user_canvas_token(user_id)
-        if not canvas_token:
-            return {
-                'error': 'No Canvas token',
-                'message': 'No Canvas API token found for user',
-                'statusCode': 400
-            }
+    canvas_token = await get_user_canvas_token(user_id)
+    if not canvas_token:
+        return {
+            'error': 'No Canvas token',
+            'message': 'No Canvas API token found for user',
+            'statusCode': 400
+        }
+    return {'canvas_token': canvas_token}
+
+async def fetch_import_quiz_questions(canvas_token: str, quiz_id: str, course_id: str):
+    """Fetch one quiz's questions inside the shared Canvas request budget."""
+    from services.achieveup_canvas_service import canvas_request_slot, get_instructor_quiz_questions
+
+    async with canvas_request_slot():
+        return await get_instructor_quiz_questions(canvas_token, quiz_id, course_id)
+
+async def import_skill_setting_from_course(source_course_id: str, target_course_id: str, user_id: str, token: str,
+                                          match_threshold: float = None, progress=None):
+    """
+    Import question skill assignments from source course to target course by matching quiz names and question text.
+    Questions match when their normalized text is near-identical (see
+    question_matching_service); match_threshold overrides Config.IMPORT_MATCH_THRESHOLD.
+
+    All matched quizzes' questions are fetched concurrently under the Canvas
+    request budget, source assignments are loaded with one query and target
+    assignments are written with one bulk write.
+
+    Args:
+        progress: optional async callback(stage, fetched_quizzes=None,
+            total_quizzes=None, details=None) called as the import advances
+    """
+    try:
+        access = await get_import_canvas_token(token, user_id)
+        if 'error' in access:
+            return access
+        canvas_token = access['canvas_token']
 
-        source_quizzes = await get_instructor_course_quizzes(canvas_token, source_course_id)
-        target_quizzes = await get_instructor_course_quizzes(canvas_token, target_course_id)
+        from services.achieveup_canvas_service import get_instructor_course_quizzes
+
+        source_quizzes, target_quizzes = await asyncio.gather(
+            get_instructor_course_quizzes(canvas_token, source_course_id),
+            get_instructor_course_quizzes(canvas_token, target_course_id)
+        )
 
         if isinstance(source_quizzes, dict) and 'error' in source_quizzes:
             return source_quizzes
@@ -1838,32 +1957,55 @@ async def import_skill_setting_from_course(source_course_id: str, target_course_
             for q in target_quizzes
         }
 
-        imported_count = 0
-        matched_quizzes = 0
-        matched_questions = 0
         details = []
-
+        quiz_pairs = []
         for source_quiz in source_quizzes:
-            source_quiz_title = source_quiz.get('title', '')
-            source_quiz_key = normalize_text(source_quiz_title)
-
-            target_quiz = target_quiz_map.get(source_quiz_key)
+            target_quiz = target_quiz_map.get(normalize_text(source_quiz.get('title', '')))
             if not target_quiz:
                 details.append({
-                    'quiz_title': source_quiz_title,
+                    'quiz_title': source_quiz.get('title', ''),
                     'status': 'skipped',
                     'reason': 'No matching target quiz found'
                 })
                 continue
+            quiz_pairs.append((source_quiz, target_quiz))
 
-            matched_quizzes += 1
+        # Fetch every matched quiz's source and target questions at once
+        fetched_quizzes = 0
 
-            source_quiz_id = str(source_quiz.get('id'))
-            target_quiz_id = str(target_quiz.get('id'))
+        async def load_quiz_pair(source_quiz, target_quiz):
+            nonlocal fetched_quizzes
+            questions = await asyncio.gather(
+                fetch_import_quiz_questions(canvas_token, str(source_quiz.get('id')), source_course_id),
+                fetch_import_quiz_questions(canvas_token, str(target_quiz.get('id')), target_course_id)
+            )
+            fetched_quizzes += 1
+            if progress:
+                await progress('fetching', fetched_quizzes=fetched_quizzes, total_quizzes=len(quiz_pairs))
+            return questions
+
+        loaded = await asyncio.gather(*(load_quiz_pair(*pair) for pair in quiz_pairs))
+
+        # Source assignments for every fetched question in one query
+        source_question_ids = [
+            str(q.get('id'))
+            for source_questions, _ in loaded if isinstance(source_questions, list)
+            for q in source_questions if q.get('id')
+        ]
+        source_assignments = {}
+        if source_question_ids:
+            cursor = achieveup_question_skills_collection.find(
+                {'course_id': source_course_id, 'question_id': {'$in': source_question_ids}},
+                {'_id': 0, 'question_id': 1, 'skills': 1}
+            )
+            async for doc in cursor:
+                source_assignments[str(doc['question_id'])] = doc.get('skills', [])
 
-            source_questions = await get_instructor_quiz_questions(canvas_token, source_quiz_id, source_course_id)
-            target_questions = await get_instructor_quiz_questions(canvas_token, target_quiz_id, target_course_id)
+        target_question_skills = {}
+        imported_details = []
 
+        for (source_quiz, _), (source_questions, target_questions) in zip(quiz_pairs, loaded):
+            source_quiz_title = source_quiz.get('title', '')
 
             if isinstance(source_questions, dict) and 'error' in source_questions:
                 details.append({
@@ -1881,71 +2023,67 @@ async def import_skill_setting_from_course(source_course_id: str, target_course_
                 })
                 continue
 
-            source_question_ids = [str(q.get('id')) for q in source_questions if q.get('id')]
-            source_assignments_result = await get_assigned_skills(token, source_course_id, source_question_ids)
+            # Pair assigned source questions with near-identical target questions
+            assigned_source_questions = [
+                sq for sq in source_questions
+                if source_assignments.get(str(sq.get('id'))) and normalize_text(sq.get('question_text', ''))
+            ]
+            matches = match_near_duplicates(
+                [normalize_text(sq.get('question_text', '')) for sq in assigned_source_questions],
+                [normalize_text(tq.get('question_text', '')) for tq in target_questions],
+                threshold=match_threshold
+            )
 
-            if 'error' in source_assignments_result:
-                details.append({
-                    'quiz_title': source_quiz_title,
-                    'status': 'skipped',
-                    'reason': 'Failed to load source assignments'
+            question_matches = []
+            for source_index, target_index, similarity in matches:
+                source_qid = str(assigned_source_questions[source_index].get('id'))
+                target_qid = str(target_questions[target_index].get('id'))
+                target_question_skills[target_qid] = source_assignments[source_qid]
+                question_matches.append({
+                    'source_question_id': source_qid,
+                    'target_question_id': target_qid,
+                    'confidence': round(similarity, 3)
                 })
-                continue
 
-            source_assignments = source_assignments_result.get('question_skills', {})
-
-            # target questions by normalized question text
-            target_question_map = {}
-            for tq in target_questions:
-                key = normalize_text(tq.get('question_text', ''))
-                if key and key not in target_question_map:
-                    target_question_map[key] = tq
-
-            target_question_skills = {}
-            quiz_imported_count = 0
-
-            for sq in source_questions:
-                source_qid = str(sq.get('id'))
-                source_skills = source_assignments.get(source_qid, [])
-                if not source_skills:
-                    continue
-
-                source_qtext_key = normalize_text(sq.get('question_text', ''))
-                if not source_qtext_key:
-                    continue
-
-                matched_target_question = target_question_map.get(source_qtext_key)
-                if not matched_target_question:
-                    continue
-
-                target_qid = str(matched_target_question.get('id'))
-                target_question_skills[target_qid] = source_skills
-                quiz_imported_count += 1
-
-            if target_question_skills:
-                save_result = await assign_skills_to_questions(token, target_course_id, target_question_skills)
-                if 'error' in save_result:
-                    details.append({
-                        'quiz_title': source_quiz_title,
-                        'status': 'failed',
-                        'reason': save_result.get('message', save_result.get('error'))
-                    })
-                    continue
-
-                imported_count += len(target_question_skills)
-                matched_questions += quiz_imported_count
-
-                details.append({
-                    'quiz_title': source_quiz_title,
-                    'status': 'imported',
-                    'matched_questions': quiz_imported_count
-                })
-            else:
+            if not question_matches:
                 details.append({
                     'quiz_title': source_quiz_title,
                     'status': 'skipped',
                     'reason': 'No matching assigned questions found'
                 })
+                continue
+
+            detail = {
+                'quiz_title': source_quiz_title,
+                'status': 'imported',
+                'matched_questions': len(question_matches),
+                'exact_matches': sum(1 for match in question_matches if match['confidence'] == 1.0),
+                'question_matches': question_matches
+            }
+            details.append(detail)
+            imported_details.append(detail)
+
+        # All target assignments in one unordered bulk write
+        write_errors = []
+        if target_question_skills:
+            if progress:
+                await progress('writing', details=details)
+            now = datetime.utcnow()
+            summary = await write_question_skill_assignments(target_course_id, {
+                question_id: {'skills': skills, 'assigned_at': now}
+                for question_id, skills in target_question_skills.items()
+            })
+            write_errors = summary['errors']
+
+            failed_ids = {error['question_id'] for error in write_errors}
+            for detail in imported_details:
+                failed = sum(1 for match in detail['question_matches'] if match['target_question_id'] in failed_ids)
+                if failed:
+                    detail['failed_questions'] = failed
+                    detail['matched_questions'] -= failed
+                if not detail['matched_questions']:
+                    detail['status'] = 'failed'
+                    detail['reason'] = 'Failed to save skill assignments'
 
         await achieveup_import_status_collection.update_one(
             {'target_course_id': target_course_id},
@@ -1968,14 +2106,13 @@ async def import_skill_setting_from_course(source_course_id: str, target_course_
             'message': 'Skill assignments imported successfully',
             'source_course_id': source_course_id,
             'target_course_id': target_course_id,
-            'matched_quizzes': matched_quizzes,
-            'matched_questions': matched_questions,
-            'imported_count': imported_count,
+            'matched_quizzes': len(quiz_pairs),
+            'matched_questions': sum(detail['matched_questions'] for detail in imported_details),
+            'imported_count': len(target_question_skills) - len(write_errors),
+            'write_errors': write_errors,
             'details': details
         }
 
-          
-
     except Exception as e:
         logger.error(f"Import skill assignment error: {str(e)}")
         import traceback
@@ -1985,6 +2122,156 @@ async def import_skill_setting_from_course(source_course_id: str, target_course_
             'message': str(e),
             'statusCode': 500
         }
+
+# Running import jobs, kept referenced until they finish
+_skill_import_tasks = set()
+
+async def run_skill_import_job(job_id: str, source_course_id: str, target_course_id: str, user_id: str, token: str,
+                               match_threshold: float = None) -> None:
+    """Run a skill import and record its progress and outcome on the target course's import status."""
+    job_filter = {'target_course_id': target_course_id, 'assignments_job.job_id': job_id}
+
+    async def report(stage, fetched_quizzes=None, total_quizzes=None, details=None):
+        now = datetime.utcnow()
+        update = {'$set': {'assignments_job.stage': stage, 'assignments_job.updated_at': now, 'updated_at': now}}
+        if total_quizzes is not None:
+            update['$set']['assignments_job.total_quizzes'] = total_quizzes
+        if details is not None:
+            update['$set']['assignments_job.details'] = details
+        if fetched_quizzes is not None:
+            # Concurrent fetches may report out of order
+            update['$max'] = {'assignments_job.fetched_quizzes': fetched_quizzes}
+        await achieveup_import_status_collection.update_one(job_filter, update)
+
+    result = await import_skill_setting_from_course(
+        source_course_id, target_course_id, user_id, token, match_threshold, progress=report
+    )
+
+    now = datetime.utcnow()
+    if 'error' in result:
+        outcome = {
+            'assignments_job.status': 'failed',
+            'assignments_job.error': result.get('message', result['error'])
+        }
+    else:
+        outcome = {
+            'assignments_job.status': 'completed',
+            'assignments_job.stage': 'completed',
+            'assignments_job.details': result['details'],
+            'assignments_job.result': {
+                key: result[key] for key in ('matched_quizzes', 'matched_questions', 'imported_count')
+            }
+        }
+    await achieveup_import_status_collection.update_one(
+        job_filter,
+        {'$set': {**outcome, 'assignments_job.finished_at': now, 'assignments_job.updated_at': now, 'updated_at': now}}
+    )
+
+async def start_skill_import_job(source_course_id: str, target_course_id: str, user_id: str, token: str,
+                                 match_threshold: float = None) -> dict:
+    """
+    Start a skill import in the background.
+
+    Returns:
+        dict with the job_id to poll through get_skill_import_job
+    """
+    try:
+        access = await get_import_canvas_token(token, user_id)
+        if 'error' in access:
+            return access
+
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        await achieveup_import_status_collection.update_one(
+            {'target_course_id': target_course_id},
+            {
+                '$set': {
+                    'source_course_id': source_course_id,
+                    'target_course_id': target_course_id,
+                    'assignments_job': {
+                        'job_id': job_id,
+                        'user_id': user_id,
+                        'status': 'running',
+                        'stage': 'queued',
+                        'fetched_quizzes': 0,
+                        'total_quizzes': 0,
+                        'details': [],
+                        'started_at': now,
+                        'updated_at': now
+                    },
+                    'updated_at': now
+                },
+                '$setOnInsert': {
+                    'matrices_imported': False,
+                    'assignments_imported': False,
+                    'created_at': now
+                }
+            },
+            upsert=True
+        )
+
+        task = asyncio.create_task(run_skill_import_job(
+            job_id, source_course_id, target_course_id, user_id, token, match_threshold
+        ))
+        _skill_import_tasks.add(task)
+        task.add_done_callback(_skill_import_tasks.discard)
+
+        return {
+            'message': 'Skill import started',
+            'job_id': job_id,
+            'status': 'running',
+            'source_course_id': source_course_id,
+            'target_course_id': target_course_id
+        }
+
+    except Exception as e:
+        logger.error(f"Start skill import error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
+async def get_skill_import_job(token: str, job_id: str) -> dict:
+    """
+    Get the progress, per-quiz details and result of a skill import job
+    started by the calling user.
+
+    A running job without progress for BACKGROUND_JOB_STALE_AFTER seconds
+    (e.g. its worker restarted) is marked failed.
+    """
+    try:
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return user_result
+
+        status = await achieveup_import_status_collection.find_one(
+            {'assignments_job.job_id': job_id, 'assignments_job.user_id': user_result['user']['id']},
+            {'_id': 0, 'source_course_id': 1, 'target_course_id': 1, 'assignments_job': 1}
+        )
+        if not status:
+            return {
+                'error': 'Job not found',
+                'message': 'Skill import job does not exist or was superseded by a newer import',
+                'statusCode': 404
+            }
+
+        job = status['assignments_job']
+        now = datetime.utcnow()
+        last_progress = job.get('updated_at') or job.get('started_at') or now
+        if job.get('status') == 'running' and (now - last_progress).total_seconds() > Config.BACKGROUND_JOB_STALE_AFTER:
+            stale = {'status': 'failed', 'error': 'Import stopped making progress', 'finished_at': now}
+            await achieveup_import_status_collection.update_one(
+                {'assignments_job.job_id': job_id, 'assignments_job.status': 'running'},
+                {'$set': {**{f'assignments_job.{key}': value for key, value in stale.items()}, 'updated_at': now}}
+            )
+            job.update(stale)
+
+        return {
+            'source_course_id': status.get('source_course_id'),
+            'target_course_id': status.get('target_course_id'),
+            **status['assignments_job']
+        }
+
+    except Exception as e:
+        logger.error(f"Get skill import job error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
     
 async def get_import_status(token: str, course_id: str) -> dict:
     try:
@@ -1992,9 +2279,10 @@ async def get_import_status(token: str, course_id: str) -> dict:
         if 'error' in user_result:
             return user_result
 
+        # Job details are only served to the job's owner through get_skill_import_job
         status = await achieveup_import_status_collection.find_one(
             {'target_course_id': course_id},
-            {'_id': 0}
+            {'_id': 0, 'assignments_job': 0}
         )
 
         if not status:
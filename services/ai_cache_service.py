@@ -0,0 +1,241 @@
+# services/ai_cache_service.py
+
+"""
+AI Response Cache
+=================
+
+Content-addressed cache for parsed LLM answers. Keys hash the model, the
+operation, the normalized prompt inputs (whitespace-collapsed, case-folded)
+and a hash of the skill list, so the same question text seen in another
+section or term is answered from the cache instead of the API. Entries live
+in Mongo (expired by a TTL index after Config.AI_CACHE_TTL) with an
+in-process LRU in front. Lookups can be bypassed when an instructor asks for
+a fresh answer; the fresh answer then replaces the cached one.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from services.ai_gateway_service import create_chat_completion_with_usage, estimate_cost
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+ai_response_cache_collection = db[Config.ACHIEVEUP_AI_RESPONSE_CACHE_COLLECTION]
+
+# key -> (expires_at timestamp or None, value, usage)
+_ai_response_cache = OrderedDict()
+_ai_cache_stats = {
+    'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'evictions': 0,
+    'saved_prompt_tokens': 0, 'saved_completion_tokens': 0
+}
+
+
+async def ensure_ai_cache_indexes() -> None:
+    """Create the TTL index that expires cached answers."""
+    await ai_response_cache_collection.create_index(
+        'expires_at', expireAfterSeconds=0, name='ai_cache_expiry_idx'
+    )
+
+
+def normalize_prompt_text(text) -> str:
+    """Collapse whitespace and case so trivially different copies of a prompt input match."""
+    return ' '.join(str(text or '').split()).casefold()
+
+
+def get_skill_list_hash(skills: list) -> str:
+    """Order-independent hash of a skill list."""
+    return hashlib.sha256('\n'.join(sorted(set(skills))).encode('utf-8')).hexdigest()[:16]
+
+
+def build_ai_cache_key(operation: str, inputs: dict, skills: list = None) -> str:
+    """
+    Build the content-addressed key for one AI answer.
+
+    Args:
+        operation: cache namespace (e.g. 'core_topic', 'question_skills')
+        inputs: the prompt inputs the answer depends on
+        skills: the candidate skill list, if the answer is drawn from one
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    payload = {
+        'model': Config.AI_MODEL,
+        'operation': operation,
+        'inputs': {name: normalize_prompt_text(value) for name, value in inputs.items()},
+        'skills': get_skill_list_hash(skills) if skills is not None else None
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def remember_ai_response(key: str, expires_at, value, usage: dict) -> None:
+    """Put an entry in the in-process LRU, evicting the least recently used."""
+    _ai_response_cache[key] = (expires_at, value, usage)
+    _ai_response_cache.move_to_end(key)
+    while len(_ai_response_cache) > Config.AI_CACHE_MAX_ENTRIES:
+        _ai_response_cache.popitem(last=False)
+        _ai_cache_stats['evictions'] += 1
+
+
+def record_saved_usage(usage: dict) -> None:
+    _ai_cache_stats['saved_prompt_tokens'] += usage.get('prompt_tokens', 0)
+    _ai_cache_stats['saved_completion_tokens'] += usage.get('completion_tokens', 0)
+
+
+async def get_cached_ai_responses(keys: list) -> dict:
+    """
+    Look up cached answers, LRU first and Mongo for the rest.
+
+    Args:
+        keys: cache keys from build_ai_cache_key
+
+    Returns:
+        dict: key -> cached value for every hit (misses are absent)
+    """
+    found = {}
+    missing = []
+    now = time.time()
+
+    for key in dict.fromkeys(keys):
+        entry = _ai_response_cache.get(key)
+        if entry and (entry[0] is None or entry[0] > now):
+            _ai_response_cache.move_to_end(key)
+            found[key] = entry[1]
+            _ai_cache_stats['memory_hits'] += 1
+            record_saved_usage(entry[2])
+        else:
+            missing.append(key)
+
+    if missing:
+        try:
+            # The TTL monitor only runs once a minute, so filter expired entries here too
+            cursor = ai_response_cache_collection.find({
+                '_id': {'$in': missing},
+                '$or': [{'expires_at': None}, {'expires_at': {'$gt': datetime.utcnow()}}]
+            })
+            async for doc in cursor:
+                expires_at = doc['expires_at'].timestamp() if doc.get('expires_at') else None
+                usage = doc.get('usage', {})
+                remember_ai_response(doc['_id'], expires_at, doc['value'], usage)
+                found[doc['_id']] = doc['value']
+                _ai_cache_stats['db_hits'] += 1
+                record_saved_usage(usage)
+        except Exception as e:
+            logger.error(f"AI cache lookup error: {str(e)}")
+
+    _ai_cache_stats['misses'] += len(missing) - sum(1 for key in missing if key in found)
+    return found
+
+
+async def store_ai_responses(operation: str, values: dict, usage: dict) -> None:
+    """
+    Cache freshly generated answers.
+
+    Args:
+        operation: cache namespace the keys were built with
+        values: key -> parsed answer
+        usage: tokens spent per answer ({'prompt_tokens', 'completion_tokens'})
+    """
+    if not values:
+        return
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=Config.AI_CACHE_TTL) if Config.AI_CACHE_TTL > 0 else None
+    for key, value in values.items():
+        remember_ai_response(key, expires_at.timestamp() if expires_at else None, value, usage)
+
+    try:
+        await ai_response_cache_collection.bulk_write([
+            UpdateOne(
+                {'_id': key},
+                {'$set': {
+                    'operation': operation,
+                    'model': Config.AI_MODEL,
+                    'value': value,
+                    'usage': usage,
+                    'created_at': now,
+                    'expires_at': expires_at
+                }},
+                upsert=True
+            )
+            for key, value in values.items()
+        ], ordered=False)
+        _ai_cache_stats['stores'] += len(values)
+    except Exception as e:
+        logger.error(f"AI cache store error: {str(e)}")
+
+
+async def cached_ai_completion(operation: str, cache_operation: str, inputs: dict, messages: list, parse,
+                               skills: list = None, bypass_cache: bool = False, **kwargs):
+    """
+    Answer a single prompt from the cache, or through the AI gateway on a miss.
+
+    Args:
+        operation: AI gateway operation (timeout and token budget)
+        cache_operation: cache namespace for the answer
+        inputs: prompt inputs the answer depends on (the cache key)
+        messages: chat messages sent on a miss
+        parse: turns the raw completion into the value to return and cache;
+            None results are returned but not cached
+        skills: candidate skill list included in the key
+        bypass_cache: skip the lookup and overwrite the cached answer
+        **kwargs: extra gateway arguments
+
+    Returns:
+        The parsed (possibly cached) answer
+    """
+    use_cache = Config.ENABLE_AI_CACHE
+    key = build_ai_cache_key(cache_operation, inputs, skills) if use_cache else None
+
+    if use_cache and bypass_cache:
+        _ai_cache_stats['bypassed'] += 1
+    elif use_cache:
+        cached = await get_cached_ai_responses([key])
+        if key in cached:
+            return cached[key]
+
+    content, usage = await create_chat_completion_with_usage(operation, messages, **kwargs)
+    value = parse(content)
+
+    if use_cache and value is not None:
+        await store_ai_responses(cache_operation, {key: value}, usage)
+    return value
+
+
+def get_ai_cache_stats() -> dict:
+    """Get hit-rate and saved-token metrics for the AI response cache."""
+    hits = _ai_cache_stats['memory_hits'] + _ai_cache_stats['db_hits']
+    lookups = hits + _ai_cache_stats['misses']
+    return {
+        **_ai_cache_stats,
+        'hits': hits,
+        'lookups': lookups,
+        'hit_rate': round(hits / lookups * 100, 2) if lookups else 0,
+        'saved_cost_usd': round(estimate_cost(
+            Config.AI_MODEL, _ai_cache_stats['saved_prompt_tokens'], _ai_cache_stats['saved_completion_tokens']
+        ), 6),
+        'entries': len(_ai_response_cache),
+        'max_entries': Config.AI_CACHE_MAX_ENTRIES,
+        'ttl_seconds': Config.AI_CACHE_TTL,
+        'enabled': Config.ENABLE_AI_CACHE
+    }
+
+
+def clear_ai_cache() -> None:
+    """Drop the in-process entries and reset the metrics (Mongo entries are kept)."""
+    _ai_response_cache.clear()
+    for name in _ai_cache_stats:
+        _ai_cache_stats[name] = 0
@@ -0,0 +1,212 @@
+# services/ai_gateway_service.py
+
+"""
+AI Gateway
+==========
+
+Single entry point for OpenAI chat completions. Every caller shares one
+AsyncOpenAI client backed by a pooled httpx client (keep-alive connections
+are reused instead of a new TLS handshake per call), and each call names an
+operation from AI_OPERATIONS, which fixes its timeout and completion-token
+budget. Rate limits (429), server errors (5xx), timeouts and dropped
+connections are retried with exponential backoff, honouring Retry-After.
+Latency, token usage and estimated cost are tracked per operation.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import httpx
+import openai
+from openai import AsyncOpenAI
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# operation -> timeout (seconds) and completion-token budget
+AI_OPERATIONS = {
+    'core_topic': {'timeout': 15, 'max_tokens': 30},
+    'core_topic_batch': {'timeout': 45, 'max_tokens': 1200},
+    'skill_suggestions': {'timeout': 30, 'max_tokens': 1000},
+    'course_skill_suggestions': {'timeout': 45, 'max_tokens': 1500},
+    'question_classification': {'timeout': 15, 'max_tokens': 100},
+    'batch_classification': {'timeout': 60, 'max_tokens': 2000}
+}
+
+# model -> USD per 1M (prompt, completion) tokens
+AI_MODEL_PRICING = {
+    'gpt-4o-mini': (0.15, 0.60)
+}
+
+_ai_client = None
+_ai_metrics = {}
+
+
+def get_ai_client() -> AsyncOpenAI:
+    """Get the shared AsyncOpenAI client, creating it on first use."""
+    global _ai_client
+    if _ai_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=30
+            ),
+            timeout=httpx.Timeout(60, connect=Config.AI_CONNECT_TIMEOUT)
+        )
+        # Retries are handled here so they show up in the metrics
+        _ai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY, http_client=http_client, max_retries=0)
+    return _ai_client
+
+
+async def close_ai_client() -> None:
+    """Close the shared client's connection pool."""
+    global _ai_client
+    if _ai_client is not None:
+        await _ai_client.close()
+        _ai_client = None
+
+
+def get_operation_metrics(operation: str) -> dict:
+    """Get the mutable metrics record for an operation."""
+    return _ai_metrics.setdefault(operation, {
+        'calls': 0,
+        'errors': 0,
+        'retries': 0,
+        'total_latency_ms': 0.0,
+        'max_latency_ms': 0.0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'cost_usd': 0.0
+    })
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of a call (0 for models without pricing)."""
+    prompt_price, completion_price = AI_MODEL_PRICING.get(model, (0, 0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def record_ai_call(operation: str, model: str, latency_ms: float, usage=None, error: bool = False) -> None:
+    """Record one completed (or finally failed) call."""
+    metrics = get_operation_metrics(operation)
+    metrics['calls'] += 1
+    metrics['total_latency_ms'] += latency_ms
+    metrics['max_latency_ms'] = max(metrics['max_latency_ms'], latency_ms)
+    if error:
+        metrics['errors'] += 1
+    if usage is not None:
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        metrics['prompt_tokens'] += prompt_tokens
+        metrics['completion_tokens'] += completion_tokens
+        metrics['cost_usd'] += estimate_cost(model, prompt_tokens, completion_tokens)
+
+
+def get_ai_metrics() -> dict:
+    """Get latency, token and cost metrics per operation plus totals."""
+    operations = {}
+    totals = {'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0}
+
+    for operation, metrics in _ai_metrics.items():
+        operations[operation] = {
+            **metrics,
+            'avg_latency_ms': round(metrics['total_latency_ms'] / metrics['calls'], 1) if metrics['calls'] else 0,
+            'total_latency_ms': round(metrics['total_latency_ms'], 1),
+            'max_latency_ms': round(metrics['max_latency_ms'], 1),
+            'cost_usd': round(metrics['cost_usd'], 6)
+        }
+        for name in totals:
+            totals[name] += metrics[name]
+
+    totals['cost_usd'] = round(totals['cost_usd'], 6)
+    return {'operations': operations, 'totals': totals}
+
+
+def reset_ai_metrics() -> None:
+    """Drop all recorded metrics."""
+    _ai_metrics.clear()
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether a failed call is worth retrying (rate limits, 5xx, timeouts, dropped connections)."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):  # APITimeoutError included
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def get_retry_delay(error: Exception, attempt: int) -> float:
+    """Backoff before the next attempt: Retry-After if the API sent one, else jittered exponential."""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), Config.AI_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    delay = Config.AI_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay + random.uniform(0, delay / 2), Config.AI_RETRY_MAX_DELAY)
+
+
+async def create_chat_completion(operation: str, messages: list, max_tokens: int = None, **kwargs) -> str:
+    """
+    Run a chat completion through the shared client.
+
+    Args:
+        operation: key of AI_OPERATIONS (sets the timeout and token budget)
+        messages: chat messages
+        max_tokens: override for the operation's completion-token budget
+        **kwargs: extra create() arguments (e.g. response_format, top_p)
+
+    Returns:
+        str: the stripped message content
+    """
+    content, _ = await create_chat_completion_with_usage(operation, messages, max_tokens, **kwargs)
+    return content
+
+
+async def create_chat_completion_with_usage(operation: str, messages: list, max_tokens: int = None, **kwargs) -> tuple:
+    """
+    Same as create_chat_completion, also returning the token usage.
+
+    Returns:
+        tuple: (content, {'prompt_tokens': int, 'completion_tokens': int})
+
+    Raises:
+        The last OpenAI error once retries are exhausted, or immediately for
+        non-retryable errors (bad request, auth).
+    """
+    settings = AI_OPERATIONS[operation]
+    model = kwargs.pop('model', Config.AI_MODEL)
+    metrics = get_operation_metrics(operation)
+    started = time.perf_counter()
+    attempt = 0
+
+    while True:
+        try:
+            response = await get_ai_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_completion_tokens=max_tokens or settings['max_tokens'],
+                timeout=settings['timeout'],
+                **kwargs
+            )
+        except Exception as e:
+            if attempt < Config.AI_MAX_RETRIES and is_retryable_error(e):
+                delay = get_retry_delay(e, attempt)
+                attempt += 1
+                metrics['retries'] += 1
+                logger.warning(f"AI {operation} call failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            record_ai_call(operation, model, (time.perf_counter() - started) * 1000, error=True)
+            raise
+
+        record_ai_call(operation, model, (time.perf_counter() - started) * 1000, response.usage)
+        usage = {
+            'prompt_tokens': getattr(response.usage, 'prompt_tokens', 0) or 0,
+            'completion_tokens': getattr(response.usage, 'completion_tokens', 0) or 0
+        }
+        return (response.choices[0].message.content or '').strip(), usage
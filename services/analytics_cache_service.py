@@ -0,0 +1,128 @@
+# services/analytics_cache_service.py
+
+"""
+Analytics Result Cache
+======================
+
+In-process LRU + TTL cache for analytics endpoint results. Keys combine the
+endpoint, the caller, the request parameters and the sync version of every
+course involved. A completed sync bumps the course's analytics snapshot
+version, so entries for the old version stop matching and age out of the LRU.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from functools import wraps
+from motor.motor_asyncio import AsyncIOMotorClient
+from services.achieveup_auth_service import achieveup_verify_token
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+course_analytics_snapshots_collection = db[Config.ACHIEVEUP_COURSE_ANALYTICS_SNAPSHOTS_COLLECTION]
+
+# key -> (stored_at, result)
+_analytics_cache = OrderedDict()
+_analytics_cache_stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+
+async def get_course_sync_version(course_id: str):
+    """Get the analytics snapshot version bumped by every course sync (None if never synced)."""
+    snapshot = await course_analytics_snapshots_collection.find_one(
+        {'course_id': str(course_id)}, {'version': 1}
+    )
+    return snapshot.get('version') if snapshot else None
+
+
+def get_analytics_cache_stats() -> dict:
+    """Get hit-rate metrics for the analytics result cache."""
+    lookups = _analytics_cache_stats['hits'] + _analytics_cache_stats['misses']
+    return {
+        **_analytics_cache_stats,
+        'lookups': lookups,
+        'hit_rate': round(_analytics_cache_stats['hits'] / lookups * 100, 2) if lookups else 0,
+        'entries': len(_analytics_cache),
+        'max_entries': Config.ANALYTICS_CACHE_MAX_ENTRIES,
+        'ttl_seconds': Config.ANALYTICS_CACHE_TTL
+    }
+
+
+def clear_analytics_cache() -> None:
+    """Drop all cached results and reset the metrics."""
+    _analytics_cache.clear()
+    for name in _analytics_cache_stats:
+        _analytics_cache_stats[name] = 0
+
+
+def get_request_course_ids(arguments: dict) -> list:
+    """Collect the course IDs a request touches from its course_id / course_ids arguments."""
+    course_ids = []
+    if arguments.get('course_id'):
+        course_ids.append(str(arguments['course_id']))
+    if arguments.get('course_ids'):
+        course_ids.extend(c.strip() for c in str(arguments['course_ids']).split(',') if c.strip())
+    return sorted(set(course_ids))
+
+
+def cache_analytics_result(endpoint: str):
+    """
+    Decorator caching an analytics service function taking (token, ...).
+
+    The token is verified before every lookup, so cached results are only
+    served to valid callers, and entries are scoped to the calling user.
+    Error results are never cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(token, *args, **kwargs):
+            user_result = await achieveup_verify_token(token)
+            if 'error' in user_result:
+                return user_result
+
+            bound = signature.bind(token, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != 'token'}
+
+            course_ids = get_request_course_ids(arguments)
+            versions = await asyncio.gather(*(get_course_sync_version(c) for c in course_ids))
+            key = (
+                endpoint,
+                user_result['user']['id'],
+                tuple(sorted((name, str(value)) for name, value in arguments.items())),
+                tuple(zip(course_ids, versions))
+            )
+
+            entry = _analytics_cache.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if time.time() - stored_at < Config.ANALYTICS_CACHE_TTL:
+                    _analytics_cache.move_to_end(key)
+                    _analytics_cache_stats['hits'] += 1
+                    return result
+                del _analytics_cache[key]
+                _analytics_cache_stats['expired'] += 1
+
+            _analytics_cache_stats['misses'] += 1
+            result = await func(token, *args, **kwargs)
+
+            if isinstance(result, dict) and 'error' not in result:
+                _analytics_cache[key] = (time.time(), result)
+                while len(_analytics_cache) > Config.ANALYTICS_CACHE_MAX_ENTRIES:
+                    _analytics_cache.popitem(last=False)
+                    _analytics_cache_stats['evictions'] += 1
+            return result
+
+        return wrapper
+    return decorator
@@ -1,11 +1,23 @@
 # services/analytics_service.py
 
+import asyncio
+import bisect
 import logging
 import json
 import statistics
+import time
 from datetime import datetime, timedelta
+import numpy as np
 from motor.motor_asyncio import AsyncIOMotorClient
-from services.achieveup_auth_service import achieveup_verify_token
+from pymongo import ReturnDocument
+from services.achieveup_auth_service import achieveup_verify_token, verify_instructor_course_access
+from services.rollup_service import get_rollup_buckets, get_rollup_granularity, merge_buckets_by_start
+from services.mastery_history_service import get_mastery_history
+from services.mastery_service import get_course_skill_mastery_summary
+from services.analytics_cache_service import cache_analytics_result, get_course_sync_version
+from services.export_service import (
+    EXPORT_CONTENT_TYPES, iter_cursor_rows, iter_list_rows, stream_export_rows, parquet_export_available
+)
 from config import Config
 
 # Set up logging
@@ -20,7 +32,23 @@ db = client[Config.DATABASE]
 achieveup_course_analytics_collection = db[Config.ACHIEVEUP_COURSE_ANALYTICS_COLLECTION]
 achieveup_student_analytics_collection = db[Config.ACHIEVEUP_STUDENT_ANALYTICS_COLLECTION]
 achieveup_skill_analytics_collection = db[Config.ACHIEVEUP_SKILL_ANALYTICS_COLLECTION]
+course_analytics_snapshots_collection = db[Config.ACHIEVEUP_COURSE_ANALYTICS_SNAPSHOTS_COLLECTION]
 
+async def ensure_analytics_indexes() -> None:
+    """Create the indexes behind instructor analytics and dashboard reads."""
+    await course_analytics_snapshots_collection.create_index(
+        'course_id', unique=True, name='course_snapshot_unique_idx'
+    )
+    await db[Config.ACHIEVEUP_SKILL_MATRICES_COLLECTION].create_index(
+        [('course_id', 1), ('created_at', -1)],
+        name='course_created_at_idx'
+    )
+    await db[Config.ACHIEVEUP_PROGRESS_COLLECTION].create_index(
+        [('course_id', 1), ('updated_at', 1)],
+        name='course_updated_at_idx'
+    )
+
+@cache_analytics_result('course_analytics')
 async def get_course_analytics(token: str, course_id: str, time_range: str = '30d', skill_id: str = None) -> dict:
     """Get comprehensive analytics for a course."""
     try:
@@ -75,6 +103,7 @@ async def get_course_analytics(token: str, course_id: str, time_range: str = '30
         logger.error(f"Get course analytics error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('student_comparison')
 async def get_student_comparison(token: str, course_id: str, skill_id: str = None, comparison_type: str = 'percentile') -> dict:
     """Get student comparison analytics."""
     try:
@@ -85,18 +114,10 @@ async def get_student_comparison(token: str, course_id: str, skill_id: str = Non
         
         user_id = user_result.get('user_id')
         
-        # Build query
-        query = {'course_id': course_id}
-        if skill_id:
-            query['skill_id'] = skill_id
-        
-        # Get all student data for comparison
-        student_data = []
-        async for student in achieveup_student_analytics_collection.find(query):
-            student.pop('_id', None)
-            student_data.append(student)
+        # Sorted scores for the course/skill, rebuilt only when the sync version changes
+        comparison_index = await get_comparison_index(course_id, skill_id)
         
-        if not student_data:
+        if not comparison_index['scores']:
             return {
                 'error': 'No data available',
                 'message': 'No student data found for comparison',
@@ -104,27 +125,26 @@ async def get_student_comparison(token: str, course_id: str, skill_id: str = Non
             }
         
         # Calculate comparison based on type
-        if comparison_type == 'percentile':
-            comparison_result = calculate_percentile_comparison(user_id, student_data)
-        elif comparison_type == 'ranking':
-            comparison_result = calculate_ranking_comparison(user_id, student_data)
+        if comparison_type == 'ranking':
+            comparison_result = calculate_ranking_comparison(user_id, comparison_index)
         elif comparison_type == 'distribution':
-            comparison_result = calculate_distribution_comparison(student_data)
+            comparison_result = calculate_distribution_comparison(comparison_index)
         else:
-            comparison_result = calculate_percentile_comparison(user_id, student_data)
+            comparison_result = calculate_percentile_comparison(user_id, comparison_index)
         
         return {
             'course_id': course_id,
             'skill_id': skill_id,
             'comparison_type': comparison_type,
             'comparison_data': comparison_result,
-            'total_students': len(student_data)
+            'total_students': len(comparison_index['scores'])
         }
         
     except Exception as e:
         logger.error(f"Get student comparison error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('skill_performance')
 async def get_skill_performance_analytics(token: str, skill_id: str, course_id: str, time_range: str = '30d') -> dict:
     """Get detailed performance analytics for a specific skill."""
     try:
@@ -186,6 +206,7 @@ async def get_skill_performance_analytics(token: str, skill_id: str, course_id:
         logger.error(f"Get skill performance analytics error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('trends')
 async def get_trend_analytics(token: str, course_ids: str = None, skill_ids: str = None, time_range: str = '90d', trend_type: str = 'progress') -> dict:
     """Get trend analytics across multiple courses or skills."""
     try:
@@ -204,25 +225,16 @@ async def get_trend_analytics(token: str, course_ids: str = None, skill_ids: str
         course_id_list = course_ids.split(',') if course_ids else []
         skill_id_list = skill_ids.split(',') if skill_ids else []
         
-        # Build query
-        query = {
-            'timestamp': {'$gte': start_date, '$lte': end_date}
-        }
-        
-        if course_id_list:
-            query['course_id'] = {'$in': course_id_list}
-        if skill_id_list:
-            query['skill_id'] = {'$in': skill_id_list}
+        # Trends are read from pre-aggregated rollup buckets
+        granularity = get_rollup_granularity(time_range)
         
         # Get trend data based on type
-        if trend_type == 'progress':
-            trend_data = await get_progress_trends(query)
-        elif trend_type == 'performance':
-            trend_data = await get_performance_trends(query)
+        if trend_type == 'performance':
+            trend_data = await get_performance_trends(course_id_list, skill_id_list, start_date, end_date, granularity)
         elif trend_type == 'engagement':
-            trend_data = await get_engagement_trends(query)
+            trend_data = await get_engagement_trends(course_id_list, skill_id_list, start_date, end_date, granularity)
         else:
-            trend_data = await get_progress_trends(query)
+            trend_data = await get_progress_trends(course_id_list, skill_id_list, start_date, end_date, granularity)
         
         # Calculate trend analysis
         trend_analysis = analyze_trends(trend_data, trend_type)
@@ -240,6 +252,74 @@ async def get_trend_analytics(token: str, course_ids: str = None, skill_ids: str
         logger.error(f"Get trend analytics error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('cohort')
+async def get_cohort_analytics(token: str, course_ids: str, skill_ids: str = None, time_range: str = '30d') -> dict:
+    """
+    Get merged analytics for a cohort of courses (e.g. every section of a class).
+    
+    Each course is summarized concurrently (bounded by COHORT_MAX_CONCURRENCY)
+    into a partial of counts, sums and histograms. Partials are cached per
+    course and sync version, and merged by adding them up, so adding a course
+    to a cohort only computes that course.
+    """
+    try:
+        # Verify token and get user info
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return user_result
+        
+        course_id_list = list(dict.fromkeys(c.strip() for c in (course_ids or '').split(',') if c.strip()))
+        skill_id_list = [s.strip() for s in skill_ids.split(',') if s.strip()] if skill_ids else []
+        
+        if not course_id_list:
+            return {'error': 'Course IDs are required', 'statusCode': 400}
+        
+        semaphore = asyncio.Semaphore(Config.COHORT_MAX_CONCURRENCY)
+        
+        async def load_partial(course_id):
+            async with semaphore:
+                started = time.perf_counter()
+                partial, cached = await get_cohort_course_partial(course_id, skill_id_list, time_range)
+                return partial, cached, round((time.perf_counter() - started) * 1000, 1)
+        
+        results = await asyncio.gather(*(load_partial(c) for c in course_id_list), return_exceptions=True)
+        
+        partials = []
+        courses = []
+        for course_id, result in zip(course_id_list, results):
+            if isinstance(result, Exception):
+                logger.error(f"Cohort partial error for course {course_id}: {str(result)}")
+                courses.append({'courseId': course_id, 'status': 'error'})
+                continue
+            partial, cached, elapsed_ms = result
+            partials.append(partial)
+            courses.append({
+                'courseId': course_id,
+                'status': 'ok',
+                'students': max((skill['students'] for skill in partial['skills'].values()), default=0),
+                'cached': cached,
+                'elapsedMs': elapsed_ms
+            })
+        
+        merged = merge_cohort_partials(partials)
+        # Overall mastery is averaged over student-skill records; count students per course instead
+        merged['overall']['masteryRecords'] = merged['overall']['students']
+        merged['overall']['students'] = sum(course.get('students', 0) for course in courses)
+        
+        return {
+            'courseIds': course_id_list,
+            'skillIds': skill_id_list,
+            'timeRange': time_range,
+            **merged,
+            'courses': courses,
+            'partial': len(partials) < len(course_id_list)
+        }
+        
+    except Exception as e:
+        logger.error(f"Get cohort analytics error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
+@cache_analytics_result('export')
 async def export_analytics_data(token: str, course_id: str = None, skill_id: str = None, format_type: str = 'json', analytics_type: str = 'course') -> dict:
     """Export analytics data."""
     try:
@@ -251,22 +331,10 @@ async def export_analytics_data(token: str, course_id: str = None, skill_id: str
         user_id = user_result.get('user_id')
         
         # Get analytics data based on type
-        if analytics_type == 'course':
-            data = await get_course_analytics_data(course_id, skill_id)
-        elif analytics_type == 'skill':
-            data = await get_skill_analytics_data(course_id, skill_id)
-        elif analytics_type == 'comparison':
-            data = await get_comparison_analytics_data(course_id, skill_id)
-        elif analytics_type == 'trends':
-            data = await get_trends_analytics_data()
-        else:
-            data = await get_course_analytics_data(course_id, skill_id)
+        data = await get_analytics_export_data(course_id, skill_id, analytics_type)
         
-        # Format data based on export type
-        if format_type == 'csv':
-            export_data = format_analytics_csv(data)
-            content_type = 'text/csv'
-        elif format_type == 'pdf':
+        # Format data based on export type (csv/ndjson/parquet are streamed, see open_analytics_export_stream)
+        if format_type == 'pdf':
             export_data = format_analytics_pdf(data)
             content_type = 'application/pdf'
         else:  # json
@@ -290,6 +358,35 @@ async def export_analytics_data(token: str, course_id: str = None, skill_id: str
         logger.error(f"Export analytics data error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+async def open_analytics_export_stream(token: str, course_id: str = None, skill_id: str = None, format_type: str = 'csv', analytics_type: str = 'course') -> dict:
+    """
+    Open a streamed CSV/NDJSON analytics export.
+    
+    Returns:
+        dict: {'stream': async iterator of bytes, 'filename', 'content_type'}, or an error
+    """
+    try:
+        # Verify token and get user info
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return user_result
+        
+        if format_type == 'parquet':
+            return {'error': 'Parquet export is available for course mastery, progress, submissions and badges', 'statusCode': 400}
+        
+        data = await get_analytics_export_data(course_id, skill_id, analytics_type)
+        
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        return {
+            'stream': stream_export_rows(iter_list_rows(data), format_type),
+            'filename': f"achieveup_analytics_{analytics_type}_{timestamp}.{format_type}",
+            'content_type': EXPORT_CONTENT_TYPES[format_type]
+        }
+        
+    except Exception as e:
+        logger.error(f"Open analytics export stream error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
 # Helper functions
 def calculate_start_date(time_range: str, end_date: datetime) -> datetime:
     """Calculate start date based on time range."""
@@ -321,25 +418,31 @@ def calculate_course_statistics(analytics_data: list) -> dict:
     }
 
 async def get_skill_breakdown(course_id: str, start_date: datetime, end_date: datetime, skill_id: str = None) -> list:
-    """Get skill breakdown for a course."""
-    # This would aggregate data by skill
-    # For now, return mock data
-    return [
-        {
-            'skill_id': 'skill_1',
-            'skill_name': 'Problem Solving',
-            'average_progress': 75.5,
-            'total_attempts': 150,
-            'completion_rate': 60.0
-        },
-        {
-            'skill_id': 'skill_2',
-            'skill_name': 'Critical Thinking',
-            'average_progress': 68.2,
-            'total_attempts': 120,
-            'completion_rate': 45.0
-        }
-    ]
+    """Get skill breakdown for a course from the daily skill rollups."""
+    buckets = await get_rollup_buckets(
+        'skill', 'day', start_date, end_date,
+        course_ids=[course_id],
+        skill_ids=[skill_id] if skill_id else None
+    )
+    
+    skills = {}
+    for bucket in buckets:
+        totals = skills.setdefault(bucket['skill_id'], {'count': 0, 'sum_progress': 0.0, 'completed': 0})
+        totals['count'] += bucket.get('count', 0)
+        totals['sum_progress'] += bucket.get('sum_progress', 0)
+        totals['completed'] += bucket.get('completed', 0)
+    
+    breakdown = []
+    for skill, totals in skills.items():
+        count = totals['count']
+        breakdown.append({
+            'skill_id': skill,
+            'skill_name': skill,
+            'average_progress': round(totals['sum_progress'] / count, 2) if count else 0,
+            'total_attempts': count,
+            'completion_rate': round(totals['completed'] / count * 100, 2) if count else 0
+        })
+    return breakdown
 
 def calculate_performance_trends(analytics_data: list) -> dict:
     """Calculate performance trends over time."""
@@ -366,86 +469,237 @@ def calculate_performance_trends(analytics_data: list) -> dict:
     return {'daily_trends': trends}
 
 async def get_engagement_metrics(course_id: str, start_date: datetime, end_date: datetime) -> dict:
-    """Get student engagement metrics."""
-    # This would calculate engagement metrics
-    # For now, return mock data
+    """Get student engagement metrics from the daily course rollups."""
+    buckets = await get_rollup_buckets('course', 'day', start_date, end_date, course_ids=[course_id])
+    
+    active_students = set()
+    total_sessions = 0
+    for bucket in buckets:
+        active_students.update(bucket.get('active_students', []))
+        total_sessions += bucket.get('count', 0)
+    
+    # Share of days in the range that saw any activity
+    days_in_range = max(1, (end_date.date() - start_date.date()).days + 1)
+    
+    return {
+        'active_students': len(active_students),
+        'average_session_duration': None,
+        'total_sessions': total_sessions,
+        'engagement_score': round(len(buckets) / days_in_range * 100, 2)
+    }
+
+# Distribution buckets for student comparison (the last bucket includes 100%)
+COMPARISON_HISTOGRAM_BINS = [0, 25, 50, 75, 100]
+COMPARISON_HISTOGRAM_LABELS = ['0-25%', '25-50%', '50-75%', '75-100%']
+
+# Comparison indexes also expire after this many seconds, for courses that are never synced
+COMPARISON_INDEX_MAX_AGE = 900
+COMPARISON_INDEX_MAX_ENTRIES = 256
+
+# (course_id, skill_id) -> {'version', 'built_at', 'index'}
+_comparison_index_cache = {}
+
+def build_comparison_index(student_data: list) -> dict:
+    """
+    Precompute everything comparison requests need from the student analytics
+    docs: an ascending score array for bisect lookups, the top performers and
+    the distribution histogram and statistics.
+    """
+    progress_by_user = {}
+    docs_by_user = {}
+    for student in student_data:
+        user_id = student.get('user_id')
+        progress_by_user.setdefault(user_id, student.get('progress_percentage', 0))
+        docs_by_user.setdefault(user_id, student)
+    
+    scores = sorted(s.get('progress_percentage', 0) for s in student_data)
+    values = np.asarray(scores, dtype=float)
+    histogram = np.histogram(values, bins=COMPARISON_HISTOGRAM_BINS)[0] if scores else [0] * len(COMPARISON_HISTOGRAM_LABELS)
+    
     return {
-        'active_students': 45,
-        'average_session_duration': 25.5,
-        'total_sessions': 180,
-        'engagement_score': 78.2
+        'scores': scores,
+        'progress_by_user': progress_by_user,
+        'docs_by_user': docs_by_user,
+        'top_performers': sorted(student_data, key=lambda x: x.get('progress_percentage', 0), reverse=True)[:5],
+        'distribution': dict(zip(COMPARISON_HISTOGRAM_LABELS, (int(count) for count in histogram))),
+        'statistics': {
+            'mean': round(float(values.mean()), 2) if scores else 0,
+            'median': round(float(np.median(values)), 2) if scores else 0,
+            'std_dev': round(float(values.std(ddof=1)), 2) if len(scores) > 1 else 0
+        }
     }
 
-def calculate_percentile_comparison(user_id: str, student_data: list) -> dict:
+async def get_comparison_index(course_id: str, skill_id: str = None) -> dict:
+    """
+    Get the comparison index for a course/skill, rebuilding it from the student
+    analytics collection only when the course sync version has changed.
+    """
+    key = (course_id, skill_id)
+    version = await get_course_sync_version(course_id)
+    cached = _comparison_index_cache.get(key)
+    if cached and cached['version'] == version and time.time() - cached['built_at'] < COMPARISON_INDEX_MAX_AGE:
+        return cached['index']
+    
+    query = {'course_id': course_id}
+    if skill_id:
+        query['skill_id'] = skill_id
+    
+    student_data = []
+    async for student in achieveup_student_analytics_collection.find(query):
+        student.pop('_id', None)
+        student_data.append(student)
+    
+    index = build_comparison_index(student_data)
+    _comparison_index_cache.pop(key, None)
+    if len(_comparison_index_cache) >= COMPARISON_INDEX_MAX_ENTRIES:
+        _comparison_index_cache.pop(next(iter(_comparison_index_cache)))
+    _comparison_index_cache[key] = {'version': version, 'built_at': time.time(), 'index': index}
+    return index
+
+# Cohort partials also expire after this many seconds, since rollups change between syncs
+COHORT_PARTIAL_MAX_AGE = 900
+COHORT_PARTIAL_MAX_ENTRIES = 512
+
+# (course_id, skill_ids, time_range) -> {'version', 'built_at', 'partial'}
+_cohort_partial_cache = {}
+
+async def build_cohort_course_partial(course_id: str, skill_ids: list, time_range: str) -> dict:
+    """Summarize one course as mergeable counts and sums: per-skill mastery and the activity timeline."""
+    end_date = datetime.utcnow()
+    start_date = calculate_start_date(time_range, end_date)
+    scope = 'skill' if skill_ids else 'course'
+    
+    skills, buckets = await asyncio.gather(
+        get_course_skill_mastery_summary(course_id, skill_ids or None),
+        get_rollup_buckets(scope, get_rollup_granularity(time_range), start_date, end_date,
+                           course_ids=[course_id], skill_ids=skill_ids or None)
+    )
+    return {'course_id': course_id, 'skills': skills, 'timeline': merge_buckets_by_start(buckets)}
+
+async def get_cohort_course_partial(course_id: str, skill_ids: list, time_range: str) -> tuple:
+    """
+    Get the cohort partial for one course, rebuilt only when its sync version changes.
+    
+    Returns:
+        tuple: (partial, served_from_cache)
+    """
+    key = (course_id, tuple(sorted(skill_ids)), time_range)
+    version = await get_course_sync_version(course_id)
+    cached = _cohort_partial_cache.get(key)
+    if cached and cached['version'] == version and time.time() - cached['built_at'] < COHORT_PARTIAL_MAX_AGE:
+        return cached['partial'], True
+    
+    partial = await build_cohort_course_partial(course_id, skill_ids, time_range)
+    _cohort_partial_cache.pop(key, None)
+    if len(_cohort_partial_cache) >= COHORT_PARTIAL_MAX_ENTRIES:
+        _cohort_partial_cache.pop(next(iter(_cohort_partial_cache)))
+    _cohort_partial_cache[key] = {'version': version, 'built_at': time.time(), 'partial': partial}
+    return partial, False
+
+def summarize_mastery_totals(totals: dict) -> dict:
+    """Turn merged mastery counts and sums into averages, spread and distribution."""
+    students = totals['students']
+    mean = totals['sum_mastery'] / students if students else 0
+    variance = max(0.0, totals['sum_sq_mastery'] / students - mean * mean) if students else 0
+    return {
+        'students': students,
+        'averageMastery': round(mean, 2),
+        'stdDev': round(variance ** 0.5, 2),
+        'accuracy': round(totals['total_correct'] / totals['total_attempted'] * 100, 2) if totals['total_attempted'] else 0,
+        'totalAttempted': totals['total_attempted'],
+        'distribution': dict(zip(COMPARISON_HISTOGRAM_LABELS, totals['histogram']))
+    }
+
+def merge_cohort_partials(partials: list) -> dict:
+    """
+    Merge per-course partials by adding their counts, sums and histograms.
+    
+    Returns:
+        dict: {'skills': [...], 'overall': {...}, 'timeline': [...]}
+    """
+    def empty_totals():
+        return {'students': 0, 'sum_mastery': 0.0, 'sum_sq_mastery': 0.0,
+                'total_attempted': 0, 'total_correct': 0, 'histogram': [0] * len(COMPARISON_HISTOGRAM_LABELS)}
+    
+    def add(totals, summary):
+        for field in ('students', 'sum_mastery', 'sum_sq_mastery', 'total_attempted', 'total_correct'):
+            totals[field] += summary.get(field, 0)
+        totals['histogram'] = [a + b for a, b in zip(totals['histogram'], summary.get('histogram', []))]
+    
+    skills = {}
+    overall = empty_totals()
+    for partial in partials:
+        for skill_id, summary in partial['skills'].items():
+            add(skills.setdefault(skill_id, empty_totals()), summary)
+            add(overall, summary)
+    
+    timeline = []
+    for bucket in merge_buckets_by_start([b for partial in partials for b in partial['timeline']]):
+        count = bucket['count']
+        timeline.append({
+            'date': bucket['bucket_start'].date().isoformat(),
+            'average_progress': round(bucket['sum_progress'] / count, 2) if count else 0,
+            'performance_score': round(bucket['passing'] / count * 100, 2) if count else 0,
+            'active_students': len(bucket['active_students']),
+            'activity': count
+        })
+    
+    return {
+        'skills': sorted(
+            ({'skillId': skill_id, **summarize_mastery_totals(totals)} for skill_id, totals in skills.items()),
+            key=lambda skill: skill['skillId']
+        ),
+        'overall': summarize_mastery_totals(overall),
+        'timeline': timeline
+    }
+
+def calculate_percentile_comparison(user_id: str, comparison_index: dict) -> dict:
     """Calculate percentile comparison for a user."""
-    if not student_data:
+    scores = comparison_index['scores']
+    if not scores:
         return {}
     
-    # Find user's data
-    user_data = next((s for s in student_data if s.get('user_id') == user_id), None)
-    if not user_data:
+    if user_id not in comparison_index['progress_by_user']:
         return {'error': 'User data not found'}
     
-    user_progress = user_data.get('progress_percentage', 0)
+    user_progress = comparison_index['progress_by_user'][user_id]
     
-    # Calculate percentile
-    all_progress = [s.get('progress_percentage', 0) for s in student_data]
-    all_progress.sort()
-    
-    percentile = 0
-    for i, progress in enumerate(all_progress):
-        if progress >= user_progress:
-            percentile = (i / len(all_progress)) * 100
-            break
+    # Share of students below the user, and rank among students above
+    percentile = bisect.bisect_left(scores, user_progress) / len(scores) * 100
     
     return {
         'user_progress': user_progress,
         'percentile': round(percentile, 1),
-        'total_students': len(student_data),
-        'rank': len([p for p in all_progress if p > user_progress]) + 1
+        'total_students': len(scores),
+        'rank': len(scores) - bisect.bisect_right(scores, user_progress) + 1
     }
 
-def calculate_ranking_comparison(user_id: str, student_data: list) -> dict:
-    """Calculate ranking comparison for a user."""
-    if not student_data:
+def calculate_ranking_comparison(user_id: str, comparison_index: dict) -> dict:
+    """Calculate ranking comparison for a user (tied scores share a rank)."""
+    scores = comparison_index['scores']
+    if not scores:
         return {}
     
-    # Sort by progress percentage
-    sorted_data = sorted(student_data, key=lambda x: x.get('progress_percentage', 0), reverse=True)
-    
-    # Find user's rank
     user_rank = 0
-    for i, student in enumerate(sorted_data):
-        if student.get('user_id') == user_id:
-            user_rank = i + 1
-            break
+    if user_id in comparison_index['progress_by_user']:
+        user_progress = comparison_index['progress_by_user'][user_id]
+        user_rank = len(scores) - bisect.bisect_right(scores, user_progress) + 1
     
     return {
         'user_rank': user_rank,
-        'total_students': len(sorted_data),
-        'top_performers': sorted_data[:5],
-        'user_data': next((s for s in student_data if s.get('user_id') == user_id), None)
+        'total_students': len(scores),
+        'top_performers': comparison_index['top_performers'],
+        'user_data': comparison_index['docs_by_user'].get(user_id)
     }
 
-def calculate_distribution_comparison(student_data: list) -> dict:
+def calculate_distribution_comparison(comparison_index: dict) -> dict:
     """Calculate distribution comparison."""
-    if not student_data:
+    if not comparison_index['scores']:
         return {}
     
-    progress_values = [s.get('progress_percentage', 0) for s in student_data]
-    
     return {
-        'distribution': {
-            '0-25%': len([p for p in progress_values if 0 <= p < 25]),
-            '25-50%': len([p for p in progress_values if 25 <= p < 50]),
-            '50-75%': len([p for p in progress_values if 50 <= p < 75]),
-            '75-100%': len([p for p in progress_values if 75 <= p <= 100])
-        },
-        'statistics': {
-            'mean': round(statistics.mean(progress_values), 2),
-            'median': round(statistics.median(progress_values), 2),
-            'std_dev': round(statistics.stdev(progress_values), 2) if len(progress_values) > 1 else 0
-        }
+        'distribution': comparison_index['distribution'],
+        'statistics': comparison_index['statistics']
     }
 
 def calculate_skill_statistics(skill_data: list) -> dict:
@@ -553,32 +807,41 @@ def generate_skill_recommendations(skill_stats: dict) -> list:
     
     return recommendations
 
-async def get_progress_trends(query: dict) -> list:
-    """Get progress trends data."""
-    # This would query the database for progress trends
-    # For now, return mock data
+async def get_trend_buckets(course_ids: list, skill_ids: list, start_date: datetime, end_date: datetime, granularity: str) -> list:
+    """Read course (or skill, when skills are given) rollups merged per bucket."""
+    scope = 'skill' if skill_ids else 'course'
+    buckets = await get_rollup_buckets(scope, granularity, start_date, end_date, course_ids=course_ids, skill_ids=skill_ids)
+    return merge_buckets_by_start(buckets)
+
+async def get_progress_trends(course_ids: list, skill_ids: list, start_date: datetime, end_date: datetime, granularity: str = 'day') -> list:
+    """Get average progress per bucket."""
     return [
-        {'date': '2024-01-01', 'average_progress': 65.2},
-        {'date': '2024-01-02', 'average_progress': 68.1},
-        {'date': '2024-01-03', 'average_progress': 72.5}
+        {
+            'date': bucket['bucket_start'].date().isoformat(),
+            'average_progress': round(bucket['sum_progress'] / bucket['count'], 2) if bucket['count'] else 0
+        }
+        for bucket in await get_trend_buckets(course_ids, skill_ids, start_date, end_date, granularity)
     ]
 
-async def get_performance_trends(query: dict) -> list:
-    """Get performance trends data."""
-    # Mock data
+async def get_performance_trends(course_ids: list, skill_ids: list, start_date: datetime, end_date: datetime, granularity: str = 'day') -> list:
+    """Get the share of passing progress updates per bucket."""
     return [
-        {'date': '2024-01-01', 'performance_score': 75.0},
-        {'date': '2024-01-02', 'performance_score': 78.2},
-        {'date': '2024-01-03', 'performance_score': 81.5}
+        {
+            'date': bucket['bucket_start'].date().isoformat(),
+            'performance_score': round(bucket['passing'] / bucket['count'] * 100, 2) if bucket['count'] else 0
+        }
+        for bucket in await get_trend_buckets(course_ids, skill_ids, start_date, end_date, granularity)
     ]
 
-async def get_engagement_trends(query: dict) -> list:
-    """Get engagement trends data."""
-    # Mock data
+async def get_engagement_trends(course_ids: list, skill_ids: list, start_date: datetime, end_date: datetime, granularity: str = 'day') -> list:
+    """Get active students and activity volume per bucket."""
     return [
-        {'date': '2024-01-01', 'engagement_score': 70.0},
-        {'date': '2024-01-02', 'engagement_score': 72.5},
-        {'date': '2024-01-03', 'engagement_score': 75.8}
+        {
+            'date': bucket['bucket_start'].date().isoformat(),
+            'engagement_score': len(bucket['active_students']),
+            'activity': bucket['count']
+        }
+        for bucket in await get_trend_buckets(course_ids, skill_ids, start_date, end_date, granularity)
     ]
 
 def analyze_trends(trend_data: list, trend_type: str) -> dict:
@@ -586,10 +849,15 @@ def analyze_trends(trend_data: list, trend_type: str) -> dict:
     if not trend_data:
         return {}
     
+    value_key = {
+        'performance': 'performance_score',
+        'engagement': 'engagement_score'
+    }.get(trend_type, 'average_progress')
+    
     # Calculate trend direction
     if len(trend_data) >= 2:
-        first_value = trend_data[0].get('average_progress', 0)
-        last_value = trend_data[-1].get('average_progress', 0)
+        first_value = trend_data[0].get(value_key, 0)
+        last_value = trend_data[-1].get(value_key, 0)
         change = last_value - first_value
         
         if change > 5:
@@ -609,327 +877,488 @@ def analyze_trends(trend_data: list, trend_type: str) -> dict:
         'trend_type': trend_type
     }
 
-async def get_course_analytics_data(course_id: str, skill_id: str = None) -> list:
-    """Get course analytics data for export."""
-    # Mock data
-    return [
-        {'course_id': course_id, 'skill_id': skill_id, 'analytics_type': 'course'}
-    ]
+# Export rows cover the same default windows as the analytics endpoints
+EXPORT_TIME_RANGE = '30d'
+EXPORT_TRENDS_TIME_RANGE = '90d'
 
-async def get_skill_analytics_data(course_id: str, skill_id: str = None) -> list:
-    """Get skill analytics data for export."""
-    # Mock data
-    return [
-        {'course_id': course_id, 'skill_id': skill_id, 'analytics_type': 'skill'}
-    ]
+async def get_analytics_export_data(course_id: str, skill_id: str, analytics_type: str) -> list:
+    """Get the rows for an analytics export type."""
+    if analytics_type == 'skill':
+        return await get_skill_analytics_data(course_id, skill_id)
+    elif analytics_type == 'comparison':
+        return await get_comparison_analytics_data(course_id, skill_id)
+    elif analytics_type == 'trends':
+        return await get_trends_analytics_data(course_id, skill_id)
+    return await get_course_analytics_data(course_id, skill_id)
 
-async def get_comparison_analytics_data(course_id: str, skill_id: str = None) -> list:
-    """Get comparison analytics data for export."""
-    # Mock data
+def summarize_rollup_bucket(bucket: dict) -> dict:
+    """Average progress and passing/completion rates of one rollup bucket."""
+    count = bucket.get('count', 0)
+    return {
+        'records': count,
+        'average_progress': round(bucket.get('sum_progress', 0) / count, 2) if count else 0,
+        'passing_rate': round(bucket.get('passing', 0) / count * 100, 2) if count else 0,
+        'completion_rate': round(bucket.get('completed', 0) / count * 100, 2) if count else 0
+    }
+
+async def get_course_analytics_data(course_id: str, skill_id: str = None, time_range: str = EXPORT_TIME_RANGE) -> list:
+    """Get course analytics data for export: one row per day from the course (or skill) rollups."""
+    end_date = datetime.utcnow()
+    start_date = calculate_start_date(time_range, end_date)
     return [
-        {'course_id': course_id, 'skill_id': skill_id, 'analytics_type': 'comparison'}
+        {
+            'course_id': course_id,
+            'skill_id': skill_id,
+            'date': bucket['bucket_start'].date().isoformat(),
+            **summarize_rollup_bucket(bucket),
+            'active_students': len(bucket['active_students'])
+        }
+        for bucket in await get_trend_buckets([course_id], [skill_id] if skill_id else [], start_date, end_date, 'day')
     ]
 
-async def get_trends_analytics_data() -> list:
-    """Get trends analytics data for export."""
-    # Mock data
+async def get_skill_analytics_data(course_id: str, skill_id: str = None, time_range: str = EXPORT_TIME_RANGE) -> list:
+    """Get skill analytics data for export: one row per skill and day from the skill rollups."""
+    end_date = datetime.utcnow()
+    start_date = calculate_start_date(time_range, end_date)
+    buckets = await get_rollup_buckets(
+        'skill', 'day', start_date, end_date,
+        course_ids=[course_id],
+        skill_ids=[skill_id] if skill_id else None
+    )
     return [
-        {'analytics_type': 'trends', 'trend_data': 'mock_trend_data'}
+        {
+            'course_id': course_id,
+            'skill_id': bucket['skill_id'],
+            'date': bucket['bucket_start'].date().isoformat(),
+            **summarize_rollup_bucket(bucket),
+            'min_progress': bucket.get('min_progress', 0),
+            'max_progress': bucket.get('max_progress', 0),
+            'active_students': len(bucket.get('active_students', []))
+        }
+        for bucket in buckets
     ]
 
-def format_analytics_csv(data: list) -> str:
-    """Format analytics data as CSV."""
-    if not data:
-        return ""
+async def get_comparison_analytics_data(course_id: str, skill_id: str = None, time_range: str = EXPORT_TIME_RANGE) -> list:
+    """
+    Get comparison analytics data for export: one row per student from the
+    student rollups, with their percentile and rank by average progress.
+    """
+    end_date = datetime.utcnow()
+    start_date = calculate_start_date(time_range, end_date)
+    buckets = await get_rollup_buckets(
+        'student', 'day', start_date, end_date,
+        course_ids=[course_id],
+        skill_ids=[skill_id] if skill_id else None
+    )
     
-    # Create CSV string
-    output = []
-    if data:
-        fieldnames = list(data[0].keys())
-        output.append(','.join(fieldnames))
-        
-        for item in data:
-            row = []
-            for field in fieldnames:
-                value = item.get(field, '')
-                if isinstance(value, datetime):
-                    value = value.isoformat()
-                row.append(str(value))
-            output.append(','.join(row))
+    students = {}
+    for bucket in buckets:
+        totals = students.setdefault(bucket['student_id'], {'count': 0, 'sum_progress': 0.0, 'passing': 0, 'completed': 0})
+        for field in totals:
+            totals[field] += bucket.get(field, 0)
     
-    return '\n'.join(output)
+    rows = [
+        {'course_id': course_id, 'skill_id': skill_id, 'student_id': student_id, **summarize_rollup_bucket(totals)}
+        for student_id, totals in students.items()
+    ]
+    scores = sorted(row['average_progress'] for row in rows)
+    for row in rows:
+        row['percentile'] = round(bisect.bisect_left(scores, row['average_progress']) / len(scores) * 100, 1)
+        row['rank'] = len(scores) - bisect.bisect_right(scores, row['average_progress']) + 1
+    return sorted(rows, key=lambda row: row['rank'])
+
+async def get_trends_analytics_data(course_id: str = None, skill_id: str = None, time_range: str = EXPORT_TRENDS_TIME_RANGE) -> list:
+    """Get trends analytics data for export: progress, performance and engagement per rollup bucket."""
+    end_date = datetime.utcnow()
+    start_date = calculate_start_date(time_range, end_date)
+    buckets = await get_trend_buckets(
+        [course_id] if course_id else [], [skill_id] if skill_id else [],
+        start_date, end_date, get_rollup_granularity(time_range)
+    )
+    rows = []
+    for bucket in buckets:
+        summary = summarize_rollup_bucket(bucket)
+        rows.append({
+            'course_id': course_id,
+            'skill_id': skill_id,
+            'date': bucket['bucket_start'].date().isoformat(),
+            'average_progress': summary['average_progress'],
+            'performance_score': summary['passing_rate'],
+            'engagement_score': len(bucket['active_students']),
+            'activity': summary['records']
+        })
+    return rows
 
 def format_analytics_pdf(data: list) -> str:
     """Format analytics data as PDF (placeholder)."""
     return f"PDF export for {len(data)} analytics records (placeholder)" 
 
-async def get_course_students_analytics(token: str, course_id: str, time_range: str = '30d', skill_id: str = None) -> dict:
-    """Get comprehensive analytics for all students in a course."""
-    try:
-        # Verify user token
-        from services.achieveup_auth_service import achieveup_verify_token
-        user_result = await achieveup_verify_token(token)
-        if 'error' in user_result:
-            return user_result
-        
-        # FIXED: Direct database collection references
-        from motor.motor_asyncio import AsyncIOMotorClient
-        from config import Config
-        import random
-        
-        client = AsyncIOMotorClient(
-        Config.DB_CONNECTION_STRING,
-        tlsAllowInvalidCertificates=(Config.ENV == 'development')
-    )
-        db = client[Config.DATABASE]
-        
-        # Use explicit collection names
-        skill_matrices_collection = db[Config.ACHIEVEUP_SKILL_MATRICES_COLLECTION]
-        mastery_collection = db[Config.ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION]
-
-        # Fetch all quiz attempts for the course in one query
-        all_quiz_attempts = await db["AchieveUp_Quiz_Attempts"].find({
-            'course_id': course_id
-        }).to_list(length=None)
-        
-        # Get students for the course
-        from services.achieveup_service import get_instructor_course_students
-        students_result = await get_instructor_course_students(token, course_id)
-        if 'error' in students_result:
-            return students_result
-        
-        students = students_result if isinstance(students_result, list) else []
-        
-        # Get all mapped skills for course from AchieveUp_Question_Skills
-        question_skills_cursor = db[Config.ACHIEVEUP_QUESTION_SKILLS_COLLECTION].find({'course_id': course_id})
-        course_skills_set = set()
-        async for qs in question_skills_cursor:
-            for skill in qs.get('skills', []):
-                if isinstance(skill, dict):
-                    course_skills_set.add(skill.get('name', ''))
-                else:
-                    course_skills_set.add(skill)
-        
-        course_skills = list(course_skills_set)
-        
-        # Also check for skills that might exist in mastery collection but not question mappings (legacy data)
-        mastery_skills_cursor = mastery_collection.distinct('skill_id', {'course_id': course_id})
-        for skill in await mastery_skills_cursor:
-            if skill not in course_skills:
-                course_skills.append(skill)
-        
-        # Determine if we should ever use demo data. Only use if absolutely no real assignments or mastery exist
-        use_demo_data = False
-        if Config.ENABLE_DEMO_MODE:
-            course_mastery_count = await mastery_collection.count_documents({'course_id': course_id})
-            course_assignment_count = await db[Config.ACHIEVEUP_QUESTION_SKILLS_COLLECTION].count_documents({'course_id': course_id})
-            if course_mastery_count == 0 and course_assignment_count == 0:
-                use_demo_data = True
-        
-        # Fallback: Define skills for each course if not found in database (only if demo mode enabled)
-        if not course_skills and use_demo_data:
-            course_skills_map = {
-                "demo_001": ["HTML/CSS Fundamentals", "JavaScript Programming", "DOM Manipulation", "Responsive Design", "Web APIs"],
-                "demo_002": ["SQL Fundamentals", "Database Design", "Data Normalization", "Query Optimization", "Stored Procedures"],
-                "demo_003": ["Network Protocols (TCP/IP)", "Network Security", "Routing & Switching", "Wireless Networks", "Network Troubleshooting"]
-            }
-            course_skills = course_skills_map.get(course_id, [])
-        
-        student_analytics = []
-        skill_distribution = {}
-        all_skill_scores = {}
+async def build_course_students_analytics(course_id: str, students: list) -> dict:
+    """
+    Compute the full student x skill breakdown for a course.
+    
+    Mastery for every student is loaded with a single aggregation and joined
+    in memory against the Canvas roster, so the cost is one round trip per
+    course regardless of enrollment size.
+    
+    Args:
+        course_id: Canvas course ID
+        students: Canvas roster for the course
+        
+    Returns:
+        dict: students, skillDistribution, averageScores and debug info
+    """
+    import random
+    from services.mastery_service import get_course_mastery_by_student
+    
+    question_skills_collection = db[Config.ACHIEVEUP_QUESTION_SKILLS_COLLECTION]
+    
+    # Get all mapped skills for course from AchieveUp_Question_Skills
+    question_skills_cursor = question_skills_collection.find({'course_id': course_id}, {'skills': 1})
+    course_skills_set = set()
+    real_assignment_count = 0
+    async for qs in question_skills_cursor:
+        real_assignment_count += 1
+        for skill in qs.get('skills', []):
+            if isinstance(skill, dict):
+                course_skills_set.add(skill.get('name', ''))
+            else:
+                course_skills_set.add(skill)
+    
+    course_skills = list(course_skills_set)
+    
+    # Per-student, per-skill mastery for the whole course in one round trip
+    mastery_by_student = await get_course_mastery_by_student(course_id)
+    
+    # Also include skills that exist in mastery but not question mappings (legacy data)
+    for student_mastery in mastery_by_student.values():
+        for mastery_skill in student_mastery:
+            if mastery_skill not in course_skills_set:
+                course_skills_set.add(mastery_skill)
+                course_skills.append(mastery_skill)
+    
+    # Determine if we should ever use demo data. Only use if absolutely no real assignments or mastery exist
+    use_demo_data = Config.ENABLE_DEMO_MODE and not mastery_by_student and real_assignment_count == 0
+    
+    # Fallback: Define skills for each course if not found in database (only if demo mode enabled)
+    if not course_skills and use_demo_data:
+        course_skills_map = {
+            "demo_001": ["HTML/CSS Fundamentals", "JavaScript Programming", "DOM Manipulation", "Responsive Design", "Web APIs"],
+            "demo_002": ["SQL Fundamentals", "Database Design", "Data Normalization", "Query Optimization", "Stored Procedures"],
+            "demo_003": ["Network Protocols (TCP/IP)", "Network Security", "Routing & Switching", "Wireless Networks", "Network Troubleshooting"]
+        }
+        course_skills = course_skills_map.get(course_id, [])
+    
+    student_analytics = []
+    skill_distribution = {}
+    all_skill_scores = {}
+    
+    # Debug info tracking
+    real_data_count = 0
+    data_source = "demo" if use_demo_data else "real"
+    
+    for i, student in enumerate(students):
+        student_id = student.get('id')
         
-        # Debug info tracking
-        real_data_count = 0
-        data_source = "demo" if use_demo_data else "real"
+        # Mastery for this student, keyed by skill_id
+        mastery_lookup = mastery_by_student.get(student_id, {})
         
-        for i, student in enumerate(students):
-            student_id = student.get('id')
+        # If no real data and demo mode is on (and we are using demo data for the course), generate demo data
+        if not mastery_lookup and use_demo_data:
+            # Use student ID as seed for consistent random data
+            seed_value = hash(student_id) % (2**32)
+            rng = random.Random(seed_value)
             
-            # Get all mastery data for this student in this course
-            mastery_data = await mastery_collection.find({
-                'student_id': student_id,
-                'course_id': course_id
-            }).to_list(length=None)
-            
-            # If no real data and demo mode is on (and we are using demo data for the course), generate demo data
-            if not mastery_data and use_demo_data:
-                # Use student ID as seed for consistent random data
-                seed_value = hash(student_id) % (2**32)
-                rng = random.Random(seed_value)
-                
-                # Generate realistic skill scores (varied by student)
-                base_performance = 0.4 + (i * 0.02)  # Varied student ability
-                skill_breakdown = {}
-                skill_scores = {}
-                skills_mastered = 0
-                
-                for skill in course_skills:
-                    score = base_performance * 100 + rng.uniform(-20, 30)
-                    score = max(15, min(100, score))
-                    
-                    if score >= 80:
-                        level = "advanced"
-                        skills_mastered += 1
-                    elif score >= 60:
-                        level = "intermediate"
-                    else:
-                        level = "beginner"
-                    
-                    questions_attempted = rng.randint(2, 8)
-                    questions_correct = max(0, int(questions_attempted * (score / 100) + rng.uniform(-1, 1)))
-                    questions_correct = min(questions_attempted, questions_correct)
-                    
-                    skill_breakdown[skill] = {
-                        "score": round(score, 1),
-                        "level": level,
-                        "questionsAttempted": questions_attempted,
-                        "questionsCorrect": questions_correct
-                    }
-                    skill_scores[skill] = score
-                    
-                    if skill not in skill_distribution:
-                        skill_distribution[skill] = 0
-                        all_skill_scores[skill] = []
-                    skill_distribution[skill] += 1
-                    all_skill_scores[skill].append(score)
-                
-                overall_progress = round(sum(skill_scores.values()) / len(skill_scores), 1) if skill_scores else 0
-                # A single badge is earned only at advanced level (80% or higher)
-                badges_earned = skills_mastered
-                
-                risk_level = 'low' if overall_progress >= 75 else 'medium' if overall_progress >= 50 else 'high'
-                
-                student_analytics.append({
-                    'id': student_id,
-                    'name': student.get('name', 'Unknown'),
-                    'progress': overall_progress,
-                    'skillsMastered': skills_mastered,
-                    'badgesEarned': badges_earned,
-                    'riskLevel': risk_level,
-                    'skillBreakdown': skill_breakdown
-                })
-                continue
-            
-            # Process real mastery data
-            if mastery_data:
-                real_data_count += len(mastery_data)
-                data_source = "real"
-
+            # Generate realistic skill scores (varied by student)
+            base_performance = 0.4 + (i * 0.02)  # Varied student ability
             skill_breakdown = {}
             skill_scores = {}
             skills_mastered = 0
             
-            # Create a lookup for mastery documents by skill_id
-            mastery_lookup = {doc.get('skill_id'): doc for doc in mastery_data}
-            
             for skill in course_skills:
-                # Skill names might be objects or strings in some matrices
-                # In the new system, they are objects: {"id": "...", "name": "...", "description": "..."}
-                skill_id = skill.get('id') if isinstance(skill, dict) else skill
-                skill_name = skill.get('name') if isinstance(skill, dict) else skill
+                score = base_performance * 100 + rng.uniform(-20, 30)
+                score = max(15, min(100, score))
                 
-                doc = mastery_lookup.get(skill_id)
-                
-                if doc:
-                    score = doc.get('mastery_percentage', 0)
-                    questions_attempted = doc.get('total_attempted', 0)
-                    questions_correct = doc.get('total_correct', 0)
-                    
-                    if score >= 80:
-                        level = "advanced"
-                        skills_mastered += 1
-                    elif score >= 60:
-                        level = "intermediate"
-                    else:
-                        level = "beginner"
-                    
-                    skill_breakdown[skill_name] = {
-                        "score": round(score, 1),
-                        "level": level,
-                        "questionsAttempted": questions_attempted,
-                        "questionsCorrect": questions_correct
-                    }
-                    skill_scores[skill_name] = score
-                    
-                    if skill_name not in skill_distribution:
-                        skill_distribution[skill_name] = 0
-                        all_skill_scores[skill_name] = []
-                    skill_distribution[skill_name] += 1
-                    all_skill_scores[skill_name].append(score)
+                if score >= 80:
+                    level = "advanced"
+                    skills_mastered += 1
+                elif score >= 60:
+                    level = "intermediate"
                 else:
-                    skill_breakdown[skill_name] = {
-                        "score": 0,
-                        "level": "beginner",
-                        "questionsAttempted": 0,
-                        "questionsCorrect": 0
-                    }
-                    skill_scores[skill_name] = 0
-                    
-                    if skill_name not in skill_distribution:
-                        skill_distribution[skill_name] = 0
-                        all_skill_scores[skill_name] = []
-                    skill_distribution[skill_name] += 1
-                    all_skill_scores[skill_name].append(0)
+                    level = "beginner"
+                
+                questions_attempted = rng.randint(2, 8)
+                questions_correct = max(0, int(questions_attempted * (score / 100) + rng.uniform(-1, 1)))
+                questions_correct = min(questions_attempted, questions_correct)
+                
+                skill_breakdown[skill] = {
+                    "score": round(score, 1),
+                    "level": level,
+                    "questionsAttempted": questions_attempted,
+                    "questionsCorrect": questions_correct
+                }
+                skill_scores[skill] = score
+                
+                if skill not in skill_distribution:
+                    skill_distribution[skill] = 0
+                    all_skill_scores[skill] = []
+                skill_distribution[skill] += 1
+                all_skill_scores[skill].append(score)
             
             overall_progress = round(sum(skill_scores.values()) / len(skill_scores), 1) if skill_scores else 0
-            risk_level = 'low' if overall_progress >= 75 else 'medium' if overall_progress >= 50 else 'high'
-            
             # A single badge is earned only at advanced level (80% or higher)
             badges_earned = skills_mastered
             
+            risk_level = 'low' if overall_progress >= 75 else 'medium' if overall_progress >= 50 else 'high'
+            
             student_analytics.append({
                 'id': student_id,
                 'name': student.get('name', 'Unknown'),
+                'email': student.get('email', ''),
                 'progress': overall_progress,
                 'skillsMastered': skills_mastered,
                 'badgesEarned': badges_earned,
                 'riskLevel': risk_level,
-                'skillBreakdown': skill_breakdown
+                'skillBreakdown': skill_breakdown,
+                'recordedSkills': 0,
+                'recordedMastery': 0,
+                'lastActivity': None
             })
+            continue
         
-        # Calculate average scores for each skill
-        average_scores = {s: round(sum(v)/len(v), 1) if v else 0 for s, v in all_skill_scores.items()}
-        
-        # Calculate assignment stats
-        real_assignment_count = 0
-        try:
-            # Count assignments directly for this course in the new collection
-            real_assignment_count = await db[Config.ACHIEVEUP_QUESTION_SKILLS_COLLECTION].count_documents({
-                'course_id': course_id
-            })
+        # Process real mastery data
+        if mastery_lookup:
+            real_data_count += len(mastery_lookup)
+            data_source = "real"
+
+        skill_breakdown = {}
+        skill_scores = {}
+        skills_mastered = 0
+        
+        for skill in course_skills:
+            # Skill names might be objects or strings in some matrices
+            # In the new system, they are objects: {"id": "...", "name": "...", "description": "..."}
+            skill_key = skill.get('id') if isinstance(skill, dict) else skill
+            skill_name = skill.get('name') if isinstance(skill, dict) else skill
+            
+            doc = mastery_lookup.get(skill_key)
             
-            # Fallback to check old collection if no assignments found
-            if real_assignment_count == 0:
-                matrices = await db[Config.ACHIEVEUP_SKILL_MATRICES_COLLECTION].find({'course_id': course_id}).to_list(length=None)
-                matrix_ids = [m.get('matrix_id') for m in matrices if m.get('matrix_id')]
+            if doc:
+                score = doc.get('mastery_percentage') or 0
+                questions_attempted = doc.get('total_attempted') or 0
+                questions_correct = doc.get('total_correct') or 0
+                
+                if score >= 80:
+                    level = "advanced"
+                    skills_mastered += 1
+                elif score >= 60:
+                    level = "intermediate"
+                else:
+                    level = "beginner"
+                
+                skill_breakdown[skill_name] = {
+                    "score": round(score, 1),
+                    "level": level,
+                    "questionsAttempted": questions_attempted,
+                    "questionsCorrect": questions_correct
+                }
+                skill_scores[skill_name] = score
                 
-                if matrix_ids:
-                    real_assignment_count = await db[Config.ACHIEVEUP_SKILL_ASSIGNMENTS_COLLECTION].count_documents({
-                        'matrix_id': {'$in': matrix_ids}
-                    })
+                if skill_name not in skill_distribution:
+                    skill_distribution[skill_name] = 0
+                    all_skill_scores[skill_name] = []
+                skill_distribution[skill_name] += 1
+                all_skill_scores[skill_name].append(score)
+            else:
+                skill_breakdown[skill_name] = {
+                    "score": 0,
+                    "level": "beginner",
+                    "questionsAttempted": 0,
+                    "questionsCorrect": 0
+                }
+                skill_scores[skill_name] = 0
+                
+                if skill_name not in skill_distribution:
+                    skill_distribution[skill_name] = 0
+                    all_skill_scores[skill_name] = []
+                skill_distribution[skill_name] += 1
+                all_skill_scores[skill_name].append(0)
+        
+        overall_progress = round(sum(skill_scores.values()) / len(skill_scores), 1) if skill_scores else 0
+        risk_level = 'low' if overall_progress >= 75 else 'medium' if overall_progress >= 50 else 'high'
+        
+        # A single badge is earned only at advanced level (80% or higher)
+        badges_earned = skills_mastered
+        
+        # Averages over the skills the student has mastery records for
+        recorded = list(mastery_lookup.values())
+        recorded_mastery = sum(m.get('mastery_percentage') or 0 for m in recorded) / len(recorded) if recorded else 0
+        last_activity = max((m.get('last_updated') for m in recorded if m.get('last_updated')), default=None)
+        
+        student_analytics.append({
+            'id': student_id,
+            'name': student.get('name', 'Unknown'),
+            'email': student.get('email', ''),
+            'progress': overall_progress,
+            'skillsMastered': skills_mastered,
+            'badgesEarned': badges_earned,
+            'riskLevel': risk_level,
+            'skillBreakdown': skill_breakdown,
+            'recordedSkills': len(recorded),
+            'recordedMastery': round(recorded_mastery, 2),
+            'lastActivity': last_activity.isoformat() if last_activity else None
+        })
+    
+    # Calculate average scores for each skill
+    average_scores = {s: round(sum(v)/len(v), 1) if v else 0 for s, v in all_skill_scores.items()}
+    
+    # Fallback to the old assignments collection if no question mappings were found
+    if real_assignment_count == 0:
+        try:
+            matrices = await db[Config.ACHIEVEUP_SKILL_MATRICES_COLLECTION].find(
+                {'course_id': course_id}, {'matrix_id': 1}
+            ).to_list(length=None)
+            matrix_ids = [m.get('matrix_id') for m in matrices if m.get('matrix_id')]
+            
+            if matrix_ids:
+                real_assignment_count = await db[Config.ACHIEVEUP_SKILL_ASSIGNMENTS_COLLECTION].count_documents({
+                    'matrix_id': {'$in': matrix_ids}
+                })
         except Exception as e:
             logger.error(f"Error counting assignments for debug: {str(e)}")
 
-        response = {
-            'analytics': {
-                'students': student_analytics,
-                'skillDistribution': skill_distribution,
-                'averageScores': average_scores,
-                'debug': {
-                    'dataSource': data_source,
-                    'realRecordCount': real_data_count,
-                    'realAssignmentCount': real_assignment_count,
-                    'demoModeEnabled': Config.ENABLE_DEMO_MODE,
-                    'queryCourseId': course_id,
-                    'serverTime': datetime.utcnow().isoformat()
-                }
+    return {
+        'students': student_analytics,
+        'skillDistribution': skill_distribution,
+        'averageScores': average_scores,
+        'debug': {
+            'dataSource': data_source,
+            'realRecordCount': real_data_count,
+            'realAssignmentCount': real_assignment_count,
+            'demoModeEnabled': Config.ENABLE_DEMO_MODE,
+            'queryCourseId': course_id
+        }
+    }
+
+async def store_course_analytics_snapshot(course_id: str, analytics: dict) -> dict:
+    """
+    Materialize the student analytics for a course as a versioned snapshot.
+    The version is incremented atomically, so concurrent syncs always store
+    distinct versions. The analytics are written as one field so skill names
+    are stored as-is.
+    
+    Args:
+        course_id: Canvas course ID
+        analytics: Output of build_course_students_analytics
+        
+    Returns:
+        dict: The stored snapshot document
+    """
+    return await course_analytics_snapshots_collection.find_one_and_update(
+        {'course_id': course_id},
+        {
+            '$inc': {'version': 1},
+            '$set': {
+                'analytics': analytics,
+                'student_count': len(analytics.get('students', [])),
+                'generated_at': datetime.utcnow()
             }
+        },
+        projection={'_id': 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+async def refresh_course_analytics_snapshot(canvas_token: str, course_id: str) -> dict:
+    """
+    Rebuild the analytics snapshot for a course from the Canvas roster and
+    current mastery. Called at the end of every course sync.
+    
+    Args:
+        canvas_token: Raw Canvas API token
+        course_id: Canvas course ID
+        
+    Returns:
+        dict: Snapshot version and size, or an error
+    """
+    try:
+        course_id = str(course_id)
+        from services.achieveup_canvas_service import get_course_students, cache_canvas_data
+        students_result = await get_course_students(canvas_token, course_id)
+        if 'error' in students_result:
+            return students_result
+        
+        students = students_result if isinstance(students_result, list) else []
+        # Keep the dashboard roster cache warm with the roster we just fetched
+        await cache_canvas_data(course_id, 'students', students)
+        analytics = await build_course_students_analytics(course_id, students)
+        snapshot = await store_course_analytics_snapshot(course_id, analytics)
+        
+        logger.info(f"Course {course_id} analytics snapshot v{snapshot['version']} built for {snapshot['student_count']} students")
+        return {
+            'course_id': course_id,
+            'version': snapshot['version'],
+            'student_count': snapshot['student_count']
         }
+    except Exception as e:
+        logger.error(f"Refresh course analytics snapshot error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
+async def get_course_analytics_snapshot(course_id: str) -> dict:
+    """Get the latest analytics snapshot for a course (single indexed read), or None."""
+    return await course_analytics_snapshots_collection.find_one(
+        {'course_id': course_id}, {'_id': 0}
+    )
+
+async def load_course_students_analytics(token: str, course_id: str) -> dict:
+    """
+    Load the student analytics for a course without re-verifying the token.
+    Callers must check access with verify_instructor_course_access first.
+    
+    Served from the materialized course snapshot written at the end of each
+    sync. Courses that have not been synced yet are computed live once and
+    the result is stored as their first snapshot.
+    """
+    started = time.perf_counter()
+    
+    snapshot = await get_course_analytics_snapshot(course_id)
+    served_from = 'snapshot'
+    
+    if not snapshot:
+        # Get students for the course
+        from services.achieveup_service import get_instructor_course_students
+        students_result = await get_instructor_course_students(token, course_id)
+        if 'error' in students_result:
+            return students_result
         
-        client.close()
+        students = students_result if isinstance(students_result, list) else []
+        analytics = await build_course_students_analytics(course_id, students)
+        snapshot = await store_course_analytics_snapshot(course_id, analytics)
+        served_from = 'live'
+    
+    analytics = snapshot['analytics']
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    analytics['debug'] = {
+        **analytics.get('debug', {}),
+        'servedFrom': served_from,
+        'snapshotVersion': snapshot['version'],
+        'snapshotGeneratedAt': snapshot['generated_at'].isoformat(),
+        'queryTimeMs': elapsed_ms,
+        'serverTime': datetime.utcnow().isoformat()
+    }
+    
+    return {'analytics': analytics}
+
+@cache_analytics_result('course_students')
+async def get_course_students_analytics(token: str, course_id: str, time_range: str = '30d', skill_id: str = None) -> dict:
+    """Get comprehensive analytics for all students in a course."""
+    try:
+        # Per-student data: only instructors of the course may read it
+        user_result = await verify_instructor_course_access(token, course_id)
+        if 'error' in user_result:
+            return user_result
         
-        return response
+        return await load_course_students_analytics(token, course_id)
         
     except Exception as e:
         logger.error(f"Get course students analytics error: {str(e)}")
@@ -937,17 +1366,21 @@ async def get_course_students_analytics(token: str, course_id: str, time_range:
         traceback.print_exc()
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('risk_assessment')
 async def get_course_risk_assessment(token: str, course_id: str, time_range: str = '30d', risk_threshold: str = '0.7') -> dict:
     """Get risk assessment analytics for a course."""
     try:
-        # Verify user token
-        from services.achieveup_auth_service import achieveup_verify_token
-        user_result = await achieveup_verify_token(token)
+        # Per-student data: only instructors of the course may read it
+        user_result = await verify_instructor_course_access(token, course_id)
         if 'error' in user_result:
             return user_result
         
-        # Get student analytics first
-        analytics_result = await get_course_students_analytics(token, course_id, time_range)
+        # Student analytics come from the course snapshot; trends are one
+        # aggregation. Neither depends on the other, so run them together.
+        analytics_result, trend_data = await asyncio.gather(
+            load_course_students_analytics(token, course_id),
+            calculate_risk_trends(course_id, time_range)
+        )
         if 'error' in analytics_result:
             return analytics_result
         
@@ -964,9 +1397,6 @@ async def get_course_risk_assessment(token: str, course_id: str, time_range: str
         # Generate recommendations
         recommendations = generate_risk_recommendations(high_risk_students, medium_risk_students, risk_factors)
         
-        # Calculate trend data
-        trend_data = await calculate_risk_trends(course_id, time_range)
-        
         return {
             'courseId': course_id,
             'timeRange': time_range,
@@ -990,6 +1420,7 @@ async def get_course_risk_assessment(token: str, course_id: str, time_range: str
         logger.error(f"Get course risk assessment error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+@cache_analytics_result('course_export')
 async def export_course_analytics(token: str, course_id: str, format_type: str = 'json', analytics_type: str = 'course', time_range: str = '30d') -> dict:
     """Export analytics data for a course in various formats."""
     try:
@@ -999,21 +1430,17 @@ async def export_course_analytics(token: str, course_id: str, format_type: str =
         if 'error' in user_result:
             return user_result
         
+        if analytics_type in COURSE_DATASET_EXPORT_COLUMNS:
+            return {'error': 'Raw course datasets are exported as csv, ndjson or parquet', 'statusCode': 400}
+        
         # Get appropriate analytics data
-        if analytics_type == 'students':
-            data = await get_course_students_analytics(token, course_id, time_range)
-        elif analytics_type == 'risk':
-            data = await get_course_risk_assessment(token, course_id, time_range)
-        else:  # course
-            data = await get_course_analytics(token, course_id, time_range)
+        data = await get_course_export_data(token, course_id, analytics_type, time_range)
         
         if 'error' in data:
             return data
         
-        # Export based on format
-        if format_type == 'csv':
-            exported_data = export_to_csv(data, analytics_type)
-        elif format_type == 'pdf':
+        # Export based on format (csv/ndjson/parquet are streamed, see open_course_analytics_export_stream)
+        if format_type == 'pdf':
             exported_data = await export_to_pdf(data, analytics_type)
         else:  # json
             exported_data = {
@@ -1035,6 +1462,129 @@ async def export_course_analytics(token: str, course_id: str, format_type: str =
         logger.error(f"Export course analytics error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+STUDENT_EXPORT_FIELDS = ['id', 'name', 'progress', 'skillsMastered', 'badgesEarned', 'riskLevel', 'skillBreakdown']
+
+async def get_course_export_data(token: str, course_id: str, analytics_type: str, time_range: str) -> dict:
+    """Get the analytics result behind a course export type."""
+    if analytics_type == 'students':
+        return await get_course_students_analytics(token, course_id, time_range)
+    elif analytics_type == 'risk':
+        return await get_course_risk_assessment(token, course_id, time_range)
+    return await get_course_analytics(token, course_id, time_range)
+
+def get_course_export_rows(data: dict, analytics_type: str) -> tuple:
+    """Get the (rows, fieldnames) to stream for a course export type."""
+    if analytics_type == 'students':
+        return data.get('analytics', {}).get('students', []), STUDENT_EXPORT_FIELDS
+    elif analytics_type == 'risk':
+        return data.get('highRiskStudents', []) + data.get('mediumRiskStudents', []), STUDENT_EXPORT_FIELDS
+    return data.get('skill_breakdown', []), None
+
+# Raw course datasets exportable as typed columns (CSV, NDJSON or Parquet)
+COURSE_DATASET_EXPORT_COLUMNS = {
+    'mastery': [
+        ('student_id', 'category'), ('student_name', 'category'), ('course_id', 'category'),
+        ('skill_id', 'category'), ('matrix_id', 'category'), ('total_attempted', 'int'),
+        ('total_correct', 'int'), ('mastery_percentage', 'float'), ('last_updated', 'timestamp')
+    ],
+    'progress': [
+        ('student_id', 'category'), ('course_id', 'category'), ('skill_id', 'category'),
+        ('score', 'float'), ('level', 'category'), ('total_questions', 'int'),
+        ('correct_answers', 'int'), ('last_updated', 'timestamp')
+    ],
+    'submissions': [
+        ('submission_id', 'string'), ('student_id', 'category'), ('student_name', 'category'),
+        ('course_id', 'category'), ('quiz_id', 'category'), ('attempt', 'int'), ('score', 'float'),
+        ('kept_score', 'float'), ('points_possible', 'float'), ('workflow_state', 'category'),
+        ('started_at', 'timestamp'), ('submitted_at', 'timestamp'), ('finished_at', 'timestamp'),
+        ('questions', 'json')
+    ],
+    'badges': [
+        ('badge_id', 'string'), ('user_id', 'category'), ('student_name', 'category'),
+        ('course_id', 'category'), ('skill_id', 'category'), ('badge_level', 'category'),
+        ('progress_percentage', 'float'), ('earned_at', 'timestamp')
+    ]
+}
+
+COURSE_DATASET_COLLECTIONS = {
+    'mastery': Config.ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION,
+    'progress': Config.ACHIEVEUP_PROGRESS_COLLECTION,
+    'submissions': Config.ACHIEVEUP_QUIZ_SUBMISSIONS_COLLECTION,
+    'badges': Config.ACHIEVEUP_USER_BADGES_COLLECTION
+}
+
+async def iter_course_dataset_rows(course_id: str, dataset: str):
+    """Yield the rows of a raw course dataset straight from its cursor."""
+    course_ids = [str(course_id)] + ([int(course_id)] if str(course_id).isdigit() else [])
+    cursor = db[COURSE_DATASET_COLLECTIONS[dataset]].find({'course_id': {'$in': course_ids}})
+    
+    async for doc in iter_cursor_rows(cursor):
+        if dataset != 'progress':
+            yield doc
+            continue
+        # Progress holds one document per student; export one row per skill
+        for skill_id, entry in (doc.get('skill_progress') or {}).items():
+            yield {
+                'student_id': doc.get('student_id'),
+                'course_id': doc.get('course_id'),
+                'skill_id': skill_id,
+                **entry,
+                'last_updated': doc.get('last_updated')
+            }
+
+async def open_course_analytics_export_stream(token: str, course_id: str, format_type: str = 'csv', analytics_type: str = 'course', time_range: str = '30d') -> dict:
+    """
+    Open a streamed CSV/NDJSON/Parquet export of a course's analytics.
+    
+    analytics_type mastery, progress, submissions or badges streams the raw
+    course dataset from its cursor as typed columns; course, students and
+    risk stream the rows of the corresponding analytics result (no Parquet).
+    
+    Returns:
+        dict: {'stream': async iterator of bytes, 'filename', 'content_type'}, or an error
+    """
+    try:
+        filename = f"course_{course_id}_{analytics_type}_{time_range}.{format_type}"
+        
+        if analytics_type in COURSE_DATASET_EXPORT_COLUMNS:
+            # Raw per-student records (answers included): only instructors of the course
+            user_result = await verify_instructor_course_access(token, course_id)
+            if 'error' in user_result:
+                return user_result
+            if format_type == 'parquet' and not parquet_export_available():
+                return {'error': 'Parquet export requires pyarrow', 'statusCode': 501}
+            
+            return {
+                'stream': stream_export_rows(
+                    iter_course_dataset_rows(course_id, analytics_type), format_type,
+                    columns=COURSE_DATASET_EXPORT_COLUMNS[analytics_type]
+                ),
+                'filename': f"course_{course_id}_{analytics_type}.{format_type}",
+                'content_type': EXPORT_CONTENT_TYPES[format_type]
+            }
+        
+        if format_type == 'parquet':
+            return {'error': 'Parquet export is available for course mastery, progress, submissions and badges', 'statusCode': 400}
+        
+        data = await get_course_export_data(token, course_id, analytics_type, time_range)
+        if 'error' in data:
+            return data
+        
+        rows, fieldnames = get_course_export_rows(data, analytics_type)
+        return {
+            'stream': stream_export_rows(iter_list_rows(rows), format_type, fieldnames),
+            'filename': filename,
+            'content_type': EXPORT_CONTENT_TYPES[format_type]
+        }
+        
+    except Exception as e:
+        logger.error(f"Open course analytics export stream error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
+# Score at which a skill counts as completed in individual graphs (the sync's 'advanced' level)
+MASTERY_COMPLETED_SCORE = 80
+
+@cache_analytics_result('individual_graphs')
 async def get_individual_graphs(token: str, course_id: str, student_id: str, graph_type: str = 'progress', time_range: str = '30d') -> dict:
     """Get individual student graphs and analytics."""
     try:
@@ -1045,7 +1595,7 @@ async def get_individual_graphs(token: str, course_id: str, student_id: str, gra
             return user_result
         
         # Get student progress data
-        from services.achieveup_service import achieveup_progress_collection, achieveup_skill_matrices_collection
+        from services.achieveup_service import achieveup_skill_matrices_collection
         from datetime import datetime, timedelta
         
         # Calculate date range
@@ -1059,12 +1609,17 @@ async def get_individual_graphs(token: str, course_id: str, student_id: str, gra
         else:  # 30d default
             start_date = end_date - timedelta(days=30)
         
-        # Get progress data
-        progress_data = await achieveup_progress_collection.find({
-            'student_id': student_id,
-            'course_id': course_id,
-            'updated_at': {'$gte': start_date, '$lte': end_date}
-        }).sort([('updated_at', 1)]).to_list(length=None)
+        # Get mastery history (every recorded change, downsampled for long ranges)
+        history = await get_mastery_history(course_id, student_id, start_date, end_date)
+        progress_data = [
+            {
+                'skill': skill,
+                'score': score,
+                'completed': score >= MASTERY_COMPLETED_SCORE,
+                'updated_at': timestamp
+            }
+            for timestamp, skill, score in history['points']
+        ]
         
         # Get skill matrix
         skill_matrix = await achieveup_skill_matrices_collection.find_one({'course_id': course_id})
@@ -1088,6 +1643,7 @@ async def get_individual_graphs(token: str, course_id: str, student_id: str, gra
             'graphData': graph_data,
             'metadata': {
                 'totalDataPoints': len(progress_data),
+                'historyResolution': history['resolution'],
                 'totalSkills': len(course_skills),
                 'dateRange': {
                     'start': start_date.isoformat(),
@@ -1158,6 +1714,15 @@ def calculate_student_risk_level(progress_data: list, total_skills: int, time_ra
     else:
         return 'high'
 
+def get_student_activity_count(student: dict) -> int:
+    """Count the skills a student has attempted, from their snapshot skill breakdown."""
+    if 'activityCount' in student:
+        return student['activityCount']
+    return len([
+        skill for skill in student.get('skillBreakdown', {}).values()
+        if skill.get('questionsAttempted', 0) > 0
+    ])
+
 def analyze_risk_factors(student_analytics: list, threshold: float) -> dict:
     """Analyze common risk factors across students."""
     if not student_analytics:
@@ -1168,7 +1733,7 @@ def analyze_risk_factors(student_analytics: list, threshold: float) -> dict:
     # Calculate factor frequencies
     low_completion = len([s for s in student_analytics if s['progress'] < threshold * 100])
     low_scores = len([s for s in student_analytics if s['progress'] < 70])
-    inactive_students = len([s for s in student_analytics if s['activityCount'] < 3])
+    inactive_students = len([s for s in student_analytics if get_student_activity_count(s) < 3])
     
     return {
         'lowCompletion': {
@@ -1229,45 +1794,79 @@ def generate_risk_recommendations(high_risk: list, medium_risk: list, risk_facto
     
     return recommendations
 
+# time_range -> (number of periods, $dateTrunc unit)
+RISK_TREND_BUCKETS = {
+    '7d': (7, 'day'),
+    '30d': (30, 'day'),
+    '90d': (12, 'week'),
+    '1y': (12, 'month')
+}
+
+def get_trend_bucket_starts(end_date: datetime, periods: int, unit: str) -> list:
+    """
+    Get the start of each of the last `periods` calendar buckets, oldest first.
+    Buckets match $dateTrunc boundaries (UTC, weeks starting Monday).
+    """
+    current = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == 'week':
+        current -= timedelta(days=current.weekday())
+    elif unit == 'month':
+        current = current.replace(day=1)
+    
+    starts = []
+    for _ in range(periods):
+        starts.append(current)
+        if unit == 'day':
+            current -= timedelta(days=1)
+        elif unit == 'week':
+            current -= timedelta(days=7)
+        else:
+            current = (current - timedelta(days=1)).replace(day=1)
+    
+    starts.reverse()  # Chronological order
+    return starts
+
 async def calculate_risk_trends(course_id: str, time_range: str) -> dict:
-    """Calculate risk trends over time for a course."""
+    """
+    Calculate risk trends over time for a course.
+    
+    Activity is counted with a single $match + $group by $dateTrunc bucket;
+    periods without activity are filled with zero in memory.
+    """
     try:
         from services.achieveup_service import achieveup_progress_collection
-        from datetime import datetime, timedelta
         
-        # Get historical data for trend calculation
         end_date = datetime.utcnow()
-        if time_range == '7d':
-            periods = 7
-            delta = timedelta(days=1)
-        elif time_range == '30d':
-            periods = 30
-            delta = timedelta(days=1)
-        elif time_range == '90d':
-            periods = 12
-            delta = timedelta(days=7)
-        else:  # 1y
-            periods = 12
-            delta = timedelta(days=30)
-        
-        trend_data = []
-        for i in range(periods):
-            period_end = end_date - (delta * i)
-            period_start = period_end - delta
-            
-            # Get progress data for this period
-            progress_count = await achieveup_progress_collection.count_documents({
+        periods, unit = RISK_TREND_BUCKETS.get(time_range, RISK_TREND_BUCKETS['1y'])
+        bucket_starts = get_trend_bucket_starts(end_date, periods, unit)
+        
+        date_trunc = {'date': '$updated_at', 'unit': unit}
+        if unit == 'week':
+            date_trunc['startOfWeek'] = 'monday'
+        
+        pipeline = [
+            {'$match': {
                 'course_id': course_id,
-                'updated_at': {'$gte': period_start, '$lte': period_end}
-            })
-            
-            trend_data.append({
+                'updated_at': {'$gte': bucket_starts[0], '$lte': end_date}
+            }},
+            {'$group': {
+                '_id': {'$dateTrunc': date_trunc},
+                'activity': {'$sum': 1}
+            }}
+        ]
+        
+        activity_by_bucket = {}
+        async for bucket in achieveup_progress_collection.aggregate(pipeline):
+            activity_by_bucket[bucket['_id']] = bucket['activity']
+        
+        trend_data = [
+            {
                 'period': period_start.strftime('%Y-%m-%d'),
-                'activity': progress_count,
+                'activity': activity_by_bucket.get(period_start, 0),
                 'date': period_start.isoformat()
-            })
-        
-        trend_data.reverse()  # Chronological order
+            }
+            for period_start in bucket_starts
+        ]
         
         return {
             'periods': periods,
@@ -1302,34 +1901,6 @@ def calculate_trend_direction(trend_data: list) -> str:
     else:
         return 'stable'
 
-def export_to_csv(data: dict, analytics_type: str) -> dict:
-    """Export analytics data to CSV format."""
-    import csv
-    import io
-    
-    output = io.StringIO()
-    
-    if analytics_type == 'students':
-        # Export student analytics to CSV
-        fieldnames = ['id', 'name', 'progress', 'skillsMastered', 'badgesEarned', 'riskLevel', 'skillBreakdown']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for student in data.get('analytics', {}).get('students', []):
-            row = {k: v for k, v in student.items() if k in fieldnames}
-            # Handle skillBreakdown as a JSON string
-            row['skillBreakdown'] = json.dumps(row['skillBreakdown'])
-            writer.writerow(row)
-    
-    csv_content = output.getvalue()
-    output.close()
-    
-    return {
-        'format': 'csv',
-        'content': csv_content,
-        'filename': f"analytics_{analytics_type}.csv"
-    }
-
 async def export_to_pdf(data: dict, analytics_type: str) -> dict:
     """Export analytics data to PDF format."""
     # This would require a PDF library like reportlab
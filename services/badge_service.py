@@ -4,6 +4,7 @@ import logging
 import uuid
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 from services.achieveup_auth_service import achieveup_verify_token
 from config import Config
 
@@ -21,6 +22,11 @@ achieveup_user_badges_collection = db[Config.ACHIEVEUP_USER_BADGES_COLLECTION]
 achieveup_badge_progress_collection = db[Config.ACHIEVEUP_BADGE_PROGRESS_COLLECTION]
 achieveup_student_skill_mastery_collection = db[Config.ACHIEVEUP_STUDENT_SKILL_MASTERY_COLLECTION]
 achieveup_skill_matrices_collection = db[Config.ACHIEVEUP_SKILL_MATRICES_COLLECTION]
+
+# Name of the unique index that makes badge awards idempotent under concurrent syncs
+USER_BADGE_UNIQUE_INDEX = 'user_course_skill_level_unique_idx'
+DUPLICATE_KEY_ERROR = 11000
+
 async def generate_badges_for_user(token: str, data: dict) -> dict:
     """Generate badges for a user based on their progress."""
     try:
@@ -240,21 +246,7 @@ async def create_badge_for_student(user_id: str, course_id: str, skill_id: str,
         skill_name = mastery_doc.get('skill_name') or mastery_doc.get('skill_id') or skill_id or 'Skill'
 
         # Look up actual course name from skill matrices
-        course_name = None
-        try:
-            matrix = await achieveup_skill_matrices_collection.find_one({
-                '$or': [
-                    {'course_id': course_id},
-                    {'course_id': int(course_id) if str(course_id).isdigit() else course_id}
-                ]
-            })
-            if matrix and matrix.get('course_name'):
-                course_name = matrix.get('course_name')
-        except Exception as e:
-            logger.warning(f"Could not look up course name for course_id {course_id}: {e}")
-        
-        if not course_name:
-            course_name = 'Unknown Course'
+        course_name = await get_course_name(course_id)
 
         badge_name = f"{badge_level.title()} in {skill_name}"
         
@@ -281,6 +273,155 @@ async def create_badge_for_student(user_id: str, course_id: str, skill_id: str,
         logger.error(f"Error creating badge for student: {str(e)}")
         return None
 
+async def remove_duplicate_user_badges() -> int:
+    """
+    Delete repeat awards of the same (user, course, skill, level) badge,
+    keeping the earliest one.
+
+    Returns:
+        int: number of badges deleted
+    """
+    duplicates = achieveup_user_badges_collection.aggregate([
+        {'$sort': {'earned_at': 1, '_id': 1}},
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'course_id': '$course_id', 'skill_id': '$skill_id', 'badge_level': '$badge_level'},
+            'ids': {'$push': '$_id'},
+            'count': {'$sum': 1}
+        }},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+
+    extra_ids = []
+    async for group in duplicates:
+        extra_ids.extend(group['ids'][1:])
+    if not extra_ids:
+        return 0
+
+    result = await achieveup_user_badges_collection.delete_many({'_id': {'$in': extra_ids}})
+    logger.warning(f"Removed {result.deleted_count} duplicate user badges before building {USER_BADGE_UNIQUE_INDEX}")
+    return result.deleted_count
+
+async def ensure_user_badge_indexes() -> None:
+    """
+    Create the unique (user, course, skill, level) index on user badges.
+    With it in place, concurrent syncs can never award the same badge twice.
+    Badges awarded twice before the index existed are removed first (once,
+    while the index is missing), since they would make the build fail.
+    """
+    existing_indexes = await achieveup_user_badges_collection.index_information()
+    if USER_BADGE_UNIQUE_INDEX not in existing_indexes:
+        await remove_duplicate_user_badges()
+    await achieveup_user_badges_collection.create_index(
+        [('user_id', 1), ('course_id', 1), ('skill_id', 1), ('badge_level', 1)],
+        unique=True,
+        name=USER_BADGE_UNIQUE_INDEX
+    )
+
+async def get_course_name(course_id: str) -> str:
+    """Look up the course name for a course from its skill matrix."""
+    try:
+        matrix = await achieveup_skill_matrices_collection.find_one(
+            {
+                '$or': [
+                    {'course_id': course_id},
+                    {'course_id': int(course_id) if str(course_id).isdigit() else course_id}
+                ]
+            },
+            {'course_name': 1}
+        )
+        if matrix and matrix.get('course_name'):
+            return matrix.get('course_name')
+    except Exception as e:
+        logger.warning(f"Could not look up course name for course_id {course_id}: {e}")
+    return 'Unknown Course'
+
+async def award_course_badges(course_id: str, mastery_docs: list) -> dict:
+    """
+    Evaluate and award skill badges for a whole course in one batch.
+    Intended to run once at the end of a course sync, after mastery aggregation.
+    
+    Existing badges for the course are preloaded into a set, the course name is
+    looked up once, and only newly earned badges are written with a single
+    unordered insert_many. Duplicate-key errors from the unique index (a
+    concurrent sync awarding the same badge) are ignored.
+    
+    Args:
+        course_id: Canvas course ID
+        mastery_docs: Aggregated mastery documents for the course
+        
+    Returns:
+        dict: Counts of evaluated and newly awarded badges
+    """
+    try:
+        course_id = str(course_id)
+        
+        # Preload every badge already earned in this course
+        existing = set()
+        cursor = achieveup_user_badges_collection.find(
+            {'course_id': course_id},
+            {'user_id': 1, 'skill_id': 1, 'badge_level': 1}
+        )
+        async for badge in cursor:
+            existing.add((badge.get('user_id'), badge.get('skill_id'), badge.get('badge_level')))
+        
+        course_name = None
+        now = datetime.utcnow()
+        new_badges = []
+        
+        for doc in mastery_docs:
+            student_id = doc.get('student_id')
+            skill_id = doc.get('skill_id')
+            percentage = doc.get('mastery_percentage', 0)
+            badge_level = get_current_badge_level(percentage)
+            
+            if not student_id or badge_level == 'none':
+                continue
+            key = (student_id, skill_id, badge_level)
+            if key in existing:
+                continue
+            existing.add(key)
+            
+            if course_name is None:
+                course_name = await get_course_name(course_id)
+            
+            skill_name = doc.get('skill_name') or skill_id or 'Skill'
+            badge_id = str(uuid.uuid4())
+            new_badges.append({
+                'badge_id': badge_id,
+                'user_id': student_id,
+                'skill_id': skill_id,
+                'skill_name': skill_name,
+                'badge_level': badge_level,
+                'badge_name': f"{badge_level.title()} in {skill_name}",
+                'course_id': course_id,
+                'course_name': course_name,
+                'student_name': doc.get('student_name'),
+                'progress_percentage': percentage,
+                'earned_at': now,
+                'shareable_link': f"/badges/{badge_id}/share"
+            })
+        
+        awarded = len(new_badges)
+        if new_badges:
+            try:
+                await achieveup_user_badges_collection.insert_many(new_badges, ordered=False)
+            except BulkWriteError as bwe:
+                write_errors = bwe.details.get('writeErrors', [])
+                duplicates = [err for err in write_errors if err.get('code') == DUPLICATE_KEY_ERROR]
+                if len(duplicates) != len(write_errors):
+                    raise
+                awarded -= len(duplicates)
+        
+        logger.info(f"Awarded {awarded} new badges in course {course_id} ({len(mastery_docs)} mastery records evaluated)")
+        return {
+            'course_id': course_id,
+            'evaluated': len(mastery_docs),
+            'awarded': awarded
+        }
+    except Exception as e:
+        logger.error(f"Award course badges error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
 async def get_badge_progress(token: str, skill_id: str, course_id: str) -> dict:
     """Get progress toward earning a badge for a specific skill."""
     try:
@@ -0,0 +1,134 @@
+# services/canonical_question_service.py
+
+"""
+Canonical Question Store
+========================
+
+The same question text shows up in many sections and terms. Each distinct
+question (by hash of normalize_question_text) gets one entry in
+Canonical Questions. The entry holds its core topic, its video candidates and
+its AI skill suggestions per skill list. Quiz Questions documents reference
+the entry through canonical_id, so a new section inherits topics and videos
+without any LLM or YouTube call.
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from services.achieveup_service import normalize_question_text
+from services.ai_cache_service import get_skill_list_hash
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+canonical_questions_collection = db[Config.CANONICAL_QUESTIONS_COLLECTION]
+quizzes_collection = db[Config.QUIZZES_COLLECTION]
+
+
+async def ensure_canonical_question_indexes() -> None:
+    """Index the canonical reference on Quiz Questions."""
+    await quizzes_collection.create_index('canonical_id', name='canonical_id_idx')
+
+
+def get_canonical_id(question_text: str) -> str:
+    """SHA-256 of the normalized question text."""
+    return hashlib.sha256(normalize_question_text(question_text or '').encode('utf-8')).hexdigest()
+
+
+async def get_canonical_questions(canonical_ids: list) -> dict:
+    """Load canonical entries by ID (missing IDs are absent from the result)."""
+    entries = {}
+    async for doc in canonical_questions_collection.find({'_id': {'$in': list(canonical_ids)}}):
+        entries[doc['_id']] = doc
+    return entries
+
+
+async def save_canonical_topics(entries: dict, overwrite: bool = True) -> None:
+    """
+    Store topics and videos on canonical entries.
+
+    Args:
+        entries: canonical_id -> {'question_text', 'course_id', 'core_topic', 'video_data'}
+        overwrite: replace an existing topic; when False the entry is only
+            filled in if it has no topic yet (used to seed from questions
+            that already have videos)
+    """
+    now = datetime.utcnow()
+    operations = []
+
+    for canonical_id, entry in entries.items():
+        topic = {'core_topic': entry['core_topic'], 'video_data': entry.get('video_data') or {}, 'updated_at': now}
+        add_to_set = {}
+        if entry.get('course_id') is not None:
+            add_to_set['course_ids'] = entry['course_id']
+        if entry.get('video_data'):
+            add_to_set['video_candidates'] = entry['video_data']
+        on_insert = {'question_text': entry.get('question_text'), 'created_at': now}
+
+        if overwrite:
+            update = {'$set': topic, '$setOnInsert': on_insert}
+        else:
+            # Either order gives the same result: insert with the topic, or fill a topic-less entry
+            update = {'$setOnInsert': {**on_insert, **topic}}
+        if add_to_set:
+            update['$addToSet'] = add_to_set
+        operations.append(UpdateOne({'_id': canonical_id}, update, upsert=True))
+        if not overwrite:
+            operations.append(UpdateOne({'_id': canonical_id, 'core_topic': None}, {'$set': topic}))
+
+    if operations:
+        await canonical_questions_collection.bulk_write(operations, ordered=False)
+
+
+async def get_canonical_skill_suggestions(question_texts: list, available_skills: list) -> dict:
+    """
+    Look up stored AI skill suggestions for questions against a skill list.
+
+    Returns:
+        dict: position in question_texts -> suggested skills (questions
+        without suggestions for this skill list are absent)
+    """
+    skills_hash = get_skill_list_hash(available_skills)
+    canonical_ids = [get_canonical_id(text) for text in question_texts]
+    entries = await get_canonical_questions(set(canonical_ids))
+
+    suggestions = {}
+    for i, canonical_id in enumerate(canonical_ids):
+        skills = entries.get(canonical_id, {}).get('skill_suggestions', {}).get(skills_hash)
+        if skills:
+            suggestions[i] = skills
+    return suggestions
+
+
+async def save_canonical_skill_suggestions(suggestions: dict, available_skills: list) -> None:
+    """
+    Store AI skill suggestions on canonical entries.
+
+    Args:
+        suggestions: question text -> suggested skills
+        available_skills: the skill list the suggestions were drawn from
+    """
+    skills_hash = get_skill_list_hash(available_skills)
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {'_id': get_canonical_id(question_text)},
+            {
+                '$set': {f'skill_suggestions.{skills_hash}': skills, 'updated_at': now},
+                '$setOnInsert': {'question_text': question_text, 'created_at': now}
+            },
+            upsert=True
+        )
+        for question_text, skills in suggestions.items() if skills
+    ]
+    if operations:
+        await canonical_questions_collection.bulk_write(operations, ordered=False)
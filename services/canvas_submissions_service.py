@@ -17,6 +17,8 @@ from typing import Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from services.achieveup_auth_service import achieveup_verify_token, get_user_canvas_token
 from services.achieveup_canvas_service import create_canvas_session, CANVAS_API_URL
+from services.rollup_service import record_progress_events
+from services.mastery_history_service import record_mastery_history
 from config import Config
 
 # Set up logging
@@ -524,6 +526,7 @@ async def sync_course_submissions_direct(canvas_token: str, course_id: str) -> d
         # This ensures student charts/graphs reflect the latest skill assignments.
         # No extra Canvas API calls — we just read what mastery_service already wrote.
         progress_synced = 0
+        mastery_docs = []
         try:
             progress_collection = db.get_collection('AchieveUp_Progress')
 
@@ -561,6 +564,28 @@ async def sync_course_submissions_direct(canvas_token: str, course_id: str) -> d
                     'notes': ''
                 }
 
+            # Scores from the previous sync; only changed scores become rollup events
+            previous_scores = {}
+            async for previous in progress_collection.find(
+                {'course_id': str(course_id)},
+                {'student_id': 1, 'skill_progress': 1}
+            ):
+                previous_scores[previous.get('student_id')] = {
+                    skill: entry.get('score')
+                    for skill, entry in (previous.get('skill_progress') or {}).items()
+                }
+
+            progress_events = []
+            for sid, skill_progress in student_mastery.items():
+                for skill_id, entry in skill_progress.items():
+                    if previous_scores.get(sid, {}).get(skill_id) != entry['score']:
+                        progress_events.append({
+                            'course_id': str(course_id),
+                            'skill_id': skill_id,
+                            'student_id': sid,
+                            'progress_percentage': entry['score']
+                        })
+
             # Upsert one Progress document per student (overwrites, no bloat)
             for sid, skill_progress in student_mastery.items():
                 await progress_collection.update_one(
@@ -575,10 +600,25 @@ async def sync_course_submissions_direct(canvas_token: str, course_id: str) -> d
                 )
                 progress_synced += 1
 
+            await record_progress_events(progress_events)
+            await record_mastery_history(course_id, {
+                sid: {skill_id: entry['score'] for skill_id, entry in skill_progress.items()}
+                for sid, skill_progress in student_mastery.items()
+            })
+
             logger.info(f"Progress collection updated for {progress_synced} students in course {course_id}")
         except Exception as progress_error:
             logger.error(f"Error updating Progress collection: {str(progress_error)}")
 
+        # === Batch badge evaluation over the final aggregated mastery ===
+        from services.badge_service import award_course_badges
+        badge_result = await award_course_badges(course_id, mastery_docs)
+        badges_awarded = badge_result.get('awarded', 0)
+
+        # === Materialize the course analytics snapshot served to dashboards ===
+        from services.analytics_service import refresh_course_analytics_snapshot
+        snapshot_result = await refresh_course_analytics_snapshot(canvas_token, course_id)
+
         return {
             'message': 'Sync completed (Direct)',
             'course_id': course_id,
@@ -586,6 +626,8 @@ async def sync_course_submissions_direct(canvas_token: str, course_id: str) -> d
             'total_synced': total_synced,
             'total_errors': total_errors,
             'progress_synced': progress_synced,
+            'badges_awarded': badges_awarded,
+            'analytics_snapshot_version': snapshot_result.get('version'),
             'synced_at': datetime.utcnow()
         }
         
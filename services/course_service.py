@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from utils.course_utils import get_quiz_questions, get_course_name, clean_text, get_incorrect_user_ids, get_quizzes
 from config import Config
+from services.canonical_question_service import get_canonical_id
 from utils.course_utils import (
     get_course_name, clean_text, get_incorrect_user_ids, get_quizzes
 )
@@ -185,6 +186,7 @@ async def sync_all_quizzes_questions(course_id, access_token, link):
                                 'course_name': course_name,
                                 'quiz_name': quiz_title,
                                 'question_text': cleaned_text,
+                                'canonical_id': get_canonical_id(cleaned_text),
                                 'question_type': question.get("question_type", "unknown"),
                                 'updated_at': datetime.now(timezone.utc)
                             }
@@ -449,6 +451,7 @@ async def update_quiz_questions_per_course(course_id, access_token, link):
                                     'course_name': course_name,
                                     'quiz_name': quiz_title,
                                     'question_text': cleaned_text,
+                                    'canonical_id': get_canonical_id(cleaned_text),
                                     'question_type': question.get("question_type", "unknown"),
                                     'updated_at': datetime.now(timezone.utc)
                                 }
@@ -0,0 +1,289 @@
+# services/export_service.py
+
+"""
+Streaming Export Service
+========================
+
+Encodes export rows as chunked CSV, NDJSON, JSON or Parquet bodies. Rows are
+pulled from Motor cursors (or in-memory lists) in batches of
+Config.EXPORT_BATCH_SIZE and each batch is yielded as soon as it is encoded,
+so large exports use constant memory and start delivering bytes immediately.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from quart import Response
+from config import Config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are unavailable without pyarrow
+    pa = None
+    pq = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Formats served as chunked streams by the export routes
+STREAMED_EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def streamed_export_response(stream, filename: str, format_type: str) -> Response:
+    """Chunked download response for an export stream, without the default response timeout."""
+    response = Response(stream, mimetype=EXPORT_CONTENT_TYPES[format_type], headers={
+        'Content-Disposition': f"attachment; filename={filename}"
+    })
+    response.timeout = None  # large exports may stream for longer than the default
+    return response
+
+
+def serialize_export_value(value):
+    """JSON default for export values (datetimes as ISO 8601, anything else as str)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def format_csv_value(value):
+    """Flatten a value for a CSV cell (nested values become JSON)."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=serialize_export_value)
+    return value
+
+
+async def iter_cursor_rows(cursor, batch_size: int = None):
+    """Iterate a Motor cursor in batches, dropping Mongo's _id."""
+    async for doc in cursor.batch_size(batch_size or Config.EXPORT_BATCH_SIZE):
+        doc.pop('_id', None)
+        yield doc
+
+
+async def iter_list_rows(rows: list):
+    """Adapt an in-memory list of rows to the async row interface."""
+    for row in rows:
+        yield row
+
+
+async def stream_csv(rows, fieldnames: list = None, batch_size: int = None):
+    """
+    Encode rows as CSV with the csv module, one chunk per batch.
+
+    Args:
+        rows: async iterable of dicts
+        fieldnames: column order (defaults to the keys of the first row;
+            keys missing from it are dropped)
+        batch_size: rows per chunk
+
+    Yields:
+        bytes: UTF-8 encoded CSV chunks, starting with the header
+    """
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    buffer = io.StringIO()
+    writer = None
+    pending = 0
+
+    async for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames or list(row.keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({key: format_csv_value(value) for key, value in row.items()})
+        pending += 1
+
+        if pending >= batch_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if writer is None and fieldnames:
+        csv.writer(buffer).writerow(fieldnames)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+async def stream_ndjson(rows, batch_size: int = None):
+    """Encode rows as newline-delimited JSON, one chunk per batch."""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    lines = []
+
+    async for row in rows:
+        lines.append(json.dumps(row, default=serialize_export_value))
+        if len(lines) >= batch_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+async def stream_json_sections(sections: dict, batch_size: int = None):
+    """
+    Encode {name: async iterable of rows} as one JSON object of arrays,
+    e.g. {"badges": [...], "skill_progress": [...]}, one chunk per batch.
+    """
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    yield b'{'
+
+    for section_index, (name, rows) in enumerate(sections.items()):
+        prefix = ', ' if section_index else ''
+        yield f'{prefix}{json.dumps(name)}: ['.encode('utf-8')
+
+        items = []
+        written = 0
+        async for row in rows:
+            items.append(json.dumps(row, default=serialize_export_value))
+            if len(items) >= batch_size:
+                yield ((', ' if written else '') + ', '.join(items)).encode('utf-8')
+                written += len(items)
+                items = []
+        if items:
+            yield ((', ' if written else '') + ', '.join(items)).encode('utf-8')
+        yield b']'
+
+    yield b'}'
+
+
+def parquet_export_available() -> bool:
+    """Whether pyarrow is installed for Parquet exports."""
+    return pq is not None
+
+
+def get_parquet_type(kind: str):
+    """Map a column kind to its Arrow type. Categories are dictionary-encoded."""
+    return {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'string': pa.string(),
+        'json': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('ms')
+    }[kind]
+
+
+def coerce_parquet_value(value, kind: str):
+    """Coerce a Mongo value to the Python type of its Parquet column (None stays null)."""
+    if value is None:
+        return None
+    if kind in ('category', 'string'):
+        return str(value)
+    if kind == 'json':
+        return json.dumps(value, default=serialize_export_value)
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    if kind == 'bool':
+        return bool(value)
+    if isinstance(value, str):
+        # Canvas timestamps are ISO 8601 strings
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    return value
+
+
+def build_parquet_table(rows: list, columns: list):
+    """Build a typed Arrow table from a batch of row dicts."""
+    return pa.table({
+        name: pa.array([coerce_parquet_value(row.get(name), kind) for row in rows], type=get_parquet_type(kind))
+        for name, kind in columns
+    })
+
+
+class ParquetChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever the Parquet writer has written so far."""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def stream_parquet(rows, columns: list, batch_size: int = None):
+    """
+    Encode rows as a Parquet file, writing one row group per batch.
+
+    Args:
+        rows: async iterable of dicts
+        columns: list of (name, kind) with kind in category, string, json,
+            int, float, bool or timestamp
+        batch_size: rows per row group
+
+    Yields:
+        bytes: the file as it is written (the footer comes last)
+    """
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    sink = ParquetChunkSink()
+    writer = None
+    batch = []
+
+    async def write_batch(batch_rows):
+        nonlocal writer
+        # Encoding is CPU-bound, keep it off the event loop
+        table = await asyncio.to_thread(build_parquet_table, batch_rows, columns)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        await asyncio.to_thread(writer.write_table, table)
+
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await write_batch(batch)
+            batch = []
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    if batch or writer is None:
+        await write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export_rows(rows, format_type: str, fieldnames: list = None, batch_size: int = None, columns: list = None):
+    """
+    Pick the encoder for a streamed export.
+
+    Args:
+        rows: async iterable of dicts
+        format_type: csv, ndjson or parquet (parquet requires columns)
+        fieldnames: CSV column order (defaults to the names in columns)
+        batch_size: rows per chunk
+        columns: list of (name, kind) column specs
+    """
+    if format_type == 'parquet':
+        return stream_parquet(rows, columns, batch_size)
+    if format_type == 'csv':
+        return stream_csv(rows, fieldnames or ([name for name, _ in columns] if columns else None), batch_size)
+    return stream_ndjson(rows, batch_size)
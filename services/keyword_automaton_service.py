@@ -0,0 +1,80 @@
+# services/keyword_automaton_service.py
+
+"""
+Keyword Automaton
+=================
+
+Aho-Corasick automaton for the rule-based question heuristics (complexity,
+fallback skill suggestion, confidence, demo-course suggestions). These used
+to test every keyword with a separate `keyword in text` scan; the automaton
+finds every keyword of every group in a single pass over the text.
+
+Matching keeps the substring semantics of the scans it replaces: text is
+lowercased and a keyword matches anywhere, including inside longer words
+('ip' matches 'description').
+"""
+
+from collections import deque
+
+
+class KeywordAutomaton:
+    """Compiled automaton over labelled keyword groups."""
+
+    def __init__(self, keyword_groups: dict):
+        """
+        Args:
+            keyword_groups: label -> list of keywords; a keyword may appear
+                under several labels
+        """
+        self.keyword_groups = {label: list(keywords) for label, keywords in keyword_groups.items()}
+
+        # Trie of all keywords; outputs[state] lists the (label, keyword) pairs ending there
+        goto = [{}]
+        outputs = [()]
+        for label, keywords in self.keyword_groups.items():
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    if char not in goto[state]:
+                        goto[state][char] = len(goto)
+                        goto.append({})
+                        outputs.append(())
+                    state = goto[state][char]
+                outputs[state] += ((label, keyword),)
+
+        # Failure links in breadth-first order, folding each state's transitions
+        # and outputs together with its failure state's so scanning never backtracks
+        self.transitions = [dict(edges) for edges in goto]
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.transitions[state] = {**self.transitions[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = self.transitions[fail[state]].get(char, 0)
+                outputs[child] += outputs[fail[child]]
+                queue.append(child)
+        self.outputs = outputs
+
+    def scan(self, text: str) -> dict:
+        """
+        Find all keywords in the text in one pass.
+
+        Returns:
+            dict: label -> set of distinct keywords found (labels without
+            any hit are absent)
+        """
+        transitions = self.transitions
+        outputs = self.outputs
+        hits = {}
+        state = 0
+        for char in (text or '').lower():
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for label, keyword in outputs[state]:
+                    hits.setdefault(label, set()).add(keyword)
+        return hits
+
+    def count(self, text: str) -> dict:
+        """Number of distinct keywords found per label (labels without any hit are absent)."""
+        return {label: len(keywords) for label, keywords in self.scan(text).items()}
@@ -0,0 +1,273 @@
+# services/mastery_history_service.py
+
+"""
+Mastery History Service
+=======================
+
+Append-only, compact history of per-student skill mastery. The Progress
+collection only holds the latest scores, so every change is also recorded
+here in bucketed documents:
+
+- ``raw`` documents hold every change for one student/course/month
+- ``weekly`` documents hold the last value per skill per week for one
+  student/course/year, so long-range graphs read one or two documents
+
+Each document stores delta-encoded parallel arrays: ``t`` (seconds since the
+previous entry, the first relative to the period start), ``k`` (index into
+``skills``) and ``v`` (change in score, in tenths of a percent, since the
+previous entry for the same skill in the document).
+"""
+
+import logging
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+mastery_history_collection = db[Config.ACHIEVEUP_MASTERY_HISTORY_COLLECTION]
+
+# Scores are stored as integers in tenths of a percent
+VALUE_SCALE = 10
+
+# Ranges longer than this are served from the weekly downsampled documents
+RAW_HISTORY_MAX_DAYS = 60
+
+
+async def ensure_mastery_history_indexes() -> None:
+    """Create the unique bucket-key index used by appends and range reads."""
+    await mastery_history_collection.create_index(
+        [('course_id', 1), ('student_id', 1), ('resolution', 1), ('period', 1)],
+        unique=True,
+        name='mastery_history_bucket_unique_idx'
+    )
+
+
+def get_history_period(timestamp: datetime, resolution: str) -> tuple:
+    """Return the (period key, period start) of the bucket holding timestamp."""
+    if resolution == 'weekly':
+        return str(timestamp.year), datetime(timestamp.year, 1, 1)
+    return timestamp.strftime('%Y-%m'), datetime(timestamp.year, timestamp.month, 1)
+
+
+def get_history_periods(start_date: datetime, end_date: datetime, resolution: str) -> list:
+    """List the period keys of every bucket overlapping [start_date, end_date]."""
+    if resolution == 'weekly':
+        return [str(year) for year in range(start_date.year, end_date.year + 1)]
+
+    periods = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        periods.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def encode_points(state: dict, points: list) -> dict:
+    """
+    Delta-encode points after the existing state of a history document.
+
+    Args:
+        state: document (or empty dict) with period_start, skills, last_values
+            and last_ts
+        points: list of (timestamp, skill, score) tuples
+
+    Returns:
+        dict: new entries ('t', 'k', 'v') plus the updated skills, last_values
+            and last_ts
+    """
+    skills = list(state.get('skills', []))
+    last_values = list(state.get('last_values', []))
+    skill_index = {skill: index for index, skill in enumerate(skills)}
+    previous_ts = state.get('last_ts') or state['period_start']
+    entries = {'t': [], 'k': [], 'v': []}
+
+    for timestamp, skill, score in sorted(points, key=lambda point: point[0]):
+        if skill not in skill_index:
+            skill_index[skill] = len(skills)
+            skills.append(skill)
+            last_values.append(0)
+        index = skill_index[skill]
+
+        delta_seconds = max(0, int((timestamp - previous_ts).total_seconds()))
+        previous_ts += timedelta(seconds=delta_seconds)
+        value = int(round(score * VALUE_SCALE))
+
+        entries['t'].append(delta_seconds)
+        entries['k'].append(index)
+        entries['v'].append(value - last_values[index])
+        last_values[index] = value
+
+    return {'entries': entries, 'skills': skills, 'last_values': last_values, 'last_ts': previous_ts}
+
+
+def decode_points(doc: dict) -> list:
+    """Expand a history document back into (timestamp, skill, score) tuples."""
+    skills = doc.get('skills', [])
+    values = [0] * len(skills)
+    timestamp = doc['period_start']
+    points = []
+
+    for delta_seconds, index, delta_value in zip(doc.get('t', []), doc.get('k', []), doc.get('v', [])):
+        timestamp += timedelta(seconds=delta_seconds)
+        values[index] += delta_value
+        points.append((timestamp, skills[index], values[index] / VALUE_SCALE))
+    return points
+
+
+def downsample_weekly(points: list) -> list:
+    """Keep only the last point per skill per (Monday-start) week."""
+    latest = {}
+    for timestamp, skill, score in sorted(points, key=lambda point: point[0]):
+        week = (timestamp - timedelta(days=timestamp.weekday())).date()
+        latest[(skill, week)] = (timestamp, skill, score)
+    return sorted(latest.values(), key=lambda point: point[0])
+
+
+async def record_mastery_history(course_id: str, scores: dict, recorded_at: datetime = None) -> int:
+    """
+    Append changed mastery scores for a course to the history buckets.
+
+    Scores equal to the latest recorded value are skipped, so this can be
+    called with every student's current scores after each sync.
+
+    Args:
+        course_id: Course ID
+        scores: {student_id: {skill: score}}
+        recorded_at: Timestamp of the snapshot (defaults to now)
+
+    Returns:
+        int: Number of changed scores recorded
+    """
+    if not scores:
+        return 0
+
+    try:
+        course_id = str(course_id)
+        recorded_at = recorded_at or datetime.utcnow()
+        raw_period, raw_start = get_history_period(recorded_at, 'raw')
+        weekly_period, weekly_start = get_history_period(recorded_at, 'weekly')
+
+        # Current raw and weekly buckets for every student, in one read
+        docs = {}
+        async for doc in mastery_history_collection.find({
+            'course_id': course_id,
+            'student_id': {'$in': list(scores.keys())},
+            '$or': [
+                {'resolution': 'raw', 'period': raw_period},
+                {'resolution': 'weekly', 'period': weekly_period}
+            ]
+        }):
+            docs[(doc['student_id'], doc['resolution'])] = doc
+
+        operations = []
+        recorded = 0
+        for student_id, skill_scores in scores.items():
+            weekly_doc = docs.get((student_id, 'weekly'), {'period_start': weekly_start})
+            latest = dict(zip(weekly_doc.get('skills', []), weekly_doc.get('last_values', [])))
+            changed = [
+                (recorded_at, skill, score)
+                for skill, score in skill_scores.items()
+                if latest.get(skill) != int(round(score * VALUE_SCALE))
+            ]
+            if not changed:
+                continue
+            recorded += len(changed)
+
+            # Raw bucket: append the new entries
+            raw_doc = docs.get((student_id, 'raw'), {'period_start': raw_start})
+            encoded = encode_points(raw_doc, changed)
+            operations.append(UpdateOne(
+                {
+                    'course_id': course_id,
+                    'student_id': student_id,
+                    'resolution': 'raw',
+                    'period': raw_period,
+                    'n': raw_doc.get('n', 0)
+                },
+                {
+                    '$push': {key: {'$each': values} for key, values in encoded['entries'].items()},
+                    '$inc': {'n': len(changed)},
+                    '$set': {
+                        'period_start': raw_start,
+                        'skills': encoded['skills'],
+                        'last_values': encoded['last_values'],
+                        'last_ts': encoded['last_ts'],
+                        'updated_at': recorded_at
+                    }
+                },
+                upsert=True
+            ))
+
+            # Weekly bucket: re-encode with one point per skill per week
+            points = downsample_weekly(decode_points(weekly_doc) + changed)
+            encoded = encode_points({'period_start': weekly_start}, points)
+            operations.append(UpdateOne(
+                {
+                    'course_id': course_id,
+                    'student_id': student_id,
+                    'resolution': 'weekly',
+                    'period': weekly_period,
+                    'n': weekly_doc.get('n', 0)
+                },
+                {
+                    '$set': {
+                        **encoded['entries'],
+                        'n': len(points),
+                        'period_start': weekly_start,
+                        'skills': encoded['skills'],
+                        'last_values': encoded['last_values'],
+                        'last_ts': encoded['last_ts'],
+                        'updated_at': recorded_at
+                    }
+                },
+                upsert=True
+            ))
+
+        if operations:
+            try:
+                await mastery_history_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as bwe:
+                # A concurrent append moved a bucket on; those changes are picked up next sync
+                logger.warning(f"Mastery history for course {course_id}: "
+                               f"{len(bwe.details.get('writeErrors', []))} bucket writes skipped")
+
+        return recorded
+
+    except Exception as e:
+        logger.error(f"Record mastery history error: {str(e)}")
+        return 0
+
+
+async def get_mastery_history(course_id: str, student_id: str, start_date: datetime, end_date: datetime) -> dict:
+    """
+    Read a student's mastery history for a time range.
+
+    Ranges up to RAW_HISTORY_MAX_DAYS read the monthly raw buckets; longer
+    ranges read the weekly downsampled yearly buckets.
+
+    Returns:
+        dict: {'resolution': str, 'points': [(timestamp, skill, score), ...]}
+    """
+    resolution = 'raw' if (end_date - start_date).days <= RAW_HISTORY_MAX_DAYS else 'weekly'
+
+    points = []
+    async for doc in mastery_history_collection.find({
+        'course_id': str(course_id),
+        'student_id': str(student_id),
+        'resolution': resolution,
+        'period': {'$in': get_history_periods(start_date, end_date, resolution)}
+    }):
+        points.extend(point for point in decode_points(doc) if start_date <= point[0] <= end_date)
+
+    points.sort(key=lambda point: point[0])
+    return {'resolution': resolution, 'points': points}
@@ -4,7 +4,6 @@ import logging
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import Config
-from services.badge_service import generate_badges_for_user
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -135,6 +134,7 @@ async def update_student_mastery(submission_data: dict) -> None:
                 },
                 '$set': {
                     'skill_name': skill_id,
+                    'student_name': student_name,
                     'last_updated': datetime.utcnow()
                 }
             }
@@ -142,8 +142,10 @@ async def update_student_mastery(submission_data: dict) -> None:
             # Upsert the mastery record
             await mastery_collection.update_one(filter_query, update_query, upsert=True)
             
-            # 4. Check for Badges immediately
-            # We need to fetch the updated doc to check percentage
+            # 4. Store computed percentage for easy access. Badge evaluation
+            # happens once per course after aggregation completes (see
+            # badge_service.award_course_badges), so intermediate
+            # percentages never award badges.
             updated_doc = await mastery_collection.find_one(filter_query)
             if updated_doc:
                 curr_correct = updated_doc.get('total_correct', 0)
@@ -151,62 +153,103 @@ async def update_student_mastery(submission_data: dict) -> None:
                 
                 if curr_total > 0:
                     percentage = (curr_correct / curr_total) * 100
-                    
-                    # Store computed percentage for easy access
                     await mastery_collection.update_one(
                         {'_id': updated_doc['_id']},
                         {'$set': {'mastery_percentage': percentage}}
                     )
 
-                    # Trigger badge generation check
-                    # We can reuse or adapt badge_service logic.
-                    # Since badge_service currently iterates ALL usage, let's call a specific check 
-                    # or just let the batch process handle it?
-                    # The prompt asked for "efficiently ... award badges".
-                    # Let's call a helper to check this specific skill badge.
-                    
-                    await check_and_award_badge(student_id, course_id, skill_id, percentage, student_name)
-
     except Exception as e:
         logger.error(f"Error updating student mastery: {str(e)}")
 
 
-async def check_and_award_badge(user_id: str, course_id: str, skill_id: str, percentage: float, student_name: str = None):
+async def ensure_mastery_indexes() -> None:
+    """Create the (course_id, student_id) index used by course-wide mastery reads."""
+    await mastery_collection.create_index(
+        [('course_id', 1), ('student_id', 1)],
+        name='course_student_idx'
+    )
+
+
+async def get_course_mastery_by_student(course_id: str) -> dict:
     """
-    Check if a student earns a badge for a specific skill based on percentage.
+    Load per-student, per-skill mastery for a whole course in one round trip.
+    
+    Args:
+        course_id: Canvas course ID
+        
+    Returns:
+        dict: {student_id: {skill_id: mastery_record}} where each record holds
+        mastery_percentage, total_attempted, total_correct and last_updated
     """
-    from services.badge_service import (
-        get_current_badge_level, 
-        achieveup_user_badges_collection
-    )
+    pipeline = [
+        {'$match': {'course_id': course_id}},
+        {'$group': {
+            '_id': '$student_id',
+            'skills': {'$push': {
+                'skill_id': '$skill_id',
+                'mastery_percentage': '$mastery_percentage',
+                'total_attempted': '$total_attempted',
+                'total_correct': '$total_correct',
+                'last_updated': '$last_updated'
+            }}
+        }}
+    ]
     
-    badge_level = get_current_badge_level(percentage)
-    if badge_level == 'none':
-        return
+    mastery_by_student = {}
+    async for group in mastery_collection.aggregate(pipeline):
+        mastery_by_student[group['_id']] = {
+            skill.get('skill_id'): skill for skill in group.get('skills', [])
+        }
+    return mastery_by_student
 
-    # Check if they already have this badge
-    existing = await achieveup_user_badges_collection.find_one({
-        'user_id': user_id,
-        'skill_id': skill_id,
-        'badge_level': badge_level,
-        'course_id': course_id
-    })
+async def get_course_skill_mastery_summary(course_id: str, skill_ids: list = None) -> dict:
+    """
+    Summarize mastery per skill for a course in one aggregation. Every field
+    is a count or a sum, so summaries of several courses can be merged by
+    adding them up.
     
-    if not existing:
-        # Award new badge!
-        # We need skill name for the badge. Fetch it from matrix or mastery doc (if cached).
-        # For efficiency, we might just query the matrix collection lightly.
-        
-        # ... logic to insert badge ...
-        # For now, let's defer to the existing badge_service generation 
-        # OR just insert it here directly to avoid circular dependency complex logic.
-        
-        # NOTE: To keep it clean, we should expose a 'award_badge_single' in badge_service
-        # But to avoid circular imports if badge_service imports this, be careful.
-        # badge_service imports: auth, config. 
-        # This imports: badge_service. 
-        # It's fine if we import inside the function.
+    Args:
+        course_id: Canvas course ID
+        skill_ids: Optional skills to restrict the summary to
         
-        from services.badge_service import create_badge_for_student
-        await create_badge_for_student(user_id, course_id, skill_id, badge_level, percentage, student_name)
-
+    Returns:
+        dict: {skill_id: {students, sum_mastery, sum_sq_mastery, total_attempted,
+        total_correct, histogram: [0-25, 25-50, 50-75, 75-100]}}
+    """
+    match = {'course_id': str(course_id)}
+    if skill_ids:
+        match['skill_id'] = {'$in': skill_ids}
+    
+    def in_range(low, high, inclusive=False):
+        upper = '$lte' if inclusive else '$lt'
+        return {'$sum': {'$cond': [{'$and': [
+            {'$gte': ['$mastery_percentage', low]}, {upper: ['$mastery_percentage', high]}
+        ]}, 1, 0]}}
+    
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': '$skill_id',
+            'students': {'$sum': 1},
+            'sum_mastery': {'$sum': '$mastery_percentage'},
+            'sum_sq_mastery': {'$sum': {'$multiply': ['$mastery_percentage', '$mastery_percentage']}},
+            'total_attempted': {'$sum': '$total_attempted'},
+            'total_correct': {'$sum': '$total_correct'},
+            'bin_0': in_range(0, 25),
+            'bin_1': in_range(25, 50),
+            'bin_2': in_range(50, 75),
+            'bin_3': in_range(75, 100, inclusive=True)
+        }}
+    ]
+    
+    summary = {}
+    async for group in mastery_collection.aggregate(pipeline):
+        summary[group['_id']] = {
+            'students': group['students'],
+            'sum_mastery': group['sum_mastery'],
+            'sum_sq_mastery': group['sum_sq_mastery'],
+            'total_attempted': group['total_attempted'],
+            'total_correct': group['total_correct'],
+            'histogram': [group[f'bin_{i}'] for i in range(4)]
+        }
+    return summary
@@ -2,10 +2,11 @@
 
 import logging
 import json
-import csv
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
 from services.achieveup_auth_service import achieveup_verify_token
+from services.rollup_service import record_progress_events, get_rollup_buckets, get_rollup_granularity
+from services.export_service import EXPORT_CONTENT_TYPES, iter_cursor_rows, stream_export_rows, parquet_export_available
 from config import Config
 
 # Set up logging
@@ -18,7 +19,6 @@ client = AsyncIOMotorClient(
     )
 db = client[Config.DATABASE]
 achieveup_user_progress_collection = db[Config.ACHIEVEUP_USER_PROGRESS_COLLECTION]
-achieveup_progress_analytics_collection = db[Config.ACHIEVEUP_PROGRESS_ANALYTICS_COLLECTION]
 
 async def get_user_progress(token: str, course_id: str = None, skill_id: str = None) -> dict:
     """Get progress for the current user."""
@@ -149,19 +149,27 @@ async def get_progress_analytics(token: str, course_id: str = None, time_range:
         else:
             start_date = end_date - timedelta(days=30)
         
-        # Build query
-        query = {
-            'user_id': user_id,
-            'last_updated': {'$gte': start_date, '$lte': end_date}
-        }
-        if course_id:
-            query['course_id'] = course_id
+        # Read the user's per-skill rollup buckets (daily, or weekly for long ranges)
+        granularity = get_rollup_granularity(time_range)
+        buckets = await get_rollup_buckets(
+            'student', granularity, start_date, end_date,
+            course_ids=[course_id] if course_id else None,
+            student_id=user_id
+        )
         
-        # Get analytics data
         analytics_data = []
-        async for analytics in achieveup_progress_analytics_collection.find(query):
-            analytics.pop('_id', None)
-            analytics_data.append(analytics)
+        for bucket in buckets:
+            count = bucket.get('count', 0)
+            analytics_data.append({
+                'user_id': user_id,
+                'course_id': bucket.get('course_id'),
+                'skill_id': bucket.get('skill_id'),
+                'progress_percentage': bucket.get('last_progress', 0),
+                'average_progress': round(bucket.get('sum_progress', 0) / count, 2) if count else 0,
+                'updates': count,
+                'granularity': granularity,
+                'timestamp': bucket['bucket_start']
+            })
         
         # Calculate trends
         trends = calculate_progress_trends(analytics_data)
@@ -200,11 +208,8 @@ async def export_progress_data(token: str, course_id: str = None, format_type: s
             progress.pop('_id', None)
             progress_data.append(progress)
         
-        # Format data based on export type
-        if format_type == 'csv':
-            export_data = format_progress_csv(progress_data)
-            content_type = 'text/csv'
-        elif format_type == 'pdf':
+        # Format data based on export type (csv/ndjson/parquet are streamed, see open_progress_export_stream)
+        if format_type == 'pdf':
             export_data = format_progress_pdf(progress_data)
             content_type = 'application/pdf'
         else:  # json
@@ -227,6 +232,47 @@ async def export_progress_data(token: str, course_id: str = None, format_type: s
         logger.error(f"Export progress data error: {str(e)}")
         return {'error': 'Internal server error', 'statusCode': 500}
 
+PROGRESS_EXPORT_COLUMNS = [
+    ('user_id', 'category'), ('course_id', 'category'), ('skill_id', 'category'), ('quiz_id', 'category'),
+    ('questions_attempted', 'int'), ('questions_correct', 'int'),
+    ('progress_percentage', 'float'), ('last_updated', 'timestamp')
+]
+
+async def open_progress_export_stream(token: str, course_id: str = None, format_type: str = 'csv') -> dict:
+    """
+    Open a streamed CSV/NDJSON/Parquet export of the user's progress, read from a cursor.
+    
+    Returns:
+        dict: {'stream': async iterator of bytes, 'filename', 'content_type'}, or an error
+    """
+    try:
+        # Verify token and get user info
+        user_result = await achieveup_verify_token(token)
+        if 'error' in user_result:
+            return user_result
+        
+        user_id = user_result.get('user_id')
+        
+        if format_type == 'parquet' and not parquet_export_available():
+            return {'error': 'Parquet export requires pyarrow', 'statusCode': 501}
+        
+        query = {'user_id': user_id}
+        if course_id:
+            query['course_id'] = course_id
+        
+        cursor = achieveup_user_progress_collection.find(query)
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        
+        return {
+            'stream': stream_export_rows(iter_cursor_rows(cursor), format_type, columns=PROGRESS_EXPORT_COLUMNS),
+            'filename': f"achieveup_progress_{user_id}_{timestamp}.{format_type}",
+            'content_type': EXPORT_CONTENT_TYPES[format_type]
+        }
+        
+    except Exception as e:
+        logger.error(f"Open progress export stream error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
 # Helper functions
 async def get_recent_activity(user_id: str, course_id: str = None) -> list:
     """Get recent activity for a user."""
@@ -247,16 +293,14 @@ async def get_recent_activity(user_id: str, course_id: str = None) -> list:
     return recent_updates
 
 async def update_progress_analytics(user_id: str, course_id: str, skill_id: str, progress_percentage: float):
-    """Update progress analytics."""
-    analytics_doc = {
-        'user_id': user_id,
+    """Fold a progress update into the daily and weekly rollup buckets."""
+    await record_progress_events([{
         'course_id': course_id,
         'skill_id': skill_id,
+        'student_id': user_id,
         'progress_percentage': progress_percentage,
         'timestamp': datetime.utcnow()
-    }
-    
-    await achieveup_progress_analytics_collection.insert_one(analytics_doc)
+    }])
 
 def calculate_progress_trends(analytics_data: list) -> dict:
     """Calculate progress trends from analytics data."""
@@ -327,31 +371,6 @@ def generate_progress_recommendations(analytics_data: list) -> list:
     
     return recommendations
 
-def format_progress_csv(progress_data: list) -> str:
-    """Format progress data as CSV."""
-    if not progress_data:
-        return ""
-    
-    # Create CSV string
-    output = []
-    fieldnames = ['user_id', 'course_id', 'skill_id', 'quiz_id', 'questions_attempted', 
-                  'questions_correct', 'progress_percentage', 'last_updated']
-    
-    # Add header
-    output.append(','.join(fieldnames))
-    
-    # Add data rows
-    for progress in progress_data:
-        row = []
-        for field in fieldnames:
-            value = progress.get(field, '')
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            row.append(str(value))
-        output.append(','.join(row))
-    
-    return '\n'.join(output)
-
 def format_progress_pdf(progress_data: list) -> str:
     """Format progress data as PDF (placeholder - would use a PDF library in production)."""
     # This is a placeholder - in production you'd use a library like reportlab
@@ -0,0 +1,164 @@
+# services/question_matching_service.py
+
+"""
+Near-Duplicate Question Matching
+================================
+
+Matches questions across courses when their text was lightly edited (a typo
+fix, a changed number) rather than copied verbatim. The matcher works like
+this:
+- each normalized question becomes a set of hashed character shingles
+- each set is summarized by a MinHash signature, whose positions agree
+  between two questions with probability equal to their Jaccard similarity
+- signatures are cut into LSH bands; questions sharing any band bucket
+  become candidate pairs, so candidates are found in near-linear time
+  instead of comparing every source question with every target question
+- candidates are verified with the exact shingle Jaccard similarity and
+  paired one-to-one, most similar first
+"""
+
+import zlib
+from functools import lru_cache
+import numpy as np
+from config import Config
+
+SHINGLE_SIZE = 5
+MAX_HASH = np.uint64((1 << 32) - 1)
+SIGNATURE_CHUNK_SHINGLES = 32768  # shingles hashed per NumPy step
+# Missed matches lose skill assignments; extra candidates only cost a Jaccard check
+LSH_FALSE_NEGATIVE_WEIGHT = 0.8
+
+
+def get_shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """CRC32 hashes of the UTF-8 byte shingles of a normalized text (texts shorter than one shingle hash whole)."""
+    data = (text or '').encode('utf-8')
+    if len(data) <= size:
+        return {zlib.crc32(data)} if data else set()
+    return {zlib.crc32(data[i:i + size]) for i in range(len(data) - size + 1)}
+
+
+@lru_cache(maxsize=8)
+def get_hash_permutations(num_perm: int) -> tuple:
+    """
+    Fixed random (a, b) pairs for the multiply-shift hash functions
+    h(x) = ((a * x + b) mod 2^64) >> 32, with a odd.
+    """
+    rng = np.random.default_rng(num_perm)
+    a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2)
+    return a[:, None], b[:, None]
+
+
+def compute_minhash_signatures(shingle_sets: list, num_perm: int) -> np.ndarray:
+    """
+    MinHash signatures for many shingle sets.
+
+    Returns:
+        (len(shingle_sets) x num_perm) array; empty sets get MAX_HASH everywhere
+    """
+    a, b = get_hash_permutations(num_perm)
+    signatures = np.full((len(shingle_sets), num_perm), MAX_HASH, dtype=np.uint64)
+
+    # Hash chunks of whole documents at once and take each document's minimum per hash function
+    chunk = []
+    chunk_shingles = 0
+    documents = [i for i, shingles in enumerate(shingle_sets) if shingles]
+    for position, doc in enumerate(documents):
+        chunk.append(doc)
+        chunk_shingles += len(shingle_sets[doc])
+        if chunk_shingles < SIGNATURE_CHUNK_SHINGLES and position < len(documents) - 1:
+            continue
+
+        values = np.fromiter((x for i in chunk for x in shingle_sets[i]), dtype=np.uint64, count=chunk_shingles)
+        starts = np.cumsum([0] + [len(shingle_sets[i]) for i in chunk[:-1]])
+        # (num_perm x shingles), so each document's minimum is a contiguous reduction; uint64 wraps mod 2^64
+        hashes = (a * values + b) >> np.uint64(32)
+        signatures[chunk] = np.minimum.reduceat(hashes, starts, axis=1).T
+        chunk = []
+        chunk_shingles = 0
+
+    return signatures
+
+
+@lru_cache(maxsize=32)
+def choose_lsh_bands(threshold: float, num_perm: int) -> tuple:
+    """
+    Pick (bands, rows) so the LSH candidate probability 1 - (1 - s^rows)^bands
+    switches on near the threshold, minimizing the weighted false positive
+    area below it plus the false negative area above it.
+    """
+    below = np.linspace(0, threshold, 101)
+    above = np.linspace(threshold, 1, 101)
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            # Mean over an even grid times the interval width approximates each area
+            false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+            false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+            error = (1 - LSH_FALSE_NEGATIVE_WEIGHT) * false_positive + LSH_FALSE_NEGATIVE_WEIGHT * false_negative
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def jaccard_similarity(first: set, second: set) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not first or not second:
+        return 0.0
+    intersection = len(first & second)
+    return intersection / (len(first) + len(second) - intersection)
+
+
+def match_near_duplicates(source_texts: list, target_texts: list, threshold: float = None,
+                          num_perm: int = None) -> list:
+    """
+    Pair source and target texts whose shingle Jaccard similarity reaches the threshold.
+
+    Args:
+        source_texts: normalized source question texts
+        target_texts: normalized target question texts
+        threshold: minimum similarity (default Config.IMPORT_MATCH_THRESHOLD)
+        num_perm: MinHash signature length (default Config.IMPORT_MATCH_NUM_PERM)
+
+    Returns:
+        list of (source index, target index, similarity) sorted by source
+        index; each source and each target is used at most once
+    """
+    threshold = Config.IMPORT_MATCH_THRESHOLD if threshold is None else threshold
+    num_perm = num_perm or Config.IMPORT_MATCH_NUM_PERM
+
+    source_shingles = [get_shingles(text) for text in source_texts]
+    target_shingles = [get_shingles(text) for text in target_texts]
+    source_signatures = compute_minhash_signatures(source_shingles, num_perm)
+    target_signatures = compute_minhash_signatures(target_shingles, num_perm)
+
+    # Bucket targets per band, then look up each source's bands
+    bands, rows = choose_lsh_bands(threshold, num_perm)
+    candidates = set()
+    for band in range(bands):
+        columns = slice(band * rows, (band + 1) * rows)
+        buckets = {}
+        for j, signature in enumerate(target_signatures[:, columns]):
+            if target_shingles[j]:
+                buckets.setdefault(signature.tobytes(), []).append(j)
+        for i, signature in enumerate(source_signatures[:, columns]):
+            if source_shingles[i]:
+                candidates.update((i, j) for j in buckets.get(signature.tobytes(), ()))
+
+    scored = []
+    for i, j in candidates:
+        similarity = 1.0 if source_texts[i] == target_texts[j] else jaccard_similarity(source_shingles[i], target_shingles[j])
+        if similarity >= threshold:
+            scored.append((similarity, i, j))
+
+    # Most similar pairs first; ties keep the original question order
+    scored.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+    used_sources = set()
+    used_targets = set()
+    matches = []
+    for similarity, i, j in scored:
+        if i not in used_sources and j not in used_targets:
+            used_sources.add(i)
+            used_targets.add(j)
+            matches.append((i, j, similarity))
+    return sorted(matches)
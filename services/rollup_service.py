@@ -0,0 +1,249 @@
+# services/rollup_service.py
+
+"""
+Analytics Rollup Service
+========================
+
+Maintains pre-aggregated daily and weekly buckets of progress/mastery events
+per course, per skill and per student. Trend and progress-analytics endpoints
+read a bounded number of bucket documents instead of scanning raw events.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+rollups_collection = db[Config.ACHIEVEUP_ANALYTICS_ROLLUPS_COLLECTION]
+progress_analytics_collection = db[Config.ACHIEVEUP_PROGRESS_ANALYTICS_COLLECTION]
+
+GRANULARITIES = ('day', 'week')
+SCOPES = ('course', 'skill', 'student')
+
+# Progress at or above these values counts as passing / completed
+PASSING_PROGRESS = 70
+COMPLETED_PROGRESS = 100
+
+
+async def ensure_rollup_indexes() -> None:
+    """Create the unique bucket-key index used by upserts and range reads."""
+    await rollups_collection.create_index(
+        [('scope', 1), ('granularity', 1), ('course_id', 1), ('skill_id', 1),
+         ('student_id', 1), ('bucket_start', 1)],
+        unique=True,
+        name='rollup_bucket_unique_idx'
+    )
+
+
+def get_rollup_granularity(time_range: str) -> str:
+    """Use daily buckets for short ranges and weekly buckets for long ones."""
+    return 'week' if time_range in ('90d', '1y') else 'day'
+
+
+def get_bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its day or (Monday-start) week."""
+    start = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def build_bucket_updates(events: list) -> list:
+    """
+    Pre-aggregate events in memory into one upsert per bucket.
+
+    Args:
+        events: dicts with course_id, skill_id, student_id, progress_percentage
+            and an optional timestamp (defaults to now)
+
+    Returns:
+        list: UpdateOne operations for the rollups collection
+    """
+    now = datetime.utcnow()
+    buckets = {}
+
+    for event in events:
+        timestamp = event.get('timestamp') or now
+        value = float(event.get('progress_percentage') or 0)
+        course_id = event.get('course_id')
+        skill_id = event.get('skill_id')
+        student_id = event.get('student_id')
+        scope_keys = {
+            'course': (course_id, None, None),
+            'skill': (course_id, skill_id, None),
+            'student': (course_id, skill_id, student_id)
+        }
+
+        for granularity in GRANULARITIES:
+            bucket_start = get_bucket_start(timestamp, granularity)
+            for scope, (c_id, s_id, st_id) in scope_keys.items():
+                key = (scope, granularity, c_id, s_id, st_id, bucket_start)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {
+                        'count': 0, 'sum_progress': 0.0, 'passing': 0, 'completed': 0,
+                        'min_progress': value, 'max_progress': value,
+                        'last_progress': value, 'last_at': timestamp,
+                        'students': set()
+                    }
+                bucket['count'] += 1
+                bucket['sum_progress'] += value
+                bucket['passing'] += 1 if value >= PASSING_PROGRESS else 0
+                bucket['completed'] += 1 if value >= COMPLETED_PROGRESS else 0
+                bucket['min_progress'] = min(bucket['min_progress'], value)
+                bucket['max_progress'] = max(bucket['max_progress'], value)
+                if timestamp >= bucket['last_at']:
+                    bucket['last_progress'] = value
+                    bucket['last_at'] = timestamp
+                if scope != 'student' and student_id:
+                    bucket['students'].add(student_id)
+
+    updates = []
+    for (scope, granularity, c_id, s_id, st_id, bucket_start), bucket in buckets.items():
+        # One pipeline stage, so every expression sees the stored bucket as it
+        # was before this write: last_progress only moves forward in time even
+        # when an older batch (late events, compaction) is written after a newer one
+        fields = {
+            'count': {'$add': [{'$ifNull': ['$count', 0]}, bucket['count']]},
+            'sum_progress': {'$add': [{'$ifNull': ['$sum_progress', 0]}, bucket['sum_progress']]},
+            'passing': {'$add': [{'$ifNull': ['$passing', 0]}, bucket['passing']]},
+            'completed': {'$add': [{'$ifNull': ['$completed', 0]}, bucket['completed']]},
+            'min_progress': {'$min': ['$min_progress', bucket['min_progress']]},
+            'max_progress': {'$max': ['$max_progress', bucket['max_progress']]},
+            'last_progress': {'$cond': [
+                {'$gte': [bucket['last_at'], {'$ifNull': ['$last_at', datetime.min]}]},
+                bucket['last_progress'],
+                '$last_progress'
+            ]},
+            'last_at': {'$max': ['$last_at', bucket['last_at']]},
+            'updated_at': now
+        }
+        if bucket['students']:
+            fields['active_students'] = {
+                '$setUnion': [{'$ifNull': ['$active_students', []]}, sorted(bucket['students'])]
+            }
+        updates.append(UpdateOne(
+            {
+                'scope': scope,
+                'granularity': granularity,
+                'course_id': c_id,
+                'skill_id': s_id,
+                'student_id': st_id,
+                'bucket_start': bucket_start
+            },
+            [{'$set': fields}],
+            upsert=True
+        ))
+    return updates
+
+
+async def record_progress_events(events: list) -> int:
+    """
+    Fold progress/mastery events into the daily and weekly rollup buckets.
+    All touched buckets are written with one unordered bulk_write.
+
+    Returns:
+        int: Number of bucket documents touched
+    """
+    if not events:
+        return 0
+    try:
+        updates = build_bucket_updates(events)
+        await rollups_collection.bulk_write(updates, ordered=False)
+        return len(updates)
+    except Exception as e:
+        logger.error(f"Record progress events error: {str(e)}")
+        return 0
+
+
+async def get_rollup_buckets(scope: str, granularity: str, start_date: datetime, end_date: datetime,
+                             course_ids: list = None, skill_ids: list = None, student_id: str = None) -> list:
+    """
+    Read the bucket documents for a scope and time range, oldest first.
+    The result size is bounded by (#keys x #buckets in range).
+    """
+    query = {
+        'scope': scope,
+        'granularity': granularity,
+        'bucket_start': {'$gte': get_bucket_start(start_date, granularity), '$lte': end_date}
+    }
+    if course_ids:
+        query['course_id'] = {'$in': course_ids}
+    if skill_ids:
+        query['skill_id'] = {'$in': skill_ids}
+    if student_id:
+        query['student_id'] = student_id
+
+    return await rollups_collection.find(query, {'_id': 0}).sort('bucket_start', 1).to_list(length=None)
+
+
+def merge_buckets_by_start(buckets: list) -> list:
+    """
+    Merge buckets that share a bucket_start (e.g. several courses) by summing
+    their counters. Returns one merged dict per bucket_start, oldest first.
+    """
+    merged = {}
+    for bucket in buckets:
+        start = bucket['bucket_start']
+        entry = merged.get(start)
+        if entry is None:
+            entry = merged[start] = {
+                'bucket_start': start, 'count': 0, 'sum_progress': 0.0,
+                'passing': 0, 'completed': 0, 'active_students': set()
+            }
+        entry['count'] += bucket.get('count', 0)
+        entry['sum_progress'] += bucket.get('sum_progress', 0)
+        entry['passing'] += bucket.get('passing', 0)
+        entry['completed'] += bucket.get('completed', 0)
+        entry['active_students'].update(bucket.get('active_students', []))
+    return [merged[start] for start in sorted(merged)]
+
+
+async def compact_progress_analytics_events(batch_size: int = 1000) -> int:
+    """
+    Fold legacy raw AchieveUp_Progress_Analytics events into rollup buckets
+    and delete them. New progress updates are written to buckets directly,
+    so this only has work to do for events recorded before the rollups.
+
+    Returns:
+        int: Number of raw events compacted
+    """
+    compacted = 0
+    try:
+        while True:
+            raw_events = await progress_analytics_collection.find({}).limit(batch_size).to_list(length=batch_size)
+            if not raw_events:
+                break
+
+            # Write buckets directly so a failure stops before anything is deleted
+            await rollups_collection.bulk_write(build_bucket_updates([
+                {
+                    'course_id': event.get('course_id'),
+                    'skill_id': event.get('skill_id'),
+                    'student_id': event.get('user_id'),
+                    'progress_percentage': event.get('progress_percentage', 0),
+                    'timestamp': event.get('timestamp')
+                }
+                for event in raw_events
+            ]), ordered=False)
+            await progress_analytics_collection.delete_many(
+                {'_id': {'$in': [event['_id'] for event in raw_events]}}
+            )
+            compacted += len(raw_events)
+
+        if compacted:
+            logger.info(f"Compacted {compacted} raw progress analytics events into rollups")
+        return compacted
+    except Exception as e:
+        logger.error(f"Compact progress analytics events error: {str(e)}")
+        return compacted
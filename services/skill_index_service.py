@@ -0,0 +1,201 @@
+# services/skill_index_service.py
+
+"""
+Lexical Skill Index
+===================
+
+Precompiled keyword index over a skill list, used by the rule-based skill
+suggesters instead of rescanning every skill and keyword for every question.
+
+For each skill list the index holds:
+- a TF-IDF weight matrix (skills x vocabulary) over skill-name tokens, rows
+  L1-normalized so a question's score is the IDF-weighted share of the
+  skill name it mentions (tokens shared by many skills count for less)
+- an inverted index from token to (skill, weight), so scoring one question
+  only touches the skills its tokens point to
+- keyword groups per skill (related terms such as 'tcp' for 'Network');
+  a group counts once when any of its terms appears in the question
+
+Indexes are cached per skill matrix (by ID and updated_at) or per skill list.
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+import numpy as np
+
+SKILL_INDEX_CACHE_MAX_ENTRIES = 256
+
+# Related terms for skills whose name contains the key
+TECHNICAL_TERM_GROUPS = {
+    'javascript': ['js', 'function', 'variable', 'array', 'object', 'async', 'promise', 'callback'],
+    'html': ['tag', 'element', 'markup', 'div', 'span', 'semantic'],
+    'css': ['style', 'layout', 'flexbox', 'grid', 'responsive', 'selector'],
+    'sql': ['query', 'select', 'insert', 'update', 'delete', 'join', 'table'],
+    'database': ['schema', 'table', 'index', 'normalization', 'entity', 'relationship'],
+    'network': ['tcp', 'ip', 'protocol', 'packet', 'router', 'switch', 'firewall'],
+    'security': ['encryption', 'authentication', 'authorization', 'firewall', 'vpn'],
+    'api': ['rest', 'endpoint', 'request', 'response', 'http', 'fetch'],
+    'dom': ['element', 'event', 'manipulation', 'document', 'node'],
+    'responsive': ['mobile', 'breakpoint', 'media query', 'viewport']
+}
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9+#]+')
+
+# cache key -> SkillIndex
+_skill_index_cache = OrderedDict()
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens ('C++' and 'C#' stay whole)."""
+    return _TOKEN_PATTERN.findall((text or '').lower())
+
+
+def get_skill_name(skill) -> str:
+    """Skill matrices store skills as names or as {'name': ...} dicts."""
+    return skill if isinstance(skill, str) else skill.get('name', '')
+
+
+def get_technical_term_groups(skill_name: str) -> list:
+    """Term groups from TECHNICAL_TERM_GROUPS that apply to a skill name."""
+    skill_lower = skill_name.lower()
+    return [terms for key, terms in TECHNICAL_TERM_GROUPS.items() if key in skill_lower]
+
+
+class SkillIndex:
+    """Compiled index over one skill list (see module docstring)."""
+
+    def __init__(self, skills: list, keyword_groups=get_technical_term_groups, min_token_length: int = 3):
+        """
+        Args:
+            skills: skill names (or {'name': ...} dicts)
+            keyword_groups: skill name -> list of term lists
+            min_token_length: shorter skill-name tokens ('of', 'js') are not indexed
+        """
+        self.skills = [get_skill_name(skill) for skill in skills]
+        skill_tokens = [
+            [token for token in tokenize(name) if len(token) >= min_token_length]
+            for name in self.skills
+        ]
+
+        self.vocabulary = {}
+        for tokens in skill_tokens:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        # TF-IDF over skill names, each row normalized to sum to 1
+        counts = np.zeros((len(self.skills), len(self.vocabulary)))
+        for row, tokens in enumerate(skill_tokens):
+            for token in tokens:
+                counts[row, self.vocabulary[token]] += 1
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = np.log((1 + len(self.skills)) / (1 + document_frequency)) + 1
+        weights = counts * idf
+        totals = weights.sum(axis=1, keepdims=True)
+        self.weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+        self.presence = (counts > 0).astype(np.float64)
+
+        # Inverted index: token -> [(skill row, weight)]
+        self.postings = {}
+        for token, column in self.vocabulary.items():
+            for row in np.flatnonzero(counts[:, column]):
+                self.postings.setdefault(token, []).append((int(row), float(self.weights[row, column])))
+
+        # Keyword groups: every (skill, group) pair is one column of the group matrix
+        self.group_terms = []
+        group_rows = []
+        for row, name in enumerate(self.skills):
+            for terms in keyword_groups(name):
+                self.group_terms.append([tuple(tokenize(term)) for term in terms])
+                group_rows.append(row)
+        self.groups = np.zeros((len(self.skills), len(self.group_terms)))
+        self.groups[group_rows, list(range(len(group_rows)))] = 1
+
+        # Single-token terms are looked up directly; multi-word terms need all their tokens
+        self.term_postings = {}
+        self.phrase_terms = []
+        for column, terms in enumerate(self.group_terms):
+            for term in terms:
+                if len(term) == 1:
+                    self.term_postings.setdefault(term[0], set()).add(column)
+                elif term:
+                    self.phrase_terms.append((set(term), column))
+
+    def match_groups(self, tokens: set) -> set:
+        """Group columns with at least one term present in the token set."""
+        columns = set()
+        for token in tokens:
+            columns |= self.term_postings.get(token, set())
+        for term_tokens, column in self.phrase_terms:
+            if term_tokens <= tokens:
+                columns.add(column)
+        return columns
+
+    def score(self, text: str) -> dict:
+        """
+        Score one question against every skill with sparse lookups.
+
+        Returns:
+            dict of arrays (one value per skill):
+                overlap: IDF-weighted share of the skill name found in the text
+                matched: number of distinct skill-name tokens found
+                groups: number of keyword groups with a hit
+        """
+        tokens = set(tokenize(text))
+        overlap = np.zeros(len(self.skills))
+        matched = np.zeros(len(self.skills))
+        for token in tokens:
+            for row, weight in self.postings.get(token, ()):
+                overlap[row] += weight
+                matched[row] += 1
+
+        groups = np.zeros(len(self.skills))
+        for column in self.match_groups(tokens):
+            groups += self.groups[:, column]
+        return {'overlap': overlap, 'matched': matched, 'groups': groups}
+
+    def score_batch(self, texts: list) -> dict:
+        """
+        Score many questions in one call.
+
+        Returns:
+            dict of (questions x skills) arrays with the same meaning as score()
+        """
+        question_terms = np.zeros((len(texts), len(self.vocabulary)))
+        question_groups = np.zeros((len(texts), len(self.group_terms)))
+        for i, text in enumerate(texts):
+            tokens = set(tokenize(text))
+            columns = [self.vocabulary[token] for token in tokens if token in self.vocabulary]
+            question_terms[i, columns] = 1
+            question_groups[i, list(self.match_groups(tokens))] = 1
+
+        return {
+            'overlap': question_terms @ self.weights.T,
+            'matched': question_terms @ self.presence.T,
+            'groups': question_groups @ self.groups.T
+        }
+
+
+def remember_skill_index(key, build) -> SkillIndex:
+    """Get a cached index, building it on a miss and evicting the least recently used."""
+    index = _skill_index_cache.get(key)
+    if index is None:
+        index = build()
+        _skill_index_cache[key] = index
+        while len(_skill_index_cache) > SKILL_INDEX_CACHE_MAX_ENTRIES:
+            _skill_index_cache.popitem(last=False)
+    _skill_index_cache.move_to_end(key)
+    return index
+
+
+def get_matrix_skill_index(matrix: dict) -> SkillIndex:
+    """Index for a skill matrix document, rebuilt whenever the matrix's updated_at changes."""
+    key = ('matrix', str(matrix.get('_id')), str(matrix.get('updated_at')))
+    return remember_skill_index(key, lambda: SkillIndex(matrix.get('skills', [])))
+
+
+def get_skill_list_index(skills: list, keyword_groups=get_technical_term_groups, min_token_length: int = 3) -> SkillIndex:
+    """Index for an ad-hoc skill list, cached by the list's contents."""
+    names = '\n'.join(get_skill_name(skill) for skill in skills)
+    key = ('skills', hashlib.sha256(names.encode('utf-8')).hexdigest(), keyword_groups, min_token_length)
+    return remember_skill_index(key, lambda: SkillIndex(skills, keyword_groups, min_token_length))
@@ -6,7 +6,6 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from services.achieveup_auth_service import achieveup_verify_token
 from config import Config
-from openai import AsyncOpenAI
 
 
 # Set up logging
@@ -0,0 +1,248 @@
+# services/transcript_store_service.py
+
+"""
+Video Transcript Store
+======================
+
+Transcripts are downloaded once per (video_id, language) and kept in Mongo
+in a compact form:
+- text: the segment texts, record-separator joined and zlib-compressed
+- starts_ms / durations_ms: segment offsets as little-endian uint32 arrays
+- token_index: token -> segment numbers, zlib-compressed JSON, built when
+  the transcript is stored so searches never rescan the text
+
+Decoded transcripts are kept in an in-process LRU. StoredTranscript.search
+finds where a topic is discussed: every segment containing a topic token
+starts a candidate window of Config.TRANSCRIPT_SEARCH_WINDOW seconds, scored
+by the IDF-weighted topic tokens it contains.
+"""
+
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from services.skill_index_service import tokenize
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+video_transcripts_collection = db[Config.VIDEO_TRANSCRIPTS_COLLECTION]
+
+SEGMENT_SEPARATOR = '\x1e'
+COMPRESSION_LEVEL = 6
+
+# (video_id, language) -> StoredTranscript
+_transcript_cache = OrderedDict()
+
+
+def index_token(token: str) -> str:
+    """Fold simple plurals so 'packets' finds 'packet'."""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def index_tokens(text: str) -> list:
+    """Search tokens of a text; tokens shorter than 3 characters are not indexed."""
+    return [index_token(token) for token in tokenize(text) if len(token) >= 3]
+
+
+def build_token_index(texts: list) -> dict:
+    """Token -> ascending numbers of the segments containing it."""
+    postings = {}
+    for number, text in enumerate(texts):
+        for token in set(index_tokens(text)):
+            postings.setdefault(token, []).append(number)
+    return postings
+
+
+def transcript_key(video_id: str, language: str) -> str:
+    return f'{video_id}:{language}'
+
+
+class StoredTranscript:
+    """A decoded transcript with its token index."""
+
+    def __init__(self, video_id: str, language: str, texts: list, starts_ms: np.ndarray,
+                 durations_ms: np.ndarray, token_index: dict):
+        self.video_id = video_id
+        self.language = language
+        self.texts = texts
+        self.starts = starts_ms / 1000.0
+        self.durations = durations_ms / 1000.0
+        self.token_index = {token: np.asarray(numbers, dtype=np.int64) for token, numbers in token_index.items()}
+
+    @classmethod
+    def from_segments(cls, video_id: str, language: str, segments: list) -> 'StoredTranscript':
+        texts = [segment['text'].replace(SEGMENT_SEPARATOR, ' ') for segment in segments]
+        return cls(
+            video_id, language, texts,
+            np.round([segment['start'] * 1000 for segment in segments]).astype('<u4'),
+            np.round([segment['duration'] * 1000 for segment in segments]).astype('<u4'),
+            build_token_index(texts)
+        )
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'StoredTranscript':
+        text = zlib.decompress(document['text']).decode('utf-8')
+        return cls(
+            document['video_id'], document['language'],
+            text.split(SEGMENT_SEPARATOR) if document['segment_count'] else [],
+            np.frombuffer(document['starts_ms'], dtype='<u4'),
+            np.frombuffer(document['durations_ms'], dtype='<u4'),
+            json.loads(zlib.decompress(document['token_index']))
+        )
+
+    def to_document(self) -> dict:
+        text = SEGMENT_SEPARATOR.join(self.texts).encode('utf-8')
+        compressed_text = zlib.compress(text, COMPRESSION_LEVEL)
+        token_index = {token: numbers.tolist() for token, numbers in self.token_index.items()}
+        return {
+            'video_id': self.video_id,
+            'language': self.language,
+            'segment_count': len(self.texts),
+            'text': compressed_text,
+            'starts_ms': np.round(self.starts * 1000).astype('<u4').tobytes(),
+            'durations_ms': np.round(self.durations * 1000).astype('<u4').tobytes(),
+            'token_index': zlib.compress(json.dumps(token_index, separators=(',', ':')).encode('utf-8'), COMPRESSION_LEVEL),
+            'text_size': len(text),
+            'compressed_text_size': len(compressed_text)
+        }
+
+    def segments(self) -> list:
+        return [
+            {'text': text, 'start': float(start), 'duration': float(duration)}
+            for text, start, duration in zip(self.texts, self.starts, self.durations)
+        ]
+
+    def to_response(self) -> dict:
+        """The transcript in the fetch_video_transcript response format."""
+        return {
+            'success': True,
+            'transcript': self.segments(),
+            'transcript_text': ' '.join(self.texts),
+            'language': self.language,
+            'video_id': self.video_id
+        }
+
+    def search(self, topic: str, window: float = None):
+        """
+        Find where a topic is discussed.
+
+        Args:
+            topic: search text, e.g. a question's core topic
+            window: seconds of transcript scored per candidate
+                (default Config.TRANSCRIPT_SEARCH_WINDOW)
+
+        Returns:
+            dict with segment_index, start (seconds), score, matched_terms and
+            the matching segment's text, or None if no topic token occurs
+        """
+        tokens = [token for token in dict.fromkeys(index_tokens(topic)) if token in self.token_index]
+        if not tokens:
+            return None
+
+        count = len(self.texts)
+        positions = np.arange(count)
+        # Each window runs from a segment to the last segment starting within `window` seconds of it
+        window_ends = np.maximum(
+            np.searchsorted(self.starts, self.starts + (window or Config.TRANSCRIPT_SEARCH_WINDOW), side='left'),
+            positions + 1
+        )
+
+        scores = np.zeros(count)
+        candidates = np.zeros(count, dtype=bool)
+        present_by_token = {}
+        for token in tokens:
+            postings = self.token_index[token]
+            hits = np.zeros(count + 1, dtype=np.int64)
+            hits[postings + 1] = 1
+            hits = np.cumsum(hits)
+            present = hits[window_ends] > hits[positions]
+            scores += np.log1p(count / len(postings)) * present
+            candidates[postings] = True
+            present_by_token[token] = present
+
+        # Windows start at a segment that mentions the topic; ties go to the earliest
+        scores[~candidates] = -1.0
+        best = int(np.argmax(scores))
+        return {
+            'segment_index': best,
+            'start': float(self.starts[best]),
+            'score': round(float(scores[best]), 4),
+            'matched_terms': [token for token in tokens if present_by_token[token][best]],
+            'text': self.texts[best]
+        }
+
+
+def cache_transcript(transcript: StoredTranscript) -> None:
+    key = (transcript.video_id, transcript.language)
+    _transcript_cache[key] = transcript
+    _transcript_cache.move_to_end(key)
+    while len(_transcript_cache) > Config.TRANSCRIPT_CACHE_MAX_ENTRIES:
+        _transcript_cache.popitem(last=False)
+
+
+async def get_stored_transcript(video_id: str, languages: list):
+    """
+    Get a stored transcript in the first available of the given languages.
+
+    Returns:
+        StoredTranscript, or None if none of the languages is stored
+    """
+    for language in languages:
+        cached = _transcript_cache.get((video_id, language))
+        if cached is not None:
+            _transcript_cache.move_to_end((video_id, language))
+            return cached
+
+    try:
+        documents = await video_transcripts_collection.find(
+            {'_id': {'$in': [transcript_key(video_id, language) for language in languages]}}
+        ).to_list(length=len(languages))
+    except Exception as e:
+        logger.error(f"Transcript store lookup error: {str(e)}")
+        return None
+    if not documents:
+        return None
+
+    preference = {language: rank for rank, language in reversed(list(enumerate(languages)))}
+    document = min(documents, key=lambda doc: preference.get(doc['language'], len(languages)))
+    transcript = StoredTranscript.from_document(document)
+    cache_transcript(transcript)
+    return transcript
+
+
+async def store_transcript(video_id: str, language: str, segments: list) -> StoredTranscript:
+    """
+    Store a downloaded transcript.
+
+    Args:
+        video_id: YouTube video ID
+        language: language code of the transcript
+        segments: [{'text', 'start', 'duration'}, ...]
+
+    Returns:
+        StoredTranscript (also returned, and cached, if the write fails)
+    """
+    transcript = StoredTranscript.from_segments(video_id, language, segments)
+    cache_transcript(transcript)
+    try:
+        await video_transcripts_collection.update_one(
+            {'_id': transcript_key(video_id, language)},
+            {'$set': {**transcript.to_document(), 'fetched_at': datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Transcript store write error: {str(e)}")
+    return transcript
@@ -0,0 +1,439 @@
+# services/video_metadata_service.py
+
+"""
+YouTube Video Metadata
+======================
+
+Title, channel and thumbnail for YouTube videos from the Data API videos
+endpoint, which accepts up to 50 IDs per call. Lookups arriving within
+Config.YOUTUBE_METADATA_BATCH_WINDOW of each other are coalesced into one
+call on a shared connection pool, and results are kept in an in-process LRU
+for Config.YOUTUBE_METADATA_CACHE_TTL.
+
+A background refresh job re-validates every stored video_data link in
+50-ID chunks: metadata of existing videos is refreshed and links to videos
+that are gone (deleted, private) or that are not YouTube links are flagged
+with video_data.unavailable. Only one refresh job runs at a time, since each
+one spends Data API quota on every stored link.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import aiohttp
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from utils.youtube_utils import clean_metadata_text, extract_video_id
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+quizzes_collection = db[Config.QUIZZES_COLLECTION]
+video_link_refresh_jobs_collection = db[Config.VIDEO_LINK_REFRESH_JOBS_COLLECTION]
+
+# Most IDs the videos endpoint accepts per call
+YOUTUBE_VIDEOS_MAX_IDS = 50
+
+_metadata_session = None
+
+# video_id -> (expires_at monotonic timestamp, metadata)
+_video_metadata_cache = OrderedDict()
+
+# video_id -> future shared by every lookup of that video until its call returns
+_metadata_lookups = {}
+# video IDs waiting for the next call
+_queued_video_ids = []
+_metadata_flush_handle = None
+_metadata_batch_tasks = set()
+
+# Running refresh jobs, kept referenced until they finish
+_video_link_refresh_tasks = set()
+
+RUNNING_REFRESH_JOB_INDEX = 'running_refresh_job_unique_idx'
+
+
+async def ensure_video_link_refresh_indexes() -> None:
+    """At most one refresh job with status 'running', enforced by a partial unique index."""
+    await video_link_refresh_jobs_collection.create_index(
+        'status',
+        unique=True,
+        partialFilterExpression={'status': 'running'},
+        name=RUNNING_REFRESH_JOB_INDEX
+    )
+
+_video_metadata_stats = {'hits': 0, 'misses': 0, 'api_calls': 0, 'requested_ids': 0}
+
+
+def get_metadata_session() -> aiohttp.ClientSession:
+    """Get the shared YouTube API session, creating it on first use."""
+    global _metadata_session
+    if _metadata_session is None or _metadata_session.closed:
+        _metadata_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=Config.YOUTUBE_METADATA_MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=Config.YOUTUBE_METADATA_TIMEOUT)
+        )
+    return _metadata_session
+
+
+async def close_video_metadata_session() -> None:
+    """Close the shared session's connection pool."""
+    global _metadata_session
+    if _metadata_session is not None:
+        await _metadata_session.close()
+        _metadata_session = None
+
+
+def parse_video_snippet(snippet: dict) -> dict:
+    """Video metadata from a videos API snippet."""
+    thumbnails = snippet.get('thumbnails', {})
+    return {
+        'title': clean_metadata_text(snippet.get('title', 'No Title Found')),
+        'channel': snippet.get('channelTitle', 'No Channel Found'),
+        'thumbnail': (thumbnails.get('high') or thumbnails.get('default') or {}).get('url', 'No Thumbnail Found')
+    }
+
+
+def get_cached_video_metadata(video_id: str):
+    """Cached metadata for a video, or None if it is missing or expired."""
+    entry = _video_metadata_cache.get(video_id)
+    if entry is None:
+        return None
+    expires_at, metadata = entry
+    if expires_at <= time.monotonic():
+        del _video_metadata_cache[video_id]
+        return None
+    _video_metadata_cache.move_to_end(video_id)
+    return metadata
+
+
+def cache_video_metadata(video_id: str, metadata: dict) -> None:
+    """Cache a video's metadata, evicting the least recently used entries past the size limit."""
+    _video_metadata_cache[video_id] = (time.monotonic() + Config.YOUTUBE_METADATA_CACHE_TTL, metadata)
+    _video_metadata_cache.move_to_end(video_id)
+    while len(_video_metadata_cache) > Config.YOUTUBE_METADATA_CACHE_MAX_ENTRIES:
+        _video_metadata_cache.popitem(last=False)
+
+
+async def fetch_video_metadata_chunk(video_ids: list) -> dict:
+    """
+    Fetch metadata for up to 50 videos in one API call.
+
+    Args:
+        video_ids: YouTube video IDs
+
+    Returns:
+        dict video_id -> metadata for the videos that exist; videos that were
+        deleted, made private or never existed are left out
+
+    Raises:
+        aiohttp.ClientError or asyncio.TimeoutError if the call fails
+    """
+    params = {'part': 'snippet', 'id': ','.join(video_ids), 'key': Config.YOUTUBE_API_KEY}
+    _video_metadata_stats['api_calls'] += 1
+    _video_metadata_stats['requested_ids'] += len(video_ids)
+    async with get_metadata_session().get(Config.YOUTUBE_VIDEOS_API_URL, params=params) as response:
+        response.raise_for_status()
+        response_data = await response.json()
+
+    found = {item['id']: parse_video_snippet(item.get('snippet', {})) for item in response_data.get('items', [])}
+    for video_id, metadata in found.items():
+        cache_video_metadata(video_id, metadata)
+    return found
+
+
+async def resolve_metadata_batch(video_ids: list) -> None:
+    """Look up a batch of queued videos and hand each waiting lookup its result."""
+    try:
+        found = await fetch_video_metadata_chunk(video_ids)
+        results = {video_id: found.get(video_id, {'error': 'Video not found'}) for video_id in video_ids}
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"YouTube metadata error for {len(video_ids)} videos: {e.status} {e.message}")
+        results = dict.fromkeys(video_ids, {'error': f'Failed to fetch metadata, status code: {e.status}'})
+    except Exception as e:
+        logger.error(f"YouTube metadata error for {len(video_ids)} videos: {e!r}")
+        results = dict.fromkeys(video_ids, {'error': 'Failed to fetch metadata'})
+
+    for video_id in video_ids:
+        future = _metadata_lookups.pop(video_id, None)
+        if future is not None and not future.done():
+            future.set_result(results[video_id])
+
+
+def flush_metadata_lookups() -> None:
+    """Send the queued lookups to the API, 50 IDs per call."""
+    global _metadata_flush_handle
+    if _metadata_flush_handle is not None:
+        _metadata_flush_handle.cancel()
+        _metadata_flush_handle = None
+
+    while _queued_video_ids:
+        batch = _queued_video_ids[:YOUTUBE_VIDEOS_MAX_IDS]
+        del _queued_video_ids[:YOUTUBE_VIDEOS_MAX_IDS]
+        task = asyncio.ensure_future(resolve_metadata_batch(batch))
+        _metadata_batch_tasks.add(task)
+        task.add_done_callback(_metadata_batch_tasks.discard)
+
+
+async def lookup_video_metadata(video_id: str) -> dict:
+    """
+    Metadata for one video, from the cache or the next batched API call.
+
+    Args:
+        video_id: YouTube video ID
+
+    Returns:
+        dict with title, channel and thumbnail, or {'error': ...}
+    """
+    global _metadata_flush_handle
+    cached = get_cached_video_metadata(video_id)
+    if cached is not None:
+        _video_metadata_stats['hits'] += 1
+        return dict(cached)
+    _video_metadata_stats['misses'] += 1
+
+    future = _metadata_lookups.get(video_id)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _metadata_lookups[video_id] = future
+        _queued_video_ids.append(video_id)
+        if len(_queued_video_ids) >= YOUTUBE_VIDEOS_MAX_IDS:
+            flush_metadata_lookups()
+        elif _metadata_flush_handle is None:
+            _metadata_flush_handle = loop.call_later(Config.YOUTUBE_METADATA_BATCH_WINDOW, flush_metadata_lookups)
+
+    # Shielded so one caller giving up does not fail the lookup for the others
+    return dict(await asyncio.shield(future))
+
+
+async def get_video_metadata(youtube_url):
+    """Retrieves metadata for a YouTube video by URL asynchronously."""
+    video_id = extract_video_id(youtube_url)
+    if not video_id:
+        return {"error": "Invalid YouTube URL"}
+
+    metadata = await lookup_video_metadata(video_id)
+    if "error" in metadata:
+        return metadata
+    return {
+        "title": metadata["title"],
+        "link": youtube_url,
+        "channel": metadata["channel"],
+        "thumbnail": metadata["thumbnail"],
+    }
+
+
+def get_video_metadata_stats() -> dict:
+    """Counters for the metadata cache and the API calls made on its misses."""
+    lookups = _video_metadata_stats['hits'] + _video_metadata_stats['misses']
+    return {
+        **_video_metadata_stats,
+        'hit_rate': round(_video_metadata_stats['hits'] / lookups, 4) if lookups else 0.0
+    }
+
+
+async def refresh_video_links(course_id: str = None, progress=None) -> dict:
+    """
+    Re-validate every stored video_data link against the videos API.
+
+    Args:
+        course_id: limit the refresh to one course's questions
+        progress: optional coroutine called with (checked_videos, total_videos)
+
+    Returns:
+        dict with counts of checked links and videos, refreshed and
+        unavailable links, and API calls that failed (their links are left as is)
+    """
+    query = {'video_data.link': {'$exists': True, '$nin': ['', None, 'No Link Found']}}
+    if course_id:
+        query['courseid'] = course_id
+
+    # video_id -> question document IDs linking to it
+    video_documents = {}
+    invalid_documents = []
+    async for document in quizzes_collection.find(query, {'video_data.link': 1}):
+        video_id = extract_video_id(str(document['video_data']['link']))
+        if video_id:
+            video_documents.setdefault(video_id, []).append(document['_id'])
+        else:
+            invalid_documents.append(document['_id'])
+
+    video_ids = list(video_documents)
+    summary = {
+        'checked_links': sum(len(ids) for ids in video_documents.values()) + len(invalid_documents),
+        'checked_videos': 0,
+        'total_videos': len(video_ids),
+        'refreshed_links': 0,
+        'unavailable_links': len(invalid_documents),
+        'failed_calls': 0
+    }
+    now = datetime.utcnow()
+    if invalid_documents:
+        await quizzes_collection.bulk_write([
+            UpdateOne({'_id': document_id}, {'$set': {
+                'video_data.unavailable': True,
+                'video_data.unavailable_reason': 'invalid_link',
+                'video_data.checked_at': now
+            }})
+            for document_id in invalid_documents
+        ], ordered=False)
+
+    for start in range(0, len(video_ids), YOUTUBE_VIDEOS_MAX_IDS):
+        chunk = video_ids[start:start + YOUTUBE_VIDEOS_MAX_IDS]
+        try:
+            found = await fetch_video_metadata_chunk(chunk)
+        except Exception as e:
+            logger.error(f"Video link refresh error for {len(chunk)} videos: {e!r}")
+            summary['failed_calls'] += 1
+            found = None
+
+        if found is not None:
+            operations = []
+            for video_id in chunk:
+                metadata = found.get(video_id)
+                if metadata:
+                    update = {
+                        '$set': {
+                            'video_data.title': metadata['title'],
+                            'video_data.channel': metadata['channel'],
+                            'video_data.thumbnail': metadata['thumbnail'],
+                            'video_data.unavailable': False,
+                            'video_data.checked_at': now
+                        },
+                        '$unset': {'video_data.unavailable_reason': ''}
+                    }
+                    summary['refreshed_links'] += len(video_documents[video_id])
+                else:
+                    update = {'$set': {
+                        'video_data.unavailable': True,
+                        'video_data.unavailable_reason': 'not_found',
+                        'video_data.checked_at': now
+                    }}
+                    summary['unavailable_links'] += len(video_documents[video_id])
+                operations.extend(UpdateOne({'_id': document_id}, update) for document_id in video_documents[video_id])
+            await quizzes_collection.bulk_write(operations, ordered=False)
+
+        summary['checked_videos'] += len(chunk)
+        if progress is not None:
+            await progress(summary['checked_videos'], summary['total_videos'])
+
+    return summary
+
+
+async def run_video_link_refresh_job(job_id: str, course_id: str = None) -> None:
+    """Run a video link refresh and record its progress and outcome on the job document."""
+    async def report(checked_videos, total_videos):
+        await video_link_refresh_jobs_collection.update_one(
+            {'_id': job_id},
+            {'$set': {'checked_videos': checked_videos, 'total_videos': total_videos, 'updated_at': datetime.utcnow()}}
+        )
+
+    try:
+        result = await refresh_video_links(course_id, progress=report)
+        outcome = {'status': 'completed', 'result': result}
+    except Exception as e:
+        logger.error(f"Video link refresh job error: {str(e)}")
+        outcome = {'status': 'failed', 'error': str(e)}
+
+    now = datetime.utcnow()
+    await video_link_refresh_jobs_collection.update_one(
+        {'_id': job_id},
+        {'$set': {**outcome, 'finished_at': now, 'updated_at': now}}
+    )
+
+
+async def fail_stale_video_link_refresh_jobs() -> None:
+    """
+    Mark running jobs without progress for BACKGROUND_JOB_STALE_AFTER seconds
+    as failed (e.g. their worker restarted), so they stop blocking new jobs.
+    """
+    now = datetime.utcnow()
+    await video_link_refresh_jobs_collection.update_many(
+        {'status': 'running', 'updated_at': {'$lt': now - timedelta(seconds=Config.BACKGROUND_JOB_STALE_AFTER)}},
+        {'$set': {'status': 'failed', 'error': 'Refresh stopped making progress', 'finished_at': now, 'updated_at': now}}
+    )
+
+
+def running_video_link_refresh_response(job: dict, course_id: str = None) -> dict:
+    """The running job for a repeated request with the same scope, otherwise a conflict."""
+    if job.get('course_id') == course_id:
+        return {'message': 'Video link refresh already running', 'job_id': job['_id'], 'status': 'running', 'course_id': course_id}
+    return {
+        'error': 'Another video link refresh is running',
+        'job_id': job['_id'],
+        'course_id': job.get('course_id'),
+        'statusCode': 409
+    }
+
+
+async def start_video_link_refresh_job(course_id: str = None) -> dict:
+    """
+    Start a video link refresh in the background. While a refresh is running
+    no other starts: a request for the same course_id gets the running job,
+    any other request a 409.
+
+    Args:
+        course_id: limit the refresh to one course's questions
+
+    Returns:
+        dict with the job_id to poll through get_video_link_refresh_job
+    """
+    try:
+        await fail_stale_video_link_refresh_jobs()
+        running = await video_link_refresh_jobs_collection.find_one({'status': 'running'})
+        if running:
+            return running_video_link_refresh_response(running, course_id)
+
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        try:
+            await video_link_refresh_jobs_collection.insert_one({
+                '_id': job_id,
+                'course_id': course_id,
+                'status': 'running',
+                'checked_videos': 0,
+                'total_videos': 0,
+                'started_at': now,
+                'updated_at': now
+            })
+        except DuplicateKeyError:
+            # Another request started a job since the check above
+            running = await video_link_refresh_jobs_collection.find_one({'status': 'running'})
+            if not running:
+                raise
+            return running_video_link_refresh_response(running, course_id)
+
+        task = asyncio.create_task(run_video_link_refresh_job(job_id, course_id))
+        _video_link_refresh_tasks.add(task)
+        task.add_done_callback(_video_link_refresh_tasks.discard)
+
+        return {'message': 'Video link refresh started', 'job_id': job_id, 'status': 'running', 'course_id': course_id}
+
+    except Exception as e:
+        logger.error(f"Start video link refresh error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
+
+
+async def get_video_link_refresh_job(job_id: str) -> dict:
+    """Get the progress and result of a video link refresh job."""
+    try:
+        await fail_stale_video_link_refresh_jobs()
+        job = await video_link_refresh_jobs_collection.find_one({'_id': job_id})
+        if not job:
+            return {'error': 'Job not found', 'statusCode': 404}
+        return {'job_id': job.pop('_id'), **job}
+
+    except Exception as e:
+        logger.error(f"Get video link refresh job error: {str(e)}")
+        return {'error': 'Internal server error', 'statusCode': 500}
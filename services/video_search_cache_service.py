@@ -0,0 +1,94 @@
+# services/video_search_cache_service.py
+
+"""
+YouTube Topic Cache
+===================
+
+Persistent cache of YouTube search results per core topic. Many questions
+(across sections and terms) share a topic, so each normalized topic is
+searched once and its candidate videos are reused until the entry expires
+(Config.YOUTUBE_TOPIC_CACHE_TTL). Searches that found nothing are cached
+too, for the shorter Config.YOUTUBE_NEGATIVE_CACHE_TTL, so hopeless topics
+are not re-searched on every update run. Failed searches are not cached.
+Entries are removed by a TTL index on expires_at.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# MongoDB setup
+client = AsyncIOMotorClient(
+    Config.DB_CONNECTION_STRING,
+    tlsAllowInvalidCertificates=(Config.ENV == 'development')
+)
+db = client[Config.DATABASE]
+youtube_topic_cache_collection = db[Config.YOUTUBE_TOPIC_CACHE_COLLECTION]
+
+_video_search_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0, 'negative_stores': 0}
+
+
+async def ensure_video_search_cache_indexes() -> None:
+    """Create the TTL index that expires cached searches."""
+    await youtube_topic_cache_collection.create_index(
+        'expires_at', expireAfterSeconds=0, name='youtube_topic_cache_expiry_idx'
+    )
+
+
+def normalize_topic(topic: str) -> str:
+    """Collapse whitespace and case so the same topic worded alike shares an entry."""
+    return ' '.join(str(topic or '').split()).casefold()
+
+
+async def get_cached_video_candidates(topic: str):
+    """
+    Look up the cached search for a topic.
+
+    Returns:
+        list of candidate videos (empty for a cached empty search), or None
+        on a miss
+    """
+    try:
+        entry = await youtube_topic_cache_collection.find_one(
+            {'_id': normalize_topic(topic), 'expires_at': {'$gt': datetime.utcnow()}}
+        )
+    except Exception as e:
+        logger.error(f"YouTube topic cache lookup error: {str(e)}")
+        return None
+
+    if entry is None:
+        _video_search_stats['misses'] += 1
+        return None
+    _video_search_stats['negative_hits' if not entry.get('videos') else 'hits'] += 1
+    return entry.get('videos', [])
+
+
+async def store_video_candidates(topic: str, videos: list) -> None:
+    """Cache a topic's search results; empty results get the negative-cache TTL."""
+    now = datetime.utcnow()
+    ttl = Config.YOUTUBE_TOPIC_CACHE_TTL if videos else Config.YOUTUBE_NEGATIVE_CACHE_TTL
+    try:
+        await youtube_topic_cache_collection.update_one(
+            {'_id': normalize_topic(topic)},
+            {'$set': {
+                'topic': topic,
+                'videos': videos,
+                'searched_at': now,
+                'expires_at': now + timedelta(seconds=ttl)
+            }},
+            upsert=True
+        )
+        _video_search_stats['stores' if videos else 'negative_stores'] += 1
+    except Exception as e:
+        logger.error(f"YouTube topic cache store error: {str(e)}")
+
+
+def get_video_search_stats() -> dict:
+    """Counters for the topic cache, with the share of lookups served from it."""
+    lookups = _video_search_stats['hits'] + _video_search_stats['negative_hits'] + _video_search_stats['misses']
+    hits = _video_search_stats['hits'] + _video_search_stats['negative_hits']
+    return {**_video_search_stats, 'hit_rate': round(hits / lookups, 4) if lookups else 0.0}
@@ -1,11 +1,15 @@
 # services/video_service.py
 
 import os
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from dotenv import load_dotenv
-from utils.youtube_utils import fetch_video_for_topic, extract_video_id, get_video_metadata
-from utils.ai_utils import generate_core_topic
+from utils.youtube_utils import fetch_video_for_topic, extract_video_id, find_video_timestamp
+from services.video_metadata_service import get_video_metadata
+from utils.ai_utils import generate_core_topic, generate_core_topics_batch
 from utils.db_utils import find_documents_by_field
+from services.canonical_question_service import get_canonical_id, get_canonical_questions, save_canonical_topics
 from config import Config
 
 # MongoDB async connection
@@ -114,31 +118,151 @@ async def get_course_videos(course_id):
         # print(f"Full traceback: {traceback.format_exc()}")
         return []
 
+async def update_videos_for_questions(questions, course_name, course_context="", duplicates=None):
+    """
+    Generate topics for a batch of questions from one course and store a video for each.
+
+    duplicates maps a canonical_id to every pending question sharing it; they all
+    receive the representative's topic and video, which is also saved as the
+    canonical entry.
+    """
+    topics = await generate_core_topics_batch(
+        [question['question_text'] for question in questions], course_name, course_context
+    )
+
+    topic_questions = []
+    for i, question in enumerate(questions):
+        core_topic = topics.get(i)
+        if not core_topic:
+            # Fall back to one call for any question the batch did not cover
+            core_topic_obj = await generate_core_topic(question['question_text'], course_name, course_context)
+            if not core_topic_obj.get("success"):
+                print(f"No core topic generated for question {question.get('questionid')}")
+                continue
+            core_topic = core_topic_obj["core_topic"]
+        topic_questions.append((question, core_topic))
+
+    await store_videos_for_topics(topic_questions, duplicates)
+
+async def store_videos_for_topics(topic_questions, duplicates=None):
+    """
+    Search a video for each (question, core_topic) pair and store the topic and
+    video on the question, its duplicates and its canonical entry.
+    """
+    duplicates = duplicates or {}
+
+    # Fetch video data for every topic at once; searches are bounded and cached per topic
+    videos = await asyncio.gather(*(fetch_video_for_topic(core_topic) for _, core_topic in topic_questions))
+
+    updates = []
+    canonical_entries = {}
+    for (question, core_topic), video_data in zip(topic_questions, videos):
+        if video_data is None:
+            # Search failed; leave the question pending so a later run retries it
+            print(f"Video search failed for question {question.get('questionid')}")
+            continue
+        canonical_id = question.get('canonical_id')
+        for copy in duplicates.get(canonical_id, [question]):
+            updates.append(UpdateOne(
+                {'questionid': copy.get("questionid")},
+                {'$set': {'core_topic': core_topic, 'video_data': video_data, 'canonical_id': canonical_id}},
+                upsert=True
+            ))
+        canonical_entries[canonical_id] = {
+            'question_text': question['question_text'],
+            'course_id': question.get('courseid'),
+            'core_topic': core_topic,
+            'video_data': video_data
+        }
+
+    if updates:
+        await quizzes_collection.bulk_write(updates, ordered=False)
+    await save_canonical_topics(canonical_entries)
+
 async def update_videos_for_filter(filter_criteria=None):
     """Update videos for all questions that match the filter criteria. Updates all videos in DB if no criteria provided."""
     query = filter_criteria if filter_criteria else {}
-    async for question in quizzes_collection.find(query):
+
+    # Group the questions still missing videos by normalized text
+    duplicates = {}
+    seeds = {}
+    seeded_questions = []
+    projection = {'questionid': 1, 'question_text': 1, 'courseid': 1, 'course_name': 1, 'video_data': 1, 'core_topic': 1, 'canonical_id': 1}
+    async for question in quizzes_collection.find(query, projection):
         question_text = question.get('question_text')
-        if not question_text or question.get('video_data'):
+        if not question_text:
+            continue
+        canonical_id = get_canonical_id(question_text)
+        if question.get('video_data'):
+            # Questions that already have a video seed the canonical store
+            if not question.get('canonical_id') and question.get('core_topic'):
+                seeds.setdefault(canonical_id, {
+                    'question_text': question_text,
+                    'course_id': question.get('courseid'),
+                    'core_topic': question['core_topic'],
+                    'video_data': question['video_data']
+                })
+                seeded_questions.append(UpdateOne({'_id': question['_id']}, {'$set': {'canonical_id': canonical_id}}))
             continue
+        question['canonical_id'] = canonical_id
+        duplicates.setdefault(canonical_id, []).append(question)
+
+    if seeds:
+        await save_canonical_topics(seeds, overwrite=False)
+        await quizzes_collection.bulk_write(seeded_questions, ordered=False)
+
+    if not duplicates:
+        return {"message": "success"}
+
+    # Questions seen before (in any course) inherit the canonical topic and video
+    canonical = await get_canonical_questions(list(duplicates))
+    inherited = []
+    known_topics = []
+    pending = {}
+    for canonical_id, questions in duplicates.items():
+        entry = canonical.get(canonical_id, {})
+        if entry.get('core_topic') and not entry.get('video_data'):
+            # The topic is known but no video was found for it: only search again
+            known_topics.append((questions[0], entry['core_topic']))
+            continue
+        if entry.get('core_topic'):
+            inherited.extend(
+                UpdateOne(
+                    {'questionid': question.get("questionid")},
+                    {'$set': {'core_topic': entry['core_topic'], 'video_data': entry['video_data'], 'canonical_id': canonical_id}}
+                )
+                for question in questions
+            )
+            continue
+        representative = questions[0]
+        pending.setdefault((representative.get('courseid'), representative.get('course_name', "")), []).append(representative)
 
-        course_id = question.get('courseid')
-        course_name = question.get('course_name', "")
+    if inherited:
+        await quizzes_collection.bulk_write(inherited, ordered=False)
+    if known_topics:
+        await store_videos_for_topics(known_topics, duplicates)
 
-        # Fetch context data and core topic
-        course_context_data = await contexts_collection.find_one({'course_id': course_id})
-        course_context = course_context_data.get('course_context', "") if course_context_data else ""
-        
-        core_topic_obj = await generate_core_topic(question_text, course_name, course_context)
-        core_topic = core_topic_obj["core_topic"]
-        # Fetch or update video data for the topic
-        video_data = await fetch_video_for_topic(core_topic)
-
-        await quizzes_collection.update_one(
-            {'questionid': question.get("questionid")},
-            {'$set': {'core_topic': core_topic, 'video_data': video_data}},
-            upsert=True
-        )
+    if not pending:
+        return {"message": "success"}
+
+    # Fetch context data once per course
+    course_contexts = {}
+    course_ids = list({course_id for course_id, _ in pending})
+    async for context in contexts_collection.find({'course_id': {'$in': course_ids}}):
+        course_contexts[context['course_id']] = context.get('course_context', "")
+
+    semaphore = asyncio.Semaphore(Config.AI_BATCH_MAX_CONCURRENCY)
+
+    async def process_batch(course_id, course_name, questions):
+        async with semaphore:
+            await update_videos_for_questions(questions, course_name, course_contexts.get(course_id, ""), duplicates)
+
+    batch_size = Config.AI_TOPIC_BATCH_SIZE
+    await asyncio.gather(*(
+        process_batch(course_id, course_name, questions[i:i + batch_size])
+        for (course_id, course_name), questions in pending.items()
+        for i in range(0, len(questions), batch_size)
+    ))
 
     return {"message": "success"}
 
@@ -200,6 +324,22 @@ async def add_video(quiz_id, question_id, video_link):
     
     return {"message": "Video added successfully", "success": True}
 
+async def find_question_video_timestamp(quiz_id, question_id, languages=['en']):
+    """Finds where a question's video discusses the question's core topic."""
+    document = await quizzes_collection.find_one(
+        {"quizid": int(quiz_id), "questionid": str(question_id)},
+        {"core_topic": 1, "video_data.link": 1}
+    )
+
+    if not document:
+        return {"success": False, "error": "Document not found"}
+
+    video_link = document.get('video_data', {}).get('link')
+    if not video_link or not document.get('core_topic'):
+        return {"success": False, "error": "Question has no video or core topic"}
+
+    return await find_video_timestamp(video_link, document['core_topic'], languages)
+
 async def remove_video(quiz_id, question_id):
     """Removes a specific video by link from a question's video data."""
     document = await quizzes_collection.find_one({"quizid": int(quiz_id), "questionid": str(question_id)})
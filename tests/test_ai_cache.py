@@ -0,0 +1,89 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from services import achieveup_ai_service, ai_cache_service as cache
+
+SKILLS = ['Loops', 'Recursion', 'Sorting']
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCacheCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query):
+        return FakeCursor([self.docs[key] for key in query['_id']['$in'] if key in self.docs])
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            key = operation._filter['_id']
+            self.docs[key] = {'_id': key, **operation._doc['$set']}
+
+
+class TestAIResponseCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        cache.clear_ai_cache()
+        self.collection = FakeCacheCollection()
+        self.prompts = []
+
+        async def completion(operation, messages, max_tokens=None, **kwargs):
+            prompt = messages[-1]['content']
+            self.prompts.append(prompt)
+            count = int(prompt.split('following ')[1].split(' ')[0])
+            return json.dumps({str(j): ['Loops'] for j in range(count)}), {'prompt_tokens': 300, 'completion_tokens': 30}
+
+        patches = [
+            patch.object(cache, 'ai_response_cache_collection', self.collection),
+            patch.object(achieveup_ai_service, 'create_chat_completion_with_usage', completion),
+            patch.object(achieveup_ai_service, 'OPENAI_API_KEY', 'test'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    async def test_batch_only_sends_questions_not_seen_before(self):
+        first = await achieveup_ai_service.classify_questions_batch_ai(['What is a for loop?', 'Define recursion'], SKILLS)
+        second = await achieveup_ai_service.classify_questions_batch_ai(
+            ['Sort this list', '  what is a FOR loop? '], SKILLS
+        )
+
+        self.assertEqual(first, {'0': ['Loops'], '1': ['Loops']})
+        self.assertEqual(second, {'0': ['Loops'], '1': ['Loops']})
+        self.assertIn('following 1 questions', self.prompts[1])
+        self.assertIn('Sort this list', self.prompts[1])
+
+        stats = cache.get_ai_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(stats['saved_prompt_tokens'], 150)  # half of the first two-question batch
+
+    async def test_answers_survive_a_restart_and_bypass_asks_again(self):
+        await achieveup_ai_service.classify_questions_batch_ai(['What is a for loop?'], SKILLS)
+        cache.clear_ai_cache()  # in-process LRU gone, Mongo entry kept
+
+        await achieveup_ai_service.classify_questions_batch_ai(['What is a for loop?'], SKILLS)
+        self.assertEqual(len(self.prompts), 1)
+        self.assertEqual(cache.get_ai_cache_stats()['db_hits'], 1)
+
+        await achieveup_ai_service.classify_questions_batch_ai(['What is a for loop?'], SKILLS, bypass_cache=True)
+        self.assertEqual(len(self.prompts), 2)
+
+    def test_key_depends_on_skill_set_not_its_order(self):
+        key = cache.build_ai_cache_key('question_skills', {'question': 'Q'}, SKILLS)
+        self.assertEqual(key, cache.build_ai_cache_key('question_skills', {'question': 'q '}, list(reversed(SKILLS))))
+        self.assertNotEqual(key, cache.build_ai_cache_key('question_skills', {'question': 'Q'}, SKILLS[:2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from services import ai_gateway_service as gateway
+
+
+def api_error(error_class, status_code, headers=None):
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_class('failed', response=response, body=None)
+
+
+class FakeCompletions:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f' {outcome} '))],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+        )
+
+
+class TestAIGateway(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        gateway.reset_ai_metrics()
+        self.sleeps = []
+
+        async def sleep(delay):
+            self.sleeps.append(delay)
+
+        p = patch.object(gateway.asyncio, 'sleep', sleep)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def use_outcomes(self, *outcomes):
+        completions = FakeCompletions(outcomes)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        p = patch.object(gateway, 'get_ai_client', lambda: client)
+        p.start()
+        self.addCleanup(p.stop)
+        return completions
+
+    async def test_rate_limits_and_server_errors_are_retried_with_operation_budget(self):
+        completions = self.use_outcomes(
+            api_error(openai.RateLimitError, 429, {'retry-after': '2'}),
+            api_error(openai.InternalServerError, 503),
+            'Photosynthesis'
+        )
+
+        content = await gateway.create_chat_completion('core_topic', [{'role': 'user', 'content': 'q'}])
+
+        self.assertEqual(content, 'Photosynthesis')
+        self.assertEqual(self.sleeps[0], 2.0)
+        self.assertEqual(len(completions.calls), 3)
+        self.assertEqual(completions.calls[0]['max_completion_tokens'], gateway.AI_OPERATIONS['core_topic']['max_tokens'])
+        self.assertEqual(completions.calls[0]['timeout'], gateway.AI_OPERATIONS['core_topic']['timeout'])
+
+        metrics = gateway.get_ai_metrics()['operations']['core_topic']
+        self.assertEqual((metrics['calls'], metrics['retries'], metrics['errors']), (1, 2, 0))
+        self.assertEqual(metrics['cost_usd'], 0.00045)  # 1000 x $0.15/M + 500 x $0.60/M
+
+    async def test_client_errors_fail_without_retry(self):
+        self.use_outcomes(api_error(openai.BadRequestError, 400))
+
+        with self.assertRaises(openai.BadRequestError):
+            await gateway.create_chat_completion('question_classification', [])
+
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(gateway.get_ai_metrics()['totals']['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
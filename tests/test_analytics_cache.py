@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch
+
+from config import Config
+from services import analytics_cache_service as cache
+
+
+async def verify_token(token):
+    return {'user': {'id': 'instructor-1'}}
+
+
+class TestAnalyticsResultCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        cache.clear_analytics_cache()
+        self.calls = []
+        self.versions = {'42': 1}
+
+        @cache.cache_analytics_result('course_analytics')
+        async def course_analytics(token, course_id, time_range='30d'):
+            self.calls.append((course_id, time_range))
+            if course_id == 'missing':
+                return {'error': 'Not found', 'statusCode': 404}
+            return {'course_id': course_id, 'time_range': time_range}
+
+        async def sync_version(course_id):
+            return self.versions.get(course_id)
+
+        self.course_analytics = course_analytics
+        patches = [
+            patch.object(cache, 'achieveup_verify_token', verify_token),
+            patch.object(cache, 'get_course_sync_version', sync_version),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    async def test_identical_requests_hit_until_sync_version_changes(self):
+        await self.course_analytics('t', '42')
+        await self.course_analytics('t', '42', time_range='30d')
+        self.assertEqual(len(self.calls), 1)
+
+        self.versions['42'] = 2
+        await self.course_analytics('t', '42')
+        self.assertEqual(len(self.calls), 2)
+
+        stats = cache.get_analytics_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['hit_rate'], 33.33)
+
+    async def test_errors_are_not_cached(self):
+        await self.course_analytics('t', 'missing')
+        await self.course_analytics('t', 'missing')
+        self.assertEqual(len(self.calls), 2)
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        with patch.object(Config, 'ANALYTICS_CACHE_MAX_ENTRIES', 2):
+            await self.course_analytics('t', '42', '7d')
+            await self.course_analytics('t', '42', '30d')
+            await self.course_analytics('t', '42', '7d')
+            await self.course_analytics('t', '42', '90d')
+            await self.course_analytics('t', '42', '7d')
+
+        self.assertEqual(self.calls, [('42', '7d'), ('42', '30d'), ('42', '90d')])
+        self.assertEqual(cache.get_analytics_cache_stats()['evictions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
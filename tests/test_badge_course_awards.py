@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch
+
+from pymongo.errors import BulkWriteError
+
+from services import badge_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+class FakeBadgesCollection:
+    def __init__(self, existing=None, duplicate_keys=None):
+        self.existing = existing or []
+        self.duplicate_keys = duplicate_keys or set()
+        self.inserted = []
+        self.insert_calls = 0
+
+    def find(self, query, projection=None):
+        return FakeCursor(b for b in self.existing if b['course_id'] == query['course_id'])
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        errors = []
+        for index, doc in enumerate(docs):
+            key = (doc['user_id'], doc['skill_id'], doc['badge_level'])
+            if key in self.duplicate_keys:
+                errors.append({'index': index, 'code': badge_service.DUPLICATE_KEY_ERROR})
+            else:
+                self.inserted.append(doc)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+
+def mastery(student_id, skill_id, percentage):
+    return {
+        'student_id': student_id,
+        'course_id': '42',
+        'skill_id': skill_id,
+        'skill_name': skill_id,
+        'student_name': f'Student {student_id}',
+        'mastery_percentage': percentage,
+    }
+
+
+class TestAwardCourseBadges(unittest.IsolatedAsyncioTestCase):
+    async def test_only_new_badges_are_inserted_in_one_batch(self):
+        collection = FakeBadgesCollection(existing=[
+            {'user_id': 's1', 'course_id': '42', 'skill_id': 'Loops', 'badge_level': 'expert'},
+        ])
+        docs = [
+            mastery('s1', 'Loops', 95),       # already earned
+            mastery('s1', 'Recursion', 80),   # new advanced
+            mastery('s2', 'Loops', 10),       # below threshold
+            mastery('s2', 'Recursion', 55),   # new intermediate
+        ]
+
+        with patch.object(badge_service, 'achieveup_user_badges_collection', collection), patch(
+            'services.badge_service.get_course_name', return_value='CS 101'
+        ):
+            result = await badge_service.award_course_badges('42', docs)
+
+        self.assertEqual(result['awarded'], 2)
+        self.assertEqual(collection.insert_calls, 1)
+        awarded = {(b['user_id'], b['skill_id'], b['badge_level']) for b in collection.inserted}
+        self.assertEqual(awarded, {('s1', 'Recursion', 'advanced'), ('s2', 'Recursion', 'intermediate')})
+        self.assertTrue(all(b['course_name'] == 'CS 101' for b in collection.inserted))
+
+    async def test_concurrent_duplicates_are_ignored(self):
+        collection = FakeBadgesCollection(duplicate_keys={('s1', 'Loops', 'expert')})
+        docs = [mastery('s1', 'Loops', 92), mastery('s2', 'Loops', 30)]
+
+        with patch.object(badge_service, 'achieveup_user_badges_collection', collection), patch(
+            'services.badge_service.get_course_name', return_value='CS 101'
+        ):
+            result = await badge_service.award_course_badges('42', docs)
+
+        self.assertEqual(result['awarded'], 1)
+        self.assertEqual(len(collection.inserted), 1)
+        self.assertEqual(collection.inserted[0]['user_id'], 's2')
+
+
+class FakeBadgeIndexCollection:
+    """Groups badges the way the duplicate-finding aggregation does."""
+
+    def __init__(self, badges):
+        self.badges = badges
+        self.deleted = []
+        self.indexes = []
+
+    async def index_information(self):
+        return {'_id_': {}}
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        groups = {}
+        for badge in sorted(self.badges, key=lambda b: (b['earned_at'], b['_id'])):
+            key = (badge['user_id'], badge['course_id'], badge['skill_id'], badge['badge_level'])
+            groups.setdefault(key, []).append(badge['_id'])
+        return FakeCursor({'ids': ids, 'count': len(ids)} for ids in groups.values() if len(ids) > 1)
+
+    async def delete_many(self, query):
+        self.deleted.extend(query['_id']['$in'])
+        return type('DeleteResult', (), {'deleted_count': len(query['_id']['$in'])})()
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(kwargs['name'])
+
+
+class TestUserBadgeIndex(unittest.IsolatedAsyncioTestCase):
+    async def test_duplicates_are_removed_keeping_the_earliest_before_the_unique_index(self):
+        badge = {'user_id': 's1', 'course_id': '42', 'skill_id': 'Loops', 'badge_level': 'expert'}
+        collection = FakeBadgeIndexCollection([
+            {**badge, '_id': 'late', 'earned_at': 3},
+            {**badge, '_id': 'first', 'earned_at': 1},
+            {**badge, '_id': 'second', 'earned_at': 2},
+            {**badge, '_id': 'other', 'earned_at': 1, 'badge_level': 'advanced'},
+        ])
+
+        with patch.object(badge_service, 'achieveup_user_badges_collection', collection):
+            await badge_service.ensure_user_badge_indexes()
+
+        self.assertEqual(sorted(collection.deleted), ['late', 'second'])
+        self.assertEqual(collection.indexes, [badge_service.USER_BADGE_UNIQUE_INDEX])
+
+
+if __name__ == '__main__':
+    unittest.main()
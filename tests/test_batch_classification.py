@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from config import Config
+from services import achieveup_ai_service
+
+
+class TestConcurrentBatchClassification(unittest.IsolatedAsyncioTestCase):
+    def test_batches_shrink_as_questions_get_longer(self):
+        with patch.object(Config, 'AI_BATCH_PROMPT_TOKENS', 400), patch.object(Config, 'AI_BATCH_MAX_QUESTIONS', 40):
+            short = achieveup_ai_service.plan_classification_batches(['Define a loop'] * 100)
+            long = achieveup_ai_service.plan_classification_batches(['x' * 2000] * 10)
+
+        self.assertEqual([len(batch) for batch in short], [40, 40, 20])
+        self.assertEqual([len(batch) for batch in long], [3, 3, 3, 1])  # truncated to 500 chars each
+        self.assertEqual(sum(short, []), list(range(100)))
+
+    async def test_batches_run_concurrently_and_unanswered_questions_are_retried(self):
+        in_flight = 0
+        peak = 0
+        calls = []
+
+        async def classify(texts, skills, bypass_cache=False):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            calls.append(list(texts))
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            # The first request for q5 drops it, as a truncated model reply would
+            if 'q5' in texts and len(texts) > 1:
+                return {str(j): [text] for j, text in enumerate(texts) if text != 'q5'}
+            return {str(j): [text] for j, text in enumerate(texts)}
+
+        texts = [f'q{i}' for i in range(12)]
+        with patch.object(achieveup_ai_service, 'classify_questions_batch_ai', classify), \
+                patch.object(Config, 'AI_BATCH_MAX_QUESTIONS', 3), \
+                patch.object(Config, 'AI_BATCH_MAX_CONCURRENCY', 2):
+            results = await achieveup_ai_service.classify_questions_concurrently(texts, ['Loops'])
+
+        self.assertEqual(results, {i: [f'q{i}'] for i in range(12)})
+        self.assertEqual(peak, 2)
+        self.assertIn(['q5'], calls)
+
+
+    async def test_a_failed_batch_is_retried_in_halves(self):
+        calls = []
+
+        async def classify(texts, skills, bypass_cache=False):
+            calls.append(len(texts))
+            # Replies for more than 4 questions overflow the token cap and fail entirely
+            if len(texts) > 4:
+                return {}
+            return {str(j): [text] for j, text in enumerate(texts)}
+
+        texts = [f'q{i}' for i in range(8)]
+        with patch.object(achieveup_ai_service, 'classify_questions_batch_ai', classify), \
+                patch.object(Config, 'AI_BATCH_MAX_QUESTIONS', 8), \
+                patch.object(Config, 'AI_BATCH_RETRIES', 1):
+            results = await achieveup_ai_service.classify_questions_concurrently(texts, ['Loops'])
+
+        self.assertEqual(results, {i: [f'q{i}'] for i in range(8)})
+        self.assertEqual(calls, [8, 4, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from services import analytics_service
+
+
+def summary(scores, attempted=10, correct=5):
+    return {
+        'students': len(scores),
+        'sum_mastery': float(sum(scores)),
+        'sum_sq_mastery': float(sum(s * s for s in scores)),
+        'total_attempted': attempted,
+        'total_correct': correct,
+        'histogram': [
+            sum(1 for s in scores if 0 <= s < 25),
+            sum(1 for s in scores if 25 <= s < 50),
+            sum(1 for s in scores if 50 <= s < 75),
+            sum(1 for s in scores if 75 <= s <= 100),
+        ],
+    }
+
+
+class TestMergeCohortPartials(unittest.TestCase):
+    def test_merged_partials_match_statistics_over_all_raw_scores(self):
+        day = datetime(2024, 3, 4)
+        partials = [
+            {'skills': {'Loops': summary([20, 60])}, 'timeline': [
+                {'bucket_start': day, 'count': 2, 'sum_progress': 80, 'passing': 0, 'completed': 0,
+                 'active_students': {'a', 'b'}}]},
+            {'skills': {'Loops': summary([80, 100], 20, 15)}, 'timeline': [
+                {'bucket_start': day, 'count': 2, 'sum_progress': 180, 'passing': 2, 'completed': 1,
+                 'active_students': {'c'}}]},
+        ]
+
+        merged = analytics_service.merge_cohort_partials(partials)
+        loops = merged['skills'][0]
+
+        self.assertEqual(loops['students'], 4)
+        self.assertEqual(loops['averageMastery'], 65.0)
+        self.assertEqual(loops['stdDev'], 29.58)  # population std dev of 20, 60, 80, 100
+        self.assertEqual(loops['accuracy'], 66.67)
+        self.assertEqual(loops['distribution'], {'0-25%': 1, '25-50%': 0, '50-75%': 1, '75-100%': 2})
+        self.assertEqual(merged['timeline'], [{
+            'date': '2024-03-04', 'average_progress': 65.0, 'performance_score': 50.0,
+            'active_students': 3, 'activity': 4
+        }])
+
+
+class TestCohortPartialCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        analytics_service._cohort_partial_cache.clear()
+
+    async def test_only_new_or_resynced_courses_are_recomputed(self):
+        built = []
+
+        async def build(course_id, skill_ids, time_range):
+            built.append(course_id)
+            return {'course_id': course_id, 'skills': {}, 'timeline': []}
+
+        versions = {'1': 5, '2': 5}
+
+        async def sync_version(course_id):
+            return versions.get(course_id)
+
+        with patch.object(analytics_service, 'build_cohort_course_partial', build), patch.object(
+            analytics_service, 'get_course_sync_version', sync_version
+        ):
+            await analytics_service.get_cohort_course_partial('1', [], '30d')
+            _, cached = await analytics_service.get_cohort_course_partial('1', [], '30d')
+            self.assertTrue(cached)
+
+            await analytics_service.get_cohort_course_partial('2', [], '30d')
+            versions['1'] = 6
+            await analytics_service.get_cohort_course_partial('1', [], '30d')
+
+        self.assertEqual(built, ['1', '2', '1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from services import (
+    achieveup_auth_service, achieveup_canvas_service, achieveup_service, analytics_cache_service, analytics_service
+)
+
+USERS = {
+    'student-token': {'id': 'u-student', 'role': 'student', 'canvasTokenType': 'student'},
+    'owner-token': {'id': 'u-owner', 'role': 'instructor', 'canvasTokenType': 'instructor'},
+    'other-token': {'id': 'u-other', 'role': 'instructor', 'canvasTokenType': 'instructor'},
+}
+TAUGHT_COURSES = {'canvas-u-owner': [{'id': 42}], 'canvas-u-other': [{'id': 7}]}
+
+
+class FakeSnapshotsCollection:
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return self.snapshot
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        self.snapshot = {
+            'course_id': query['course_id'],
+            'version': (self.snapshot or {}).get('version', 0) + update['$inc']['version'],
+            **update['$set']
+        }
+        return self.snapshot
+
+
+class TestInstructorCourseAccess(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        achieveup_auth_service._instructor_courses_cache.clear()
+        analytics_cache_service._analytics_cache.clear()
+        self.canvas_calls = 0
+
+        async def verify(token):
+            if token not in USERS:
+                return {'error': 'Invalid token', 'statusCode': 401}
+            return {'user': USERS[token]}
+
+        async def canvas_token(user_id):
+            return f'canvas-{user_id}'
+
+        async def instructor_courses(token):
+            self.canvas_calls += 1
+            return TAUGHT_COURSES[token]
+
+        self.snapshots = FakeSnapshotsCollection({
+            'course_id': '42', 'version': 3, 'generated_at': datetime(2026, 1, 5),
+            'analytics': {'students': [{
+                'id': 's1', 'name': 'Ada', 'email': 'ada@example.edu', 'progress': 40.0, 'skillsMastered': 1,
+                'recordedSkills': 2, 'recordedMastery': 80.0, 'lastActivity': '2026-01-04T00:00:00'
+            }]}
+        })
+        self.patches = [
+            patch.object(achieveup_auth_service, 'achieveup_verify_token', verify),
+            patch.object(achieveup_service, 'achieveup_verify_token', verify),
+            patch.object(analytics_cache_service, 'achieveup_verify_token', verify),
+            patch.object(achieveup_auth_service, 'get_user_canvas_token', canvas_token),
+            patch.object(achieveup_canvas_service, 'get_instructor_courses', instructor_courses),
+            patch.object(analytics_service, 'course_analytics_snapshots_collection', self.snapshots),
+            patch.object(analytics_cache_service, 'course_analytics_snapshots_collection', self.snapshots),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    async def test_students_and_other_instructors_cannot_read_course_analytics(self):
+        for token in ('student-token', 'other-token'):
+            result = await analytics_service.get_course_students_analytics(token, '42')
+            self.assertEqual(result['statusCode'], 403)
+            risk = await analytics_service.get_course_risk_assessment(token, '42')
+            self.assertEqual(risk['statusCode'], 403)
+
+        # The owning instructor gets the snapshot; their course list is fetched once
+        result = await analytics_service.get_course_students_analytics('owner-token', '42')
+        self.assertEqual(result['analytics']['students'][0]['id'], 's1')
+        await achieveup_auth_service.verify_instructor_course_access('owner-token', '42')
+        self.assertEqual(self.canvas_calls, 2)  # u-other once, u-owner once
+
+    async def test_instructor_student_analytics_are_served_from_the_snapshot(self):
+        with patch.object(achieveup_service, 'achieveup_skill_matrices_collection', FakeSnapshotsCollection()):
+            denied = await achieveup_service.get_instructor_student_analytics('other-token', '42')
+            result = await achieveup_service.get_instructor_student_analytics('owner-token', '42')
+
+        self.assertEqual(denied['statusCode'], 403)
+        self.assertEqual(result['studentAnalytics'], [{
+            'studentId': 's1', 'studentName': 'Ada', 'email': 'ada@example.edu', 'progressCount': 2,
+            'overallMastery': 80.0, 'skillsCompleted': 1, 'lastActivity': '2026-01-04T00:00:00'
+        }])
+        self.assertEqual(result['generatedAt'], '2026-01-05T00:00:00')
+
+    async def test_raw_dataset_exports_require_an_instructor_of_the_course(self):
+        for token in ('student-token', 'other-token'):
+            for dataset in ('mastery', 'progress', 'submissions', 'badges'):
+                result = await analytics_service.open_course_analytics_export_stream(token, '42', 'csv', dataset)
+                self.assertEqual(result['statusCode'], 403)
+                self.assertNotIn('stream', result)
+
+        result = await analytics_service.open_course_analytics_export_stream('owner-token', '42', 'csv', 'submissions')
+        self.assertIn('stream', result)
+
+    async def test_raw_datasets_are_not_served_in_other_formats(self):
+        for format_type in ('json', 'pdf'):
+            result = await analytics_service.export_course_analytics('owner-token', '42', format_type, 'submissions')
+            self.assertEqual(result['statusCode'], 400)
+            self.assertNotIn('exportData', result)
+
+    async def test_snapshot_version_is_incremented_atomically(self):
+        first = await analytics_service.store_course_analytics_snapshot('42', {'students': []})
+        second = await analytics_service.store_course_analytics_snapshot('42', {'students': [{}]})
+        self.assertEqual((first['version'], second['version']), (4, 5))
+        self.assertEqual(second['student_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+
+from services import export_service
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestStreamingExports(unittest.IsolatedAsyncioTestCase):
+    async def test_csv_is_quoted_and_chunked_per_batch(self):
+        rows = [
+            {'name': 'Doe, Jane', 'notes': 'said "hi"', 'skills': {'Loops': 90}},
+            {'name': 'Roe', 'notes': 'line\nbreak', 'skills': {}},
+            {'name': 'Poe', 'notes': None, 'skills': []},
+        ]
+
+        chunks = await collect(export_service.stream_csv(export_service.iter_list_rows(rows), batch_size=2))
+
+        self.assertEqual(len(chunks), 2)
+        parsed = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(parsed[0]['name'], 'Doe, Jane')
+        self.assertEqual(parsed[0]['notes'], 'said "hi"')
+        self.assertEqual(json.loads(parsed[0]['skills']), {'Loops': 90})
+        self.assertEqual(parsed[1]['notes'], 'line\nbreak')
+        self.assertEqual(parsed[2]['notes'], '')
+
+    async def test_empty_csv_still_has_a_header(self):
+        chunks = await collect(export_service.stream_csv(export_service.iter_list_rows([]), ['a', 'b']))
+        self.assertEqual(b''.join(chunks), b'a,b\r\n')
+
+    async def test_ndjson_and_json_sections_are_valid(self):
+        rows = [{'n': i, 'at': datetime(2024, 3, 4)} for i in range(5)]
+
+        ndjson = b''.join(await collect(export_service.stream_ndjson(export_service.iter_list_rows(rows), 2)))
+        lines = [json.loads(line) for line in ndjson.decode('utf-8').splitlines()]
+        self.assertEqual([line['n'] for line in lines], list(range(5)))
+        self.assertEqual(lines[0]['at'], '2024-03-04T00:00:00')
+
+        body = b''.join(await collect(export_service.stream_json_sections({
+            'badges': export_service.iter_list_rows(rows),
+            'skill_progress': export_service.iter_list_rows([]),
+        }, batch_size=2)))
+        self.assertEqual(json.loads(body)['skill_progress'], [])
+        self.assertEqual(len(json.loads(body)['badges']), 5)
+
+    async def test_parquet_columns_are_typed_and_dictionary_encoded(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = [('skill_id', 'category'), ('score', 'float'), ('attempt', 'int'), ('submitted_at', 'timestamp')]
+        rows = [
+            {'skill_id': 'Loops', 'score': 9, 'attempt': '2', 'submitted_at': '2024-03-04T10:00:00Z'},
+            {'skill_id': 'Loops', 'score': None, 'attempt': 1, 'submitted_at': datetime(2024, 3, 5)},
+            {'skill_id': 'Recursion', 'score': 7.5, 'attempt': 1, 'submitted_at': None},
+        ]
+
+        chunks = await collect(export_service.stream_parquet(export_service.iter_list_rows(rows), columns, batch_size=2))
+        table = pq.read_table(io.BytesIO(b''.join(chunks)))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(table.num_rows, 3)
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('skill_id').type))
+        self.assertEqual(table.column('attempt').to_pylist(), [2, 1, 1])
+        self.assertEqual(table.column('score').to_pylist(), [9.0, None, 7.5])
+        self.assertEqual(table.column('submitted_at').to_pylist()[0], datetime(2024, 3, 4, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from services.achieveup_ai_service import (
+    analyze_question_complexity,
+    calculate_confidence_score,
+    get_fallback_skill_suggestion
+)
+from services.keyword_automaton_service import KeywordAutomaton
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    def test_overlapping_and_shared_keywords_are_all_found(self):
+        automaton = KeywordAutomaton({
+            'network': ['ip', 'tcp/ip', 'protocol'],
+            'written': ['describe', 'describe in detail'],
+            'low': ['describe']
+        })
+
+        self.assertEqual(automaton.scan('Describe in detail the TCP/IP Protocol stack.'), {
+            'network': {'ip', 'tcp/ip', 'protocol'},
+            'written': {'describe', 'describe in detail'},
+            'low': {'describe'}
+        })
+        # Substring semantics, as with `keyword in text`
+        self.assertEqual(automaton.count('A description of the network'), {'network': 1})
+        self.assertEqual(automaton.scan(''), {})
+
+    def test_question_heuristics(self):
+        question = {'question_text': 'Analyze and compare the indexes of this database table.', 'type': 'text'}
+
+        self.assertEqual(analyze_question_complexity(question), 'high')
+        self.assertEqual(get_fallback_skill_suggestion(question, ['Networking', 'Database Design']), ['Database Design'])
+        self.assertAlmostEqual(calculate_confidence_score(question, ['Database Design']), 0.82)
+
+
+if __name__ == '__main__':
+    unittest.main()
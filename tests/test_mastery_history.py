@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime
+
+from services import mastery_history_service as history
+
+
+class TestHistoryEncoding(unittest.TestCase):
+    def test_points_round_trip_through_delta_encoding(self):
+        start = datetime(2024, 3, 1)
+        points = [
+            (datetime(2024, 3, 2, 8), 'Loops', 40.0),
+            (datetime(2024, 3, 2, 8), 'Recursion', 12.5),
+            (datetime(2024, 3, 9, 8), 'Loops', 65.3),
+        ]
+
+        encoded = history.encode_points({'period_start': start}, points)
+        doc = {'period_start': start, 'skills': encoded['skills'], **encoded['entries']}
+
+        self.assertEqual(encoded['entries']['v'], [400, 125, 253])
+        self.assertEqual(history.decode_points(doc), points)
+
+    def test_appending_continues_from_existing_state(self):
+        start = datetime(2024, 3, 1)
+        first = history.encode_points({'period_start': start}, [(datetime(2024, 3, 2), 'Loops', 40.0)])
+        state = {'period_start': start, 'skills': first['skills'],
+                 'last_values': first['last_values'], 'last_ts': first['last_ts']}
+
+        second = history.encode_points(state, [(datetime(2024, 3, 3), 'Loops', 50.0)])
+
+        self.assertEqual(second['entries'], {'t': [86400], 'k': [0], 'v': [100]})
+
+    def test_weekly_downsampling_keeps_last_value_per_skill(self):
+        points = [
+            (datetime(2024, 3, 4), 'Loops', 10.0),
+            (datetime(2024, 3, 6), 'Loops', 20.0),
+            (datetime(2024, 3, 6), 'Recursion', 5.0),
+            (datetime(2024, 3, 11), 'Loops', 30.0),
+        ]
+
+        self.assertEqual(history.downsample_weekly(points), points[1:])
+
+    def test_periods_cover_the_range(self):
+        self.assertEqual(
+            history.get_history_periods(datetime(2023, 11, 20), datetime(2024, 2, 1), 'raw'),
+            ['2023-11', '2023-12', '2024-01', '2024-02']
+        )
+        self.assertEqual(
+            history.get_history_periods(datetime(2023, 3, 1), datetime(2024, 2, 1), 'weekly'),
+            ['2023', '2024']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
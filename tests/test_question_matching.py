@@ -0,0 +1,44 @@
+import unittest
+
+from services.question_matching_service import choose_lsh_bands, match_near_duplicates
+
+
+class TestNearDuplicateMatching(unittest.TestCase):
+    def test_edited_questions_match_with_their_similarity(self):
+        source = [
+            'which protocol guarantees in order delivery of packets between two hosts',
+            'what is the output of the loop when n equals 10',
+            'name three layers of the osi model',
+        ]
+        target = [
+            'name three layers of the osi model',
+            'explain how a hash table resolves collisions',
+            'what is the output of the loop when n equals 12',
+            'which protocol guarantes in order delivery of packets between two hosts',
+        ]
+
+        matches = match_near_duplicates(source, target, threshold=0.7)
+
+        self.assertEqual([(i, j) for i, j, _ in matches], [(0, 3), (1, 2), (2, 0)])
+        self.assertEqual(matches[2][2], 1.0)
+        self.assertTrue(0.7 <= matches[1][2] < 1.0)
+        # A strict threshold keeps only the exact match
+        self.assertEqual([(i, j) for i, j, _ in match_near_duplicates(source, target, threshold=0.99)], [(2, 0)])
+
+    def test_each_target_is_used_once_preferring_the_closest_source(self):
+        matches = match_near_duplicates(
+            ['define a binary search tree of height 3', 'define a binary search tree of height 4'],
+            ['define a binary search tree of height 4'],
+            threshold=0.6
+        )
+        self.assertEqual(matches, [(1, 0, 1.0)])
+
+    def test_lsh_bands_fit_the_signature(self):
+        bands, rows = choose_lsh_bands(0.7, 128)
+        self.assertLessEqual(bands * rows, 128)
+        # Recall is favoured: most pairs right at the threshold become candidates
+        self.assertGreater(1 - (1 - 0.7 ** rows) ** bands, 0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from datetime import datetime
+
+from services import analytics_service
+
+
+class TestTrendBucketStarts(unittest.TestCase):
+    def test_daily_buckets_end_today(self):
+        end = datetime(2024, 3, 10, 15, 30)
+        starts = analytics_service.get_trend_bucket_starts(end, 7, 'day')
+
+        self.assertEqual(len(starts), 7)
+        self.assertEqual(starts[0], datetime(2024, 3, 4))
+        self.assertEqual(starts[-1], datetime(2024, 3, 10))
+
+    def test_weekly_buckets_start_on_monday(self):
+        end = datetime(2024, 3, 10, 15, 30)  # Sunday
+        starts = analytics_service.get_trend_bucket_starts(end, 12, 'week')
+
+        self.assertEqual(starts[-1], datetime(2024, 3, 4))
+        self.assertTrue(all(start.weekday() == 0 for start in starts))
+        self.assertEqual((starts[-1] - starts[0]).days, 77)
+
+    def test_monthly_buckets_cross_year_boundary(self):
+        end = datetime(2024, 2, 20)
+        starts = analytics_service.get_trend_bucket_starts(end, 12, 'month')
+
+        self.assertEqual(starts[0], datetime(2023, 3, 1))
+        self.assertEqual(starts[-1], datetime(2024, 2, 1))
+
+
+class TestRiskFactors(unittest.TestCase):
+    def test_activity_is_derived_from_skill_breakdown(self):
+        student = {
+            'progress': 40,
+            'skillBreakdown': {
+                'Loops': {'questionsAttempted': 3},
+                'Recursion': {'questionsAttempted': 0},
+            },
+        }
+
+        factors = analytics_service.analyze_risk_factors([student], 0.7)
+
+        self.assertEqual(factors['inactiveStudents']['count'], 1)
+        self.assertEqual(factors['lowCompletion']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
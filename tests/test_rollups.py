@@ -0,0 +1,131 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from services import analytics_service, rollup_service
+
+
+def evaluate(expression, doc):
+    """Evaluate the few aggregation operators the bucket updates use against a stored bucket."""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    (operator, args), = expression.items()
+    values = evaluate(args, doc)
+    if operator == '$ifNull':
+        return values[1] if values[0] is None else values[0]
+    if operator == '$add':
+        return sum(values)
+    if operator in ('$min', '$max'):
+        present = [value for value in values if value is not None]
+        return (min if operator == '$min' else max)(present)
+    if operator == '$gte':
+        return values[0] >= values[1]
+    if operator == '$cond':
+        return values[1] if values[0] else values[2]
+    if operator == '$setUnion':
+        return sorted(set().union(*values))
+    raise ValueError(operator)
+
+
+class TestBuildBucketUpdates(unittest.TestCase):
+    def test_events_are_folded_into_one_upsert_per_bucket(self):
+        events = [
+            {'course_id': '42', 'skill_id': 'Loops', 'student_id': 's1',
+             'progress_percentage': 50, 'timestamp': datetime(2024, 3, 6, 9)},
+            {'course_id': '42', 'skill_id': 'Loops', 'student_id': 's2',
+             'progress_percentage': 90, 'timestamp': datetime(2024, 3, 6, 17)},
+        ]
+
+        updates = rollup_service.build_bucket_updates(events)
+        by_key = {
+            (op._filter['scope'], op._filter['granularity'], op._filter['student_id']): op._doc[0]['$set']
+            for op in updates
+        }
+
+        # course + skill buckets shared, one student bucket each, for day and week
+        self.assertEqual(len(updates), 8)
+        course_day = by_key[('course', 'day', None)]
+        self.assertEqual(course_day['count']['$add'][1], 2)
+        self.assertEqual(course_day['sum_progress']['$add'][1], 140)
+        self.assertEqual(course_day['passing']['$add'][1], 1)
+        self.assertEqual(course_day['last_progress']['$cond'][1], 90)
+        self.assertEqual(course_day['active_students']['$setUnion'][1], ['s1', 's2'])
+        self.assertNotIn('active_students', by_key[('student', 'day', 's1')])
+
+    def test_an_older_batch_does_not_overwrite_last_progress(self):
+        newer = {'count': 1, 'sum_progress': 90, 'passing': 1, 'completed': 0, 'min_progress': 90,
+                 'max_progress': 90, 'last_progress': 90, 'last_at': datetime(2024, 3, 6, 17)}
+        older_event = {'course_id': '42', 'skill_id': 'Loops', 'student_id': 's1',
+                       'progress_percentage': 50, 'timestamp': datetime(2024, 3, 6, 9)}
+
+        update = rollup_service.build_bucket_updates([older_event])[0]._doc[0]['$set']
+        applied = {name: evaluate(expression, newer) for name, expression in update.items()}
+
+        self.assertEqual(applied['last_progress'], 90)
+        self.assertEqual(applied['last_at'], datetime(2024, 3, 6, 17))
+        self.assertEqual(applied['count'], 2)
+        self.assertEqual(applied['min_progress'], 50)
+
+    def test_weekly_buckets_start_on_monday(self):
+        start = rollup_service.get_bucket_start(datetime(2024, 3, 10, 15, 30), 'week')
+        self.assertEqual(start, datetime(2024, 3, 4))
+
+
+class TestMergeBuckets(unittest.TestCase):
+    def test_buckets_from_several_courses_are_summed(self):
+        day = datetime(2024, 3, 4)
+        merged = rollup_service.merge_buckets_by_start([
+            {'bucket_start': day, 'count': 2, 'sum_progress': 100, 'passing': 1, 'completed': 0,
+             'active_students': ['s1']},
+            {'bucket_start': day, 'count': 1, 'sum_progress': 80, 'passing': 1, 'completed': 0,
+             'active_students': ['s1', 's2']},
+        ])
+
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]['count'], 3)
+        self.assertEqual(merged[0]['active_students'], {'s1', 's2'})
+
+
+class TestAnalyticsExportRows(unittest.IsolatedAsyncioTestCase):
+    async def test_comparison_rows_rank_students_by_average_progress(self):
+        day = datetime(2024, 3, 4)
+        buckets = [
+            {'student_id': 's1', 'bucket_start': day, 'count': 2, 'sum_progress': 100, 'passing': 0, 'completed': 0},
+            {'student_id': 's2', 'bucket_start': day, 'count': 1, 'sum_progress': 90, 'passing': 1, 'completed': 0},
+            {'student_id': 's1', 'bucket_start': day, 'count': 2, 'sum_progress': 180, 'passing': 2, 'completed': 0},
+        ]
+        calls = []
+
+        async def rollup_buckets(scope, granularity, start_date, end_date, course_ids=None, skill_ids=None):
+            calls.append((scope, course_ids, skill_ids))
+            return buckets
+
+        with patch.object(analytics_service, 'get_rollup_buckets', rollup_buckets):
+            rows = await analytics_service.get_analytics_export_data('42', None, 'comparison')
+
+        self.assertEqual(calls, [('student', ['42'], None)])
+        self.assertEqual([(row['student_id'], row['average_progress'], row['rank']) for row in rows],
+                         [('s2', 90.0, 1), ('s1', 70.0, 2)])
+        self.assertEqual(rows[1]['passing_rate'], 50.0)
+        self.assertEqual(rows[0]['percentile'], 50.0)
+
+    async def test_trend_rows_come_from_merged_buckets(self):
+        async def rollup_buckets(scope, granularity, start_date, end_date, course_ids=None, skill_ids=None):
+            return [{'bucket_start': datetime(2024, 3, 4), 'count': 4, 'sum_progress': 300, 'passing': 3,
+                     'completed': 1, 'active_students': ['s1', 's2']}]
+
+        with patch.object(analytics_service, 'get_rollup_buckets', rollup_buckets):
+            rows = await analytics_service.get_analytics_export_data(None, None, 'trends')
+
+        self.assertEqual(rows, [{
+            'course_id': None, 'skill_id': None, 'date': '2024-03-04', 'average_progress': 75.0,
+            'performance_score': 75.0, 'engagement_score': 2, 'activity': 4
+        }])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from datetime import datetime
+from unittest.mock import patch
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from services import achieveup_canvas_service, achieveup_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeQuestionSkillsCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.writes = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        ids = query['question_id']['$in']
+        return FakeCursor([d for d in self.docs if d['course_id'] == query['course_id'] and d['question_id'] in ids])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append({op._filter['question_id']: op._doc['$set']['skills'] for op in operations})
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_count=len(operations))
+
+
+class FlakyQuestionSkillsCollection:
+    """Fails the write of question 'bad' the way an unordered bulk_write reports it."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+        bad = [i for i, op in enumerate(operations) if op._filter['question_id'] == 'bad']
+        if bad:
+            raise BulkWriteError({
+                'writeErrors': [{'index': bad[0], 'code': 11000, 'errmsg': 'E11000 duplicate key'}],
+                'nMatched': 1, 'nModified': 1, 'nUpserted': len(operations) - 2
+            })
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_count=len(operations))
+
+
+class FakeImportStatusCollection:
+    def __init__(self):
+        self.doc = {}
+
+    async def update_one(self, query, update, upsert=False):
+        job = self.doc.get('assignments_job', {})
+        if 'assignments_job.job_id' in query and job.get('job_id') != query['assignments_job.job_id']:
+            return
+        for key, value in {**update.get('$set', {}), **update.get('$max', {})}.items():
+            if key.startswith('assignments_job.'):
+                job[key.split('.', 1)[1]] = value
+            elif key == 'assignments_job':
+                job = dict(value)
+            else:
+                self.doc[key] = value
+        self.doc['assignments_job'] = job
+
+    async def find_one(self, query, projection=None):
+        job = self.doc.get('assignments_job', {})
+        if any(job.get(key.split('.', 1)[1]) != value for key, value in query.items()):
+            return None
+        return self.doc
+
+
+QUIZZES = {
+    'src': [{'id': 's1', 'title': 'Quiz 1'}, {'id': 's2', 'title': 'Quiz 2'}, {'id': 's3', 'title': 'Old quiz'}],
+    'dst': [{'id': 't1', 'title': 'Quiz 1'}, {'id': 't2', 'title': 'quiz 2 '}],
+}
+QUESTIONS = {
+    's1': [{'id': '11', 'question_text': 'What does <b>TCP</b> stand for?'}],
+    's2': [{'id': '21', 'question_text': 'How many bits are in an IPv4 address of 32 parts'},
+           {'id': '22', 'question_text': 'Unassigned question'}],
+    't1': [{'id': '91', 'question_text': 'What does TCP stand for'}],
+    't2': [{'id': '92', 'question_text': 'How many bits are in an IPv4 address of 32 part'}],
+}
+
+
+class TestConcurrentSkillImport(unittest.IsolatedAsyncioTestCase):
+    async def test_import_job_fetches_concurrently_and_writes_once(self):
+        in_flight = 0
+        peak = 0
+
+        async def course_quizzes(canvas_token, course_id):
+            return QUIZZES[course_id]
+
+        async def quiz_questions(canvas_token, quiz_id, course_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return QUESTIONS[quiz_id]
+
+        async def canvas_access(token, user_id):
+            return {'canvas_token': 'canvas'}
+
+        async def verify(token):
+            return {'user': {'id': 'u1'}}
+
+        skills = FakeQuestionSkillsCollection([
+            {'course_id': 'src', 'question_id': '11', 'skills': ['Networking']},
+            {'course_id': 'src', 'question_id': '21', 'skills': ['Addressing']},
+        ])
+        status = FakeImportStatusCollection()
+
+        with patch.object(achieveup_service, 'get_import_canvas_token', canvas_access), \
+                patch.object(achieveup_service, 'achieveup_verify_token', verify), \
+                patch.object(achieveup_service, 'achieveup_question_skills_collection', skills), \
+                patch.object(achieveup_service, 'achieveup_import_status_collection', status), \
+                patch.object(achieveup_canvas_service, 'get_instructor_course_quizzes', course_quizzes), \
+                patch.object(achieveup_canvas_service, 'get_instructor_quiz_questions', quiz_questions):
+            started = await achieveup_service.start_skill_import_job('src', 'dst', 'u1', 'token')
+            await asyncio.gather(*achieveup_service._skill_import_tasks)
+            job = await achieveup_service.get_skill_import_job('token', started['job_id'])
+
+        self.assertEqual(peak, 4)  # both quizzes' source and target questions at once
+        self.assertEqual(len(skills.queries), 1)
+        self.assertEqual(skills.queries[0]['question_id']['$in'], ['11', '21', '22'])
+        self.assertEqual(skills.writes, [{'91': ['Networking'], '92': ['Addressing']}])
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['fetched_quizzes'], 2)
+        self.assertEqual(job['result'], {'matched_quizzes': 2, 'matched_questions': 2, 'imported_count': 2})
+        self.assertEqual([(d['quiz_title'], d['status']) for d in job['details']], [
+            ('Old quiz', 'skipped'), ('Quiz 1', 'imported'), ('Quiz 2', 'imported')
+        ])
+        self.assertLess(job['details'][2]['question_matches'][0]['confidence'], 1.0)
+
+    async def test_jobs_are_only_visible_to_their_owner_and_expire_without_progress(self):
+        async def verify(token):
+            return {'user': {'id': token}}
+
+        status = FakeImportStatusCollection()
+        status.doc = {'source_course_id': 'src', 'target_course_id': 'dst', 'assignments_job': {
+            'job_id': 'j1', 'user_id': 'u1', 'status': 'running',
+            'started_at': datetime(2026, 1, 1), 'updated_at': datetime(2026, 1, 1)
+        }}
+
+        with patch.object(achieveup_service, 'achieveup_verify_token', verify), \
+                patch.object(achieveup_service, 'achieveup_import_status_collection', status):
+            other = await achieveup_service.get_skill_import_job('u2', 'j1')
+            job = await achieveup_service.get_skill_import_job('u1', 'j1')
+
+        self.assertEqual(other['statusCode'], 404)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(status.doc['assignments_job']['status'], 'failed')
+
+
+class TestSkillAssignmentWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_chunked_writes_report_counts_and_per_question_errors(self):
+        collection = FlakyQuestionSkillsCollection()
+        assignments = {qid: {'skills': ['Loops']} for qid in ['q1', 'q2', 'bad', 'q4', 'q5']}
+
+        with patch.object(achieveup_service, 'achieveup_question_skills_collection', collection), \
+                patch.object(Config, 'ASSIGNMENT_WRITE_BATCH_SIZE', 3):
+            summary = await achieveup_service.write_question_skill_assignments('c1', assignments, replace=True)
+
+        self.assertEqual([len(batch) for batch in collection.batches], [3, 2])
+        self.assertIsInstance(collection.batches[0][0], ReplaceOne)
+        self.assertEqual(collection.batches[0][0]._doc, {'skills': ['Loops'], 'course_id': 'c1', 'question_id': 'q1'})
+        self.assertEqual(summary['upserted'], 1 + 2)
+        self.assertEqual(summary['matched'], 1)
+        self.assertEqual(summary['errors'], [{'question_id': 'bad', 'error': 'E11000 duplicate key'}])
+
+
+class FakeQuestionSkillIndexCollection:
+    """Groups assignments the way the duplicate-finding aggregation does."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.deleted = []
+        self.indexes = []
+
+    async def index_information(self):
+        return {'_id_': {}}
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        groups = {}
+        newest_first = sorted(
+            self.docs, key=lambda doc: (max(doc.get('updated_at', 0), doc.get('assigned_at', 0)), doc['_id']), reverse=True
+        )
+        for doc in newest_first:
+            groups.setdefault((doc['course_id'], doc['question_id']), []).append(doc['_id'])
+        return FakeCursor([{'ids': ids, 'count': len(ids)} for ids in groups.values() if len(ids) > 1])
+
+    async def delete_many(self, query):
+        self.deleted.extend(query['_id']['$in'])
+        return SimpleNamespace(deleted_count=len(query['_id']['$in']))
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(kwargs['name'])
+
+
+class TestQuestionSkillIndex(unittest.IsolatedAsyncioTestCase):
+    async def test_duplicates_are_removed_keeping_the_newest_before_the_unique_index(self):
+        collection = FakeQuestionSkillIndexCollection([
+            {'_id': 'old', 'course_id': '42', 'question_id': '1', 'updated_at': 1},
+            {'_id': 'newest', 'course_id': '42', 'question_id': '1', 'assigned_at': 3},
+            {'_id': 'middle', 'course_id': '42', 'question_id': '1', 'updated_at': 2},
+            {'_id': 'other', 'course_id': '42', 'question_id': '2', 'updated_at': 1},
+        ])
+
+        with patch.object(achieveup_service, 'achieveup_question_skills_collection', collection):
+            await achieveup_service.ensure_question_skill_indexes()
+
+        self.assertEqual(sorted(collection.deleted), ['middle', 'old'])
+        self.assertEqual(collection.indexes, [achieveup_service.QUESTION_SKILL_UNIQUE_INDEX])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from services import skill_index_service
+from services.achieveup_ai_service import classify_question_skills_keywords
+from services.skill_index_service import SkillIndex, get_matrix_skill_index
+
+SKILLS = ['Web Design', 'Database Design', 'Network Security', {'name': 'JavaScript Programming'}]
+
+
+class TestSkillIndex(unittest.TestCase):
+    def test_shared_tokens_weigh_less_than_distinctive_ones(self):
+        index = SkillIndex(SKILLS)
+
+        design = index.score('Explain the design of this page')['overlap']
+        database = index.score('Which database engine fits?')['overlap']
+
+        # 'design' appears in two skill names, 'database' in one
+        self.assertLess(design[1], database[1])
+        self.assertAlmostEqual(design[1] + database[1], 1.0)
+
+    def test_batch_scores_match_single_scores(self):
+        index = SkillIndex(SKILLS)
+        texts = ['Write a SQL query over the orders table', 'Which TCP packet flag opens a connection?',
+                 'Use a media query for mobile layouts', 'Nothing relevant here']
+
+        batch = index.score_batch(texts)
+        for i, text in enumerate(texts):
+            single = index.score(text)
+            for name in ('overlap', 'matched', 'groups'):
+                np.testing.assert_allclose(batch[name][i], single[name])
+
+        self.assertEqual(batch['groups'][0].tolist(), [0, 1, 0, 0])  # 'table' -> database terms
+        self.assertEqual(batch['groups'][2].tolist(), [0, 0, 0, 0])  # no skill name contains 'responsive'
+
+    def test_matrix_index_is_rebuilt_when_the_matrix_changes(self):
+        skill_index_service._skill_index_cache.clear()
+        matrix = {'_id': 'm1', 'skills': ['Web Design'], 'updated_at': datetime(2024, 1, 1)}
+
+        first = get_matrix_skill_index(matrix)
+        self.assertIs(get_matrix_skill_index(dict(matrix)), first)
+
+        updated = get_matrix_skill_index({**matrix, 'skills': ['Web Design', 'SQL'], 'updated_at': datetime(2024, 2, 1)})
+        self.assertEqual(updated.skills, ['Web Design', 'SQL'])
+
+    def test_keyword_classifier_ranks_by_name_and_related_keywords(self):
+        skills = ['Network Protocols', 'Database Management', 'Data Structures']
+
+        self.assertEqual(
+            classify_question_skills_keywords('Write a database query that will select rows', skills),
+            ['Database Management']
+        )
+        self.assertEqual(classify_question_skills_keywords('Unrelated', skills), ['Network Protocols'])
+
+
+if __name__ == '__main__':
+    unittest.main()
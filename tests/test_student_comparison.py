@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import patch
+
+from services import analytics_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = [dict(doc) for doc in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+class FakeStudentAnalyticsCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.find_calls = 0
+
+    def find(self, query):
+        self.find_calls += 1
+        return FakeCursor(d for d in self.docs if d['course_id'] == query['course_id'])
+
+
+STUDENTS = [
+    {'course_id': '42', 'user_id': 'a', 'progress_percentage': 90},
+    {'course_id': '42', 'user_id': 'b', 'progress_percentage': 60},
+    {'course_id': '42', 'user_id': 'c', 'progress_percentage': 60},
+    {'course_id': '42', 'user_id': 'd', 'progress_percentage': 10},
+]
+
+
+class TestComparisonIndex(unittest.TestCase):
+    def test_percentile_rank_and_distribution(self):
+        index = analytics_service.build_comparison_index(STUDENTS)
+
+        percentile = analytics_service.calculate_percentile_comparison('b', index)
+        self.assertEqual(percentile['percentile'], 25.0)
+        self.assertEqual(percentile['rank'], 2)
+        self.assertEqual(analytics_service.calculate_ranking_comparison('c', index)['user_rank'], 2)
+
+        distribution = analytics_service.calculate_distribution_comparison(index)
+        self.assertEqual(distribution['distribution'], {'0-25%': 1, '25-50%': 0, '50-75%': 2, '75-100%': 1})
+        self.assertEqual(distribution['statistics']['median'], 60.0)
+
+
+class TestComparisonIndexCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        analytics_service._comparison_index_cache.clear()
+
+    async def test_index_is_rebuilt_only_when_sync_version_changes(self):
+        collection = FakeStudentAnalyticsCollection(STUDENTS)
+        versions = iter([3, 3, 4])
+
+        async def sync_version(course_id):
+            return next(versions)
+
+        with patch.object(analytics_service, 'achieveup_student_analytics_collection', collection), patch.object(
+            analytics_service, 'get_course_sync_version', sync_version
+        ):
+            await analytics_service.get_comparison_index('42')
+            await analytics_service.get_comparison_index('42')
+            self.assertEqual(collection.find_calls, 1)
+
+            await analytics_service.get_comparison_index('42')
+            self.assertEqual(collection.find_calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
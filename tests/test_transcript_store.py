@@ -0,0 +1,103 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from services import transcript_store_service
+from services.transcript_store_service import StoredTranscript
+from utils import youtube_utils
+
+SEGMENTS = [
+    {'text': 'welcome back to the networking course', 'start': 0.0, 'duration': 4.5},
+    {'text': 'today we look at how hosts exchange packets', 'start': 4.5, 'duration': 5.25},
+    {'text': 'routers forward packets between networks', 'start': 40.0, 'duration': 6.0},
+    {'text': 'a tcp connection starts with the three way', 'start': 80.12, 'duration': 3.0},
+    {'text': 'handshake: syn, syn-ack and ack', 'start': 83.12, 'duration': 4.0},
+    {'text': 'the handshake also agrees on sequence numbers', 'start': 140.0, 'duration': 5.0},
+]
+
+
+class FakeTranscriptsCollection:
+    def __init__(self):
+        self.docs = {}
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        docs = [self.docs[key] for key in query['_id']['$in'] if key in self.docs]
+
+        async def to_list(length):
+            return docs
+        return SimpleNamespace(to_list=to_list)
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query['_id']] = update['$set']
+
+
+class FakeFetchedTranscript:
+    language_code = 'en'
+
+    def __iter__(self):
+        return iter([SimpleNamespace(**segment) for segment in SEGMENTS])
+
+
+class FakeTranscriptApi:
+    downloads = 0
+
+    def fetch(self, video_id, languages):
+        FakeTranscriptApi.downloads += 1
+        return FakeFetchedTranscript()
+
+
+class TestStoredTranscript(unittest.TestCase):
+    def test_document_round_trip(self):
+        transcript = StoredTranscript.from_segments('vid', 'en', SEGMENTS)
+        document = transcript.to_document()
+        restored = StoredTranscript.from_document({**document, '_id': 'vid:en'})
+
+        self.assertEqual(restored.segments(), SEGMENTS)
+        self.assertEqual(len(document['starts_ms']), 4 * len(SEGMENTS))
+        self.assertEqual(restored.token_index['packet'].tolist(), [1, 2])
+
+    def test_search_prefers_the_window_with_most_topic_terms(self):
+        transcript = StoredTranscript.from_segments('vid', 'en', SEGMENTS)
+
+        match = transcript.search('TCP three-way handshake', window=30)
+        self.assertEqual(match['segment_index'], 3)
+        self.assertEqual(match['start'], 80.12)
+        self.assertEqual(match['matched_terms'], ['tcp', 'three', 'way', 'handshake'])
+        self.assertIsNone(transcript.search('binary search trees'))
+
+
+class TestTranscriptCache(unittest.IsolatedAsyncioTestCase):
+    async def test_transcript_is_downloaded_once_and_searched_from_the_store(self):
+        collection = FakeTranscriptsCollection()
+        FakeTranscriptApi.downloads = 0
+        transcript_store_service._transcript_cache.clear()
+
+        with patch.object(transcript_store_service, 'video_transcripts_collection', collection), \
+                patch.object(youtube_utils, 'YouTubeTranscriptApi', FakeTranscriptApi):
+            first = await youtube_utils.fetch_video_transcript('https://www.youtube.com/watch?v=abcdefghijk')
+            transcript_store_service._transcript_cache.clear()
+            second = await youtube_utils.fetch_video_transcript('abcdefghijk')
+            match = await youtube_utils.find_video_timestamp('abcdefghijk', 'tcp handshake')
+
+        self.assertEqual(FakeTranscriptApi.downloads, 1)
+        self.assertEqual(list(collection.docs), ['abcdefghijk:en'])
+        self.assertEqual(first, second)
+        self.assertEqual(second['transcript'], SEGMENTS)
+        self.assertEqual(match['deep_link'], 'https://www.youtube.com/watch?v=abcdefghijk&t=78s')
+
+    async def test_fallback_languages_are_served_from_the_cache(self):
+        collection = FakeTranscriptsCollection()
+        transcript_store_service._transcript_cache.clear()
+
+        with patch.object(transcript_store_service, 'video_transcripts_collection', collection):
+            await transcript_store_service.store_transcript('abcdefghijk', 'es', SEGMENTS)
+            transcript = await transcript_store_service.get_stored_transcript('abcdefghijk', ['en', 'es'])
+
+        self.assertEqual(transcript.language, 'es')
+        self.assertEqual(collection.queries, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from services import video_metadata_service
+
+
+class FakeResponse:
+    def __init__(self, items):
+        self.items = items
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return {'items': self.items}
+
+
+class FakeSession:
+    """The videos endpoint: every ID exists except those starting with 'gone'."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None):
+        ids = params['id'].split(',')
+        self.calls.append(ids)
+        return FakeResponse([
+            {'id': video_id, 'snippet': {'title': f'Video {video_id} &amp; more', 'channelTitle': 'Channel',
+                                         'thumbnails': {'high': {'url': f'https://i.ytimg.com/{video_id}.jpg'}}}}
+            for video_id in ids if not video_id.startswith('gone')
+        ])
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeQuizzesCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.updates = {}
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            self.updates[op._filter['_id']] = op._doc['$set']
+
+
+class TestVideoMetadata(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        video_metadata_service._video_metadata_cache.clear()
+        self.session = FakeSession()
+        self.patch = patch.object(video_metadata_service, 'get_metadata_session', lambda: self.session)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    async def test_concurrent_lookups_share_batched_calls_and_the_cache(self):
+        video_ids = [f'video{i:06d}' for i in range(60)] + ['gone0000001']
+        results = await asyncio.gather(*(
+            video_metadata_service.lookup_video_metadata(video_id) for video_id in video_ids * 2
+        ))
+
+        self.assertEqual([len(ids) for ids in self.session.calls], [50, 11])
+        self.assertEqual(results[0]['title'], 'Video video000000 & more')
+        self.assertEqual(results[60], {'error': 'Video not found'})
+        self.assertEqual(results[61], results[0])
+
+        metadata = await video_metadata_service.get_video_metadata('https://www.youtube.com/watch?v=video000001')
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertEqual(metadata['link'], 'https://www.youtube.com/watch?v=video000001')
+
+    async def test_refresh_updates_live_videos_and_flags_dead_links(self):
+        collection = FakeQuizzesCollection([
+            {'_id': 1, 'video_data': {'link': 'https://youtu.be/video000001'}},
+            {'_id': 2, 'video_data': {'link': 'https://www.youtube.com/watch?v=video000001'}},
+            {'_id': 3, 'video_data': {'link': 'https://youtu.be/gone0000001'}},
+            {'_id': 4, 'video_data': {'link': 'https://example.com'}},
+        ])
+        with patch.object(video_metadata_service, 'quizzes_collection', collection):
+            summary = await video_metadata_service.refresh_video_links()
+
+        self.assertEqual(self.session.calls, [['video000001', 'gone0000001']])
+        self.assertEqual(summary['refreshed_links'], 2)
+        self.assertEqual(summary['unavailable_links'], 2)
+        self.assertEqual(collection.updates[2]['video_data.title'], 'Video video000001 & more')
+        self.assertEqual(collection.updates[3]['video_data.unavailable_reason'], 'not_found')
+        self.assertEqual(collection.updates[4]['video_data.unavailable_reason'], 'invalid_link')
+
+
+class FakeRefreshJobsCollection:
+    def __init__(self, jobs=()):
+        self.jobs = {job['_id']: job for job in jobs}
+
+    async def update_many(self, query, update):
+        for job in self.jobs.values():
+            if job['status'] == query['status'] and job['updated_at'] < query['updated_at']['$lt']:
+                job.update(update['$set'])
+
+    async def find_one(self, query):
+        return next((job for job in self.jobs.values() if all(job.get(k) == v for k, v in query.items())), None)
+
+    async def insert_one(self, job):
+        self.jobs[job['_id']] = job
+
+
+class TestVideoLinkRefreshJobs(unittest.IsolatedAsyncioTestCase):
+    async def test_only_one_refresh_runs_at_a_time(self):
+        jobs = FakeRefreshJobsCollection([
+            {'_id': 'stale', 'course_id': None, 'status': 'running', 'updated_at': datetime(2026, 1, 1)}
+        ])
+
+        async def run_job(job_id, course_id=None):
+            return None
+
+        with patch.object(video_metadata_service, 'video_link_refresh_jobs_collection', jobs), \
+                patch.object(video_metadata_service, 'run_video_link_refresh_job', run_job):
+            started = await video_metadata_service.start_video_link_refresh_job('c1')
+            repeated = await video_metadata_service.start_video_link_refresh_job('c1')
+            other = await video_metadata_service.start_video_link_refresh_job('c2')
+            await asyncio.gather(*video_metadata_service._video_link_refresh_tasks)
+
+        self.assertEqual(jobs.jobs['stale']['status'], 'failed')
+        self.assertEqual(repeated['job_id'], started['job_id'])
+        self.assertEqual(other['statusCode'], 409)
+        self.assertEqual(other['job_id'], started['job_id'])
+        self.assertEqual([job['_id'] for job in jobs.jobs.values() if job['status'] == 'running'], [started['job_id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from utils import youtube_utils
+
+
+class FakeVideosSearch:
+    """A blocking search returning one video, or nothing for 'nothing'; 'broken' raises."""
+    queries = []
+
+    def __init__(self, query, limit=1):
+        self.query = query
+
+    def result(self):
+        FakeVideosSearch.queries.append(self.query)
+        time.sleep(0.02)
+        if self.query == 'broken':
+            raise RuntimeError('scrape failed')
+        if self.query == 'nothing':
+            return {'result': []}
+        return {'result': [{'title': 'Intro &amp; more', 'link': 'https://youtu.be/x',
+                            'channel': {'name': 'Channel'}, 'thumbnails': [{'url': 'thumb'}]}]}
+
+
+class TestVideoSearch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        FakeVideosSearch.queries = []
+        self.cache = {}
+
+        async def cached_candidates(topic):
+            return self.cache.get(youtube_utils.normalize_topic(topic))
+
+        async def store_candidates(topic, videos):
+            self.cache[youtube_utils.normalize_topic(topic)] = videos
+
+        self.patches = [
+            patch.object(youtube_utils, 'VideosSearch', FakeVideosSearch),
+            patch.object(youtube_utils, 'get_cached_video_candidates', cached_candidates),
+            patch.object(youtube_utils, 'store_video_candidates', store_candidates),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    async def test_concurrent_requests_for_a_topic_share_one_search(self):
+        videos = await asyncio.gather(*(
+            youtube_utils.fetch_video_for_topic(topic) for topic in ['TCP Handshake', 'tcp  handshake'] * 5
+        ))
+
+        self.assertEqual(FakeVideosSearch.queries, ['TCP Handshake'])
+        self.assertEqual(videos[0]['title'], 'Intro & more')
+        self.assertIsNot(videos[0], videos[1])
+        # Later calls are served from the cache
+        await youtube_utils.fetch_video_for_topic('TCP handshake')
+        self.assertEqual(len(FakeVideosSearch.queries), 1)
+
+    async def test_empty_results_are_cached_but_failures_are_not(self):
+        self.assertEqual(await youtube_utils.fetch_video_for_topic('nothing'), {})
+        self.assertIsNone(await youtube_utils.fetch_video_for_topic('broken'))
+        self.assertEqual(self.cache, {'nothing': []})
+
+        await youtube_utils.fetch_video_for_topic('nothing')
+        await youtube_utils.fetch_video_for_topic('broken')
+        self.assertEqual(FakeVideosSearch.queries, ['nothing', 'broken', 'broken'])
+
+    async def test_queued_searches_do_not_time_out(self):
+        # 16 searches queue for the pool; each fits the timeout, the whole queue does not
+        with patch.object(youtube_utils.Config, 'YOUTUBE_SEARCH_TIMEOUT', 0.05):
+            videos = await asyncio.gather(*(youtube_utils.fetch_video_for_topic(f'topic {i}') for i in range(16)))
+
+        self.assertEqual(len(FakeVideosSearch.queries), 16)
+        self.assertTrue(all(video and video['link'] for video in videos))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+import unittest
+from unittest.mock import patch
+
+from services import canonical_question_service, video_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeQuizzesCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.writes = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.extend((op._filter['questionid'], op._doc['$set']) for op in operations)
+
+
+class FakeContextsCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([doc for doc in self.docs if doc['course_id'] in query['course_id']['$in']])
+
+
+class FakeCanonicalStore:
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    async def get(self, canonical_ids):
+        return {cid: self.entries[cid] for cid in canonical_ids if cid in self.entries}
+
+    async def save(self, entries, overwrite=True):
+        for cid, entry in entries.items():
+            if overwrite or cid not in self.entries:
+                self.entries[cid] = entry
+
+
+async def fetch_video(topic):
+    return {'link': f'https://youtu.be/{topic}'}
+
+
+class TestBatchedVideoUpdates(unittest.IsolatedAsyncioTestCase):
+    def use_store(self, store):
+        for name, fake in (('get_canonical_questions', store.get), ('save_canonical_topics', store.save)):
+            p = patch.object(video_service, name, fake)
+            p.start()
+            self.addCleanup(p.stop)
+
+    async def test_topics_are_generated_per_course_batch_with_single_question_fallback(self):
+        self.use_store(FakeCanonicalStore())
+        quizzes = FakeQuizzesCollection([
+            {'questionid': '1', 'courseid': 'c1', 'course_name': 'Bio', 'question_text': 'Photosynthesis?'},
+            {'questionid': '2', 'courseid': 'c1', 'course_name': 'Bio', 'question_text': 'Mitosis?'},
+            {'questionid': '3', 'courseid': 'c1', 'course_name': 'Bio', 'question_text': 'Done', 'video_data': {'link': 'x'}},
+            {'questionid': '4', 'courseid': 'c2', 'course_name': 'CS', 'question_text': 'Recursion?'},
+        ])
+        contexts = FakeContextsCollection([{'course_id': 'c1', 'course_context': 'Plant cells'}])
+        batch_calls = []
+        single_calls = []
+
+        async def topics_batch(texts, course_name, course_context=''):
+            batch_calls.append((texts, course_name, course_context))
+            # The model skips "Mitosis?"
+            return {i: f'{text} topic' for i, text in enumerate(texts) if text != 'Mitosis?'}
+
+        async def single_topic(text, course_name, course_context=''):
+            single_calls.append(text)
+            return {'success': True, 'core_topic': 'Cell division'}
+
+        with patch.object(video_service, 'quizzes_collection', quizzes), \
+                patch.object(video_service, 'contexts_collection', contexts), \
+                patch.object(video_service, 'generate_core_topics_batch', topics_batch), \
+                patch.object(video_service, 'generate_core_topic', single_topic), \
+                patch.object(video_service, 'fetch_video_for_topic', fetch_video):
+            await video_service.update_videos_for_filter()
+
+        self.assertEqual(len(contexts.queries), 1)
+        self.assertEqual(sorted(batch_calls), [
+            (['Photosynthesis?', 'Mitosis?'], 'Bio', 'Plant cells'),
+            (['Recursion?'], 'CS', ''),
+        ])
+        self.assertEqual(single_calls, ['Mitosis?'])
+        self.assertEqual(dict((qid, update['core_topic']) for qid, update in quizzes.writes), {
+            '1': 'Photosynthesis? topic', '2': 'Cell division', '4': 'Recursion? topic'
+        })
+
+    async def test_repeated_questions_are_generated_once_and_later_sections_inherit(self):
+        store = FakeCanonicalStore()
+        self.use_store(store)
+        quizzes = FakeQuizzesCollection([
+            {'questionid': '1', 'courseid': 'fall', 'course_name': 'Bio', 'question_text': 'What is <b>Photosynthesis</b>?'},
+            {'questionid': '2', 'courseid': 'spring', 'course_name': 'Bio', 'question_text': 'what is photosynthesis'},
+        ])
+        contexts = FakeContextsCollection([])
+        batch_calls = []
+
+        async def topics_batch(texts, course_name, course_context=''):
+            batch_calls.append(texts)
+            return {i: 'Photosynthesis' for i in range(len(texts))}
+
+        with patch.object(video_service, 'quizzes_collection', quizzes), \
+                patch.object(video_service, 'contexts_collection', contexts), \
+                patch.object(video_service, 'generate_core_topics_batch', topics_batch), \
+                patch.object(video_service, 'fetch_video_for_topic', fetch_video):
+            await video_service.update_videos_for_filter()
+
+            self.assertEqual(len(batch_calls), 1)
+            self.assertEqual(sorted(qid for qid, _ in quizzes.writes), ['1', '2'])
+
+            # A new section of the course gets the topic and video without any external call
+            quizzes.docs = [{'questionid': '3', 'courseid': 'summer', 'course_name': 'Bio', 'question_text': 'What is photosynthesis?'}]
+            quizzes.writes = []
+            await video_service.update_videos_for_filter()
+
+        self.assertEqual(len(batch_calls), 1)
+        self.assertEqual(quizzes.writes[0][1]['video_data'], {'link': 'https://youtu.be/Photosynthesis'})
+        self.assertEqual(len(store.entries), 1)
+
+    async def test_failed_searches_leave_questions_pending(self):
+        store = FakeCanonicalStore()
+        self.use_store(store)
+        quizzes = FakeQuizzesCollection([
+            {'questionid': '1', 'courseid': 'c1', 'course_name': 'Bio', 'question_text': 'Photosynthesis?'},
+            {'questionid': '2', 'courseid': 'c1', 'course_name': 'Bio', 'question_text': 'Mitosis?'},
+        ])
+
+        async def topics_batch(texts, course_name, course_context=''):
+            return {i: text.rstrip('?') for i, text in enumerate(texts)}
+
+        async def flaky_fetch(topic):
+            return None if topic == 'Mitosis' else await fetch_video(topic)
+
+        with patch.object(video_service, 'quizzes_collection', quizzes), \
+                patch.object(video_service, 'contexts_collection', FakeContextsCollection([])), \
+                patch.object(video_service, 'generate_core_topics_batch', topics_batch), \
+                patch.object(video_service, 'fetch_video_for_topic', flaky_fetch):
+            await video_service.update_videos_for_filter()
+
+        self.assertEqual([qid for qid, _ in quizzes.writes], ['1'])
+        self.assertEqual([entry['core_topic'] for entry in store.entries.values()], ['Photosynthesis'])
+
+    async def test_known_topics_without_a_video_only_search_again(self):
+        store = FakeCanonicalStore()
+        self.use_store(store)
+        quizzes = FakeQuizzesCollection([
+            {'questionid': '1', 'course_name': 'Bio', 'question_text': 'Photosynthesis?'},
+        ])
+        searches = []
+
+        async def topics_batch(texts, course_name, course_context=''):
+            raise AssertionError('topic already known')
+
+        async def record_fetch(topic):
+            searches.append(topic)
+            return {} if len(searches) == 1 else await fetch_video(topic)
+
+        async def first_topics(texts, course_name, course_context=''):
+            return {0: 'Light reactions'}
+
+        with patch.object(video_service, 'quizzes_collection', quizzes), \
+                patch.object(video_service, 'contexts_collection', FakeContextsCollection([])), \
+                patch.object(video_service, 'fetch_video_for_topic', record_fetch):
+            with patch.object(video_service, 'generate_core_topics_batch', first_topics):
+                await video_service.update_videos_for_filter()
+            # YouTube found nothing: the question stays without a video
+            self.assertEqual(quizzes.writes[0][1]['video_data'], {})
+
+            quizzes.writes = []
+            with patch.object(video_service, 'generate_core_topics_batch', topics_batch):
+                await video_service.update_videos_for_filter()
+
+        self.assertEqual(searches, ['Light reactions', 'Light reactions'])
+        self.assertEqual(quizzes.writes, [('1', {
+            'core_topic': 'Light reactions', 'video_data': {'link': 'https://youtu.be/Light reactions'},
+            'canonical_id': video_service.get_canonical_id('Photosynthesis?')
+        })])
+
+
+class FakeCanonicalCollection:
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+class TestSaveCanonicalTopics(unittest.IsolatedAsyncioTestCase):
+    async def test_missing_course_ids_are_not_added(self):
+        collection = FakeCanonicalCollection()
+        with patch.object(canonical_question_service, 'canonical_questions_collection', collection):
+            await canonical_question_service.save_canonical_topics({
+                'a': {'question_text': 'A?', 'course_id': None, 'core_topic': 'A', 'video_data': {}},
+                'b': {'question_text': 'B?', 'course_id': 'c1', 'core_topic': 'B', 'video_data': {}},
+            })
+
+        self.assertNotIn('$addToSet', collection.operations[0]._doc)
+        self.assertEqual(collection.operations[1]._doc['$addToSet'], {'course_ids': 'c1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,17 @@
 # Import necessary libraries
 import asyncio
-from openai import AsyncOpenAI
+import json
 from config import Config
-# Initialize OpenAI client with your API key
-client = AsyncOpenAI(api_key=Config.OPENAI_KEY)
+from services.ai_gateway_service import create_chat_completion_with_usage
+from services.ai_cache_service import (
+    build_ai_cache_key,
+    cached_ai_completion,
+    get_cached_ai_responses,
+    store_ai_responses
+)
 
 # Define the coroutine for generating core topic with GPT
-async def generate_core_topic(question_text, course_name, course_context=""):
+async def generate_core_topic(question_text, course_name, course_context="", bypass_cache=False):
     """
     Generate a concise core topic using GPT for a given question.
 
@@ -14,6 +19,7 @@ async def generate_core_topic(question_text, course_name, course_context=""):
     - question_text (str): The text of the question.
     - course_name (str): The name of the course the question belongs to.
     - course_context (str): Additional context for the course, provided by the instructor.
+    - bypass_cache (bool): Ask the model again instead of reusing a cached topic.
 
     Returns:
     - str: A concise topic title relevant to the question and course.
@@ -34,22 +40,100 @@ async def generate_core_topic(question_text, course_name, course_context=""):
     messages = [{"role": "user", "content": prompt}]
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            #temperature=0.7,
-            max_completion_tokens=10000,
+        # Extract and clean up the generated topic
+        core_topic = await cached_ai_completion(
+            'core_topic', 'core_topic',
+            {'question': question_text, 'course': course_name, 'context': course_context},
+            messages,
+            lambda content: clean_core_topic(content) or None,
+            bypass_cache=bypass_cache,
             top_p=0.5
         )
-        
-        # Extract and clean up the generated topic
-        core_topic = response.choices[0].message.content.strip().strip('"').strip("'")
+        if not core_topic:
+            return {"success": False, "error": "Empty core topic"}
         return {"success": True, "core_topic": core_topic}
 
     except Exception as e:
         print(f"Error generating core topic: {e}")
         return {"success": False, "error": str(e)}
 
+def clean_core_topic(content):
+    """Strip whitespace and quotes from a generated topic."""
+    return str(content).strip().strip('"').strip("'")
+
+async def generate_core_topics_batch(question_texts, course_name, course_context="", bypass_cache=False):
+    """
+    Generate core topics for several questions of one course with a single GPT call.
+
+    Topics are cached under the same keys as generate_core_topic, so only
+    questions without a cached topic are sent to the model.
+
+    Parameters:
+    - question_texts (list): The texts of the questions.
+    - course_name (str): The name of the course the questions belong to.
+    - course_context (str): Additional context for the course, provided by the instructor.
+    - bypass_cache (bool): Ask the model again instead of reusing cached topics.
+
+    Returns:
+    - dict: Maps each question's position in question_texts to its topic. Positions
+      the model skipped are absent so callers can fall back to generate_core_topic.
+    """
+    topics = {}
+    keys = [
+        build_ai_cache_key('core_topic', {'question': text, 'course': course_name, 'context': course_context})
+        if Config.ENABLE_AI_CACHE else None
+        for text in question_texts
+    ]
+    if Config.ENABLE_AI_CACHE and not bypass_cache:
+        cached = await get_cached_ai_responses(keys)
+        for i, key in enumerate(keys):
+            if key in cached:
+                topics[i] = cached[key]
+
+    pending = [i for i in range(len(question_texts)) if i not in topics]
+    if not pending:
+        return topics
+
+    questions_formatted = "\n".join(f"{j}. {question_texts[i][:500]}" for j, i in enumerate(pending))
+    prompt = (
+        f"For each of the following {len(pending)} questions from course {course_name}, "
+        f"generate a concise, specific core topic that is relevant to the subject matter. "
+        f"You can assume the course is at a college/university level. "
+        f"Each topic should be no longer than 4-5 words and should directly relate to the main concepts of its question."
+    )
+    if course_context:
+        prompt += f"\nHere's what the instructor gave us, so use it to generate more relevant topics in the context of the course itself: {course_context}"
+    prompt += (
+        f"\n\nQuestions:\n{questions_formatted}\n\n"
+        'Return ONLY a JSON object mapping each question number (as a string) to its topic, e.g. {"0": "Topic", "1": "Topic"}.'
+    )
+
+    try:
+        content, usage = await create_chat_completion_with_usage(
+            'core_topic_batch',
+            [{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            top_p=0.5
+        )
+        batch_topics = json.loads(content)
+    except Exception as e:
+        print(f"Error generating core topics: {e}")
+        return topics
+
+    fresh = {}
+    for j, i in enumerate(pending):
+        topic = batch_topics.get(str(j))
+        if isinstance(topic, str) and clean_core_topic(topic):
+            topics[i] = clean_core_topic(topic)
+            if Config.ENABLE_AI_CACHE:
+                fresh[keys[i]] = topics[i]
+
+    # Spread the batch's token cost across its questions
+    await store_ai_responses('core_topic', fresh, {
+        name: round(tokens / len(pending)) for name, tokens in usage.items()
+    })
+    return topics
+
 # Main block to test the function
 if __name__ == "__main__":
     # Define a sample question and course details
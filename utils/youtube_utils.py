@@ -1,12 +1,14 @@
 # utils/youtube_utils.py
 from youtubesearchpython import VideosSearch
 import re
+from concurrent.futures import ThreadPoolExecutor
 from googleapiclient.discovery import build
 from config import Config
-import aiohttp
 import asyncio
 import html
 import logging
+from services.video_search_cache_service import get_cached_video_candidates, normalize_topic, store_video_candidates
+from services.transcript_store_service import get_stored_transcript, store_transcript
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 
@@ -22,6 +24,96 @@ def clean_metadata_text(text: str) -> str:
     """
     return html.unescape(text)
 
+# VideosSearch scrapes YouTube with blocking HTTP, so searches run on a small
+# dedicated thread pool; its size is the global limit on concurrent searches
+_youtube_search_executor = ThreadPoolExecutor(
+    max_workers=Config.YOUTUBE_SEARCH_MAX_CONCURRENCY, thread_name_prefix='youtube-search'
+)
+
+# normalized topic -> in-flight search shared by concurrent callers
+_pending_topic_searches = {}
+
+# (event loop, semaphore) admitting searches to the pool, so searches wait
+# for a thread before their timeout starts
+_youtube_search_slots = (None, None)
+
+def get_youtube_search_semaphore():
+    """Semaphore limiting running searches to the pool size, created per event loop."""
+    global _youtube_search_slots
+    loop = asyncio.get_running_loop()
+    if _youtube_search_slots[0] is not loop:
+        _youtube_search_slots = (loop, asyncio.Semaphore(Config.YOUTUBE_SEARCH_MAX_CONCURRENCY))
+    return _youtube_search_slots[1]
+
+def parse_video_result(video):
+    """Video metadata (title, link, channel, thumbnail) from one VideosSearch result."""
+    return {
+        'title': clean_metadata_text(video.get('title', 'No Title Found')),
+        'link': video.get('link', 'No Link Found'),
+        'channel': video.get('channel', {}).get('name', 'No Channel Found'),
+        'thumbnail': video.get('thumbnails', [{}])[0].get('url', 'No Thumbnail Found')
+    }
+
+def search_videos_blocking(topic, limit):
+    """Run a YouTube search on the calling thread (use search_videos_for_topic from async code)."""
+    search_results = VideosSearch(topic, limit=limit).result()
+    logging.debug(f"Raw search results for topic '{topic}': {search_results}")
+    return [parse_video_result(video) for video in search_results.get('result', [])]
+
+async def search_videos_for_topic(topic, limit=None):
+    """
+    Search YouTube for a topic without blocking the event loop.
+
+    Parameters:
+    - topic (str): The topic to search for.
+    - limit (int): Number of candidate videos (default Config.YOUTUBE_SEARCH_CANDIDATES).
+
+    Returns:
+    - list: Candidate video metadata dicts (empty if nothing was found),
+            or None if the search failed or timed out.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # Wait for a free search thread first: the timeout covers the search
+        # itself, not the time spent queued behind other searches
+        async with get_youtube_search_semaphore():
+            return await asyncio.wait_for(
+                loop.run_in_executor(
+                    _youtube_search_executor, search_videos_blocking, topic, limit or Config.YOUTUBE_SEARCH_CANDIDATES
+                ),
+                timeout=Config.YOUTUBE_SEARCH_TIMEOUT
+            )
+    except Exception as e:
+        logging.error(f"Error fetching videos for topic '{topic}': {e!r}")
+        return None
+
+async def search_and_cache_topic(topic):
+    """Search a topic and cache the result; failed searches return None and are not cached."""
+    videos = await search_videos_for_topic(topic)
+    if videos is None:
+        return None
+    await store_video_candidates(topic, videos)
+    return videos
+
+async def fetch_video_candidates(topic):
+    """
+    Candidate videos for a topic from the topic cache, searching YouTube on a miss.
+    Concurrent requests for the same topic share one search. Returns None if
+    the search failed.
+    """
+    cached = await get_cached_video_candidates(topic)
+    if cached is not None:
+        return cached
+
+    key = normalize_topic(topic)
+    search = _pending_topic_searches.get(key)
+    if search is None:
+        search = asyncio.ensure_future(search_and_cache_topic(topic))
+        _pending_topic_searches[key] = search
+        search.add_done_callback(lambda _: _pending_topic_searches.pop(key, None))
+    # Shielded so one caller giving up does not cancel the search for the others
+    return await asyncio.shield(search)
+
 async def fetch_video_for_topic(topic):
     """
     Fetch a single video for a given topic from YouTube.
@@ -32,45 +124,22 @@ async def fetch_video_for_topic(topic):
     Returns:
     - dict: A dictionary containing video metadata (title, link, channel, thumbnail),
             or an empty dictionary if no video is found.
+    - None: if the search failed or timed out.
     """
-    try:
-        # Start the search
-        logging.debug(f"Starting search for topic: {topic}")
-        search = VideosSearch(topic, limit=1)
-        
-        # Fetch search results
-        search_results = search.result()
-        logging.debug(f"Raw search results for topic '{topic}': {search_results}")
-        
-        # Parse the search results
-        results = search_results.get('result', [])
-        
-        if not results:
-            logging.warning(f"No results found for topic '{topic}'")
-            return {}
-
-        # Extract video details from the first result
-        video = results[0]  
-        
-        # Ensure video data contains expected keys
-        video_data = {
-            'title': clean_metadata_text(video.get('title', 'No Title Found')),
-            'link': video.get('link', 'No Link Found'),
-            'channel': video.get('channel', {}).get('name', 'No Channel Found'),
-            'thumbnail': video.get('thumbnails', [{}])[0].get('url', 'No Thumbnail Found')
-        }
-        
-        logging.debug(f"Extracted video data for topic '{topic}': {video_data}")
-        return video_data
-
-    except Exception as e:
-        logging.error(f"Error fetching videos for topic '{topic}': {e}")
+    logging.debug(f"Starting search for topic: {topic}")
+    candidates = await fetch_video_candidates(topic)
+    if candidates is None:
+        return None
+    if not candidates:
+        logging.warning(f"No results found for topic '{topic}'")
         return {}
-    
-
-
 
+    # Callers may add fields (e.g. transcripts) to the returned dict
+    return dict(candidates[0])
 
+def close_youtube_search_executor():
+    """Stop the search thread pool without waiting for running searches."""
+    _youtube_search_executor.shutdown(wait=False, cancel_futures=True)
 
 
 def extract_video_id(youtube_url):
@@ -83,38 +152,68 @@ def extract_video_id(youtube_url):
     return video_id
 
 
-async def get_video_metadata(youtube_url):
-    """Retrieves metadata for a YouTube video by URL asynchronously."""
-    video_id = extract_video_id(youtube_url)
-    if not video_id:
-        return {"error": "Invalid YouTube URL"}
+async def load_video_transcript(video_id, languages):
+    """
+    Get a video's transcript from the transcript store, downloading and
+    storing it on a miss.
 
-    # YouTube API URL for getting video details
-    api_url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet&id={video_id}&key={Config.YOUTUBE_API_KEY}"
+    Returns:
+    - StoredTranscript
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(api_url) as response:
-            if response.status == 200:
-                response_data = await response.json()
+    Raises the youtube_transcript_api errors if the download fails.
+    """
+    stored = await get_stored_transcript(video_id, languages)
+    if stored is not None:
+        return stored
+
+    # Run the synchronous transcript API in a thread pool to make it async-friendly
+    # New API (v1.2.3+) requires instantiating the class
+    def fetch_transcript():
+        api = YouTubeTranscriptApi()
+        fetched_transcript = api.fetch(video_id, languages=languages)
+        # Convert FetchedTranscriptSnippet objects to list of dicts format
+        return fetched_transcript.language_code, [
+            {
+                'text': snippet.text,
+                'start': snippet.start,
+                'duration': snippet.duration
+            }
+            for snippet in fetched_transcript
+        ]
 
-                if "items" in response_data and len(response_data["items"]) > 0:
-                    video = response_data["items"][0]["snippet"]
-                    metadata = {
-                        "title": clean_metadata_text(video["title"]),
-                        "link" : youtube_url,
-                        "channel": video["channelTitle"],
-                        "thumbnail": video["thumbnails"]["high"]["url"],
-                    }
-                    return metadata
-                else:
-                    return {"error": "Video not found"}
-            else:
-                return {"error": f"Failed to fetch metadata, status code: {response.status}"}
+    loop = asyncio.get_running_loop()
+    language, transcript_list = await loop.run_in_executor(None, fetch_transcript)
+    return await store_transcript(video_id, language, transcript_list)
+
+
+def get_transcript_error(error, video_id_or_url, languages):
+    """Response for a failed transcript download."""
+    if isinstance(error, TranscriptsDisabled):
+        message = 'Transcripts are disabled for this video'
+    elif isinstance(error, NoTranscriptFound):
+        message = f'No transcript found for this video in languages: {languages}'
+    elif isinstance(error, VideoUnavailable):
+        message = 'Video is unavailable or does not exist'
+    else:
+        logging.error(f"Error fetching transcript for video {video_id_or_url}: {error}")
+        message = f'Failed to fetch transcript: {str(error)}'
+    return {
+        'success': False,
+        'error': message
+    }
+
+
+def get_transcript_video_id(video_id_or_url):
+    """Video ID from a YouTube URL, or the argument itself if it is already an ID."""
+    if 'youtube.com' in video_id_or_url or 'youtu.be' in video_id_or_url:
+        return extract_video_id(video_id_or_url)
+    return video_id_or_url
 
 
 async def fetch_video_transcript(video_id_or_url, languages=['en']):
     """
-    Fetches transcript for a YouTube video.
+    Fetches transcript for a YouTube video. Each transcript is downloaded
+    once and then served from the transcript store.
     
     Parameters:
     - video_id_or_url (str): YouTube video ID or full URL
@@ -136,7 +235,7 @@ async def fetch_video_transcript(video_id_or_url, languages=['en']):
     """
     try:
         # Extract video ID if URL is provided
-        video_id = extract_video_id(video_id_or_url) if 'youtube.com' in video_id_or_url or 'youtu.be' in video_id_or_url else video_id_or_url
+        video_id = get_transcript_video_id(video_id_or_url)
         
         if not video_id:
             return {
@@ -144,58 +243,71 @@ async def fetch_video_transcript(video_id_or_url, languages=['en']):
                 'error': 'Invalid video ID or URL'
             }
         
-        # Run the synchronous transcript API in a thread pool to make it async-friendly
-        # New API (v1.2.3+) requires instantiating the class
-        def fetch_transcript():
-            api = YouTubeTranscriptApi()
-            fetched_transcript = api.fetch(video_id, languages=languages)
-            # Convert FetchedTranscriptSnippet objects to list of dicts format
-            return [
-                {
-                    'text': snippet.text,
-                    'start': snippet.start,
-                    'duration': snippet.duration
-                }
-                for snippet in fetched_transcript
-            ]
+        transcript = await load_video_transcript(video_id, languages)
+        return transcript.to_response()
         
-        loop = asyncio.get_event_loop()
-        transcript_list = await loop.run_in_executor(None, fetch_transcript)
-        
-        # Format transcript data
-        # transcript_list is a list of dicts: [{'text': '...', 'start': 0.0, 'duration': 5.0}, ...]
-        transcript_text = ' '.join([item['text'] for item in transcript_list])
-        
-        return {
+    except Exception as e:
+        return get_transcript_error(e, video_id_or_url, languages)
+
+
+async def find_video_timestamp(video_id_or_url, topic, languages=['en']):
+    """
+    Finds where in a video a topic is discussed, using the stored transcript's
+    token index.
+    
+    Parameters:
+    - video_id_or_url (str): YouTube video ID or full URL
+    - topic (str): Text to look for, e.g. a question's core topic
+    - languages (list): List of language codes to try (default: ['en'])
+    
+    Returns:
+    - dict: {
             'success': True,
-            'transcript': transcript_list,
-            'transcript_text': transcript_text,
-            'language': languages[0] if transcript_list else None,
-            'video_id': video_id
+            'video_id': '...',
+            'start': 84.0,  # seconds, a little before the matching segment
+            'segment_index': 31,
+            'segment_start': 86.0,
+            'score': 3.2,
+            'matched_terms': [...],
+            'text': '...',  # text of the matching segment
+            'deep_link': 'https://www.youtube.com/watch?v=...&t=84s'
         }
-        
-    except TranscriptsDisabled:
-        return {
-            'success': False,
-            'error': 'Transcripts are disabled for this video'
-        }
-    except NoTranscriptFound:
-        return {
-            'success': False,
-            'error': f'No transcript found for this video in languages: {languages}'
-        }
-    except VideoUnavailable:
-        return {
+        OR
+        {
             'success': False,
-            'error': 'Video is unavailable or does not exist'
+            'error': 'Error message'
         }
+    """
+    try:
+        video_id = get_transcript_video_id(video_id_or_url)
+        if not video_id:
+            return {
+                'success': False,
+                'error': 'Invalid video ID or URL'
+            }
+
+        transcript = await load_video_transcript(video_id, languages)
     except Exception as e:
-        logging.error(f"Error fetching transcript for video {video_id_or_url}: {e}")
+        return get_transcript_error(e, video_id_or_url, languages)
+
+    match = transcript.search(topic)
+    if match is None:
         return {
             'success': False,
-            'error': f'Failed to fetch transcript: {str(e)}'
+            'error': 'Topic not found in transcript'
         }
 
+    start = max(0.0, match['start'] - Config.TRANSCRIPT_DEEP_LINK_LEAD)
+    return {
+        'success': True,
+        'video_id': video_id,
+        'language': transcript.language,
+        **match,
+        'segment_start': match['start'],
+        'start': start,
+        'deep_link': f'https://www.youtube.com/watch?v={video_id}&t={int(start)}s'
+    }
+
 
 async def enrich_video_with_transcript(video_data, fetch_transcript=False):
     """